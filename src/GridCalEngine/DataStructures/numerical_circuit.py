@@ -18,7 +18,7 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 import scipy.sparse as sp
-from typing import List, Tuple, Dict, Union, TYPE_CHECKING
+from typing import List, Tuple, Dict, Union, Callable, Any, TYPE_CHECKING
 
 from GridCalEngine.basic_structures import Logger
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
@@ -27,7 +27,7 @@ from GridCalEngine.enumerations import BranchImpedanceMode
 import GridCalEngine.Topology.topology as tp
 import GridCalEngine.Topology.simulation_indices as si
 
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 import GridCalEngine.Compilers.circuit_to_data as gc_compiler2
 import GridCalEngine.Topology.admittance_matrices as ycalc
 import GridCalEngine.DataStructures as ds
@@ -252,6 +252,12 @@ class NumericalCircuit:
         # Dict[idtag] -> (structure, index)
         self.structs_dict_: Union[Dict[str, Tuple[ALL_STRUCTS, int]], None] = None
 
+        # (optional) cache of admittance structures shared among circuits with the same static data
+        self.admittance_cache: Union[ycalc.AdmittanceMatricesCache, None] = None
+
+        # (optional) sparse factorization handle to reuse the symbolic analysis among power flows
+        self.sparse_solver: Union[SparseLinearSolver, None] = None
+
     def reset_calculations(self):
         """
         This resets the lazy evaluation of the calculations like Ybus, Sbus, etc...
@@ -797,7 +803,9 @@ class NumericalCircuit:
         """
         # compute on demand and store
         if self.conn_matrices_ is None:
-            self.conn_matrices_ = self.get_connectivity_matrices()
+            self.conn_matrices_ = self.get_cached('connectivity',
+                                                  self.get_connectivity_matrices,
+                                                  self.branch_data.active)
 
         return self.conn_matrices_.Cf
 
@@ -809,7 +817,9 @@ class NumericalCircuit:
         """
         # compute on demand and store
         if self.conn_matrices_ is None:
-            self.conn_matrices_ = self.get_connectivity_matrices()
+            self.conn_matrices_ = self.get_cached('connectivity',
+                                                  self.get_connectivity_matrices,
+                                                  self.branch_data.active)
 
         return self.conn_matrices_.Ct
 
@@ -820,7 +830,9 @@ class NumericalCircuit:
         :return: CSC matrix
         """
         if self.conn_matrices_ is None:
-            self.conn_matrices_ = self.get_connectivity_matrices()
+            self.conn_matrices_ = self.get_cached('connectivity',
+                                                  self.get_connectivity_matrices,
+                                                  self.branch_data.active)
 
         return self.conn_matrices_.A
 
@@ -847,6 +859,50 @@ class NumericalCircuit:
             Ct_=self.branch_data.C_branch_bus_t.tocsc()
         )
 
+    def get_cached(self, name: str, func: Callable[[], Any], *arrays: np.ndarray) -> Any:
+        """
+        Get a structure from the admittance cache if there is any
+        :param name: name of the structure
+        :param func: function without arguments to compute the structure
+        :param arrays: arrays that the structure depends on (besides the static data)
+        :return: structure
+        """
+        if self.admittance_cache is None:
+            return func()
+        else:
+            key = (name, ycalc.get_arrays_hash(self.bus_data.original_idx,
+                                               self.branch_data.original_idx,
+                                               *arrays))
+            return self.admittance_cache.get(key, func)
+
+    def get_structure_hash(self) -> bytes:
+        """
+        Get a digest of the information that defines the admittances, the islands and the bus types.
+        Circuits compiled from the same grid with the same digest only differ in their injections and set points
+        :return: digest bytes
+        """
+        return ycalc.get_arrays_hash(self.bus_data.active,
+                                     self.bus_data.bus_types,
+                                     self.branch_data.active,
+                                     self.branch_data.tap_module,
+                                     self.branch_data.tap_angle,
+                                     self.branch_data.Beq,
+                                     self.Yshunt_from_devices)
+
+    def get_cached_admittance_matrices(self) -> ycalc.AdmittanceMatrices:
+        """
+        Get Admittance structures, reusing them from the admittance cache if possible.
+        The returned object may be shared, use get_admittance_matrices to modify it.
+        :return: Admittance object
+        """
+        return self.get_cached('admittances',
+                               self.get_admittance_matrices,
+                               self.branch_data.active,
+                               self.branch_data.tap_module,
+                               self.branch_data.tap_angle,
+                               self.branch_data.Beq,
+                               self.Yshunt_from_devices)
+
     def get_admittance_matrices(self) -> ycalc.AdmittanceMatrices:
         """
         Get Admittance structures
@@ -945,7 +1001,7 @@ class NumericalCircuit:
 
         # compute admittances on demand
         if self.admittances_ is None:
-            self.admittances_ = self.get_admittance_matrices()
+            self.admittances_ = self.get_cached_admittance_matrices()
 
         return self.admittances_.Ybus
 
@@ -956,7 +1012,7 @@ class NumericalCircuit:
         :return: CSC matrix
         """
         if self.admittances_ is None:
-            self.admittances_ = self.get_admittance_matrices()
+            self.admittances_ = self.get_cached_admittance_matrices()
 
         return self.admittances_.Yf
 
@@ -967,7 +1023,7 @@ class NumericalCircuit:
         :return: CSC matrix
         """
         if self.admittances_ is None:
-            self.admittances_ = self.get_admittance_matrices()
+            self.admittances_ = self.get_cached_admittance_matrices()
 
         return self.admittances_.Yt
 
@@ -979,7 +1035,13 @@ class NumericalCircuit:
         """
         # compute admittances on demand
         if self.series_admittances_ is None:
-            self.series_admittances_ = self.get_series_admittance_matrices()
+            self.series_admittances_ = self.get_cached('series_admittances',
+                                                       self.get_series_admittance_matrices,
+                                                       self.branch_data.active,
+                                                       self.branch_data.tap_module,
+                                                       self.branch_data.tap_angle,
+                                                       self.branch_data.Beq,
+                                                       self.Yshunt_from_devices)
 
         return self.series_admittances_.Yseries
 
@@ -990,7 +1052,13 @@ class NumericalCircuit:
         :return: Array of complex values
         """
         if self.series_admittances_ is None:
-            self.series_admittances_ = self.get_series_admittance_matrices()
+            self.series_admittances_ = self.get_cached('series_admittances',
+                                                       self.get_series_admittance_matrices,
+                                                       self.branch_data.active,
+                                                       self.branch_data.tap_module,
+                                                       self.branch_data.tap_angle,
+                                                       self.branch_data.Beq,
+                                                       self.Yshunt_from_devices)
 
         return self.series_admittances_.Yshunt
 
@@ -1001,7 +1069,10 @@ class NumericalCircuit:
         :return:
         """
         if self.fast_decoupled_admittances_ is None:
-            self.fast_decoupled_admittances_ = self.get_fast_decoupled_amittances()
+            self.fast_decoupled_admittances_ = self.get_cached('fast_decoupled_admittances',
+                                                               self.get_fast_decoupled_amittances,
+                                                               self.branch_data.active,
+                                                               self.branch_data.tap_module)
 
         return self.fast_decoupled_admittances_.B1
 
@@ -1012,7 +1083,10 @@ class NumericalCircuit:
         :return:
         """
         if self.fast_decoupled_admittances_ is None:
-            self.fast_decoupled_admittances_ = self.get_fast_decoupled_amittances()
+            self.fast_decoupled_admittances_ = self.get_cached('fast_decoupled_admittances',
+                                                               self.get_fast_decoupled_amittances,
+                                                               self.branch_data.active,
+                                                               self.branch_data.tap_module)
 
         return self.fast_decoupled_admittances_.B2
 
@@ -1023,7 +1097,10 @@ class NumericalCircuit:
         :return:
         """
         if self.linear_admittances_ is None:
-            self.linear_admittances_ = self.get_linear_admittance_matrices()
+            self.linear_admittances_ = self.get_cached('linear_admittances',
+                                                       self.get_linear_admittance_matrices,
+                                                       self.branch_data.active,
+                                                       self.branch_data.tap_module)
 
         return self.linear_admittances_.Bbus
 
@@ -1034,7 +1111,10 @@ class NumericalCircuit:
         :return:
         """
         if self.linear_admittances_ is None:
-            self.linear_admittances_ = self.get_linear_admittance_matrices()
+            self.linear_admittances_ = self.get_cached('linear_admittances',
+                                                       self.get_linear_admittance_matrices,
+                                                       self.branch_data.active,
+                                                       self.branch_data.tap_module)
 
         return self.linear_admittances_.Bf
 
@@ -1045,7 +1125,10 @@ class NumericalCircuit:
         :return:
         """
         if self.linear_admittances_ is None:
-            self.linear_admittances_ = self.get_linear_admittance_matrices()
+            self.linear_admittances_ = self.get_cached('linear_admittances',
+                                                       self.get_linear_admittance_matrices,
+                                                       self.branch_data.active,
+                                                       self.branch_data.tap_module)
 
         return self.linear_admittances_.get_Bred(pqpv=self.pqpv)
 
@@ -1056,7 +1139,10 @@ class NumericalCircuit:
         :return:
         """
         if self.linear_admittances_ is None:
-            self.linear_admittances_ = self.get_linear_admittance_matrices()
+            self.linear_admittances_ = self.get_cached('linear_admittances',
+                                                       self.get_linear_admittance_matrices,
+                                                       self.branch_data.active,
+                                                       self.branch_data.tap_module)
 
         return self.linear_admittances_.get_Bslack(pqpv=self.pqpv, vd=self.vd)
 
@@ -1850,6 +1936,12 @@ class NumericalCircuit:
         if consider_hvdc_as_island_links:
             nc.hvdc_data = self.hvdc_data.slice(elm_idx=hvdc_idx, bus_idx=bus_idx)
 
+        # the islands of the same circuit share the static data, hence they may share the cache too
+        nc.admittance_cache = self.admittance_cache
+
+        # the factorization handle keeps the analysis of every island Jacobian pattern
+        nc.sparse_solver = self.sparse_solver
+
         return nc
 
     def split_into_islands(self,
@@ -1863,8 +1955,14 @@ class NumericalCircuit:
         """
 
         # find the matching islands
-        adj = self.compute_adjacency_matrix(consider_hvdc_as_island_links=consider_hvdc_as_island_links)
-        idx_islands = tp.find_islands(adj=adj, active=self.bus_data.active)
+        idx_islands = self.get_cached('islands_{}'.format(consider_hvdc_as_island_links),
+                                      lambda: tp.find_islands(
+                                          adj=self.compute_adjacency_matrix(
+                                              consider_hvdc_as_island_links=consider_hvdc_as_island_links),
+                                          active=self.bus_data.active),
+                                      self.bus_data.active,
+                                      self.branch_data.active,
+                                      self.hvdc_data.active)
 
         circuit_islands = list()  # type: List[NumericalCircuit]
 
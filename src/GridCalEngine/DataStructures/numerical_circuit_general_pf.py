@@ -27,7 +27,7 @@ from GridCalEngine.enumerations import BranchImpedanceMode
 import GridCalEngine.Topology.topology as tp
 import GridCalEngine.Topology.simulation_indices as si
 
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 import GridCalEngine.Compilers.circuit_to_generalised_pf as gc_compiler2
 import GridCalEngine.Topology.admittance_matrices as ycalc
 import GridCalEngine.DataStructures as ds
@@ -259,6 +259,9 @@ class NumericalCircuit:
         # Dict[idtag] -> (structure, index)
         self.structs_dict_: Union[Dict[str, Tuple[ALL_STRUCTS, int]], None] = None
 
+        # (optional) sparse factorization handle to reuse the symbolic analysis among power flows
+        self.sparse_solver: Union[SparseLinearSolver, None] = None
+
 
     def reset_calculations(self):
         """
@@ -0,0 +1,643 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from __future__ import annotations
+import copy
+import numpy as np
+from typing import Dict, List, Any, Union, TYPE_CHECKING
+
+from GridCalEngine.basic_structures import Vec, IntVec, Mat
+from GridCalEngine.enumerations import BusMode, BranchImpedanceMode, ExternalGridMode
+from GridCalEngine.Devices.multi_circuit import MultiCircuit
+from GridCalEngine.Devices.profile_store import get_profiles_values
+from GridCalEngine.Devices.Substation.bus import Bus
+from GridCalEngine.Devices.Aggregation.area import Area
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit, compile_numerical_circuit_at
+from GridCalEngine.Topology.admittance_matrices import AdmittanceMatricesCache
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import SparseLinearSolver
+
+if TYPE_CHECKING:  # Only imports the below statements during type checking
+    from GridCalEngine.Simulations.OPF.opf_results import OptimalPowerFlowResults
+
+
+class StackedArray:
+    """
+    Time x device stack of a compiled property.
+    Only the devices whose value changes along the time are stored in the matrix,
+    the rest are represented by the base array.
+    """
+
+    def __init__(self, base: np.ndarray, idx: IntVec, data: np.ndarray):
+        """
+        Constructor
+        :param base: array of values of all the devices at the first time step
+        :param idx: indices of the devices that change in time
+        :param data: matrix (time, len(idx)) with the values of the changing devices
+        """
+        self.base = base
+        self.idx = idx
+        self.data = data
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by this structure
+        :return: number of bytes
+        """
+        return self.base.nbytes + self.idx.nbytes + self.data.nbytes
+
+    def at(self, r: int) -> np.ndarray:
+        """
+        Get a new array with the values at a given position of the stack
+        :param r: row of the stack (not the time index)
+        :return: array of values for all the devices
+        """
+        arr = self.base.copy()
+        if len(self.idx):
+            arr[self.idx] = self.data[r, :]
+        return arr
+
+    def slice(self, r: IntVec) -> "StackedArray":
+        """
+        Get a StackedArray with only some of the rows
+        :param r: array of rows of the stack
+        :return: StackedArray
+        """
+        return StackedArray(base=self.base, idx=self.idx, data=self.data[r, :])
+
+    def rows(self, r: IntVec) -> np.ndarray:
+        """
+        Get the dense matrix of values at a number of stack positions
+        :param r: array of rows of the stack
+        :return: matrix (len(r), number of devices)
+        """
+        mat = np.tile(self.base, (len(r), 1))
+        if len(self.idx):
+            mat[:, self.idx] = self.data[r, :]
+        return mat
+
+
+def stack_matrix(mat: Mat, dtype) -> StackedArray:
+    """
+    Build a StackedArray from the (time x devices) matrix of values
+    :param mat: matrix (nt, number of devices) in the compilation order
+    :param dtype: data type to store
+    :return: StackedArray
+    """
+    mat = np.asarray(mat)
+    nt, ndev = mat.shape
+
+    if nt > 0:
+        base = mat[0, :]
+        idx = np.where(np.any(mat != base, axis=0))[0]
+    else:
+        base = np.zeros(ndev, dtype=dtype)
+        idx = np.zeros(0, dtype=int)
+
+    return StackedArray(base=np.array(base, dtype=dtype),
+                        idx=idx.astype(int),
+                        data=np.array(mat[:, idx], dtype=dtype))
+
+
+class NumericalCircuitTimeSeries:
+    """
+    Compile once, patch per time step.
+    The static information (topology, impedances, etc.) is compiled a single time
+    and the time-dependent values are gathered from pre-stacked profile matrices
+    to produce the NumericalCircuit of every time step.
+    """
+
+    def __init__(self,
+                 circuit: MultiCircuit,
+                 time_indices: Union[IntVec, None] = None,
+                 apply_temperature=False,
+                 branch_tolerance_mode=BranchImpedanceMode.Specified,
+                 opf_results: Union[OptimalPowerFlowResults, None] = None,
+                 use_stored_guess=False,
+                 bus_dict: Union[Dict[Bus, int], None] = None,
+                 areas_dict: Union[Dict[Area, int], None] = None,
+                 admittance_cache_size: int = 32):
+        """
+        Constructor
+        :param circuit: MultiCircuit instance
+        :param time_indices: array of time indices to prepare, if None all the time steps are prepared
+        :param apply_temperature: apply the branch temperature correction
+        :param branch_tolerance_mode: Branch tolerance mode
+        :param opf_results:(optional) OptimalPowerFlowResults (time series) instance
+        :param use_stored_guess: use the storage voltage guess?
+        :param bus_dict (optional) Dict[Bus, int] dictionary
+        :param areas_dict (optional) Dict[Area, int] dictionary
+        :param admittance_cache_size: number of admittance structures to keep (0 to disable the cache)
+        """
+        self.time_indices: IntVec = (circuit.get_all_time_indices() if time_indices is None
+                                     else np.array(time_indices, dtype=int))
+
+        self.use_stored_guess = use_stored_guess
+
+        # time index -> stack row
+        self.time_map: Dict[int, int] = {int(t): r for r, t in enumerate(self.time_indices)}
+
+        # compile the static information with the time series semantics
+        self.base: NumericalCircuit = compile_numerical_circuit_at(circuit=circuit,
+                                                                   t_idx=int(self.time_indices[0]),
+                                                                   apply_temperature=apply_temperature,
+                                                                   branch_tolerance_mode=branch_tolerance_mode,
+                                                                   opf_results=opf_results,
+                                                                   use_stored_guess=use_stored_guess,
+                                                                   bus_dict=bus_dict,
+                                                                   areas_dict=areas_dict)
+        self.Vbus0 = self.base.bus_data.Vbus.copy()
+
+        # all the time steps share the static data, hence the admittances of equal topologies are reused
+        self.admittance_cache_size = admittance_cache_size
+        self.admittance_cache: Union[AdmittanceMatricesCache, None] = (
+            AdmittanceMatricesCache(max_size=admittance_cache_size) if admittance_cache_size > 0 else None
+        )
+
+        # the Jacobians of the time steps usually have the same structure
+        self.sparse_solver = SparseLinearSolver()
+
+        self.gen_bus_idx: IntVec = self.base.generator_data.get_bus_indices()
+        self.batt_bus_idx: IntVec = self.base.battery_data.get_bus_indices()
+        self.hvdc_F: IntVec = self.base.hvdc_data.get_bus_indices_f()
+        self.hvdc_T: IntVec = self.base.hvdc_data.get_bus_indices_t()
+
+        self.static_bus_types: IntVec = self.get_static_bus_types(circuit=circuit)
+
+        # devices whose reactive power limits depend on the active power
+        self.gen_q_curves = [(k, elm.q_curve) for k, elm in enumerate(circuit.get_generators())
+                             if elm.use_reactive_power_curve]
+        self.batt_q_curves = [(k, elm.q_curve) for k, elm in enumerate(circuit.get_batteries())
+                              if elm.use_reactive_power_curve]
+
+        self.stacks: Dict[str, StackedArray] = dict()
+        self.compile_bus_stacks(circuit=circuit)
+        self.compile_load_stacks(circuit=circuit, opf_results=opf_results)
+        self.compile_shunt_stacks(circuit=circuit)
+        self.compile_generator_stacks(devices=circuit.get_generators(), prefix='gen', opf_results=opf_results)
+        self.compile_generator_stacks(devices=circuit.get_batteries(), prefix='batt', opf_results=opf_results)
+        self.compile_branch_stacks(circuit=circuit, opf_results=opf_results)
+        self.compile_hvdc_stacks(circuit=circuit, opf_results=opf_results)
+        self.compile_fluid_stacks(circuit=circuit)
+
+    @property
+    def nt(self) -> int:
+        """
+        Number of prepared time steps
+        :return: int
+        """
+        return len(self.time_indices)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the stacked profiles
+        :return: number of bytes
+        """
+        return sum([s.nbytes for s in self.stacks.values()])
+
+    def get_static_bus_types(self, circuit: MultiCircuit) -> IntVec:
+        """
+        Get the bus types that do not depend on the time (slack buses and PV external grids)
+        :param circuit: MultiCircuit
+        :return: array of bus types
+        """
+        bus_types = np.full(self.base.nbus, BusMode.PQ.value, dtype=int)
+        for i, bus in enumerate(circuit.buses):
+            if bus.is_slack:
+                bus_types[i] = BusMode.Slack.value
+
+        bus_dict = {bus: i for i, bus in enumerate(circuit.buses)}
+        for elm in circuit.get_external_grids():
+            i = bus_dict[elm.bus]
+            if elm.mode == ExternalGridMode.VD:
+                bus_types[i] = BusMode.Slack.value
+            elif elm.mode == ExternalGridMode.PV:
+                if bus_types[i] != BusMode.Slack.value:
+                    bus_types[i] = BusMode.PV.value
+
+        return bus_types
+
+    def prof(self, devices: List[Any], prop: str) -> Mat:
+        """
+        Get the values of a profile of a list of devices at the prepared time indices.
+        The profiles stored in the circuit's profile store are fetched with one call per store
+        :param devices: list of devices
+        :param prop: profile property name
+        :return: matrix (nt, number of devices)
+        """
+        return get_profiles_values(profiles=[getattr(elm, prop) for elm in devices],
+                                   time_indices=self.time_indices)
+
+    def add_stack(self, name: str, mat: Mat, dtype) -> None:
+        """
+        Store a stacked property
+        :param name: name of the stack
+        :param mat: matrix (nt, number of devices)
+        :param dtype: data type
+        """
+        self.stacks[name] = stack_matrix(mat=mat, dtype=dtype)
+
+    def compile_bus_stacks(self, circuit: MultiCircuit) -> None:
+        """
+        Stack the buses' time dependent values
+        :param circuit: MultiCircuit
+        """
+        self.add_stack('bus_active',
+                       self.prof(circuit.buses, 'active_prof'),
+                       dtype=self.base.bus_data.active.dtype)
+
+    def compile_load_stacks(self, circuit: MultiCircuit,
+                            opf_results: Union[OptimalPowerFlowResults, None] = None) -> None:
+        """
+        Stack the load-like devices' time dependent values, following the order of get_load_data
+        :param circuit: MultiCircuit
+        :param opf_results: OptimalPowerFlowResults (time series)
+        """
+        S = list()
+        I = list()
+        Y = list()
+        active = list()
+        cost = list()
+
+        def zeros(n: int) -> Mat:
+            return np.zeros((self.nt, n))
+
+        devices = circuit.get_loads()
+        s = self.prof(devices, 'P_prof') + 1j * self.prof(devices, 'Q_prof')
+        if opf_results is not None:
+            s = s - opf_results.load_shedding[np.ix_(self.time_indices, np.arange(len(devices)))]
+        S.append(s)
+        I.append(self.prof(devices, 'Ir_prof') + 1j * self.prof(devices, 'Ii_prof'))
+        Y.append(self.prof(devices, 'G_prof') + 1j * self.prof(devices, 'B_prof'))
+        active.append(self.prof(devices, 'active_prof'))
+        cost.append(self.prof(devices, 'Cost_prof'))
+
+        devices = circuit.get_static_generators()
+        S.append(-(self.prof(devices, 'P_prof') + 1j * self.prof(devices, 'Q_prof')))
+        I.append(zeros(len(devices)))
+        Y.append(zeros(len(devices)))
+        active.append(self.prof(devices, 'active_prof'))
+        cost.append(self.prof(devices, 'Cost_prof'))
+
+        devices = circuit.get_external_grids()
+        S.append(self.prof(devices, 'P_prof') + 1j * self.prof(devices, 'Q_prof'))
+        I.append(zeros(len(devices)))
+        Y.append(zeros(len(devices)))
+        active.append(self.prof(devices, 'active_prof'))
+        cost.append(zeros(len(devices)))
+
+        devices = circuit.get_controllable_shunts()
+        steps = self.prof(devices, 'step_prof').astype(int) - 1
+        y = np.empty((self.nt, len(devices)), dtype=complex)
+        for k, elm in enumerate(devices):
+            y[:, k] = elm.g_steps[steps[:, k]] + 1j * elm.b_steps[steps[:, k]]
+        S.append(zeros(len(devices)))
+        I.append(zeros(len(devices)))
+        Y.append(y)
+        active.append(self.prof(devices, 'active_prof'))
+        cost.append(self.prof(devices, 'Cost_prof'))
+
+        devices = circuit.get_current_injections()
+        S.append(zeros(len(devices)))
+        I.append(self.prof(devices, 'Ir_prof') + 1j * self.prof(devices, 'Ii_prof'))
+        Y.append(zeros(len(devices)))
+        active.append(self.prof(devices, 'active_prof'))
+        cost.append(self.prof(devices, 'Cost_prof'))
+
+        data = self.base.load_data
+        self.add_stack('load_S', np.hstack(S), dtype=data.S.dtype)
+        self.add_stack('load_I', np.hstack(I), dtype=data.I.dtype)
+        self.add_stack('load_Y', np.hstack(Y), dtype=data.Y.dtype)
+        self.add_stack('load_active', np.hstack(active), dtype=data.active.dtype)
+        self.add_stack('load_cost', np.hstack(cost), dtype=data.cost.dtype)
+
+    def compile_shunt_stacks(self, circuit: MultiCircuit) -> None:
+        """
+        Stack the shunts' time dependent values
+        :param circuit: MultiCircuit
+        """
+        devices = circuit.get_shunts()
+        data = self.base.shunt_data
+        self.add_stack('shunt_active',
+                       self.prof(devices, 'active_prof'),
+                       dtype=data.active.dtype)
+        self.add_stack('shunt_admittance',
+                       self.prof(devices, 'G_prof') + 1j * self.prof(devices, 'B_prof'),
+                       dtype=data.admittance.dtype)
+
+    def compile_generator_stacks(self, devices, prefix: str,
+                                 opf_results: Union[OptimalPowerFlowResults, None] = None) -> None:
+        """
+        Stack the generators' (or batteries') time dependent values
+        :param devices: list of generators or batteries
+        :param prefix: 'gen' or 'batt'
+        :param opf_results: OptimalPowerFlowResults (time series)
+        """
+        data = self.base.generator_data if prefix == 'gen' else self.base.battery_data
+
+        if opf_results is not None:
+            cols = np.ix_(self.time_indices, np.arange(len(devices)))
+            if prefix == 'gen':
+                p = opf_results.generator_power[cols] - opf_results.generator_shedding[cols]
+            else:
+                p = opf_results.battery_power[cols]
+        else:
+            p = self.prof(devices, 'P_prof')
+
+        self.add_stack(prefix + '_p', p, dtype=data.p.dtype)
+
+        for name, prop, dtype in [('active', 'active_prof', data.active.dtype),
+                                  ('pf', 'Pf_prof', data.pf.dtype),
+                                  ('v', 'Vset_prof', data.v.dtype),
+                                  ('cost_0', 'Cost0_prof', data.cost_0.dtype),
+                                  ('cost_1', 'Cost_prof', data.cost_1.dtype),
+                                  ('cost_2', 'Cost2_prof', data.cost_2.dtype),
+                                  ('srap', 'srap_enabled_prof', bool)]:
+            self.add_stack(prefix + '_' + name, self.prof(devices, prop), dtype=dtype)
+
+    def compile_branch_stacks(self, circuit: MultiCircuit,
+                              opf_results: Union[OptimalPowerFlowResults, None] = None) -> None:
+        """
+        Stack the branches' time dependent values, following the order of get_branch_data
+        :param circuit: MultiCircuit
+        :param opf_results: OptimalPowerFlowResults (time series)
+        """
+        data = self.base.branch_data
+
+        # list of compiled devices (the ill-connected windings are not compiled)
+        devices = list()
+        for lst in circuit.get_branch_lists_wo_hvdc():
+            for elm in lst:
+                if elm.bus_from is not None and elm.bus_to is not None:
+                    devices.append(elm)
+
+        rates = self.prof(devices, 'rate_prof')
+        self.add_stack('br_active',
+                       self.prof(devices, 'active_prof'),
+                       dtype=data.active.dtype)
+        self.add_stack('br_rates', rates, dtype=data.rates.dtype)
+        self.add_stack('br_contingency_rates',
+                       rates * self.prof(devices, 'contingency_factor_prof'),
+                       dtype=data.contingency_rates.dtype)
+        self.add_stack('br_protection_rates',
+                       rates * self.prof(devices, 'protection_rating_factor_prof'),
+                       dtype=data.protection_rates.dtype)
+        self.add_stack('br_overload_cost',
+                       self.prof(devices, 'Cost_prof'),
+                       dtype=data.overload_cost.dtype)
+
+        # the transformers and windings have tap profiles, the VSC angles may come from the OPF
+        trafos = set(circuit.transformers2w + circuit.windings)
+        vsc = set(circuit.vsc_devices)
+        trafo_idx = np.array([ii for ii, elm in enumerate(devices) if elm in trafos], dtype=int)
+        trafo_devices = [devices[ii] for ii in trafo_idx]
+
+        tap_module = np.tile(data.tap_module, (self.nt, 1))
+        if opf_results is None:
+            tap_module[:, trafo_idx] = self.prof(trafo_devices, 'tap_module_prof')
+
+        tap_angle = np.tile(data.tap_angle, (self.nt, 1))
+        if opf_results is not None:
+            opf_idx = np.array([ii for ii, elm in enumerate(devices) if elm in trafos or elm in vsc], dtype=int)
+            tap_angle[:, opf_idx] = opf_results.phase_shift[np.ix_(self.time_indices, opf_idx)]
+        else:
+            tap_angle[:, trafo_idx] = self.prof(trafo_devices, 'tap_phase_prof')
+
+        self.add_stack('br_tap_module', tap_module, dtype=data.tap_module.dtype)
+        self.add_stack('br_tap_angle', tap_angle, dtype=data.tap_angle.dtype)
+
+    def compile_hvdc_stacks(self, circuit: MultiCircuit,
+                            opf_results: Union[OptimalPowerFlowResults, None] = None) -> None:
+        """
+        Stack the HVDC lines' time dependent values
+        :param circuit: MultiCircuit
+        :param opf_results: OptimalPowerFlowResults (time series)
+        """
+        devices = circuit.hvdc_lines
+        data = self.base.hvdc_data
+
+        rate = self.prof(devices, 'rate_prof')
+        self.add_stack('hvdc_active', self.prof(devices, 'active_prof'), dtype=data.active.dtype)
+        self.add_stack('hvdc_rate', rate, dtype=data.rate.dtype)
+        self.add_stack('hvdc_contingency_rate',
+                       rate * self.prof(devices, 'contingency_factor_prof'),
+                       dtype=data.contingency_rate.dtype)
+        self.add_stack('hvdc_protection_rates',
+                       rate * self.prof(devices, 'protection_rating_factor_prof'),
+                       dtype=data.protection_rates.dtype)
+        self.add_stack('hvdc_angle_droop', self.prof(devices, 'angle_droop_prof'), dtype=data.angle_droop.dtype)
+        self.add_stack('hvdc_Vset_f', self.prof(devices, 'Vset_f_prof'), dtype=data.Vset_f.dtype)
+        self.add_stack('hvdc_Vset_t', self.prof(devices, 'Vset_t_prof'), dtype=data.Vset_t.dtype)
+
+        if opf_results is not None:
+            p = opf_results.hvdc_Pf[np.ix_(self.time_indices, np.arange(len(devices)))]
+        else:
+            p = self.prof(devices, 'Pset_prof')
+        self.add_stack('hvdc_Pset', p, dtype=data.Pset.dtype)
+
+    def compile_fluid_stacks(self, circuit: MultiCircuit) -> None:
+        """
+        Stack the fluid nodes' time dependent values
+        :param circuit: MultiCircuit
+        """
+        if len(circuit.fluid_nodes) > 0:
+            devices = circuit.get_fluid_nodes()
+            for name, prop in [('inflow', 'inflow_prof'),
+                               ('spillage_cost', 'spillage_cost_prof'),
+                               ('max_soc', 'max_soc_prof'),
+                               ('min_soc', 'min_soc_prof')]:
+                self.add_stack('fluid_' + name, self.prof(devices, prop), dtype=float)
+
+    def get_row(self, t_idx: int) -> int:
+        """
+        Get the stack row of a time index
+        :param t_idx: time index
+        :return: row
+        """
+        r = self.time_map.get(int(t_idx), None)
+        if r is None:
+            raise Exception('The time index {} was not compiled'.format(t_idx))
+        return r
+
+    def get_slice(self, time_indices: IntVec) -> "NumericalCircuitTimeSeries":
+        """
+        Get a copy that only contains some of the time steps.
+        This is used to send compact objects to parallel workers.
+        :param time_indices: array of time indices (must have been compiled)
+        :return: NumericalCircuitTimeSeries
+        """
+        rows = np.array([self.get_row(t) for t in time_indices], dtype=int)
+        obj = copy.copy(self)
+        obj.time_indices = np.array(time_indices, dtype=int)
+        obj.time_map = {int(t): r for r, t in enumerate(obj.time_indices)}
+        obj.stacks = {name: stack.slice(rows) for name, stack in self.stacks.items()}
+        if self.admittance_cache is not None:
+            obj.admittance_cache = AdmittanceMatricesCache(max_size=self.admittance_cache_size)
+        obj.sparse_solver = SparseLinearSolver()
+        return obj
+
+    def get_bus_types(self, gen_active: Vec, batt_active: Vec, hvdc_active: IntVec) -> IntVec:
+        """
+        Compose the bus types for the given device states
+        :param gen_active: array of generator states
+        :param batt_active: array of battery states
+        :param hvdc_active: array of HVDC states
+        :return: array of bus types
+        """
+        bus_types = self.static_bus_types.copy()
+
+        # controlled generators and batteries set their bus as PV if it is not the slack
+        for bus_idx, active, controllable in [
+            (self.gen_bus_idx, gen_active, self.base.generator_data.controllable),
+            (self.batt_bus_idx, batt_active, self.base.battery_data.controllable)
+        ]:
+            if len(bus_idx):
+                b = bus_idx[active.astype(bool) & controllable.astype(bool)]
+                b = b[bus_types[b] != BusMode.Slack.value]
+                bus_types[b] = BusMode.PV.value
+
+        # hack the bus types to believe they are PV
+        if len(hvdc_active):
+            act = hvdc_active.astype(bool)
+            bus_types[self.hvdc_F[act]] = BusMode.PV.value
+            bus_types[self.hvdc_T[act]] = BusMode.PV.value
+
+        return bus_types
+
+    def get_srap_power(self, p: Vec, active: Vec, srap: Vec, bus_idx: IntVec) -> Vec:
+        """
+        Get the SRAP available power per bus
+        :param p: array of generation power
+        :param active: array of generation states
+        :param srap: array of srap enabled flags
+        :param bus_idx: array of generation bus indices
+        :return: array of power per bus
+        """
+        mask = active.astype(bool) & srap.astype(bool) & (p > 0.0)
+        return np.bincount(bus_idx[mask], weights=p[mask], minlength=self.base.nbus)
+
+    def get_at(self, t_idx: int) -> NumericalCircuit:
+        """
+        Get the NumericalCircuit of a time index.
+        The static arrays are shared with the base compilation and must be considered read-only,
+        the time-dependent arrays are new for every call.
+        :param t_idx: time index
+        :return: NumericalCircuit
+        """
+        r = self.get_row(t_idx)
+        st = self.stacks
+
+        nc: NumericalCircuit = copy.copy(self.base)
+        nc.t_idx = int(t_idx)
+        nc.reset_calculations()
+        nc.simulation_indices_ = None
+        nc.admittance_cache = self.admittance_cache
+        nc.sparse_solver = self.sparse_solver
+
+        # generators and batteries
+        nc.generator_data = copy.copy(self.base.generator_data)
+        nc.battery_data = copy.copy(self.base.battery_data)
+        for data, prefix, q_curves in [(nc.generator_data, 'gen', self.gen_q_curves),
+                                       (nc.battery_data, 'batt', self.batt_q_curves)]:
+            data.p = st[prefix + '_p'].at(r)
+            data.active = st[prefix + '_active'].at(r)
+            data.pf = st[prefix + '_pf'].at(r)
+            data.v = st[prefix + '_v'].at(r)
+            data.cost_0 = st[prefix + '_cost_0'].at(r)
+            data.cost_1 = st[prefix + '_cost_1'].at(r)
+            data.cost_2 = st[prefix + '_cost_2'].at(r)
+
+            if len(q_curves):
+                data.qmin = data.qmin.copy()
+                data.qmax = data.qmax.copy()
+                for k, q_curve in q_curves:
+                    data.qmin[k] = q_curve.get_qmin(data.p[k])
+                    data.qmax[k] = q_curve.get_qmax(data.p[k])
+
+        # hvdc
+        nc.hvdc_data = copy.copy(self.base.hvdc_data)
+        nc.hvdc_data.active = st['hvdc_active'].at(r)
+        nc.hvdc_data.rate = st['hvdc_rate'].at(r)
+        nc.hvdc_data.contingency_rate = st['hvdc_contingency_rate'].at(r)
+        nc.hvdc_data.protection_rates = st['hvdc_protection_rates'].at(r)
+        nc.hvdc_data.angle_droop = st['hvdc_angle_droop'].at(r)
+        nc.hvdc_data.Pset = st['hvdc_Pset'].at(r)
+        nc.hvdc_data.Vset_f = st['hvdc_Vset_f'].at(r)
+        nc.hvdc_data.Vset_t = st['hvdc_Vset_t'].at(r)
+
+        # buses
+        nc.bus_data = copy.copy(self.base.bus_data)
+        nc.bus_data.active = st['bus_active'].at(r)
+        nc.bus_data.Vbus = self.Vbus0.copy()
+        nc.bus_data.bus_types = self.get_bus_types(gen_active=nc.generator_data.active,
+                                                   batt_active=nc.battery_data.active,
+                                                   hvdc_active=nc.hvdc_data.active)
+        nc.bus_data.srap_availbale_power = self.get_srap_power(p=nc.generator_data.p,
+                                                               active=nc.generator_data.active,
+                                                               srap=st['gen_srap'].at(r),
+                                                               bus_idx=self.gen_bus_idx)
+        nc.bus_data.srap_availbale_power += self.get_srap_power(p=nc.battery_data.p,
+                                                                active=nc.battery_data.active,
+                                                                srap=st['batt_srap'].at(r),
+                                                                bus_idx=self.batt_bus_idx)
+
+        # loads
+        nc.load_data = copy.copy(self.base.load_data)
+        nc.load_data.S = st['load_S'].at(r)
+        nc.load_data.I = st['load_I'].at(r)
+        nc.load_data.Y = st['load_Y'].at(r)
+        nc.load_data.active = st['load_active'].at(r)
+        nc.load_data.cost = st['load_cost'].at(r)
+
+        # shunts
+        nc.shunt_data = copy.copy(self.base.shunt_data)
+        nc.shunt_data.active = st['shunt_active'].at(r)
+        nc.shunt_data.admittance = st['shunt_admittance'].at(r)
+
+        # branches
+        nc.branch_data = copy.copy(self.base.branch_data)
+        nc.branch_data.active = st['br_active'].at(r)
+        nc.branch_data.rates = st['br_rates'].at(r)
+        nc.branch_data.contingency_rates = st['br_contingency_rates'].at(r)
+        nc.branch_data.protection_rates = st['br_protection_rates'].at(r)
+        nc.branch_data.overload_cost = st['br_overload_cost'].at(r)
+        nc.branch_data.tap_module = st['br_tap_module'].at(r)
+        nc.branch_data.tap_angle = st['br_tap_angle'].at(r)
+
+        # fluid nodes
+        if 'fluid_inflow' in st:
+            nc.fluid_node_data = copy.copy(self.base.fluid_node_data)
+            nc.fluid_node_data.inflow = st['fluid_inflow'].at(r)
+            nc.fluid_node_data.spillage_cost = st['fluid_spillage_cost'].at(r)
+            nc.fluid_node_data.max_soc = st['fluid_max_soc'].at(r)
+            nc.fluid_node_data.min_soc = st['fluid_min_soc'].at(r)
+
+        nc.consolidate_information(use_stored_guess=self.use_stored_guess)
+
+        return nc
+
+    def get_branch_active_matrix(self, time_indices: Union[IntVec, None] = None) -> Mat:
+        """
+        Get the matrix of branch states
+        :param time_indices: array of time indices (must have been compiled), if None all are used
+        :return: matrix (time, branches)
+        """
+        if time_indices is None:
+            rows = np.arange(self.nt)
+        else:
+            rows = np.array([self.get_row(t) for t in time_indices], dtype=int)
+        return self.stacks['br_active'].rows(rows)
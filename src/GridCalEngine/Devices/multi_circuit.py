@@ -33,6 +33,7 @@ from GridCalEngine.basic_structures import IntVec, StrVec, Vec, Mat, CxVec, IntM
 from GridCalEngine.data_logger import DataLogger
 import GridCalEngine.Devices as dev
 from GridCalEngine.Devices.types import ALL_DEV_TYPES, BRANCH_TYPES, INJECTION_DEVICE_TYPES, FLUID_TYPES
+from GridCalEngine.Devices.profile_store import ProfileStore
 from GridCalEngine.basic_structures import Logger
 import GridCalEngine.Topology.topology as tp
 from GridCalEngine.enumerations import DeviceType
@@ -301,6 +302,12 @@ class MultiCircuit:
         # master time profile
         self.time_profile: Union[pd.DatetimeIndex, None] = None
 
+        # optional columnar storage of the profiles (see build_profile_store)
+        self.profile_store: Union[ProfileStore, None] = None
+
+        # cached topology states index: (key of the status profiles' versions, index)
+        self._topology_states_cache: Union[Tuple[Tuple[int, ...], tp.TopologyStatesIndex], None] = None
+
         # contingencies
         self.contingencies: List[dev.Contingency] = list()
 
@@ -752,7 +759,39 @@ class MultiCircuit:
                  and that [5, 6, 7, 8] are represented by the topology of 5
         """
 
-        return tp.find_different_states(states_array=self.get_branch_active_time_array())
+        return self.get_topology_states().get_groups()
+
+    def get_status_devices(self) -> List[ALL_DEV_TYPES]:
+        """
+        Get the devices whose status defines the topology state:
+        branches without HVDC, switches, HVDC lines and generators
+        :return: list of devices
+        """
+        return self.get_branches_wo_hvdc() + self.switch_devices + self.hvdc_lines + self.generators
+
+    def get_status_time_array(self) -> IntMat:
+        """
+        Get the status of the devices that define the topology state
+        :return: array (time, devices) in the order of get_status_devices
+        """
+        devices = self.get_status_devices()
+        active = np.empty((self.get_time_number(), len(devices)), dtype=bool)
+        for i, elm in enumerate(devices):
+            active[:, i] = elm.active_prof.toarray()
+        return active
+
+    def get_topology_states(self) -> tp.TopologyStatesIndex:
+        """
+        Get the index of the different device status states along time.
+        The index is cached and rebuilt when any of the status profiles changes
+        :return: TopologyStatesIndex
+        """
+        key = (self.get_time_number(),) + tuple(elm.active_prof.version for elm in self.get_status_devices())
+
+        if self._topology_states_cache is None or self._topology_states_cache[0] != key:
+            self._topology_states_cache = (key, tp.TopologyStatesIndex(states_array=self.get_status_time_array()))
+
+        return self._topology_states_cache[1]
 
     def get_diagrams(self) -> List[Union[dev.MapDiagram, dev.SchematicDiagram]]:
         """
@@ -2726,6 +2765,7 @@ class MultiCircuit:
         """
 
         self.time_profile = pd.to_datetime(index, dayfirst=True)
+        self.release_profile_store()
 
         for elm in self.buses:
             elm.create_profiles(index)
@@ -2755,6 +2795,8 @@ class MultiCircuit:
             # it may come in nanoseconds instead of seconds...
             self.time_profile = pd.to_datetime(np.array(unix_data) / 1e9, unit='s', origin='unix')
 
+        self.release_profile_store()
+
         self.ensure_profiles_exist()
 
         for elm in self.buses:
@@ -2768,6 +2810,55 @@ class MultiCircuit:
             for elm in lst:
                 elm.create_profiles(self.time_profile)
 
+    def build_profile_store(self) -> ProfileStore:
+        """
+        Gather the numeric profiles of all the devices into columnar (time x devices) storage.
+        The devices' Profile objects become views over the store columns.
+        :return: ProfileStore
+        """
+        if self.time_profile is None:
+            raise Exception('Cannot build the profile store without a time index')
+
+        if self.profile_store is not None:
+            self.profile_store.detach()
+
+        self.profile_store = ProfileStore()
+        self.profile_store.build(grid=self)
+        return self.profile_store
+
+    def release_profile_store(self) -> None:
+        """
+        Copy the profile store values back into the devices' profiles and delete the store
+        """
+        if self.profile_store is not None:
+            self.profile_store.detach()
+            self.profile_store = None
+
+    def set_profiles_matrix(self,
+                            device_type: DeviceType,
+                            prop: str,
+                            mat: Mat,
+                            sparsity_threshold: float = 0.8) -> None:
+        """
+        Set the profile of a property for all the devices of a type from a (time x devices) matrix.
+        The values are kept in the profile store, without creating one array per device
+        :param device_type: DeviceType
+        :param prop: snapshot property name (i.e. "P")
+        :param mat: matrix (ntime, ndevices) in the order of the devices list
+        :param sparsity_threshold: proportion of repeated values to store a column as sparse
+        """
+        if mat.shape[0] != self.get_time_number():
+            raise ValueError(f'The matrix has {mat.shape[0]} rows, but there are {self.get_time_number()} time steps')
+
+        if self.profile_store is None:
+            self.profile_store = ProfileStore()
+
+        self.profile_store.set_matrix(device_type=device_type,
+                                      prop=prop,
+                                      devices=self.get_elements_by_type(device_type=device_type),
+                                      mat=mat,
+                                      sparsity_threshold=sparsity_threshold)
+
     def ensure_profiles_exist(self) -> None:
         """
         Format the pandas profiles in place using a time index.
@@ -15,13 +15,18 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-from typing import Union, Dict, Tuple, List, Any
+from __future__ import annotations
+from typing import Union, Dict, Tuple, List, Any, TYPE_CHECKING
 from collections import Counter
+from itertools import count
 import numpy as np
 import numba as nb
 from GridCalEngine.basic_structures import Numeric, NumericVec, IntVec
 from GridCalEngine.enumerations import DeviceType
-from GridCalEngine.Devices.sparse_array import SparseArray, PROFILE_TYPES, check_type
+from GridCalEngine.Devices.sparse_array import SparseArray, RleArray, PROFILE_TYPES, check_type, rle_count_runs
+
+if TYPE_CHECKING:  # Only imports the below statements during type checking
+    from GridCalEngine.Devices.profile_store import ColumnarProfile
 
 
 @nb.njit()
@@ -92,6 +97,105 @@ def check_if_sparse(arr: Union[NumericVec], sparsity: float = 0.8) -> Tuple[bool
         return True, max_val
 
 
+class StoreColumnSparseArray(SparseArray):
+    """
+    SparseArray built from a column of a columnar profile store.
+    The modifications are written back to the store through the Profile that handed it out
+    """
+
+    def __init__(self, data_type: PROFILE_TYPES) -> None:
+        """
+        Constructor
+        :param data_type: data type
+        """
+        SparseArray.__init__(self, data_type=data_type)
+
+        # profile to write the modifications to (None while building)
+        self.profile: Union[Profile, None] = None
+
+    def write_back(self) -> None:
+        """
+        Write the values into the profile
+        """
+        if self.profile is not None:
+            self.profile.write_back_sparse_array(self)
+
+    @SparseArray.default_value.setter
+    def default_value(self, val):
+        """
+        Default value setter
+        :param val: value
+        """
+        SparseArray.default_value.fset(self, val)
+        self.write_back()
+
+    def insert(self, i: int, x: Numeric):
+        """
+        Insert an element in the data dictionary
+        :param i: index
+        :param x: value
+        """
+        SparseArray.insert(self, i, x)
+        self.write_back()
+
+    def fill(self, value: Any):
+        """
+        Fill the sparse array with the same value
+        :param value: any value
+        """
+        SparseArray.fill(self, value)
+        self.write_back()
+
+    def __setitem__(self, key: int, value: Any) -> None:
+        SparseArray.__setitem__(self, key, value)
+        self.write_back()
+
+    def scale(self, value: Union[float, int]):
+        """
+        Scale all the values of this array
+        :param value: scaling factor
+        """
+        SparseArray.scale(self, value)
+        self.write_back()
+
+    def resize(self, n: int):
+        """
+        Resize the array
+        :param n: number of elements
+        """
+        SparseArray.resize(self, n)
+        self.write_back()
+
+    def resample(self, indices: IntVec):
+        """
+        Resample this sparse array in-place
+        :param indices: array of integer indices (not repeated)
+        """
+        SparseArray.resample(self, indices)
+        self.write_back()
+
+    def set_sparse_data_from_data(self, indptr, data):
+        """
+        Set the sparse entries
+        :param indptr: indices
+        :param data: values
+        """
+        SparseArray.set_sparse_data_from_data(self, indptr, data)
+        self.write_back()
+
+
+# global counter of profile modifications: every change takes a number that has never been used
+_PROFILE_VERSIONS = count(1)
+
+
+def next_profile_version() -> int:
+    """
+    Get a new profile version number
+    :return: int, larger than any previously returned
+    """
+    return next(_PROFILE_VERSIONS)
+
+
 class Profile:
     """
     Profile
@@ -113,7 +217,7 @@ class Profile:
 
         self._is_sparse: bool = is_sparse
 
-        self._sparse_array: Union[SparseArray, None] = None
+        self._sparse_array: Union[SparseArray, RleArray, None] = None
 
         self._dense_array: Union[NumericVec, None] = None
 
@@ -125,9 +229,93 @@ class Profile:
 
         self._default_value = default_value
 
+        # if set, the data lives in the column _store_col of a columnar store and this profile is a view
+        self._store: Union[ColumnarProfile, None] = None
+
+        self._store_col: int = -1
+
+        # sparse array handed out while being a view, and the store version it was built at
+        self._store_sparse_array: Union[StoreColumnSparseArray, None] = None
+        self._store_sparse_version: int = -1
+
+        # modification stamp, see the version property
+        self._version: int = next_profile_version()
+
         if arr is not None:
             self.set(arr=arr)
 
+    @property
+    def version(self) -> int:
+        """
+        Modification stamp of the values of this profile.
+        It changes every time the values are modified through the Profile (or its columnar store) API,
+        and it is never repeated by another profile, so it can be used as a cache key
+        :return: int
+        """
+        if self._store is not None:
+            return max(self._version, self._store.version)
+        else:
+            return self._version
+
+    @property
+    def is_view(self) -> bool:
+        """
+        Is this profile a view over a columnar store?
+        :return: bool
+        """
+        return self._store is not None
+
+    @property
+    def store(self) -> Union[ColumnarProfile, None]:
+        """
+        Columnar store this profile is a view of
+        :return: ColumnarProfile or None if the profile owns its data
+        """
+        return self._store
+
+    @property
+    def store_col(self) -> int:
+        """
+        Column of the store this profile is a view of
+        :return: int (-1 if the profile owns its data)
+        """
+        return self._store_col
+
+    def set_view(self, store: ColumnarProfile, col: int) -> None:
+        """
+        Make this profile a view over a column of a columnar store, the own data is released
+        :param store: ColumnarProfile
+        :param col: column (device) index in the store
+        """
+        self._store = store
+        self._store_col = col
+        self._store_sparse_array = None
+        self._version = next_profile_version()
+        self._is_sparse = bool(store.sparse_mask[col])
+        self._sparse_array = None
+        self._dense_array = None
+        self._initialized = True
+
+    def write_back_sparse_array(self, sparse_array: SparseArray) -> None:
+        """
+        Store the values of a sparse array obtained from the sparse_array property of a view
+        :param sparse_array: SparseArray modified by the caller
+        """
+        self.set(sparse_array.toarray())
+        if self._store is not None and sparse_array is self._store_sparse_array:
+            # the handed out array is up to date with the store
+            self._store_sparse_version = self._store.version
+
+    def detach_view(self) -> None:
+        """
+        Copy the values of the store column into this profile and stop being a view
+        """
+        if self._store is not None:
+            arr = self._store.get_column(self._store_col)
+            self._store = None
+            self._store_col = -1
+            self.set(arr.copy())
+
     def info(self):
         """
         Return dictionary with information about the profile object and its content
@@ -149,7 +337,10 @@ class Profile:
         Return the dictionary hosting the sparse data if this profile is sparse
         :return: Dict[int, Numeric]
         """
-        if self._sparse_array is not None:
+        if self._store is not None:
+            if self._is_sparse:
+                return self.sparse_array.get_map()
+        elif self._sparse_array is not None:
             return self._sparse_array.get_map()
 
     @property
@@ -175,6 +366,7 @@ class Profile:
         :param val:
         :return:
         """
+        self.detach_view()
         self._default_value = val
         if self.sparse_array is not None:
             self.sparse_array.default_value = self.default_value
@@ -203,11 +395,27 @@ class Profile:
         self._initialized = True
 
     @property
-    def sparse_array(self) -> Union[SparseArray, None]:
+    def sparse_array(self) -> Union[SparseArray, RleArray, None]:
         """
         Sparse array getter
-        :return: SparseArray or None
+        :return: SparseArray, RleArray or None
         """
+        if self._store is not None:
+            if self._is_sparse:
+                # build the sparse array of the store column only if the store changed since the last time
+                if self._store_sparse_array is None or self._store_sparse_version != self._store.version:
+                    base, indices, data = self._store.get_sparse_column(self._store_col)
+                    sparse_array = StoreColumnSparseArray(data_type=self.dtype)
+                    sparse_array.create(size=self._store.nt,
+                                        default_value=base.item(),
+                                        data={int(i): x.item() for i, x in zip(indices, data)})
+                    sparse_array.profile = self
+                    self._store_sparse_array = sparse_array
+                    self._store_sparse_version = self._store.version
+                return self._store_sparse_array
+            else:
+                return None
+
         return self._sparse_array
 
     @property
@@ -216,6 +424,9 @@ class Profile:
         Dense array getter
         :return: numpy array or None
         """
+        if self._store is not None:
+            return None if self._is_sparse else self._store.get_column(self._store_col)
+
         return self._dense_array
 
     def create_sparse(self, size: int, default_value: Numeric, map_data: Dict[int, Numeric] = None):
@@ -225,12 +436,21 @@ class Profile:
         :param default_value: default value
         :param map_data: map with the data
         """
+        self._store = None
+        self._version = next_profile_version()
         self._is_sparse = True
         self._sparse_array = SparseArray(data_type=self.dtype)
         if map_data is None:
             self._sparse_array.create(size=size, default_value=default_value)
         else:
             self._sparse_array.create_from_dict(default_value=default_value, size=size, map_data=map_data)
+
+            if self.dtype in (bool, int, float) and len(map_data) > 2:
+                # step-like data is smaller run-length encoded
+                rle_array = RleArray(data_type=self.dtype)
+                rle_array.create_from_dict(default_value=default_value, size=size, map_data=map_data)
+                if 2 * rle_array.n_runs < len(map_data):
+                    self._sparse_array = rle_array
         self._initialized = True
 
     def create_dense(self, size: int, default_value: Numeric):
@@ -239,6 +459,8 @@ class Profile:
         :param size: size
         :param default_value: default value
         """
+        self._store = None
+        self._version = next_profile_version()
         self._is_sparse = False
         self._dense_array = np.full(size, default_value)
         self._sparse_array = None
@@ -248,10 +470,11 @@ class Profile:
     def sparsity(self) -> float:
         """
         Get the profile sparsity
+        For the run-length encoded profiles this is the number of runs per position (see RleArray.get_sparsity)
         :return: floar value (0 for fully dense, almos 1 for fully sparse)
         """
         if self._is_sparse:
-            return self._sparse_array.get_sparsity()
+            return self.sparse_array.get_sparsity()
         else:
             return 0.0
 
@@ -261,6 +484,17 @@ class Profile:
         :param arr:
         :return:
         """
+        self._version = next_profile_version()
+
+        if self._store is not None:
+            if len(arr) == self._store.nt:
+                # write through the store
+                self._store.set_column(self._store_col, arr)
+                return
+            else:
+                self._store = None
+                self._store_col = -1
+
         if len(arr) > 0:
 
             # Count occurrences of each element in the array
@@ -272,8 +506,28 @@ class Profile:
             # compute the sparsity factor
             sparsity_factor = most_common_count / len(arr)
 
+            # number of runs of equal consecutive values
+            if self.dtype in (bool, int, float) and isinstance(arr, np.ndarray):
+                n_runs = rle_count_runs(arr)
+            else:
+                n_runs = len(arr)
+
             # if the sparsity is sufficient...
-            if sparsity_factor >= self._sparsity_threshold:
+            if sparsity_factor >= self._sparsity_threshold and 2 * n_runs < len(arr) - most_common_count:
+
+                # step-like profile: the runs take less space than the map
+                self._is_sparse = True
+                self._sparse_array = RleArray(data_type=self.dtype)
+                self._sparse_array.create_from_array(arr)
+
+            elif sparsity_factor < self._sparsity_threshold and 2 * n_runs <= (1.0 - self._sparsity_threshold) * len(arr):
+
+                # step-like profile that would be stored dense
+                self._is_sparse = True
+                self._sparse_array = RleArray(data_type=self.dtype)
+                self._sparse_array.create_from_array(arr)
+
+            elif sparsity_factor >= self._sparsity_threshold:
                 base = most_common_element  # this is the most frequent value
                 if isinstance(base, np.bool_):
                     base = bool(base)
@@ -310,6 +564,9 @@ class Profile:
         :param other: Profile
         :return: equal?
         """
+        if self._store is not None or other._store is not None:
+            return self._is_sparse == other._is_sparse and np.array_equal(self.toarray(), other.toarray())
+
         if self._is_sparse == other._is_sparse:
 
             if self._is_sparse:
@@ -326,7 +583,9 @@ class Profile:
         :param key: index position
         :return: value at "key"
         """
-        if self._is_sparse:
+        if self._store is not None:
+            return self._store.get_value(key, self._store_col)
+        elif self._is_sparse:
             return self._sparse_array[key]
         else:
             return self._dense_array[key]
@@ -339,7 +598,12 @@ class Profile:
         """
         if isinstance(key, int):
 
-            if self._is_sparse:
+            self._version = next_profile_version()
+
+            if self._store is not None:
+                assert key < self._store.nt
+                self._store.set_value(key, self._store_col, value)
+            elif self._is_sparse:
                 assert key < self._sparse_array.size()
                 self._sparse_array[key] = value
             else:
@@ -370,6 +634,7 @@ class Profile:
         Convert this profile to sparse
         :return: Nothing
         """
+        self.detach_view()
         if self._is_sparse:
             self._dense_array = self._sparse_array.toarray()
             self._sparse_array = None
@@ -380,6 +645,8 @@ class Profile:
         Resize the profile
         :param n: new size
         """
+        self.detach_view()
+        self._version = next_profile_version()
         if isinstance(n, int):
             if self._initialized:
                 if self._is_sparse:
@@ -397,6 +664,8 @@ class Profile:
         Resample this profile in-place
         :param indices: new indices
         """
+        self.detach_view()
+        self._version = next_profile_version()
         if self._is_sparse:
             self._sparse_array.resample(indices=indices)
         else:
@@ -409,6 +678,8 @@ class Profile:
         """
         check_type(dtype=self.dtype, value=value)
 
+        self._store = None
+        self._version = next_profile_version()
         self.default_value = value
         self._is_sparse = True
         if self._sparse_array is None:
@@ -421,11 +692,12 @@ class Profile:
         Scale this profile with the same value
         :param value: any value
         """
+        self.detach_view()
+        self._version = next_profile_version()
         if self._is_sparse:
 
-            # Scale the map
-            self._sparse_array._map = {key: val * value
-                                       for key, val in self._sparse_array.get_map().items()}
+            # Scale the sparse data
+            self._sparse_array.scale(value)
         else:
 
             # Scale the dense array
@@ -436,7 +708,9 @@ class Profile:
         Get the size
         :return: integer
         """
-        if self._initialized:
+        if self._store is not None:
+            return self._store.nt
+        elif self._initialized:
             return self._sparse_array.size() if self._is_sparse else len(self._dense_array)
         else:
             return 0
@@ -447,13 +721,28 @@ class Profile:
         :return: NumericVec
         """
         if self.size() > 0:
-            if self._is_sparse:
+            if self._store is not None:
+                return self._store.get_column(self._store_col)
+            elif self._is_sparse:
                 return self._sparse_array.toarray()
             else:
                 return self._dense_array
         else:
             return np.zeros(0)
 
+    def get_values(self, indices: IntVec) -> NumericVec:
+        """
+        Get the values at several positions at once
+        :param indices: array of integer indices
+        :return: NumericVec
+        """
+        if self._store is not None:
+            return self._store.get(time_indices=indices, device_indices=np.array([self._store_col]))[:, 0]
+        elif self._is_sparse:
+            return self._sparse_array.at_batch(indices)
+        else:
+            return self._dense_array[indices]
+
     def tolist(self) -> List[Union[int, float]]:
         """
         Get dense list representation
@@ -474,7 +763,7 @@ class Profile:
         Get the sparse representation of the sparse data
         :return:
         """
-        return self._sparse_array.get_sparse_representation()
+        return self.sparse_array.get_sparse_representation()
 
     def set_sparse_data_from_data(self, indptr, data):
         """
@@ -482,4 +771,6 @@ class Profile:
         :param indptr: array of data indices
         :param data: array of data values
         """
+        self.detach_view()
+        self._version = next_profile_version()
         self._sparse_array.set_sparse_data_from_data(indptr=indptr, data=data)
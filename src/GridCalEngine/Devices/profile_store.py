@@ -0,0 +1,559 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from __future__ import annotations
+
+from typing import Dict, List, Tuple, Union, Any, Sequence, TYPE_CHECKING
+import numpy as np
+import numba as nb
+
+from GridCalEngine.basic_structures import IntVec, BoolVec, NumericVec, Mat
+from GridCalEngine.enumerations import DeviceType
+from GridCalEngine.Devices.profile import Profile, next_profile_version
+
+if TYPE_CHECKING:  # Only imports the below statements during type checking
+    from GridCalEngine.Devices.multi_circuit import MultiCircuit
+
+
+@nb.njit(cache=True)
+def get_columns_mode(sorted_mat: Mat) -> Tuple[NumericVec, IntVec]:
+    """
+    Get the most frequent value of each column of a matrix whose columns are sorted
+    :param sorted_mat: matrix with every column sorted (nt, ndev)
+    :return: most frequent value per column (ndev), number of repetitions per column (ndev)
+    """
+    nt, ndev = sorted_mat.shape
+    mode = np.empty(ndev, dtype=sorted_mat.dtype)
+    count = np.zeros(ndev, dtype=np.int64)
+
+    for j in range(ndev):
+        if nt == 0:
+            continue
+
+        best_val = sorted_mat[0, j]
+        best_cnt = 1
+        run = 1
+        for i in range(1, nt):
+            if sorted_mat[i, j] == sorted_mat[i - 1, j]:
+                run += 1
+            else:
+                run = 1
+
+            if run > best_cnt:
+                best_cnt = run
+                best_val = sorted_mat[i, j]
+
+        mode[j] = best_val
+        count[j] = best_cnt
+
+    return mode, count
+
+
+@nb.njit(cache=True)
+def fill_sparse_columns(out: Mat, out_cols: IntVec, cols: IntVec, base: NumericVec,
+                        indptr: IntVec, indices: IntVec, data: NumericVec, t_pos: IntVec) -> None:
+    """
+    Write the values of sparse columns into a dense matrix
+    :param out: matrix to write into (len(time selection), ...)
+    :param out_cols: column of out where each sparse column goes
+    :param cols: sparse column indices to write
+    :param base: base value of each sparse column
+    :param indptr: column pointers of the sparse columns
+    :param indices: time indices of the entries different from the base value
+    :param data: entries different from the base value
+    :param t_pos: position of every time index in the time selection (-1 if not selected)
+    """
+    for k in range(len(cols)):
+        c = cols[k]
+        oc = out_cols[k]
+        for i in range(out.shape[0]):
+            out[i, oc] = base[c]
+
+        for p in range(indptr[c], indptr[c + 1]):
+            r = t_pos[indices[p]]
+            if r >= 0:
+                out[r, oc] = data[p]
+
+
+def get_profiles_values(profiles: Sequence[Profile], time_indices: IntVec, dtype=None) -> Mat:
+    """
+    Get the values of a list of profiles at some time indices as a (time x profiles) matrix.
+    The profiles that are views of the same columnar store are fetched with a single call to the store
+    :param profiles: list of Profile objects
+    :param time_indices: time indices
+    :param dtype: numpy data type of the result, if None it is inferred from the values
+    :return: matrix (len(time_indices), len(profiles))
+    """
+    time_indices = np.asarray(time_indices, dtype=int)
+
+    # store -> (positions in the list, store columns)
+    groups: Dict[int, Tuple[ColumnarProfile, List[int], List[int]]] = dict()
+    own: List[int] = list()
+    for k, profile in enumerate(profiles):
+        store = profile.store
+        if store is None:
+            own.append(k)
+        else:
+            _, pos, cols = groups.setdefault(id(store), (store, list(), list()))
+            pos.append(k)
+            cols.append(profile.store_col)
+
+    blocks = list()
+    for store, pos, cols in groups.values():
+        blocks.append((pos, store.get(time_indices=time_indices, device_indices=np.array(cols, dtype=int))))
+
+    if len(own):
+        blocks.append((own, np.array([profiles[k].get_values(time_indices) for k in own]).T))
+
+    if dtype is None:
+        dtype = np.result_type(*[b.dtype for _, b in blocks]) if len(blocks) else float
+
+    out = np.empty((len(time_indices), len(profiles)), dtype=dtype)
+    for pos, block in blocks:
+        out[:, pos] = block
+
+    return out
+
+
+class ColumnarProfile:
+    """
+    Time series of one property for a set of devices stored as a (time x devices) matrix.
+    The columns that vary are kept in one contiguous dense block and the mostly constant
+    columns are kept as a base value plus CSC-like arrays of the entries that differ from it.
+    """
+
+    def __init__(self, nt: int, dtype=float):
+        """
+        ColumnarProfile constructor (empty, use from_matrix or from_profiles)
+        :param nt: number of time steps
+        :param dtype: numpy data type
+        """
+        self.nt: int = nt
+        self.dtype = dtype
+
+        # modification stamp (see Profile.version)
+        self.version: int = next_profile_version()
+
+        # per device: is it stored as sparse? and position in the dense block or sparse structure
+        self.sparse_mask: BoolVec = np.zeros(0, dtype=bool)
+        self.position: IntVec = np.zeros(0, dtype=int)
+
+        # dense columns (nt, n_dense)
+        self.dense: Mat = np.zeros((nt, 0), dtype=dtype)
+
+        # sparse columns
+        self.base: NumericVec = np.zeros(0, dtype=dtype)
+        self.indptr: IntVec = np.zeros(1, dtype=int)
+        self.indices: IntVec = np.zeros(0, dtype=int)
+        self.data: NumericVec = np.zeros(0, dtype=dtype)
+
+    @property
+    def ndev(self) -> int:
+        """
+        Number of devices (columns)
+        :return: int
+        """
+        return len(self.sparse_mask)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """
+        Shape of the represented matrix
+        :return: (nt, ndev)
+        """
+        return self.nt, self.ndev
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays
+        :return: number of bytes
+        """
+        return sum(x.nbytes for x in (self.sparse_mask, self.position, self.dense,
+                                      self.base, self.indptr, self.indices, self.data))
+
+    @staticmethod
+    def from_matrix(mat: Mat, sparsity_threshold: float = 0.8) -> "ColumnarProfile":
+        """
+        Build from a dense (time x devices) matrix.
+        The columns whose most frequent value appears at least sparsity_threshold times are stored as sparse
+        :param mat: matrix (nt, ndev)
+        :param sparsity_threshold: proportion of repeated values to store a column as sparse
+        :return: ColumnarProfile
+        """
+        mat = np.asarray(mat)
+        nt, ndev = mat.shape
+        obj = ColumnarProfile(nt=nt, dtype=mat.dtype)
+
+        if nt > 0:
+            mode, count = get_columns_mode(np.sort(mat, axis=0))
+            sparse_mask = count >= sparsity_threshold * nt
+        else:
+            mode = np.zeros(ndev, dtype=mat.dtype)
+            sparse_mask = np.ones(ndev, dtype=bool)
+
+        dense_idx = np.where(~sparse_mask)[0]
+        sparse_idx = np.where(sparse_mask)[0]
+
+        obj.sparse_mask = sparse_mask
+        obj.position = np.empty(ndev, dtype=int)
+        obj.position[dense_idx] = np.arange(len(dense_idx))
+        obj.position[sparse_idx] = np.arange(len(sparse_idx))
+
+        obj.dense = np.ascontiguousarray(mat[:, dense_idx])
+
+        # entries different from the base value, column by column (transposed to get the column order)
+        obj.base = mode[sparse_idx]
+        diff = (mat[:, sparse_idx] != obj.base).T
+        cols, rows = np.nonzero(diff)
+        obj.indptr = np.r_[0, np.cumsum(np.bincount(cols, minlength=len(sparse_idx)))].astype(int)
+        obj.indices = rows.astype(int)
+        obj.data = mat[rows, sparse_idx[cols]]
+
+        return obj
+
+    @staticmethod
+    def from_profiles(profiles: Sequence[Profile], nt: int, dtype=float) -> "ColumnarProfile":
+        """
+        Build from existing Profile objects keeping their sparse / dense classification
+        :param profiles: list of Profile objects of length nt
+        :param nt: number of time steps
+        :param dtype: numpy data type
+        :return: ColumnarProfile
+        """
+        obj = ColumnarProfile(nt=nt, dtype=dtype)
+        ndev = len(profiles)
+        obj.sparse_mask = np.array([p.is_sparse for p in profiles], dtype=bool)
+        obj.position = np.empty(ndev, dtype=int)
+
+        dense_idx = np.where(~obj.sparse_mask)[0]
+        sparse_idx = np.where(obj.sparse_mask)[0]
+        obj.position[dense_idx] = np.arange(len(dense_idx))
+        obj.position[sparse_idx] = np.arange(len(sparse_idx))
+
+        obj.dense = np.empty((nt, len(dense_idx)), dtype=dtype)
+        for k, j in enumerate(dense_idx):
+            obj.dense[:, k] = profiles[j].toarray()
+
+        obj.base = np.empty(len(sparse_idx), dtype=dtype)
+        indptr = np.zeros(len(sparse_idx) + 1, dtype=int)
+        indices = list()
+        data = list()
+        for k, j in enumerate(sparse_idx):
+            sparse_map = profiles[j].get_sparse_map()
+            obj.base[k] = profiles[j].sparse_array.default_value
+            keys = sorted(sparse_map.keys())
+            indices += keys
+            data += [sparse_map[i] for i in keys]
+            indptr[k + 1] = indptr[k] + len(keys)
+
+        obj.indptr = indptr
+        obj.indices = np.array(indices, dtype=int)
+        obj.data = np.array(data, dtype=dtype)
+
+        return obj
+
+    def get(self,
+            time_indices: Union[IntVec, None] = None,
+            device_indices: Union[IntVec, None] = None) -> Mat:
+        """
+        Get the values at a selection of time steps and devices
+        :param time_indices: time indices, if None all are returned
+        :param device_indices: device indices, if None all are returned
+        :return: matrix (len(time_indices), len(device_indices))
+        """
+        if time_indices is None:
+            time_indices = np.arange(self.nt)
+        else:
+            time_indices = np.asarray(time_indices, dtype=int)
+
+        if device_indices is None:
+            device_indices = np.arange(self.ndev)
+        else:
+            device_indices = np.asarray(device_indices, dtype=int)
+
+        # repeated time indices are solved once and then expanded
+        t_unique, t_inv = np.unique(time_indices, return_inverse=True)
+
+        out = np.empty((len(t_unique), len(device_indices)), dtype=self.dtype)
+
+        is_sparse = self.sparse_mask[device_indices]
+        pos = self.position[device_indices]
+
+        dense_out = np.where(~is_sparse)[0]
+        if len(dense_out):
+            out[:, dense_out] = self.dense[np.ix_(t_unique, pos[dense_out])]
+
+        sparse_out = np.where(is_sparse)[0]
+        if len(sparse_out):
+            t_pos = np.full(self.nt, -1, dtype=int)
+            t_pos[t_unique] = np.arange(len(t_unique))
+            fill_sparse_columns(out=out,
+                                out_cols=sparse_out,
+                                cols=pos[sparse_out],
+                                base=self.base,
+                                indptr=self.indptr,
+                                indices=self.indices,
+                                data=self.data,
+                                t_pos=t_pos)
+
+        if len(t_unique) == len(time_indices) and np.all(t_unique == time_indices):
+            return out
+        else:
+            return out[t_inv, :]
+
+    def at(self, t: int, device_indices: Union[IntVec, None] = None) -> NumericVec:
+        """
+        Get the values of all the devices at a time step
+        :param t: time index
+        :param device_indices: device indices, if None all are returned
+        :return: array (len(device_indices))
+        """
+        return self.get(time_indices=np.array([t]), device_indices=device_indices)[0, :]
+
+    def get_column(self, j: int) -> NumericVec:
+        """
+        Get the full time series of a device
+        :param j: device index
+        :return: array (nt)
+        """
+        k = self.position[j]
+        if self.sparse_mask[j]:
+            col = np.full(self.nt, self.base[k], dtype=self.dtype)
+            a, b = self.indptr[k], self.indptr[k + 1]
+            col[self.indices[a:b]] = self.data[a:b]
+            return col
+        else:
+            return self.dense[:, k]
+
+    def get_sparse_column(self, j: int) -> Tuple[Any, IntVec, NumericVec]:
+        """
+        Get the sparse representation of a sparse column
+        :param j: device index
+        :return: base value, time indices of the different values, different values
+        """
+        k = self.position[j]
+        a, b = self.indptr[k], self.indptr[k + 1]
+        return self.base[k], self.indices[a:b], self.data[a:b]
+
+    def get_value(self, t: int, j: int) -> Any:
+        """
+        Get a single value
+        :param t: time index
+        :param j: device index
+        :return: value
+        """
+        k = self.position[j]
+        if self.sparse_mask[j]:
+            a, b = self.indptr[k], self.indptr[k + 1]
+            p = a + np.searchsorted(self.indices[a:b], t)
+            if p < b and self.indices[p] == t:
+                return self.data[p]
+            else:
+                return self.base[k]
+        else:
+            return self.dense[t, k]
+
+    def set_value(self, t: int, j: int, value: Any) -> None:
+        """
+        Set a single value
+        :param t: time index
+        :param j: device index
+        :param value: value to set
+        """
+        self.version = next_profile_version()
+        k = self.position[j]
+        if self.sparse_mask[j]:
+            a, b = self.indptr[k], self.indptr[k + 1]
+            p = a + np.searchsorted(self.indices[a:b], t)
+            found = p < b and self.indices[p] == t
+
+            if value == self.base[k]:
+                if found:
+                    self.indices = np.delete(self.indices, p)
+                    self.data = np.delete(self.data, p)
+                    self.indptr[k + 1:] -= 1
+            else:
+                if found:
+                    self.data[p] = value
+                else:
+                    self.indices = np.insert(self.indices, p, t)
+                    self.data = np.insert(self.data, p, value)
+                    self.indptr[k + 1:] += 1
+        else:
+            self.dense[t, k] = value
+
+    def set_column(self, j: int, arr: NumericVec) -> None:
+        """
+        Set the full time series of a device, the column keeps its storage type
+        :param j: device index
+        :param arr: array (nt)
+        """
+        if len(arr) != self.nt:
+            raise ValueError(f'The array length {len(arr)} does not match the number of time steps {self.nt}')
+
+        self.version = next_profile_version()
+        k = self.position[j]
+        if self.sparse_mask[j]:
+            arr = np.asarray(arr)
+            mode, _ = get_columns_mode(np.sort(arr.astype(self.dtype))[:, np.newaxis])
+            self.base[k] = mode[0]
+            new_idx = np.where(arr != mode[0])[0]
+
+            a, b = self.indptr[k], self.indptr[k + 1]
+            self.indices = np.r_[self.indices[:a], new_idx, self.indices[b:]].astype(int)
+            self.data = np.r_[self.data[:a], arr[new_idx], self.data[b:]].astype(self.dtype)
+            self.indptr[k + 1:] += len(new_idx) - (b - a)
+        else:
+            self.dense[:, k] = arr
+
+
+class ProfileStore:
+    """
+    Columnar storage of the device profiles of a MultiCircuit.
+    There is one ColumnarProfile per device type and property, and the
+    Profile objects of the devices become views over its columns
+    """
+
+    def __init__(self):
+        """
+        ProfileStore constructor
+        """
+        # (device type, property name) -> ColumnarProfile
+        self.data: Dict[Tuple[DeviceType, str], ColumnarProfile] = dict()
+
+        # device type -> list of devices in the columns order
+        self.devices: Dict[DeviceType, List[Any]] = dict()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays
+        :return: number of bytes
+        """
+        return sum(x.nbytes for x in self.data.values())
+
+    def get_keys(self) -> List[Tuple[DeviceType, str]]:
+        """
+        Get the stored (device type, property name) pairs
+        :return: list of keys
+        """
+        return list(self.data.keys())
+
+    def get_profile(self, device_type: DeviceType, prop: str) -> ColumnarProfile:
+        """
+        Get the columnar profile of a device type and property
+        :param device_type: DeviceType
+        :param prop: snapshot property name (i.e. "P")
+        :return: ColumnarProfile
+        """
+        return self.data[(device_type, prop)]
+
+    def get(self,
+            device_type: DeviceType,
+            prop: str,
+            time_indices: Union[IntVec, None] = None,
+            device_indices: Union[IntVec, None] = None) -> Mat:
+        """
+        Get the values at a selection of time steps and devices
+        :param device_type: DeviceType
+        :param prop: snapshot property name (i.e. "P")
+        :param time_indices: time indices, if None all are returned
+        :param device_indices: device indices (in the device list order), if None all are returned
+        :return: matrix (len(time_indices), len(device_indices))
+        """
+        return self.data[(device_type, prop)].get(time_indices=time_indices, device_indices=device_indices)
+
+    def attach(self, device_type: DeviceType, prop: str, devices: List[Any], values: ColumnarProfile) -> None:
+        """
+        Store a ColumnarProfile and turn the devices profiles into views over it
+        :param device_type: DeviceType
+        :param prop: snapshot property name (i.e. "P")
+        :param devices: list of devices in the columns order
+        :param values: ColumnarProfile
+        """
+        if values.ndev != len(devices):
+            raise ValueError(f'The number of columns {values.ndev} does not match the number of devices '
+                             f'{len(devices)}')
+
+        self.data[(device_type, prop)] = values
+        self.devices[device_type] = devices
+
+        for j, elm in enumerate(devices):
+            elm.get_profile(magnitude=prop).set_view(store=values, col=j)
+
+    def set_matrix(self,
+                   device_type: DeviceType,
+                   prop: str,
+                   devices: List[Any],
+                   mat: Mat,
+                   sparsity_threshold: float = 0.8) -> None:
+        """
+        Set the profiles of a property for a list of devices from a (time x devices) matrix
+        without creating one array per device
+        :param device_type: DeviceType
+        :param prop: snapshot property name (i.e. "P")
+        :param devices: list of devices in the columns order
+        :param mat: matrix (nt, ndev)
+        :param sparsity_threshold: proportion of repeated values to store a column as sparse
+        """
+        self.attach(device_type=device_type,
+                    prop=prop,
+                    devices=devices,
+                    values=ColumnarProfile.from_matrix(mat=mat, sparsity_threshold=sparsity_threshold))
+
+    def build(self, grid: MultiCircuit) -> None:
+        """
+        Gather the numeric profiles of all the devices of a grid into columnar storage
+        :param grid: MultiCircuit
+        """
+        nt = grid.get_time_number()
+
+        for template in grid.get_objects_with_profiles_list():
+
+            device_type = template.device_type
+            elm_list = grid.get_elements_by_type(device_type=device_type)
+
+            if len(elm_list) == 0:
+                continue
+
+            for prop, profile_name in template.properties_with_profile.items():
+
+                profiles = [getattr(elm, profile_name) for elm in elm_list]
+                dtype = profiles[0].dtype
+
+                # only the numeric profiles are stored, the object profiles are left as they are
+                if dtype not in (bool, int, float):
+                    continue
+
+                if not all(p.is_initialized and p.size() == nt for p in profiles):
+                    continue
+
+                self.attach(device_type=device_type,
+                            prop=prop,
+                            devices=elm_list,
+                            values=ColumnarProfile.from_profiles(profiles=profiles, nt=nt, dtype=dtype))
+
+    def detach(self) -> None:
+        """
+        Copy the stored values back into the devices' own profiles and clear the store
+        """
+        for (device_type, prop), values in self.data.items():
+            for elm in self.devices[device_type]:
+                elm.get_profile(magnitude=prop).detach_view()
+
+        self.data.clear()
+        self.devices.clear()
@@ -16,8 +16,9 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-from typing import Dict, Any, Union
+from typing import Dict, Any, Union, Tuple, Callable
 import numpy as np
+import numba as nb
 from GridCalEngine.enumerations import DeviceType
 from GridCalEngine.basic_structures import Numeric, NumericVec, IntVec
 
@@ -226,10 +227,10 @@ class SparseArray:
         if self._default_value != other._default_value:
             return False
 
-        if self._size != other._size:
+        if self._size != other.size():
             return False
 
-        if self._map != other._map:
+        if self._map != other.get_map():
             return False
 
         return True
@@ -241,6 +242,22 @@ class SparseArray:
         """
         return self._size
 
+    def at_batch(self, indices: IntVec) -> NumericVec:
+        """
+        Get the values at several positions
+        :param indices: array of indices
+        :return: array of values
+        """
+        return self.toarray()[indices]
+
+    def scale(self, value: Union[float, int]):
+        """
+        Scale all the values of this array
+        :param value: scaling factor
+        """
+        self._default_value = self._default_value * value
+        self._map = {key: val * value for key, val in self._map.items()}
+
     def resize(self, n: int):
         """
         Resize the array
@@ -317,3 +334,515 @@ class SparseArray:
         for i, x in zip(indptr, data):
             self._map[i] = x
 
+
+def get_numpy_type(data_type: PROFILE_TYPES):
+    """
+    Get the numpy type used to store the values of a profile type
+    :param data_type: profile type (bool, int, float or DeviceType)
+    :return: numpy type (object for the device types)
+    """
+    if data_type in (bool, int, float):
+        return data_type
+    else:
+        return object
+
+
+@nb.njit(cache=True)
+def rle_count_runs(arr: NumericVec) -> int:
+    """
+    Count the number of runs of equal consecutive values
+    :param arr: array
+    :return: number of runs
+    """
+    if len(arr) == 0:
+        return 0
+
+    n = 1
+    for i in range(1, len(arr)):
+        if arr[i] != arr[i - 1]:
+            n += 1
+    return n
+
+
+@nb.njit(cache=True)
+def rle_encode(arr: NumericVec) -> Tuple[IntVec, NumericVec]:
+    """
+    Run-length encode an array
+    :param arr: array
+    :return: start index of every run, value of every run
+    """
+    n_runs = rle_count_runs(arr)
+    starts = np.empty(n_runs, dtype=np.int64)
+    values = np.empty(n_runs, dtype=arr.dtype)
+
+    k = -1
+    for i in range(len(arr)):
+        if i == 0 or arr[i] != arr[i - 1]:
+            k += 1
+            starts[k] = i
+            values[k] = arr[i]
+
+    return starts, values
+
+
+@nb.njit(cache=True)
+def rle_decode(starts: IntVec, values: NumericVec, size: int) -> NumericVec:
+    """
+    Expand a run-length encoded array
+    :param starts: start index of every run
+    :param values: value of every run
+    :param size: length of the array
+    :return: array
+    """
+    arr = np.empty(size, dtype=values.dtype)
+    n_runs = len(starts)
+    for k in range(n_runs):
+        end = starts[k + 1] if k + 1 < n_runs else size
+        for i in range(starts[k], end):
+            arr[i] = values[k]
+    return arr
+
+
+@nb.njit(cache=True)
+def rle_at_batch(starts: IntVec, values: NumericVec, indices: IntVec, size: int) -> NumericVec:
+    """
+    Get the values of a run-length encoded array at several positions
+    :param starts: start index of every run
+    :param values: value of every run
+    :param indices: positions (negative positions count from the end, like in numpy)
+    :param size: length of the array
+    :return: array of values
+    """
+    idx = np.empty(len(indices), dtype=np.int64)
+    for i in range(len(indices)):
+        idx[i] = indices[i] + size if indices[i] < 0 else indices[i]
+    pos = np.searchsorted(starts, idx, side='right') - 1
+    res = np.empty(len(indices), dtype=values.dtype)
+    for i in range(len(indices)):
+        res[i] = values[pos[i]]
+    return res
+
+
+@nb.njit(cache=True)
+def rle_compress(starts: IntVec, values: NumericVec) -> Tuple[IntVec, NumericVec]:
+    """
+    Join the consecutive runs that have the same value
+    :param starts: start index of every run
+    :param values: value of every run
+    :return: start index of every run, value of every run
+    """
+    keep = np.ones(len(starts), dtype=np.bool_)
+    for k in range(1, len(starts)):
+        if values[k] == values[k - 1]:
+            keep[k] = False
+    return starts[keep], values[keep]
+
+
+@nb.njit(cache=True)
+def rle_from_sparse(keys: IntVec, data: NumericVec, default_value, size: int) -> Tuple[IntVec, NumericVec]:
+    """
+    Run-length encode an array given by a default value and the sorted positions that differ from it
+    :param keys: sorted positions of the non-default values
+    :param data: non-default values
+    :param default_value: value of the rest of positions
+    :param size: length of the array
+    :return: start index of every run, value of every run
+    """
+    starts = np.empty(2 * len(keys) + 1, dtype=np.int64)
+    values = np.empty(2 * len(keys) + 1, dtype=data.dtype)
+    k = 0
+    pos = 0
+    for i in range(len(keys)):
+        if keys[i] > pos:
+            # default gap before this position
+            starts[k] = pos
+            values[k] = default_value
+            k += 1
+
+        starts[k] = keys[i]
+        values[k] = data[i]
+        k += 1
+        pos = keys[i] + 1
+
+    if pos < size:
+        starts[k] = pos
+        values[k] = default_value
+        k += 1
+
+    return rle_compress(starts[:k], values[:k])
+
+
+@nb.njit(cache=True)
+def rle_merge(starts_a: IntVec, starts_b: IntVec) -> Tuple[IntVec, IntVec, IntVec]:
+    """
+    Merge the runs of two run-length encoded arrays of the same length
+    :param starts_a: run starts of the array a
+    :param starts_b: run starts of the array b
+    :return: merged run starts, run index in a of every merged run, run index in b of every merged run
+    """
+    n = len(starts_a) + len(starts_b)
+    starts = np.empty(n, dtype=np.int64)
+    idx_a = np.empty(n, dtype=np.int64)
+    idx_b = np.empty(n, dtype=np.int64)
+
+    ia = 0
+    ib = 0
+    k = 0
+    while ia < len(starts_a) or ib < len(starts_b):
+        sa = starts_a[ia] if ia < len(starts_a) else np.iinfo(np.int64).max
+        sb = starts_b[ib] if ib < len(starts_b) else np.iinfo(np.int64).max
+        s = min(sa, sb)
+        if sa == s:
+            ia += 1
+        if sb == s:
+            ib += 1
+        starts[k] = s
+        idx_a[k] = ia - 1
+        idx_b[k] = ib - 1
+        k += 1
+
+    return starts[:k], idx_a[:k], idx_b[:k]
+
+
+class RleArray:
+    """
+    Run-length encoded array, suited to step-like profiles
+    (i.e. seasonal ratings or maintenance outages).
+    It offers the same interface as SparseArray
+    """
+
+    def __init__(self, data_type: PROFILE_TYPES) -> None:
+        """
+        RleArray constructor
+        :param data_type: profile type (bool, int or float)
+        """
+        self._dtype = data_type
+        self._default_value: Numeric = 0
+        self._size: int = 0
+        self._starts: IntVec = np.zeros(0, dtype=int)
+        self._values: NumericVec = np.zeros(0, dtype=get_numpy_type(data_type))
+
+    @property
+    def dtype(self) -> Union[bool, int, float, DeviceType]:
+        """
+        Get the declared type
+        :return: type
+        """
+        return self._dtype
+
+    @property
+    def default_value(self):
+        """
+        Default value getter (the most frequent value)
+        :return: numeric value
+        """
+        return self._default_value
+
+    @default_value.setter
+    def default_value(self, val):
+        """
+        Default value setter, the positions that had the former default value take the new one
+        :param val: value
+        """
+        check_type(dtype=self.dtype, value=val)
+        if self.n_runs > 0 and val != self._default_value:
+            values = self._values.copy()
+            values[self._values == self._default_value] = val
+            self._starts, self._values = rle_compress(self._starts, values)
+        self._default_value = val
+
+    @property
+    def starts(self) -> IntVec:
+        """
+        Start index of every run
+        :return: IntVec
+        """
+        return self._starts
+
+    @property
+    def values(self) -> NumericVec:
+        """
+        Value of every run
+        :return: NumericVec
+        """
+        return self._values
+
+    @property
+    def n_runs(self) -> int:
+        """
+        Number of runs
+        :return: int
+        """
+        return len(self._starts)
+
+    def info(self):
+        """
+        Return dictionary with information about the profile object and its content
+        :return:
+        """
+        return {
+            "me": hex(id(self)),
+            "default_value": self._default_value,
+            "size": self._size,
+            "runs": self.n_runs,
+        }
+
+    def _set_runs(self, starts: IntVec, values: NumericVec) -> None:
+        """
+        Set the runs and update the default (most frequent) value
+        :param starts: start index of every run
+        :param values: value of every run
+        """
+        self._starts = starts
+        self._values = values.astype(get_numpy_type(self.dtype))
+
+        if len(starts):
+            lengths = np.diff(np.r_[starts, self._size])
+            uniques, inv = np.unique(self._values, return_inverse=True)
+            totals = np.bincount(inv, weights=lengths)
+            self._default_value = uniques[np.argmax(totals)].item()
+
+    def get_map(self) -> Dict[int, Numeric]:
+        """
+        Return a dictionary with the values different from the default value
+        :return: Dict[int, Numeric]
+        """
+        arr = self.toarray()
+        idx = np.where(arr != self._default_value)[0]
+        return {int(i): arr[i].item() for i in idx}
+
+    def get_sparsity(self) -> float:
+        """
+        Get the sparsity of this profile.
+        Unlike SparseArray.get_sparsity, which is the fraction of positions that differ from the default value,
+        this is the number of runs per position: a step-like profile with many non-default values still has
+        a low metric, since its storage only grows with the number of value changes
+        :return: Sparsity metric
+        """
+        return float(self.n_runs) / float(self._size) if self._size > 0 else 0.0
+
+    def create(self, size: int, default_value: Numeric, data: Union[Dict[int, Numeric], None] = None):
+        """
+        Build from definition
+        :param size: size
+        :param default_value: default value
+        :param data: map of the values different from the default value
+        """
+        self.create_from_dict(default_value=default_value, size=size,
+                              map_data=data if data is not None else dict())
+
+    def create_from_array(self, array: NumericVec, default_value: Numeric = None):
+        """
+        Build from array
+        :param array: NumericVec
+        :param default_value: not used, the most frequent value becomes the default value
+        """
+        self._size = len(array)
+        starts, values = rle_encode(np.asarray(array, dtype=get_numpy_type(self.dtype)))
+        self._set_runs(starts, values)
+
+    def create_from_dict(self, default_value: Numeric, size: int, map_data: Dict[int, Numeric]):
+        """
+        Create this array from dict data
+        :param default_value: value of the positions not in the map
+        :param size: size
+        :param map_data: map of the values different from the default value
+        """
+        self.default_value = default_value
+        self._size = size
+        tpe = get_numpy_type(self.dtype)
+        keys = np.array(sorted(map_data.keys()), dtype=np.int64)
+        data = np.array([map_data[i] for i in keys], dtype=tpe)
+        starts, values = rle_from_sparse(keys, data, tpe(default_value), size)
+        self._set_runs(starts, values)
+
+    def fill(self, value: Any):
+        """
+        Fill the array with the same value
+        :param value: any value
+        """
+        self.default_value = value
+        if self._size > 0:
+            self._starts = np.zeros(1, dtype=int)
+            self._values = np.array([value], dtype=get_numpy_type(self.dtype))
+        else:
+            self._starts = np.zeros(0, dtype=int)
+            self._values = np.zeros(0, dtype=get_numpy_type(self.dtype))
+
+    def toarray(self) -> NumericVec:
+        """
+        Get numpy vector from this structure
+        :return: NumericVec
+        """
+        return rle_decode(self._starts, self._values, self._size)
+
+    def at(self, idx: int) -> Any:
+        """
+        Get the array at a position
+        :param idx: index
+        :return: Numeric value
+        """
+        if idx < 0:
+            idx += self._size
+        k = np.searchsorted(self._starts, idx, side='right') - 1
+        return self._values[k].item()
+
+    def at_batch(self, indices: IntVec) -> NumericVec:
+        """
+        Get the values at several positions
+        :param indices: array of indices
+        :return: array of values
+        """
+        return rle_at_batch(self._starts, self._values, np.asarray(indices, dtype=np.int64), self._size)
+
+    def __getitem__(self, key: int) -> Any:
+        return self.at(idx=key)
+
+    def __setitem__(self, key: int, value: Any) -> None:
+
+        if isinstance(key, int):
+
+            assert -self._size <= key < self._size
+
+            if self.at(key) != value:
+                self._set_values(indices=np.array([key], dtype=np.int64), data=[value])
+
+        else:
+            raise TypeError("Key must be an integer")
+
+    def _set_values(self, indices: IntVec, data: NumericVec) -> None:
+        """
+        Overwrite several positions splicing the runs they fall in, without expanding the array.
+        The default value is kept.
+        :param indices: positions (negative positions count from the end, like in numpy)
+        :param data: values (if a position is repeated, the last value prevails)
+        """
+        if len(indices) == 0:
+            return
+
+        idx = np.asarray(indices, dtype=np.int64)
+        idx = np.where(idx < 0, idx + self._size, idx)
+        vals = np.asarray(data, dtype=self._values.dtype)
+
+        # sort the positions and keep the last value of the repeated ones
+        order = np.argsort(idx, kind='stable')
+        idx = idx[order]
+        vals = vals[order]
+        last = np.r_[idx[1:] != idx[:-1], True]
+        idx = idx[last]
+        vals = vals[last]
+
+        # every set position becomes a run of its own, then the equal neighbours are joined again
+        cuts = np.unique(np.r_[idx, idx + 1])
+        cuts = cuts[cuts < self._size]
+        starts, idx_a, _ = rle_merge(self._starts, cuts)
+        values = self._values[idx_a]
+        values[np.searchsorted(starts, idx)] = vals
+        self._starts, self._values = rle_compress(starts, values)
+
+    def __eq__(self, other: Union["RleArray", SparseArray]) -> bool:
+        """
+        Equality operator
+        :param other: RleArray or SparseArray
+        :return: bool
+        """
+        if self._size != other.size():
+            return False
+
+        if isinstance(other, RleArray):
+            return np.array_equal(self._starts, other._starts) and np.array_equal(self._values, other._values)
+        else:
+            return self._default_value == other.default_value and self.get_map() == other.get_map()
+
+    def size(self) -> int:
+        """
+        Get the size
+        :return: integer
+        """
+        return self._size
+
+    def resize(self, n: int):
+        """
+        Resize the array
+        :param n: number of elements.
+                  If n is smaller than the current size, the content is reduced to its first n elements,
+                  otherwise it is extended with the default value
+        """
+        if n < self._size:
+            keep = self._starts < n
+            self._starts = self._starts[keep]
+            self._values = self._values[keep]
+
+        elif n > self._size:
+            if self.n_runs == 0 or self._values[-1] != self._default_value:
+                self._starts = np.r_[self._starts, self._size].astype(int)
+                self._values = np.r_[self._values, self._default_value].astype(get_numpy_type(self.dtype))
+
+        self._size = n
+
+    def resample(self, indices: IntVec):
+        """
+        Resample this array in-place
+        :param indices: array of integer indices
+        """
+        arr = self.at_batch(indices)
+        self._size = len(indices)
+        starts, values = rle_encode(arr)
+        self._starts = starts
+        self._values = values
+
+    def scale(self, value: Union[float, int]):
+        """
+        Scale all the values of this array
+        :param value: scaling factor
+        """
+        self._default_value = self._default_value * value
+        self._values = self._values * value
+
+    def binary_operation(self, other: Union["RleArray", float, int], op: Callable) -> "RleArray":
+        """
+        Element-wise operation with another run-length encoded array or with a scalar
+        :param other: RleArray of the same size or scalar
+        :param op: vectorized operation (i.e. np.add)
+        :return: new RleArray
+        """
+        if isinstance(other, RleArray):
+            if other.size() != self._size:
+                raise ValueError(f'Size mismatch {self._size} != {other.size()}')
+            starts, idx_a, idx_b = rle_merge(self._starts, other._starts)
+            values = op(self._values[idx_a], other._values[idx_b])
+        else:
+            starts = self._starts
+            values = op(self._values, other)
+
+        tpe = type(values[0].item()) if len(values) else self.dtype
+        res = RleArray(data_type=tpe)
+        res._size = self._size
+        starts, values = rle_compress(starts, values)
+        res._set_runs(starts, values)
+        return res
+
+    def __add__(self, other: Union["RleArray", float, int]) -> "RleArray":
+        return self.binary_operation(other, np.add)
+
+    def __sub__(self, other: Union["RleArray", float, int]) -> "RleArray":
+        return self.binary_operation(other, np.subtract)
+
+    def __mul__(self, other: Union["RleArray", float, int]) -> "RleArray":
+        return self.binary_operation(other, np.multiply)
+
+    def get_sparse_representation(self):
+        """
+        Get the sparse representation of the data
+        :return: indices, values
+        """
+        data_map = self.get_map()
+        return list(data_map.keys()), list(data_map.values())
+
+    def set_sparse_data_from_data(self, indptr, data):
+        """
+        Set values at several positions
+        :param indptr: positions
+        :param data: values
+        """
+        self._set_values(indices=np.asarray(indptr, dtype=np.int64), data=data)
@@ -139,7 +139,10 @@ def save_gridcal_data_to_zip(dfs: Dict[str, pd.DataFrame],
                         # pack the array into a DataFrame
 
                         try:
-                            if np.iscomplexobj(arr):
+                            if hasattr(arr, "to_df"):
+                                # tabular results (i.e. reports) provide their own typed DataFrame
+                                arr.to_df().to_parquet(buffer)
+                            elif np.iscomplexobj(arr):
                                 filename += "__complex__"
                                 pd.DataFrame(data=np.c_[arr.real, arr.imag]).to_parquet(buffer)
                             else:
@@ -17,7 +17,10 @@
 
 import numpy as np
 import numba as nb
+from typing import Union
+from scipy.sparse import csc_matrix, issparse
 
+from GridCalEngine.basic_structures import Mat
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
 from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearAnalysis
@@ -87,11 +90,9 @@ def scale_proportional_sensed(P, idx1, idx2, dT=1.0):
 
 
 @nb.njit()
-def compute_alpha(ptdf, P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0, lodf=None):
+def compute_transfer_increments(P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0):
     """
-    Compute line sensitivity to power transfer
-    :param ptdf: Power transfer distribution factors (n-branch, n-bus)
-    :param lodf: Optional. Line outage distribution factor (n-branch, n-branch). Needed to compute alpha n-1.
+    Compute the bus injection increments due to an exchange between two regions
     :param P0: all bus Injections [p.u.]
     :param Pinstalled: bus generation installed power [p.u.]
     :param Pgen: bus generation current power [p.u.]
@@ -105,7 +106,7 @@ def compute_alpha(ptdf, P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0,
                  2: shift load
                  3 (or else): shift udasing generation and load
 
-    :return: Exchange sensitivity vector for all the lines
+    :return: bus injection increments
     """
 
     if mode == 0:
@@ -128,7 +129,32 @@ def compute_alpha(ptdf, P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0,
     dPu = get_proportional_deltas_sensed(P, idx1, dP=dT)
     dPd = get_proportional_deltas_sensed(P, idx2, dP=-dT)
 
-    dP = dPu + dPd
+    return dPu + dPd
+
+
+@nb.njit()
+def compute_alpha(ptdf, P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0, lodf=None):
+    """
+    Compute line sensitivity to power transfer
+    :param ptdf: Power transfer distribution factors (n-branch, n-bus)
+    :param lodf: Optional. Line outage distribution factor (n-branch, n-branch). Needed to compute alpha n-1.
+    :param P0: all bus Injections [p.u.]
+    :param Pinstalled: bus generation installed power [p.u.]
+    :param Pgen: bus generation current power [p.u.]
+    :param Pload: bus load power [p.u.]
+    :param idx1: bus indices of the sending region
+    :param idx2: bus indices of the receiving region
+    :param dT: Exchange amount
+    :param mode: Type of power shift
+                 0: shift generation based on the current generated power
+                 1: shift generation based on the installed power
+                 2: shift load
+                 3 (or else): shift udasing generation and load
+
+    :return: Exchange sensitivity vector for all the lines
+    """
+
+    dP = compute_transfer_increments(P0, Pgen, Pinstalled, Pload, idx1, idx2, dT, mode)
 
     # compute the line flow increments due to the exchange increment dT in MW
     dflow = ptdf.dot(dP)
@@ -148,6 +174,29 @@ def compute_alpha(ptdf, P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0,
     return alpha
 
 
+def get_alpha(ptdf: Union[Mat, csc_matrix], P0, Pgen, Pinstalled, Pload, idx1, idx2, dT=1.0, mode=0):
+    """
+    Compute line sensitivity to power transfer with a dense or a sparse PTDF
+    :param ptdf: Power transfer distribution factors (n-branch, n-bus), dense or sparse
+    :param P0: all bus Injections [p.u.]
+    :param Pinstalled: bus generation installed power [p.u.]
+    :param Pgen: bus generation current power [p.u.]
+    :param Pload: bus load power [p.u.]
+    :param idx1: bus indices of the sending region
+    :param idx2: bus indices of the receiving region
+    :param dT: Exchange amount
+    :param mode: Type of power shift (see compute_alpha)
+    :return: Exchange sensitivity vector for all the lines
+    """
+    if issparse(ptdf):
+        dP = compute_transfer_increments(P0, Pgen, Pinstalled, Pload,
+                                         np.asarray(idx1, dtype=int), np.asarray(idx2, dtype=int), dT, mode)
+        return (ptdf @ dP) / dT
+    else:
+        return compute_alpha(ptdf=ptdf, P0=P0, Pgen=Pgen, Pinstalled=Pinstalled, Pload=Pload,
+                             idx1=idx1, idx2=idx2, dT=dT, mode=mode)
+
+
 #
 # @nb.njit()
 # def compute_atc(br_idx, contingency_br_idx, lodf, alpha, flows, rates, contingency_rates, threshold=0.005):
@@ -321,6 +370,136 @@ def compute_atc_list(br_idx, contingency_br_idx, lodf, alpha, flows, rates, cont
     return results
 
 
+@nb.njit()
+def compute_atc_list_sparse(br_idx, contingency_br_idx, lodf_data, lodf_indices, lodf_indptr, alpha, flows, rates,
+                            contingency_rates, base_exchange, threshold, time_idx):
+    """
+    Compute all lines' ATC using a sparse LODF
+    :param br_idx: array of branch indices to analyze
+    :param contingency_br_idx: array of branch indices to fail
+    :param lodf_data: LODF CSR data (n-branch, n-outage branch)
+    :param lodf_indices: LODF CSR column indices (sorted)
+    :param lodf_indptr: LODF CSR row pointers
+    :param alpha: Branch sensitivities to the exchange [p.u.]
+    :param flows: Branches power injected at the "from" side [MW]
+    :param rates: all Branches rates vector
+    :param contingency_rates: all Branches contingency rates vector
+    :param base_exchange: amount already exchanges between areas
+    :param threshold: value that determines if a line is studied for the ATC calculation
+    :param time_idx: time index of the calculation
+    :return: same list of entries as compute_atc_list
+    """
+
+    is_contingency = np.zeros(len(lodf_indptr) - 1, dtype=nb.bool_)
+    for c in contingency_br_idx:
+        is_contingency[c] = True
+
+    results = list()
+
+    for im, m in enumerate(br_idx):  # for each branch
+
+        if abs(alpha[m]) > threshold:  # if the branch is relevant enough for the ATC...
+
+            # compute the ATC in "N"
+            if alpha[m] == 0:
+                atc_n = np.inf
+            elif alpha[m] > 0:
+                atc_n = (rates[m] - flows[m]) / alpha[m]
+            else:
+                atc_n = (-rates[m] - flows[m]) / alpha[m]
+
+            # explore the ATC in "N-1", the discarded LODF values are zero and never pass the threshold
+            for k in range(lodf_indptr[m], lodf_indptr[m + 1]):
+
+                c = lodf_indices[k]
+                lodf_mc = lodf_data[k]
+
+                if not is_contingency[c]:
+                    continue
+
+                # compute the exchange sensitivity in contingency conditions
+                beta = alpha[m] + lodf_mc * alpha[c]
+
+                if m != c and abs(lodf_mc) > threshold and abs(beta) > threshold:
+
+                    # compute the contingency flow
+                    contingency_flow = flows[m] + lodf_mc * flows[c]
+
+                    # compute the ATC in "N-1"
+                    if beta == 0:
+                        atc_mc = np.inf
+                    elif beta > 0:
+                        atc_mc = (contingency_rates[m] - contingency_flow) / beta
+                    else:
+                        atc_mc = (-contingency_rates[m] - contingency_flow) / beta
+
+                    final_atc = min(atc_mc, atc_n)
+                    ntc = final_atc + base_exchange
+
+                    # refine the ATC to the most restrictive value every time
+                    results.append((time_idx,  # 0
+                                    m,  # 1
+                                    c,  # 2
+                                    alpha[m],  # 3
+                                    beta,  # 4
+                                    lodf_mc,  # 5
+                                    atc_n,  # 6
+                                    atc_mc,  # 7
+                                    final_atc,  # 8
+                                    ntc,  # 9
+                                    flows[m],  # 10
+                                    contingency_flow,  # 11
+                                    flows[m] / (rates[m] + 1e-9) * 100.0,  # 12
+                                    contingency_flow / (contingency_rates[m] + 1e-9) * 100.0,  # 13
+                                    base_exchange))  # 14
+
+    return results
+
+
+def get_atc_list(br_idx, contingency_br_idx, lodf: Union[Mat, csc_matrix], alpha, flows, rates, contingency_rates,
+                 base_exchange, threshold, time_idx):
+    """
+    Compute all lines' ATC with a dense or a sparse LODF
+    :param br_idx: array of branch indices to analyze
+    :param contingency_br_idx: array of branch indices to fail
+    :param lodf: Line outage distribution factors (n-branch, n-outage branch), dense or sparse
+    :param alpha: Branch sensitivities to the exchange [p.u.]
+    :param flows: Branches power injected at the "from" side [MW]
+    :param rates: all Branches rates vector
+    :param contingency_rates: all Branches contingency rates vector
+    :param base_exchange: amount already exchanges between areas
+    :param threshold: value that determines if a line is studied for the ATC calculation
+    :param time_idx: time index of the calculation
+    :return: list of entries (see compute_atc_list)
+    """
+    if issparse(lodf):
+        lodf_csr = lodf.tocsr()
+        lodf_csr.sort_indices()
+        return compute_atc_list_sparse(br_idx=br_idx,
+                                       contingency_br_idx=contingency_br_idx,
+                                       lodf_data=lodf_csr.data,
+                                       lodf_indices=lodf_csr.indices,
+                                       lodf_indptr=lodf_csr.indptr,
+                                       alpha=alpha,
+                                       flows=flows,
+                                       rates=rates,
+                                       contingency_rates=contingency_rates,
+                                       base_exchange=base_exchange,
+                                       threshold=threshold,
+                                       time_idx=time_idx)
+    else:
+        return compute_atc_list(br_idx=br_idx,
+                                contingency_br_idx=contingency_br_idx,
+                                lodf=lodf,
+                                alpha=alpha,
+                                flows=flows,
+                                rates=rates,
+                                contingency_rates=contingency_rates,
+                                base_exchange=base_exchange,
+                                threshold=threshold,
+                                time_idx=time_idx)
+
+
 class AvailableTransferCapacityResults(ResultsTemplate):
 
     def __init__(self, br_names, bus_names, rates, contingency_rates, clustering_results):
@@ -474,7 +653,8 @@ class AvailableTransferCapacityOptions:
                  bus_idx_from=list(), bus_idx_to=list(), idx_br=list(), sense_br=list(), Pf=None,
                  idx_hvdc_br=list(), sense_hvdc_br=list(), Pf_hvdc=None,
                  dT=100.0, threshold=0.02, mode: AvailableTransferMode = AvailableTransferMode.Generation,
-                 max_report_elements=-1, use_clustering=False, cluster_number=200):
+                 max_report_elements=-1, use_clustering=False, cluster_number=200,
+                 use_sparse_factors=False, ptdf_threshold=1e-4):
         """
 
         :param distributed_slack:
@@ -493,6 +673,10 @@ class AvailableTransferCapacityOptions:
         :param mode:
         :param max_report_elements: maximum number of elements to show in the report (-1 for all)
         :param use_clustering:
+        :param cluster_number:
+        :param use_sparse_factors: use the thresholded sparse PTDF and LODF.
+                                   The LODF is cut at the ATC threshold, so the report is not altered
+        :param ptdf_threshold: threshold of the sparse PTDF
         """
         self.distributed_slack = distributed_slack
         self.correct_values = correct_values
@@ -516,6 +700,9 @@ class AvailableTransferCapacityOptions:
         self.use_clustering = use_clustering
         self.cluster_number = cluster_number
 
+        self.use_sparse_factors = use_sparse_factors
+        self.ptdf_threshold = ptdf_threshold
+
 
 class AvailableTransferCapacityDriver(DriverTemplate):
     tpe = SimulationTypes.NetTransferCapacity_run
@@ -563,7 +750,13 @@ class AvailableTransferCapacityDriver(DriverTemplate):
             correct_values=self.options.correct_values,
         )
 
-        linear.run()
+        if self.options.use_sparse_factors:
+            # the LODF values below the ATC threshold are never used
+            factors = linear.get_sparse_factors(ptdf_threshold=self.options.ptdf_threshold,
+                                                lodf_threshold=self.options.threshold)
+        else:
+            linear.run()
+            factors = linear
 
         # get the branch indices to analyze
         br_idx = nc.branch_data.get_monitor_enabled_indices()
@@ -591,14 +784,14 @@ class AvailableTransferCapacityDriver(DriverTemplate):
                       AvailableTransferMode.Load: 2,
                       AvailableTransferMode.GenerationAndLoad: 3}
 
-        alpha = compute_alpha(ptdf=linear.PTDF,
-                              P0=nc.Sbus.real,
-                              Pinstalled=nc.bus_installed_power,
-                              Pgen=nc.generator_data.get_injections_per_bus().real,
-                              Pload=nc.load_data.get_injections_per_bus().real,
-                              idx1=idx1b,
-                              idx2=idx2b,
-                              mode=mode_2_int[self.options.mode])
+        alpha = get_alpha(ptdf=factors.PTDF,
+                          P0=nc.Sbus.real,
+                          Pinstalled=nc.bus_installed_power,
+                          Pgen=nc.generator_data.get_injections_per_bus().real,
+                          Pload=nc.load_data.get_injections_per_bus().real,
+                          idx1=idx1b,
+                          idx2=idx2b,
+                          mode=mode_2_int[self.options.mode])
 
         # get flow
         if self.options.use_provided_flows:
@@ -613,7 +806,7 @@ class AvailableTransferCapacityDriver(DriverTemplate):
             (Shvdc, Losses_hvdc, Pf_hvdc, Pt_hvdc,
              loading_hvdc, n_free) = nc.hvdc_data.get_power(Sbase=nc.Sbase, theta=np.zeros(nc.nbus))
 
-            flows = linear.get_flows(nc.Sbus + Shvdc)
+            flows = factors.get_flows(nc.Sbus + Shvdc)
 
         # base exchange
         base_exchange = (self.options.inter_area_branch_sense * flows[self.options.inter_area_branch_idx]).sum()
@@ -625,16 +818,16 @@ class AvailableTransferCapacityDriver(DriverTemplate):
                                   * self.options.Pf_hvdc[self.options.idx_hvdc_br]).sum()
 
         # compute ATC
-        report = compute_atc_list(br_idx=br_idx,
-                                  contingency_br_idx=con_br_idx,
-                                  lodf=linear.LODF,
-                                  alpha=alpha,
-                                  flows=flows,
-                                  rates=nc.Rates,
-                                  contingency_rates=nc.ContingencyRates,
-                                  base_exchange=base_exchange,
-                                  time_idx=0,
-                                  threshold=self.options.threshold)
+        report = get_atc_list(br_idx=br_idx,
+                              contingency_br_idx=con_br_idx,
+                              lodf=factors.LODF,
+                              alpha=alpha,
+                              flows=flows,
+                              rates=nc.Rates,
+                              contingency_rates=nc.ContingencyRates,
+                              base_exchange=base_exchange,
+                              time_idx=0,
+                              threshold=self.options.threshold)
         report = np.array(report, dtype=object)
 
         # sort by NTC
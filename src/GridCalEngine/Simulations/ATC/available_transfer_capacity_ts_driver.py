@@ -23,7 +23,7 @@ from GridCalEngine.Simulations.LinearFactors.linear_analysis_options import Line
 from GridCalEngine.Simulations.LinearFactors.linear_analysis_ts_driver import LinearAnalysisTimeSeriesDriver
 from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearAnalysis
 from GridCalEngine.Simulations.ATC.available_transfer_capacity_driver import (AvailableTransferCapacityOptions,
-                                                                              compute_atc_list, compute_alpha)
+                                                                              get_atc_list, get_alpha)
 from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.Simulations.results_table import ResultsTable
 from GridCalEngine.Simulations.results_template import ResultsTemplate
@@ -259,6 +259,9 @@ class AvailableTransferCapacityTimeSeriesDriver(TimeSeriesDriverTemplate):
         la_options = LinearAnalysisOptions(
             distribute_slack=self.options.distributed_slack,
             correct_values=self.options.correct_values,
+            ptdf_threshold=self.options.ptdf_threshold,
+            lodf_threshold=self.options.threshold,
+            use_sparse_factors=self.options.use_sparse_factors,
         )
 
         la_driver = LinearAnalysisTimeSeriesDriver(
@@ -288,7 +291,13 @@ class AvailableTransferCapacityTimeSeriesDriver(TimeSeriesDriverTemplate):
                 distributed_slack=True,
                 correct_values=False,
             )
-            linear_analysis.run()
+            if self.options.use_sparse_factors:
+                # the LODF values below the ATC threshold are never used
+                factors = linear_analysis.get_sparse_factors(ptdf_threshold=self.options.ptdf_threshold,
+                                                             lodf_threshold=self.options.threshold)
+            else:
+                linear_analysis.run()
+                factors = linear_analysis
 
             P: Vec = nc.Sbus.real
 
@@ -301,17 +310,17 @@ class AvailableTransferCapacityTimeSeriesDriver(TimeSeriesDriverTemplate):
                     self.logger.add_error(msg)
                     raise Exception(msg)
             else:
-                flows_t: Vec = linear_analysis.get_flows(P)
+                flows_t: Vec = factors.get_flows(P)
 
             # compute the branch exchange sensitivity (alpha)
-            alpha = compute_alpha(ptdf=linear_analysis.PTDF,
-                                  P0=P,  # no problem that there are in p.u., are only used for the sensitivity
-                                  Pinstalled=nc.bus_installed_power,
-                                  Pgen=nc.generator_data.get_injections_per_bus().real,
-                                  Pload=nc.load_data.get_injections_per_bus().real,
-                                  idx1=self.options.bus_idx_from,
-                                  idx2=self.options.bus_idx_to,
-                                  mode=mode_2_int[self.options.mode])
+            alpha = get_alpha(ptdf=factors.PTDF,
+                              P0=P,  # no problem that there are in p.u., are only used for the sensitivity
+                              Pinstalled=nc.bus_installed_power,
+                              Pgen=nc.generator_data.get_injections_per_bus().real,
+                              Pload=nc.load_data.get_injections_per_bus().real,
+                              idx1=self.options.bus_idx_from,
+                              idx2=self.options.bus_idx_to,
+                              mode=mode_2_int[self.options.mode])
 
             # base exchange
             base_exchange = (self.options.inter_area_branch_sense * flows_t[self.options.inter_area_branch_idx]).sum()
@@ -323,16 +332,16 @@ class AvailableTransferCapacityTimeSeriesDriver(TimeSeriesDriverTemplate):
                         t, self.options.idx_hvdc_br]).sum()
 
             # compute ATC
-            report = compute_atc_list(br_idx=br_idx,
-                                      contingency_br_idx=con_br_idx,
-                                      lodf=linear_analysis.LODF,
-                                      alpha=alpha,
-                                      flows=flows_t,
-                                      rates=self.results.rates[t, :],
-                                      contingency_rates=self.results.contingency_rates[t, :],
-                                      base_exchange=base_exchange,
-                                      time_idx=t,
-                                      threshold=self.options.threshold)
+            report = get_atc_list(br_idx=br_idx,
+                                  contingency_br_idx=con_br_idx,
+                                  lodf=factors.LODF,
+                                  alpha=alpha,
+                                  flows=flows_t,
+                                  rates=self.results.rates[t, :],
+                                  contingency_rates=self.results.contingency_rates[t, :],
+                                  base_exchange=base_exchange,
+                                  time_idx=t,
+                                  threshold=self.options.threshold)
 
             report = np.array(report, dtype=object)
 
@@ -0,0 +1,139 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from typing import List
+import numpy as np
+import GridCalEngine.Topology.topology as tp
+from GridCalEngine.basic_structures import Vec, IntVec, CxVec, BoolVec
+from GridCalEngine.Devices.Aggregation.contingency import Contingency
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
+from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearMultiContingencies, LinearMultiContingency
+
+
+def get_linear_contingency_flows(numerical_circuit: NumericalCircuit,
+                                 multi_contingency: LinearMultiContingency,
+                                 contingencies: List[Contingency],
+                                 base_Sf: CxVec) -> CxVec:
+    """
+    Estimate the post-contingency flows of a contingency group.
+    The active power is computed with the linear factors from the base active power,
+    and the reactive power is kept from the base case
+    :param numerical_circuit: NumericalCircuit (the injection contingencies are applied and reverted)
+    :param multi_contingency: LinearMultiContingency of the group
+    :param contingencies: list of contingencies of the group
+    :param base_Sf: base case power flows (MVA), i.e. from the AC power flow
+    :return: estimated flows (MVA)
+    """
+    if multi_contingency.has_injection_contingencies():
+        injections = numerical_circuit.set_linear_contingency_status(contingencies_list=contingencies)
+        numerical_circuit.set_linear_contingency_status(contingencies_list=contingencies, revert=True)
+    else:
+        injections = None
+
+    c_flow = multi_contingency.get_contingency_flows(base_flow=base_Sf.real, injections=injections)
+
+    return c_flow + 1j * base_Sf.imag
+
+
+def get_contingencies_severity(numerical_circuit: NumericalCircuit,
+                               linear_multiple_contingencies: LinearMultiContingencies,
+                               contingencies_list: List[List[Contingency]],
+                               base_Sf: CxVec,
+                               mon_idx: IntVec) -> Vec:
+    """
+    Estimate the severity of every contingency group with the linear factors.
+    The severity is the maximum estimated post-contingency loading of the monitored branches,
+    using the same definition as the power flow loading (flow / rate)
+    :param numerical_circuit: NumericalCircuit (the injection contingencies are applied and reverted)
+    :param linear_multiple_contingencies: LinearMultiContingencies already computed
+    :param contingencies_list: list of the contingencies of each group
+    :param base_Sf: base case power flows (MVA), i.e. from the AC power flow
+    :param mon_idx: array of monitored branch indices
+    :return: severity of each contingency group (p.u.)
+    """
+    ncon = len(linear_multiple_contingencies.multi_contingencies)
+    severity = np.zeros(ncon)
+
+    if len(mon_idx) == 0:
+        return severity
+
+    rates = numerical_circuit.rates[mon_idx] + 1e-9
+
+    for ic, multi_contingency in enumerate(linear_multiple_contingencies.multi_contingencies):
+
+        c_flow = get_linear_contingency_flows(numerical_circuit=numerical_circuit,
+                                              multi_contingency=multi_contingency,
+                                              contingencies=contingencies_list[ic],
+                                              base_Sf=base_Sf)
+
+        severity[ic] = np.max(np.abs(c_flow[mon_idx]) / rates)
+
+    return severity
+
+
+def get_islanding_contingencies(numerical_circuit: NumericalCircuit,
+                                linear_multiple_contingencies: LinearMultiContingencies) -> BoolVec:
+    """
+    Find the contingency groups that split the grid in more islands than the base case.
+    The linear factors cannot represent those, so they must be solved exactly
+    :param numerical_circuit: NumericalCircuit
+    :param linear_multiple_contingencies: LinearMultiContingencies already computed
+    :return: boolean array, True for the contingencies that produce new islands
+    """
+    ncon = len(linear_multiple_contingencies.multi_contingencies)
+    islanding = np.zeros(ncon, dtype=bool)
+
+    Cf = numerical_circuit.Cf
+    Ct = numerical_circuit.Ct
+    bus_active = numerical_circuit.bus_data.active
+    branch_active = numerical_circuit.branch_data.active
+
+    adj = tp.get_adjacency_matrix(C_branch_bus_f=Cf, C_branch_bus_t=Ct,
+                                  branch_active=branch_active, bus_active=bus_active).tocsc()
+    n_islands_0 = len(tp.find_islands(adj=adj, active=bus_active))
+
+    for ic, multi_contingency in enumerate(linear_multiple_contingencies.multi_contingencies):
+
+        if len(multi_contingency.branch_indices):
+            active = branch_active.copy()
+            active[multi_contingency.branch_indices] = 0
+            adj = tp.get_adjacency_matrix(C_branch_bus_f=Cf, C_branch_bus_t=Ct,
+                                          branch_active=active, bus_active=bus_active).tocsc()
+            islanding[ic] = len(tp.find_islands(adj=adj, active=bus_active)) > n_islands_0
+
+    return islanding
+
+
+def select_contingencies(severity: Vec, threshold: float, top_n: int, forced: BoolVec = None) -> IntVec:
+    """
+    Select the contingency groups that deserve an exact solution
+    :param severity: severity of each contingency group (see get_contingencies_severity)
+    :param threshold: contingencies with a severity greater or equal than this value are selected
+    :param top_n: the top_n most severe contingencies are selected regardless of the threshold
+    :param forced: boolean array of contingencies that must be selected (i.e. islanding ones), optional
+    :return: sorted array of selected contingency indices
+    """
+    selected = severity >= threshold
+
+    if forced is not None:
+        selected |= forced
+
+    if top_n > 0:
+        # stable sort, so that ties keep the declaration order
+        ranking = np.argsort(-severity, kind='stable')
+        selected[ranking[:top_n]] = True
+
+    return np.where(selected)[0]
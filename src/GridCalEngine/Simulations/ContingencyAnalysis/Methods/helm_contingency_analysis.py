@@ -58,7 +58,10 @@ def helm_contingency_analysis(grid: MultiCircuit,
                                          branch_names=numerical_circuit.branch_names,
                                          bus_names=numerical_circuit.bus_names,
                                          bus_types=numerical_circuit.bus_types,
-                                         con_names=grid.get_contingency_group_names())
+                                         con_names=grid.get_contingency_group_names(),
+                                         dense=options.dense_results,
+                                         top_k=options.top_k_contingencies,
+                                         loading_threshold=options.exceedance_threshold)
 
     # get contingency groups dictionary
     cg_dict = grid.get_contingency_group_dict()
@@ -108,9 +111,7 @@ def helm_contingency_analysis(grid: MultiCircuit,
         # run
         V, Sf, loading = helm_variations.compute_variations(contingency_br_indices=contingency_br_indices)
 
-        results.Sf[ic, :] = Sf
-        results.Sbus[ic, :] = numerical_circuit.Sbus
-        results.loading[ic, :] = loading
+        results.set_contingency_results(ic, Sf=Sf, loading=loading, Sbus=numerical_circuit.Sbus)
         results.report.analyze(t=t,
                                t_prob=t_prob,
                                mon_idx=mon_idx,
@@ -16,6 +16,7 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 from __future__ import annotations
 from typing import TYPE_CHECKING
+import numpy as np
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
 from GridCalEngine.Simulations.ContingencyAnalysis.contingency_analysis_results import ContingencyAnalysisResults
@@ -60,15 +61,24 @@ def linear_contingency_analysis(grid: MultiCircuit,
                                          branch_names=numerical_circuit.branch_names,
                                          bus_names=numerical_circuit.bus_names,
                                          bus_types=numerical_circuit.bus_types,
-                                         con_names=grid.get_contingency_group_names())
+                                         con_names=grid.get_contingency_group_names(),
+                                         dense=options.dense_results,
+                                         top_k=options.top_k_contingencies,
+                                         loading_threshold=options.exceedance_threshold)
 
     linear_analysis = LinearAnalysis(numerical_circuit=numerical_circuit,
                                      distributed_slack=options.lin_options.distribute_slack,
                                      correct_values=options.lin_options.correct_values)
-    linear_analysis.run()
+    if options.lin_options.use_sparse_factors:
+        # thresholded CSC factors built by blocks, the dense matrices are never allocated
+        factors = linear_analysis.get_sparse_factors(ptdf_threshold=options.lin_options.ptdf_threshold,
+                                                     lodf_threshold=options.lin_options.lodf_threshold)
+    else:
+        linear_analysis.run()
+        factors = linear_analysis
 
-    linear_multiple_contingencies.compute(lodf=linear_analysis.LODF,
-                                          ptdf=linear_analysis.PTDF,
+    linear_multiple_contingencies.compute(lodf=factors.LODF,
+                                          ptdf=factors.PTDF,
                                           ptdf_threshold=options.lin_options.ptdf_threshold,
                                           lodf_threshold=options.lin_options.lodf_threshold,
                                           prepare_for_srap=options.use_srap)
@@ -86,28 +96,31 @@ def linear_contingency_analysis(grid: MultiCircuit,
             calling_class.logger.add_error(msg)
             raise Exception(msg)
     else:
-        flows_n = linear_analysis.get_flows(numerical_circuit.Sbus) * numerical_circuit.Sbase
+        flows_n = factors.get_flows(numerical_circuit.Sbus) * numerical_circuit.Sbase
 
     loadings_n = flows_n / (numerical_circuit.rates + 1e-9)
 
     if calling_class is not None:
         calling_class.report_text('Computing loading...')
 
+    # flows of all the contingencies without injection changes, computed at once
+    c_flows = linear_multiple_contingencies.get_contingency_flows_batch(base_flows=np.atleast_2d(flows_n))[0, :, :]
+    cg_dict = grid.get_contingency_group_dict()
+
     # for each contingency group
     for ic, multi_contingency in enumerate(linear_multiple_contingencies.multi_contingencies):
 
         if multi_contingency.has_injection_contingencies():
-            cnt = grid.contingencies
+            cnt = cg_dict[grid.contingency_groups[ic].idtag]
             injections = numerical_circuit.set_linear_contingency_status(contingencies_list=cnt)
+            numerical_circuit.set_linear_contingency_status(contingencies_list=cnt, revert=True)
+            c_flow = multi_contingency.get_contingency_flows(base_flow=flows_n, injections=injections)
         else:
-            injections = None
+            c_flow = c_flows[ic, :]
 
-        c_flow = multi_contingency.get_contingency_flows(base_flow=flows_n, injections=injections)
         c_loading = c_flow / (numerical_circuit.rates + 1e-9)
 
-        results.Sf[ic, :] = c_flow  # already in MW
-        results.Sbus[ic, :] = Pbus
-        results.loading[ic, :] = c_loading
+        results.set_contingency_results(ic, Sf=c_flow, loading=c_loading, Sbus=Pbus)  # flows already in MW
         results.report.analyze(t=t,
                                t_prob=t_prob,
                                mon_idx=mon_idx,
@@ -125,7 +138,7 @@ def linear_contingency_analysis(grid: MultiCircuit,
                                contingency_deadband=options.contingency_deadband,
                                srap_rever_to_nominal_rating=options.srap_rever_to_nominal_rating,
                                multi_contingency=multi_contingency,
-                               PTDF=linear_analysis.PTDF,
+                               PTDF=factors.PTDF,
                                available_power=numerical_circuit.bus_data.srap_availbale_power,
                                srap_used_power=results.srap_used_power,
                                F=F,
@@ -140,6 +153,6 @@ def linear_contingency_analysis(grid: MultiCircuit,
                 calling_class.report_text(f'Contingency group: {grid.contingency_groups[ic].name}')
                 calling_class.report_progress2(ic, len(linear_multiple_contingencies.multi_contingencies))
 
-    results.lodf = linear_analysis.LODF
+    results.lodf = factors.LODF
 
     return results
@@ -15,20 +15,191 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 from __future__ import annotations
-from typing import TYPE_CHECKING, Union
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Union, List, Tuple, Dict, Any
 import numpy as np
+from scipy.sparse import csc_matrix
+from GridCalEngine.basic_structures import Vec, IntVec, CxVec, StrVec, Mat, CxMat
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
-from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
+from GridCalEngine.Devices.Aggregation.contingency import Contingency
+from GridCalEngine.Devices.Aggregation.contingency_group import ContingencyGroup
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit, compile_numerical_circuit_at
 from GridCalEngine.Simulations.ContingencyAnalysis.contingency_analysis_results import ContingencyAnalysisResults
+from GridCalEngine.Simulations.ContingencyAnalysis.contingencies_report import ContingencyResultsReport
+from GridCalEngine.Simulations.ContingencyAnalysis.contingency_statistics import ContingencyStatistics
 from GridCalEngine.Simulations.PowerFlow.power_flow_worker import multi_island_pf_nc
 from GridCalEngine.Simulations.PowerFlow.power_flow_options import PowerFlowOptions, SolverType
-from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearAnalysis, LinearMultiContingencies
+from GridCalEngine.Simulations.LinearFactors.linear_analysis import (LinearAnalysis, LinearMultiContingencies,
+                                                                     LinearMultiContingency)
 from GridCalEngine.Simulations.ContingencyAnalysis.contingency_analysis_options import ContingencyAnalysisOptions
+from GridCalEngine.Simulations.ContingencyAnalysis.Methods.contingency_screening import (get_contingencies_severity,
+                                                                                   get_islanding_contingencies,
+                                                                                   get_linear_contingency_flows,
+                                                                                   select_contingencies)
 
 if TYPE_CHECKING:
     from GridCalEngine.Simulations.ContingencyAnalysis.contingency_analysis_driver import ContingencyAnalysisDriver
 
 
+def nonlinear_contingency_analysis_chunk(numerical_circuit: NumericalCircuit,
+                                         pf_opts: PowerFlowOptions,
+                                         options: ContingencyAnalysisOptions,
+                                         contingency_indices: IntVec,
+                                         contingency_groups: List[ContingencyGroup],
+                                         contingencies_list: List[List[Contingency]],
+                                         multi_contingencies: Union[List[LinearMultiContingency], None],
+                                         base_voltage: CxVec,
+                                         base_flow: Vec,
+                                         base_loading: Vec,
+                                         PTDF: Union[Mat, csc_matrix, None],
+                                         available_power: Vec,
+                                         F: IntVec,
+                                         T: IntVec,
+                                         bus_area_indices: IntVec,
+                                         area_names: StrVec,
+                                         t: Union[None, int] = None,
+                                         t_prob: float = 1.0,
+                                         calling_class: Union[ContingencyAnalysisDriver, None] = None
+                                         ) -> ContingencyAnalysisResults:
+    """
+    Run the non-linear contingency analysis of a set of contingency groups.
+    This function is used as-is by the parallel processes, each one with its own copy of the numerical circuit
+    :param numerical_circuit: NumericalCircuit of the base case (it is restored after every contingency)
+    :param pf_opts: PowerFlowOptions
+    :param options: ContingencyAnalysisOptions
+    :param contingency_indices: indices of the contingency groups in the complete study
+    :param contingency_groups: list of ContingencyGroup (same length as contingency_indices)
+    :param contingencies_list: list of the contingencies of each group (same length as contingency_indices)
+    :param multi_contingencies: list of LinearMultiContingency of each group if SRAP is used, None otherwise
+    :param base_voltage: base case voltage, used as initial guess
+    :param base_flow: base case flows modules
+    :param base_loading: base case loading modules
+    :param PTDF: PTDF for the SRAP conditions (None if SRAP is not used)
+    :param available_power: Array of power available for SRAP
+    :param F: branches' from bus indices
+    :param T: branches' to bus indices
+    :param bus_area_indices: area index of each bus
+    :param area_names: area names
+    :param t: time index, if None the snapshot is used
+    :param t_prob: probability of te time
+    :param calling_class: ContingencyAnalysisDriver to report the progress and check the cancellation (optional)
+    :return: ContingencyAnalysisResults of the contingency groups in contingency_indices
+    """
+    results = ContingencyAnalysisResults(ncon=len(contingency_indices),
+                                         nbr=numerical_circuit.nbr,
+                                         nbus=numerical_circuit.nbus,
+                                         branch_names=numerical_circuit.branch_names,
+                                         bus_names=numerical_circuit.bus_names,
+                                         bus_types=numerical_circuit.bus_types,
+                                         con_names=[cg.name for cg in contingency_groups],
+                                         dense=options.dense_results,
+                                         top_k=options.top_k_contingencies,
+                                         loading_threshold=options.exceedance_threshold)
+
+    mon_idx = numerical_circuit.branch_data.get_monitor_enabled_indices()
+
+    for i, ic in enumerate(contingency_indices):
+
+        contingency_group = contingency_groups[i]
+        contingencies = contingencies_list[i]
+
+        # set the status
+        numerical_circuit.set_contingency_status(contingencies)
+
+        # report progress
+        if t is None and calling_class is not None:
+            calling_class.report_text(f'Contingency group: {contingency_group.name}')
+            calling_class.report_progress2(i, len(contingency_indices))
+
+        # run
+        pf_res = multi_island_pf_nc(nc=numerical_circuit,
+                                    options=pf_opts,
+                                    V_guess=base_voltage)
+
+        results.set_contingency_results(i,
+                                        Sf=pf_res.Sf,
+                                        loading=pf_res.loading,
+                                        Sbus=pf_res.Sbus,
+                                        voltage=pf_res.voltage)
+        multi_contingency = multi_contingencies[i] if options.use_srap else None
+
+        results.report.analyze(t=t,
+                               t_prob=t_prob,
+                               mon_idx=mon_idx,
+                               numerical_circuit=numerical_circuit,
+                               base_flow=base_flow,
+                               base_loading=base_loading,
+                               contingency_flows=np.abs(pf_res.Sf),
+                               contingency_loadings=np.abs(pf_res.loading),
+                               contingency_idx=int(ic),
+                               contingency_group=contingency_group,
+                               using_srap=options.use_srap,
+                               srap_ratings=numerical_circuit.branch_data.protection_rates,
+                               srap_max_power=options.srap_max_power,
+                               srap_deadband=options.srap_deadband,
+                               contingency_deadband=options.contingency_deadband,
+                               multi_contingency=multi_contingency,
+                               PTDF=PTDF,
+                               available_power=available_power,
+                               srap_used_power=results.srap_used_power,
+                               F=F,
+                               T=T,
+                               bus_area_indices=bus_area_indices,
+                               area_names=area_names,
+                               top_n=options.srap_top_n)
+
+        # set the status
+        numerical_circuit.set_contingency_status(contingencies, revert=True)
+
+        if calling_class is not None:
+            if calling_class.is_cancel():
+                return results
+
+    return results
+
+
+# base case of the worker processes, installed once per process by nonlinear_contingency_analysis_worker_init
+_WORKER_BASE_CASE: Dict[str, Any] = dict()
+
+
+def nonlinear_contingency_analysis_worker_init(base_case: Dict[str, Any]) -> None:
+    """
+    Process pool initializer: keep the base case in the worker process,
+    so that only the contingency indices are sent with every chunk
+    :param base_case: arguments of nonlinear_contingency_analysis_chunk shared by all the chunks, where
+                      contingency_groups, contingencies_list and multi_contingencies are the complete lists
+    """
+    _WORKER_BASE_CASE.clear()
+    _WORKER_BASE_CASE.update(base_case)
+
+
+def nonlinear_contingency_analysis_chunk_worker(contingency_indices: IntVec) -> Tuple[CxMat, CxMat, CxMat, CxMat, Mat,
+                                                                                       ContingencyResultsReport,
+                                                                                       Union[ContingencyStatistics, None]]:
+    """
+    Process pool entry point of nonlinear_contingency_analysis_chunk.
+    The results are returned as plain arrays since ContingencyAnalysisResults is not picklable
+    :param contingency_indices: indices of the contingency groups to run
+    :return: voltage, Sbus, Sf, loading, srap_used_power, report, statistics (None with dense results)
+    """
+    kwargs = dict(_WORKER_BASE_CASE)
+    contingency_groups = kwargs.pop('contingency_groups')
+    contingencies_list = kwargs.pop('contingencies_list')
+    multi_contingencies = kwargs.pop('multi_contingencies')
+
+    res = nonlinear_contingency_analysis_chunk(
+        contingency_indices=contingency_indices,
+        contingency_groups=[contingency_groups[i] for i in contingency_indices],
+        contingencies_list=[contingencies_list[i] for i in contingency_indices],
+        multi_contingencies=([multi_contingencies[i] for i in contingency_indices]
+                             if multi_contingencies is not None else None),
+        **kwargs
+    )
+    return (res.voltage, res.Sbus, res.Sf, res.loading, res.srap_used_power, res.report,
+            None if res.dense else res.statistics)
+
+
 def nonlinear_contingency_analysis(grid: MultiCircuit,
                                    options: ContingencyAnalysisOptions,
                                    linear_multiple_contingencies: LinearMultiContingencies,
@@ -36,7 +207,9 @@ def nonlinear_contingency_analysis(grid: MultiCircuit,
                                    t: Union[None, int] = None,
                                    t_prob: float = 1.0) -> ContingencyAnalysisResults:
     """
-    Run a contingency analysis using the power flow options
+    Run a contingency analysis using the power flow options.
+    If options.use_screening is set, the contingencies are ranked with the linear factors and only
+    the selected ones are solved with the power flow, the rest keep the linear estimation of the flows
     :param grid: MultiCircuit
     :param options: ContingencyAnalysisOptions
     :param linear_multiple_contingencies: LinearMultiContingencies
@@ -57,25 +230,30 @@ def nonlinear_contingency_analysis(grid: MultiCircuit,
 
     area_names, bus_area_indices, F, T, hvdc_F, hvdc_T = grid.get_branch_areas_info()
 
+    # get contingency groups dictionary
+    cg_dict = grid.get_contingency_group_dict()
+    mon_idx = numerical_circuit.branch_data.get_monitor_enabled_indices()
+
+    ncon = len(grid.contingency_groups)
+    contingencies_list = [cg_dict[contingency_group.idtag] for contingency_group in grid.contingency_groups]
+
     # declare the results
-    results = ContingencyAnalysisResults(ncon=len(grid.contingency_groups),
+    results = ContingencyAnalysisResults(ncon=ncon,
                                          nbr=numerical_circuit.nbr,
                                          nbus=numerical_circuit.nbus,
                                          branch_names=numerical_circuit.branch_names,
                                          bus_names=numerical_circuit.bus_names,
                                          bus_types=numerical_circuit.bus_types,
-                                         con_names=grid.get_contingency_group_names())
-
-    # get contingency groups dictionary
-    cg_dict = grid.get_contingency_group_dict()
-    calc_branches = grid.get_branches_wo_hvdc()
-    mon_idx = numerical_circuit.branch_data.get_monitor_enabled_indices()
+                                         con_names=grid.get_contingency_group_names(),
+                                         dense=options.dense_results,
+                                         top_k=options.top_k_contingencies,
+                                         loading_threshold=options.exceedance_threshold)
 
     # run 0
     pf_res_0 = multi_island_pf_nc(nc=numerical_circuit,
                                   options=pf_opts)
 
-    if options.use_srap:
+    if options.use_srap or options.use_screening:
 
         # we need the PTDF for this
         linear_analysis = LinearAnalysis(numerical_circuit=numerical_circuit,
@@ -89,68 +267,137 @@ def nonlinear_contingency_analysis(grid: MultiCircuit,
                                               lodf_threshold=options.lin_options.lodf_threshold,
                                               prepare_for_srap=options.use_srap)
 
-        PTDF = linear_analysis.PTDF
+        PTDF = linear_analysis.PTDF if options.use_srap else None
+        multi_contingencies = linear_multiple_contingencies.multi_contingencies if options.use_srap else None
 
     else:
         PTDF = None
+        multi_contingencies = None
+
+    if options.use_screening:
+
+        if t is None and calling_class is not None:
+            calling_class.report_text('Screening the contingencies...')
+
+        results.screening_severity = get_contingencies_severity(
+            numerical_circuit=numerical_circuit,
+            linear_multiple_contingencies=linear_multiple_contingencies,
+            contingencies_list=contingencies_list,
+            base_Sf=pf_res_0.Sf,
+            mon_idx=mon_idx
+        )
+
+        islanding = get_islanding_contingencies(numerical_circuit=numerical_circuit,
+                                                linear_multiple_contingencies=linear_multiple_contingencies)
+
+        selected = select_contingencies(severity=results.screening_severity,
+                                        threshold=options.screening_threshold,
+                                        top_n=options.screening_top_n,
+                                        forced=islanding)
+
+        # the base case overloads are reported along with the first contingency, hence it is always solved
+        if ncon > 0 and (len(selected) == 0 or selected[0] != 0):
+            selected = np.r_[0, selected]
+
+        results.screened_in = np.zeros(ncon, dtype=bool)
+        results.screened_in[selected] = True
+
+        # the contingencies that are not solved keep the linear estimation
+        for ic in np.where(~results.screened_in)[0]:
+            c_flow = get_linear_contingency_flows(
+                numerical_circuit=numerical_circuit,
+                multi_contingency=linear_multiple_contingencies.multi_contingencies[ic],
+                contingencies=contingencies_list[ic],
+                base_Sf=pf_res_0.Sf
+            )
+            results.set_contingency_results(ic,
+                                            Sf=c_flow,
+                                            loading=c_flow / (numerical_circuit.rates + 1e-9),
+                                            Sbus=pf_res_0.Sbus,
+                                            voltage=pf_res_0.voltage)
+
+        if calling_class is not None:
+            calling_class.logger.add_info('Contingencies solved after the screening',
+                                          value=len(selected),
+                                          expected_value=ncon)
+    else:
+        selected = np.arange(ncon)
 
     available_power = numerical_circuit.generator_data.get_injections_per_bus().real
 
-    # for each contingency group
-    for ic, contingency_group in enumerate(grid.contingency_groups):
+    # arguments shared by all the contingency groups
+    common_args = dict(base_voltage=pf_res_0.voltage,
+                       base_flow=np.abs(pf_res_0.Sf),
+                       base_loading=np.abs(pf_res_0.loading),
+                       PTDF=PTDF,
+                       available_power=available_power,
+                       F=F,
+                       T=T,
+                       bus_area_indices=bus_area_indices,
+                       area_names=area_names,
+                       t=t,
+                       t_prob=t_prob)
 
-        # get the group's contingencies
-        contingencies = cg_dict[contingency_group.idtag]
+    if options.multi_core and len(selected) > 1:
 
-        # set the status
-        numerical_circuit.set_contingency_status(contingencies)
+        n_workers = options.n_workers if options.n_workers > 0 else os.cpu_count()
+        n_workers = max(1, min(n_workers, len(selected)))
+
+        # use more chunks than workers to balance the load and to have a quicker cancellation
+        n_chunks = min(len(selected), n_workers * 4)
+        chunks = [c for c in np.array_split(selected, n_chunks) if len(c)]
 
-        # report progress
         if t is None and calling_class is not None:
-            calling_class.report_text(f'Contingency group: {contingency_group.name}')
-            calling_class.report_progress2(ic, len(grid.contingency_groups) * 100)
+            calling_class.report_text(f'Running {len(selected)} contingency groups in {n_workers} processes...')
 
-        # run
-        pf_res = multi_island_pf_nc(nc=numerical_circuit,
-                                    options=pf_opts,
-                                    V_guess=pf_res_0.voltage)
+        # the base case is sent once per process, the chunks only carry the contingency indices
+        base_case = dict(numerical_circuit=numerical_circuit,
+                         pf_opts=pf_opts,
+                         options=options,
+                         contingency_groups=grid.contingency_groups,
+                         contingencies_list=contingencies_list,
+                         multi_contingencies=multi_contingencies,
+                         **common_args)
 
-        results.Sf[ic, :] = pf_res.Sf
-        results.Sbus[ic, :] = pf_res.Sbus
-        results.loading[ic, :] = pf_res.loading
-        results.voltage[ic, :] = pf_res.voltage
-        multi_contingency = linear_multiple_contingencies.multi_contingencies[ic] if options.use_srap else None
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 initializer=nonlinear_contingency_analysis_worker_init,
+                                 initargs=(base_case,)) as executor:
 
-        results.report.analyze(t=t,
-                               t_prob=t_prob,
-                               mon_idx=mon_idx,
-                               numerical_circuit=numerical_circuit,
-                               base_flow=np.abs(pf_res_0.Sf),
-                               base_loading=np.abs(pf_res_0.loading),
-                               contingency_flows=np.abs(pf_res.Sf),
-                               contingency_loadings=np.abs(pf_res.loading),
-                               contingency_idx=ic,
-                               contingency_group=contingency_group,
-                               using_srap=options.use_srap,
-                               srap_ratings=numerical_circuit.branch_data.protection_rates,
-                               srap_max_power=options.srap_max_power,
-                               srap_deadband=options.srap_deadband,
-                               contingency_deadband=options.contingency_deadband,
-                               multi_contingency=multi_contingency,
-                               PTDF=PTDF,
-                               available_power=available_power,
-                               srap_used_power=results.srap_used_power,
-                               F=F,
-                               T=T,
-                               bus_area_indices=bus_area_indices,
-                               area_names=area_names,
-                               top_n=options.srap_top_n)
+            futures = dict()
+            for pos in chunks:
+                fut = executor.submit(nonlinear_contingency_analysis_chunk_worker, pos)
+                futures[fut] = pos
 
-        # set the status
-        numerical_circuit.set_contingency_status(contingencies, revert=True)
+            # gather the chunks in order, so that the report is the same as in the serial run
+            chunk_results = dict()
+            for i, fut in enumerate(as_completed(futures)):
+                chunk_results[fut] = fut.result()
 
-        if calling_class is not None:
-            if calling_class.is_cancel():
-                return results
+                if t is None and calling_class is not None:
+                    calling_class.report_progress2(i, len(chunks))
+
+                if calling_class is not None:
+                    if calling_class.is_cancel():
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+
+        for fut, pos in futures.items():
+            if fut in chunk_results:
+                results.merge(pos, *chunk_results[fut])
+
+    else:
+        res = nonlinear_contingency_analysis_chunk(numerical_circuit=numerical_circuit,
+                                                   pf_opts=pf_opts,
+                                                   options=options,
+                                                   contingency_indices=selected,
+                                                   contingency_groups=[grid.contingency_groups[i] for i in selected],
+                                                   contingencies_list=[contingencies_list[i] for i in selected],
+                                                   multi_contingencies=([multi_contingencies[i] for i in selected]
+                                                                        if multi_contingencies is not None else None),
+                                                   calling_class=calling_class,
+                                                   **common_args)
+
+        results.merge(selected, res.voltage, res.Sbus, res.Sf, res.loading, res.srap_used_power, res.report,
+                      None if res.dense else res.statistics)
 
     return results
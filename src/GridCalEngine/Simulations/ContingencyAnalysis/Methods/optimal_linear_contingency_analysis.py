@@ -70,7 +70,10 @@ def optimal_linear_contingency_analysis(grid: MultiCircuit,
                                          branch_names=numerical_circuit.branch_names,
                                          bus_names=numerical_circuit.bus_names,
                                          bus_types=numerical_circuit.bus_types,
-                                         con_names=grid.get_contingency_group_names())
+                                         con_names=grid.get_contingency_group_names(),
+                                         dense=options.dense_results,
+                                         top_k=options.top_k_contingencies,
+                                         loading_threshold=options.exceedance_threshold)
 
     linear_analysis = LinearAnalysis(numerical_circuit=numerical_circuit,
                                      distributed_slack=options.lin_options.distribute_slack,
@@ -134,9 +137,7 @@ def optimal_linear_contingency_analysis(grid: MultiCircuit,
         c_flow = multi_contingency.get_contingency_flows(base_flow=flows_n, injections=injections)
         c_loading = c_flow / (numerical_circuit.rates + 1e-9)
 
-        results.Sf[ic, :] = c_flow  # already in MW
-        results.Sbus[ic, :] = Pbus
-        results.loading[ic, :] = c_loading
+        results.set_contingency_results(ic, Sf=c_flow, loading=c_loading, Sbus=Pbus)  # flows already in MW
         results.report.analyze(t=t,
                                t_prob=t_prob,
                                mon_idx=mon_idx,
@@ -17,8 +17,9 @@
 import numpy as np
 import numba as nb
 import pandas as pd
-from scipy.sparse import csc_matrix
-from typing import List, Union, Any
+from scipy.sparse import csc_matrix, issparse
+from io import BytesIO
+from typing import List, Dict, Tuple, Union, Any
 from GridCalEngine.basic_structures import IntVec, StrMat, StrVec, Vec, Mat
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
 from GridCalEngine.Devices import ContingencyGroup
@@ -52,18 +53,24 @@ def get_ptdf_comp_numba(data: Vec, indices: IntVec, indptr: IntVec, PTDF: Mat, m
     return result
 
 
-def get_ptdf_comp(mon_br_idx: int, branch_indices: IntVec, mlodf_factors: csc_matrix, PTDF: Mat):
+def get_ptdf_comp(mon_br_idx: int, branch_indices: IntVec, mlodf_factors: csc_matrix,
+                  PTDF: Union[Mat, csc_matrix]):
     """
     Get the compensated PTDF values for a single monitored branch
     :param mon_br_idx:
     :param branch_indices:
     :param mlodf_factors:
-    :param PTDF:
+    :param PTDF: dense or sparse PTDF
     :return:
     """
     # PTDFc = MLODF[m, βδ] x PTDF[βδ, :] + PTDF[m, :]
     # PTDFc = mlodf_factors[mon_br_idx, :] @ PTDF[branch_indices, :] + PTDF[mon_br_idx, :]
 
+    if issparse(PTDF):
+        ptdf = PTDF.tocsr()
+        res = mlodf_factors.tocsr()[mon_br_idx, :] @ ptdf[branch_indices, :] + ptdf[mon_br_idx, :]
+        return res.toarray().ravel()
+
     res = get_ptdf_comp_numba(data=mlodf_factors.data,
                               indices=mlodf_factors.indices,
                               indptr=mlodf_factors.indptr,
@@ -216,23 +223,227 @@ class ContingencyTableEntry:
         return np.array(self.to_string_list(time_array=time_array, time_format=time_format))
 
 
+class ContingencyReportColumns:
+    """
+    Contingency report rows stored column-wise in numpy blocks
+    The text columns are stored as integer codes into lookup tables, and are only decoded on export
+    """
+
+    __columns__ = {"time_index": np.int32,
+                   "contingency_idx": np.int32,
+                   "monitored_idx": np.int32,
+                   "t_prob": float,
+                   "area_from": object,
+                   "area_to": object,
+                   "base_name": object,
+                   "contingency_name": object,
+                   "base_rating": float,
+                   "contingency_rating": float,
+                   "srap_rating": float,
+                   "base_flow": float,
+                   "post_contingency_flow": float,
+                   "post_srap_flow": float,
+                   "base_loading": float,
+                   "post_contingency_loading": float,
+                   "post_srap_loading": float,
+                   "msg_ov": object,
+                   "msg_srap": object,
+                   "srap_power": float,
+                   "solved_by_srap": bool}
+
+    # columns stored as codes into the lookup tables
+    __text_columns__ = [name for name, tpe in __columns__.items() if tpe is object]
+
+    # columns in the order of the report headers (after the time index and the time string)
+    __report_columns__ = ["t_prob", "area_from", "area_to", "base_name", "contingency_name",
+                          "base_rating", "contingency_rating", "srap_rating",
+                          "base_flow", "post_contingency_flow", "post_srap_flow",
+                          "base_loading", "post_contingency_loading", "post_srap_loading",
+                          "msg_ov", "msg_srap", "srap_power", "solved_by_srap"]
+
+    # number of staged rows written to a block at once
+    __flush_size__ = 1024
+
+    def __init__(self, data: Union[Dict[str, np.ndarray], None] = None) -> None:
+        """
+        Constructor
+        :param data: optional dictionary of equally sized columns to wrap
+        """
+        # lookup tables of the text columns {column name: {text: code}}
+        self.tables: Dict[str, Dict[str, int]] = {name: dict() for name in self.__text_columns__}
+
+        # blocks of rows: the columns (text columns as codes) and the lookup tables their codes refer to.
+        # The blocks are never modified, so they can be shared between reports
+        self.blocks: List[Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, int]]]] = list()
+
+        if data is not None and len(data["time_index"]) > 0:
+            block = dict()
+            for name, tpe in self.__columns__.items():
+                if tpe is object:
+                    codes, uniques = pd.factorize(np.asarray(data[name], dtype=object))
+                    self.tables[name] = {text: i for i, text in enumerate(uniques)}
+                    block[name] = codes.astype(np.int32)
+                else:
+                    block[name] = np.asarray(data[name], dtype=tpe)
+            self.blocks.append((block, self.tables))
+
+        # rows appended but not yet written to a block (writing numpy scalars one by one is slow)
+        self.staged: List[tuple] = list()
+
+    @property
+    def n_stored(self) -> int:
+        """
+        Number of rows written to the blocks
+        :return: int
+        """
+        return sum(len(block["time_index"]) for block, _ in self.blocks)
+
+    @property
+    def size(self) -> int:
+        """
+        Number of rows
+        :return: int
+        """
+        return self.n_stored + len(self.staged)
+
+    def append(self, *values):
+        """
+        Append one row
+        :param values: value of every column in the order of __columns__
+        """
+        self.staged.append(values)
+
+        if len(self.staged) >= self.__flush_size__:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the staged rows to a new block
+        """
+        if len(self.staged) > 0:
+            block = dict()
+            for (name, tpe), values in zip(self.__columns__.items(), zip(*self.staged)):
+                if tpe is object:
+                    table = self.tables[name]
+                    block[name] = np.array([table.setdefault(text, len(table)) for text in values], dtype=np.int32)
+                else:
+                    block[name] = np.array(values, dtype=tpe)
+
+            self.blocks.append((block, self.tables))
+            self.staged.clear()
+
+    def consolidate(self):
+        """
+        Concatenate the blocks into a single one whose codes refer to the own lookup tables
+        """
+        self.flush()
+
+        if len(self.blocks) > 1 or (len(self.blocks) == 1 and self.blocks[0][1] is not self.tables):
+            block = dict()
+            for name in self.__columns__.keys():
+                if name in self.tables:
+                    table = self.tables[name]
+                    arrays = list()
+                    for blk, tables in self.blocks:
+                        if tables is self.tables:
+                            arrays.append(blk[name])
+                        else:
+                            # translate the codes of a foreign block to the own table
+                            remap = np.array([table.setdefault(text, len(table)) for text in tables[name].keys()],
+                                             dtype=np.int32)
+                            arrays.append(remap[blk[name]])
+                    block[name] = np.concatenate(arrays)
+                else:
+                    block[name] = np.concatenate([blk[name] for blk, _ in self.blocks])
+
+            self.blocks = [(block, self.tables)]
+
+    def get_codes(self, name: str) -> np.ndarray:
+        """
+        Get the stored values of a column (the codes for the text columns)
+        :param name: column name
+        :return: array
+        """
+        self.consolidate()
+        if len(self.blocks):
+            return self.blocks[0][0][name]
+        else:
+            return np.empty(0, dtype=np.int32 if name in self.tables else self.__columns__[name])
+
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        Get a column, the text columns are decoded from their lookup tables
+        :param name: column name
+        :return: array
+        """
+        codes = self.get_codes(name)
+
+        if name in self.tables:
+            return np.array(list(self.tables[name].keys()), dtype=object)[codes]
+        else:
+            return codes
+
+    def extend(self, other: "ContingencyReportColumns"):
+        """
+        Append the rows of other columns
+        The blocks of the other columns are shared (not copied), the cost depends on the number of blocks only
+        :param other: ContingencyReportColumns
+        """
+        self.flush()
+        self.blocks += other.blocks
+        self.staged += other.staged
+
+        if len(self.staged) >= self.__flush_size__:
+            self.flush()
+
+
 class ContingencyResultsReport:
     """
     Contingency results report table
+    The rows are stored column-wise (see ContingencyReportColumns), no per-row objects are created
     """
 
     def __init__(self) -> None:
         """
         Constructor
         """
-        self.entries: List[ContingencyTableEntry] = list()
+        self.columns: ContingencyReportColumns = ContingencyReportColumns()
+
+    @property
+    def entries(self) -> List[ContingencyTableEntry]:
+        """
+        Get the rows as ContingencyTableEntry objects (materialized on demand)
+        :return: List[ContingencyTableEntry]
+        """
+        cols = {name: self.get_column(name).tolist() for name in ContingencyReportColumns.__columns__.keys()}
+        del cols["contingency_idx"]
+        del cols["monitored_idx"]
+        return [ContingencyTableEntry(**dict(zip(cols.keys(), row))) for row in zip(*cols.values())]
 
     def add_entry(self, entry: ContingencyTableEntry):
         """
         Add contingencies entry
         :param entry: ContingencyTableEntry
         """
-        self.entries.append(entry)
+        self.add(time_index=entry.time_index,
+                 t_prob=entry.t_prob,
+                 area_from=entry.area_from,
+                 area_to=entry.area_to,
+                 base_name=entry.base_name,
+                 contingency_name=entry.contingency_name,
+                 base_rating=entry.base_rating,
+                 contingency_rating=entry.contingency_rating,
+                 srap_rating=entry.srap_rating,
+                 base_flow=entry.base_flow,
+                 post_contingency_flow=entry.post_contingency_flow,
+                 post_srap_flow=entry.post_srap_flow,
+                 base_loading=entry.base_loading,
+                 post_contingency_loading=entry.post_contingency_loading,
+                 post_srap_loading=entry.post_srap_loading,
+                 msg_ov=entry.msg_ov,
+                 msg_srap=entry.msg_srap,
+                 srap_power=entry.srap_power,
+                 solved_by_srap=entry.solved_by_srap)
 
     def add(self,
             time_index: int,
@@ -244,16 +455,18 @@ class ContingencyResultsReport:
             base_rating: float,
             contingency_rating: float,
             srap_rating: float,
-            base_flow: complex,
-            post_contingency_flow: complex,
-            post_srap_flow: complex,
+            base_flow: float,
+            post_contingency_flow: float,
+            post_srap_flow: float,
             base_loading: float,
             post_contingency_loading: float,
             post_srap_loading: float,
             msg_ov: str,
             msg_srap: str,
             srap_power: float,
-            solved_by_srap: bool = False):
+            solved_by_srap: bool = False,
+            contingency_idx: int = -1,
+            monitored_idx: int = -1):
 
         """
         Add report data
@@ -266,9 +479,9 @@ class ContingencyResultsReport:
         :param base_rating:
         :param contingency_rating:
         :param srap_rating:
-        :param base_flow:
-        :param post_contingency_flow:
-        :param post_srap_flow:
+        :param base_flow: absolute base flow
+        :param post_contingency_flow: absolute post-contingency flow
+        :param post_srap_flow: absolute post-SRAP flow
         :param base_loading:
         :param post_contingency_loading:
         :param post_srap_loading:
@@ -276,43 +489,32 @@ class ContingencyResultsReport:
         :param msg_srap:
         :param srap_power:
         :param solved_by_srap:
+        :param contingency_idx: index of the contingency group (-1 if unknown)
+        :param monitored_idx: index of the monitored branch (-1 if unknown)
         :return:
         """
-        self.add_entry(ContingencyTableEntry(
-            time_index=time_index,
-            t_prob=t_prob,
-            area_from=area_from,
-            area_to=area_to,
-            base_name=base_name,
-            contingency_name=contingency_name,
-            base_rating=base_rating,
-            contingency_rating=contingency_rating,
-            srap_rating=srap_rating,
-            base_flow=base_flow,
-            post_contingency_flow=post_contingency_flow,
-            post_srap_flow=post_srap_flow,
-            base_loading=base_loading,
-            post_contingency_loading=post_contingency_loading,
-            post_srap_loading=post_srap_loading,
-            msg_ov=msg_ov,
-            msg_srap=msg_srap,
-            srap_power=srap_power,
-            solved_by_srap=solved_by_srap)
-        )
+        # same order as ContingencyReportColumns.__columns__
+        self.columns.append(time_index, contingency_idx, monitored_idx, t_prob,
+                            area_from, area_to, base_name, contingency_name,
+                            base_rating, contingency_rating, srap_rating,
+                            base_flow, post_contingency_flow, post_srap_flow,
+                            base_loading, post_contingency_loading, post_srap_loading,
+                            msg_ov, msg_srap, srap_power, solved_by_srap)
 
     def merge(self, other: "ContingencyResultsReport"):
         """
         Add another ContingencyResultsReport in-place
+        The cost depends on the number of rows of the other report only
         :param other: ContingencyResultsReport instance
         """
-        self.entries += other.entries
+        self.columns.extend(other.columns)
 
     def size(self) -> int:
         """
         Get the size
         :return: number of entries
         """
-        return len(self.entries)
+        return self.columns.size
 
     def n_cols(self) -> int:
         """
@@ -336,24 +538,87 @@ class ContingencyResultsReport:
         """
         return np.arange(0, self.size())
 
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        Get a column of the report
+        :param name: column name (see ContingencyReportColumns.__columns__)
+        :return: array
+        """
+        return self.columns.get_column(name)
+
+    @staticmethod
+    def get_time_strings(time_index: IntVec,
+                         time_array: Union[pd.DatetimeIndex, None],
+                         time_format='%Y/%m/%d  %H:%M.%S') -> StrVec:
+        """
+        Get the time of each row as string
+        :param time_index: array of time indices
+        :param time_array: optional time array to get the time
+        :param time_format: optional time format to display the time
+        :return: StrVec
+        """
+        if time_array is not None and len(time_index):
+            return np.array(time_array[time_index].strftime(time_format), dtype=object)
+        else:
+            return np.full(len(time_index), "", dtype=object)
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Get the typed columns as a DataFrame, suitable to export to parquet or feather
+        :return: DataFrame
+        """
+        return pd.DataFrame({name: self.get_column(name) for name in ContingencyReportColumns.__columns__.keys()})
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "ContingencyResultsReport":
+        """
+        Create a report from the DataFrame produced by to_df
+        :param df: DataFrame
+        :return: ContingencyResultsReport
+        """
+        report = cls()
+        report.columns = ContingencyReportColumns(data={name: df[name].values
+                                                        for name in ContingencyReportColumns.__columns__.keys()})
+        return report
+
+    def to_parquet(self, path: Union[str, BytesIO]):
+        """
+        Save the report in the parquet format
+        :param path: file path or buffer
+        """
+        self.to_df().to_parquet(path)
+
+    def to_feather(self, path: Union[str, BytesIO]):
+        """
+        Save the report in the feather format
+        :param path: file path or buffer
+        """
+        self.to_df().to_feather(path)
+
     def get_data(self, time_array: Union[pd.DatetimeIndex, None] = None, time_format='%Y/%m/%d  %H:%M.%S') -> StrMat:
         """
-        Get data as list of lists of strings
-        :return: List[List[str]]
+        Get data as a matrix of strings
+        :return: StrMat
         """
+        df = self.get_df(time_array=time_array, time_format=time_format)
         data = np.empty((self.size(), self.n_cols()), dtype=object)
-        for i, e in enumerate(self.entries):
-            data[i, :] = e.to_array(time_array=time_array, time_format=time_format)
+        for j, col in enumerate(df.columns):
+            data[:, j] = [str(x) for x in df[col].tolist()]
         return data
 
     def get_df(self, time_array: Union[pd.DatetimeIndex, None], time_format='%Y/%m/%d  %H:%M.%S') -> pd.DataFrame:
         """
-        Get data as pandas DataFrame
+        Get data as pandas DataFrame with the report headers
         :return: DataFrame
         """
-        return pd.DataFrame(data=self.get_data(time_array=time_array, time_format=time_format),
-                            index=self.get_index(),
-                            columns=self.get_headers())
+        time_index = self.get_column("time_index")
+        data = {"Time idx": time_index,
+                "Time": self.get_time_strings(time_index=time_index, time_array=time_array, time_format=time_format)}
+
+        for hdr, name in zip(self.get_headers()[2:], ContingencyReportColumns.__report_columns__):
+            data[hdr] = self.get_column(name)
+
+        return pd.DataFrame(data=data, index=self.get_index())
 
     def get_summary_table(self,
                           time_array: Union[pd.DatetimeIndex, None],
@@ -365,21 +630,8 @@ class ContingencyResultsReport:
         :return:
         """
 
-        df = self.get_df(time_array=time_array, time_format=time_format)
-
-        df["Time idx"] = df["Time idx"].astype(int)
-        df["Probability cluster"] = df["Probability cluster"].astype(float)
-        df["Base rating (MW)"] = df["Base rating (MW)"].astype(float)
-        df["Contingency rating (MW)"] = df["Contingency rating (MW)"].astype(float)
-        df["SRAP rating (MW)"] = df["SRAP rating (MW)"].astype(float)
-        df["Base flow (MW)"] = df["Base flow (MW)"].astype(float)
-        df["Post-Contingency flow (MW)"] = df["Post-Contingency flow (MW)"].astype(float)
-        df["Post-SRAP flow (MW)"] = df["Post-SRAP flow (MW)"].astype(float)
-        df["Base loading (pu)"] = df["Base loading (pu)"].astype(float)
-        df["Post-Contingency loading (pu)"] = df["Post-Contingency loading (pu)"].astype(float)
-        df["Post-SRAP loading (pu)"] = df["Post-SRAP loading (pu)"].astype(float)
-        df["SRAP Power (MW)"] = df["SRAP Power (MW)"].astype(float)
-        df["Solved with SRAP"] = df["Solved with SRAP"].astype(bool)
+        # the columns are typed already, and the dates are only formatted for the grouped maxima
+        df = self.get_df(time_array=None)
 
         # If we are analyzing a base case, we report base case
         # If we are analyzing an overload due to a contingency (not in base), we report:
@@ -426,7 +678,7 @@ class ContingencyResultsReport:
         ov_time_pu = df_grp["Probability cluster"].sum()
 
         if time_array is not None:
-            ov_max_dates = [time_array[t].strftime(time_format) for t in ov_max_date.values]
+            ov_max_dates = time_array[ov_max_date.values].strftime(time_format)
         else:
             ov_max_dates = ov_max_date.values
 
@@ -490,8 +742,7 @@ class ContingencyResultsReport:
         :param other: ContingencyResultsReport
         :return: self
         """
-        for entry in other.entries:
-            self.add_entry(entry)
+        self.merge(other)
         return self
 
     def analyze(self,
@@ -512,7 +763,7 @@ class ContingencyResultsReport:
                 contingency_deadband: float = 0.0,
                 srap_rever_to_nominal_rating: bool = False,
                 multi_contingency: LinearMultiContingency = None,
-                PTDF: Mat = None,
+                PTDF: Union[Mat, csc_matrix] = None,
                 available_power: Vec = None,
                 srap_used_power: Mat = None,
                 F: Vec = None,
@@ -551,6 +802,18 @@ class ContingencyResultsReport:
         :param detailed_massive_report: Generate massive report
         """
 
+        # monitored branches that fulfil the conditions to be reported (see the loop below)
+        c_flows_mon = np.abs(contingency_flows[mon_idx])
+        b_flows_mon = np.abs(base_flow[mon_idx])
+        candidates = ((contingency_flows[mon_idx] != base_flow[mon_idx])
+                      & (c_flows_mon / (b_flows_mon + 1e-9) - 1 > contingency_deadband)
+                      & (np.abs(contingency_loadings[mon_idx]) > 1)
+                      & (c_flows_mon > b_flows_mon))
+
+        # nothing to report: the base case is reported with the first contingency
+        if contingency_idx != 0 and not np.any(candidates):
+            return
+
         # Reporting base case
         if contingency_idx == 0:  # only doing it once per hour
 
@@ -582,10 +845,12 @@ class ContingencyResultsReport:
                              msg_ov='Overload not acceptable',
                              msg_srap='SRAP not applicable',
                              srap_power=0.0,
-                             solved_by_srap=False)
+                             solved_by_srap=False,
+                             contingency_idx=-1,
+                             monitored_idx=m)
 
         # Now evalueting the effect of contingencies
-        for m in mon_idx:  # for each monitored branch ...
+        for m in mon_idx[candidates]:  # for each monitored branch that may be reported ...
 
             if len(area_names):
                 area_from = area_names[bus_area_indices[F[m]]]
@@ -715,4 +980,6 @@ class ContingencyResultsReport:
                              msg_ov=msg_ov,
                              msg_srap=msg_srap,
                              srap_power=abs(max_srap_power),
-                             solved_by_srap=solved_by_srap)
+                             solved_by_srap=solved_by_srap,
+                             contingency_idx=contingency_idx,
+                             monitored_idx=m)
@@ -38,7 +38,15 @@ class ContingencyAnalysisOptions:
                  srap_rever_to_nominal_rating: bool = False,
                  detailed_massive_report: bool = False,
                  contingency_deadband: float = 0.0,
-                 engine=ContingencyMethod.PowerFlow):
+                 engine=ContingencyMethod.PowerFlow,
+                 multi_core: bool = False,
+                 n_workers: int = 0,
+                 use_screening: bool = False,
+                 screening_threshold: float = 0.9,
+                 screening_top_n: int = 0,
+                 dense_results: bool = True,
+                 top_k_contingencies: int = 5,
+                 exceedance_threshold: float = 1.0):
         """
         ContingencyAnalysisOptions
         :param use_provided_flows: Use the provided flows?
@@ -56,6 +64,17 @@ class ContingencyAnalysisOptions:
         :param detailed_massive_report: If checked, a massive posibly intractable report is generated.
         :param contingency_deadband: Deadband to report contingencies
         :param engine: ContingencyEngine to use (PowerFlow, PTDF, ...)
+        :param multi_core: Run the contingency groups in parallel processes? (applicable to the PowerFlow engine)
+        :param n_workers: Number of parallel processes when multi_core is True (0: number of CPUs)
+        :param use_screening: Rank the contingencies with the linear factors and only solve exactly the severe ones?
+                              (applicable to the PowerFlow engine)
+        :param screening_threshold: Estimated post-contingency loading (p.u.) over which a contingency is solved
+        :param screening_top_n: Number of most severe contingencies that are solved regardless of the threshold
+        :param dense_results: Store the (contingency, branch) and (contingency, bus) result matrices?
+                              otherwise only the bounded-memory contingency statistics are kept
+        :param top_k_contingencies: Number of worst contingencies stored per branch in the statistics
+        :param exceedance_threshold: Loading (p.u.) over which the (contingency, branch) pairs are stored
+                                     in the statistics
         """
 
         self.use_provided_flows = use_provided_flows
@@ -81,3 +100,19 @@ class ContingencyAnalysisOptions:
         self.detailed_massive_report = detailed_massive_report
 
         self.contingency_deadband = contingency_deadband
+
+        self.multi_core: bool = multi_core
+
+        self.n_workers: int = n_workers
+
+        self.use_screening: bool = use_screening
+
+        self.screening_threshold: float = screening_threshold
+
+        self.screening_top_n: int = screening_top_n
+
+        self.dense_results: bool = dense_results
+
+        self.top_k_contingencies: int = top_k_contingencies
+
+        self.exceedance_threshold: float = exceedance_threshold
@@ -16,11 +16,13 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import numpy as np
+from typing import List, Tuple, Union
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
 from GridCalEngine.Simulations.results_table import ResultsTable
 from GridCalEngine.Simulations.results_template import ResultsTemplate
 from GridCalEngine.Simulations.ContingencyAnalysis.contingencies_report import ContingencyResultsReport
-from GridCalEngine.basic_structures import IntVec, StrVec, CxMat, Mat
+from GridCalEngine.Simulations.ContingencyAnalysis.contingency_statistics import ContingencyStatistics
+from GridCalEngine.basic_structures import IntVec, StrVec, CxMat, CxVec, Mat, Vec, BoolVec
 from GridCalEngine.enumerations import StudyResultsType, ResultTypes, DeviceType
 
 
@@ -29,8 +31,12 @@ class ContingencyAnalysisResults(ResultsTemplate):
     Contingency analysis results
     """
 
+    # number of contingencies reduced into the statistics at once
+    __statistics_batch_size__ = 256
+
     def __init__(self, ncon: int, nbus: int, nbr: int,
-                 bus_names: StrVec, branch_names: StrVec, bus_types: IntVec, con_names: StrVec):
+                 bus_names: StrVec, branch_names: StrVec, bus_types: IntVec, con_names: StrVec,
+                 dense: bool = True, top_k: int = 5, loading_threshold: float = 1.0):
         """
         ContingencyAnalysisResults
         :param ncon: number of contingencies
@@ -40,18 +46,33 @@ class ContingencyAnalysisResults(ResultsTemplate):
         :param branch_names: branch names
         :param bus_types: bus types array
         :param con_names: contingency names
+        :param dense: allocate the (contingency, branch) and (contingency, bus) matrices?
+                      otherwise only the statistics are kept
+        :param top_k: number of worst contingencies stored per branch in the statistics
+        :param loading_threshold: loading (p.u.) over which the (contingency, branch) pairs are stored
         """
-        ResultsTemplate.__init__(
-            self,
-            name='Contingency Analysis Results',
-            available_results=[
+        if dense:
+            available_results = [
                 ResultTypes.BusActivePower,
                 ResultTypes.BranchActivePowerFrom,
                 ResultTypes.BranchLoading,
                 ResultTypes.ContingencyAnalysisReport,
+                ResultTypes.ContingencyStatisticalAnalysisReport,
                 ResultTypes.SrapUsedPower
+            ]
+        else:
+            available_results = [
+                ResultTypes.MaxContingencyFlows,
+                ResultTypes.MaxContingencyLoading,
+                ResultTypes.ContingencyAnalysisReport,
+                ResultTypes.ContingencyStatisticalAnalysisReport,
+                ResultTypes.SrapUsedPower
+            ]
 
-            ],
+        ResultsTemplate.__init__(
+            self,
+            name='Contingency Analysis Results',
+            available_results=available_results,
             time_array=None,
             clustering_results=None,
             study_results_type=StudyResultsType.ContingencyAnalysis
@@ -62,14 +83,28 @@ class ContingencyAnalysisResults(ResultsTemplate):
         self.bus_types = bus_types
         self.con_names = con_names
 
-        self.voltage: CxMat = np.ones((ncon, nbus), dtype=complex)
-        self.Sbus: CxMat = np.zeros((ncon, nbus), dtype=complex)
-        self.Sf: CxMat = np.zeros((ncon, nbr), dtype=complex)
-        self.loading: CxMat = np.zeros((ncon, nbr), dtype=complex)
+        self.dense = dense
+        n_dense = ncon if dense else 0
+
+        self.voltage: CxMat = np.ones((n_dense, nbus), dtype=complex)
+        self.Sbus: CxMat = np.zeros((n_dense, nbus), dtype=complex)
+        self.Sf: CxMat = np.zeros((n_dense, nbr), dtype=complex)
+        self.loading: CxMat = np.zeros((n_dense, nbr), dtype=complex)
         self.srap_used_power = np.zeros((nbr, nbus), dtype=float)
 
+        # contingency screening: estimated severity and whether the contingency was solved exactly
+        self.screening_severity: Vec = np.zeros(ncon, dtype=float)
+        self.screened_in: BoolVec = np.ones(ncon, dtype=bool)
+
         self.report: ContingencyResultsReport = ContingencyResultsReport()
 
+        # streamed worst-case statistics, available regardless of the dense matrices.
+        # The contingencies are reduced by batches when the statistics are requested (see the statistics property):
+        # with dense matrices the stored rows are reduced, otherwise the staged results are
+        self._statistics = ContingencyStatistics(nbr=nbr, nbus=nbus, top_k=top_k, loading_threshold=loading_threshold)
+        self._statistics_pending: BoolVec = np.zeros(n_dense, dtype=bool)
+        self._statistics_staged: List[Tuple[int, CxVec, CxVec, Union[CxVec, None]]] = list()
+
         self.register(name='branch_names', tpe=StrVec)
         self.register(name='bus_names', tpe=StrVec)
         self.register(name='con_names', tpe=StrVec)
@@ -80,6 +115,8 @@ class ContingencyAnalysisResults(ResultsTemplate):
         self.register(name='Sf', tpe=CxMat)
         self.register(name='loading', tpe=CxMat)
         self.register(name='srap_used_power', tpe=Mat)
+        self.register(name='screening_severity', tpe=Vec)
+        self.register(name='screened_in', tpe=BoolVec)
 
         self.register(name='report', tpe=ContingencyResultsReport)
 
@@ -91,6 +128,111 @@ class ContingencyAnalysisResults(ResultsTemplate):
         rates = nc.Rates
         self.loading = self.Sf / (rates + 1e-9)
 
+    @property
+    def statistics(self) -> ContingencyStatistics:
+        """
+        Get the contingency statistics, reducing the pending contingencies first
+        :return: ContingencyStatistics
+        """
+        self.flush_statistics()
+
+        if self.dense and np.any(self._statistics_pending):
+            idx = np.where(self._statistics_pending)[0]
+            for a in range(0, len(idx), self.__statistics_batch_size__):
+                batch = idx[a:a + self.__statistics_batch_size__]
+                self._statistics.update(contingency_indices=batch,
+                                        flows=self.Sf[batch, :],
+                                        loading=self.loading[batch, :],
+                                        Sbus=self.Sbus[batch, :])
+            self._statistics_pending[idx] = False
+
+        return self._statistics
+
+    def flush_statistics(self):
+        """
+        Reduce the staged contingency results into the statistics as a single batch
+        """
+        if len(self._statistics_staged):
+            ic, Sf, loading, Sbus = zip(*self._statistics_staged)
+            self._statistics.update(contingency_indices=np.array(ic, dtype=int),
+                                    flows=np.array(Sf),
+                                    loading=np.array(loading),
+                                    Sbus=None if any(x is None for x in Sbus) else np.array(Sbus))
+            self._statistics_staged.clear()
+
+    def set_contingency_results(self, ic: int, Sf: CxVec, loading: CxVec,
+                                Sbus: Union[CxVec, None] = None, voltage: Union[CxVec, None] = None):
+        """
+        Store the results of a contingency
+        :param ic: contingency index
+        :param Sf: branch flows (nbr)
+        :param loading: branch loadings (nbr)
+        :param Sbus: bus power injections (nbus) (optional)
+        :param voltage: voltages (nbus) (optional)
+        """
+        if self.dense:
+            self.Sf[ic, :] = Sf
+            self.loading[ic, :] = loading
+            if Sbus is not None:
+                self.Sbus[ic, :] = Sbus
+            if voltage is not None:
+                self.voltage[ic, :] = voltage
+            self._statistics_pending[ic] = True
+        else:
+            self._statistics_staged.append((ic, Sf, loading, Sbus))
+            if len(self._statistics_staged) >= self.__statistics_batch_size__:
+                self.flush_statistics()
+
+    def merge(self, contingency_indices: IntVec, voltage: CxMat, Sbus: CxMat, Sf: CxMat, loading: CxMat,
+              srap_used_power: Mat, report: ContingencyResultsReport,
+              statistics: Union[ContingencyStatistics, None]):
+        """
+        Merge the results of a subset of contingencies in-place
+        :param contingency_indices: indices of the contingencies of the subset in these results
+        :param voltage: voltages of the subset (ncon_subset, nbus)
+        :param Sbus: bus power injections of the subset (ncon_subset, nbus)
+        :param Sf: branch flows of the subset (ncon_subset, nbr)
+        :param loading: branch loadings of the subset (ncon_subset, nbr)
+        :param srap_used_power: SRAP power used by the subset (nbr, nbus)
+        :param report: ContingencyResultsReport of the subset
+        :param statistics: ContingencyStatistics of the subset (indexed by subset position),
+                           not used with dense results, since they are reduced from the merged matrices
+        """
+        if self.dense:
+            self.voltage[contingency_indices, :] = voltage
+            self.Sbus[contingency_indices, :] = Sbus
+            self.Sf[contingency_indices, :] = Sf
+            self.loading[contingency_indices, :] = loading
+            self._statistics_pending[contingency_indices] = True
+        else:
+            self.flush_statistics()
+            self._statistics.merge(statistics, contingency_indices=contingency_indices)
+        self.srap_used_power += srap_used_power
+        self.report.merge(report)
+
+    def get_screening_recall(self, full_results: "ContingencyAnalysisResults", loading_threshold: float = 1.0) -> float:
+        """
+        Get the recall of the contingency screening, this is the fraction of the contingencies
+        that overload some branch in a full (non-screened) run that were selected by the screening
+        :param full_results: ContingencyAnalysisResults of the same study without screening (dense)
+        :param loading_threshold: loading (p.u.) over which a contingency is considered critical
+        :return: recall in [0, 1] (1 if there are no critical contingencies)
+        """
+        if not full_results.dense or full_results.loading.shape[0] != len(self.screened_in):
+            raise ValueError('The screening recall needs the dense results of the same contingencies '
+                             'without screening (dense_results=True)')
+
+        if full_results.loading.shape[1] == 0:
+            return 1.0
+
+        critical = np.max(np.abs(full_results.loading), axis=1) > loading_threshold
+        n_critical = int(np.sum(critical))
+
+        if n_critical == 0:
+            return 1.0
+
+        return float(np.sum(critical & self.screened_in)) / n_critical
+
     @staticmethod
     def get_steps():
         """
@@ -196,6 +338,43 @@ class ContingencyAnalysisResults(ResultsTemplate):
                 idx_device_type=DeviceType.BranchDevice
             )
 
+        elif result_type == ResultTypes.MaxContingencyFlows:
+
+            return ResultsTable(
+                data=self.statistics.max_flow,
+                index=self.branch_names,
+                columns=[result_type.value],
+                title=result_type.value,
+                units='(MW)',
+                cols_device_type=DeviceType.NoDevice,
+                idx_device_type=DeviceType.BranchDevice
+            )
+
+        elif result_type == ResultTypes.MaxContingencyLoading:
+
+            return ResultsTable(
+                data=self.statistics.max_loading * 100.0,
+                index=self.branch_names,
+                columns=[result_type.value],
+                title=result_type.value,
+                units='(%)',
+                cols_device_type=DeviceType.NoDevice,
+                idx_device_type=DeviceType.BranchDevice
+            )
+
+        elif result_type == ResultTypes.ContingencyStatisticalAnalysisReport:
+
+            data, columns = self.statistics.get_top_k_table(branch_names=self.branch_names,
+                                                            con_names=self.con_names)
+            return ResultsTable(
+                data=data,
+                index=self.branch_names,
+                columns=columns,
+                title=result_type.value,
+                cols_device_type=DeviceType.NoDevice,
+                idx_device_type=DeviceType.BranchDevice
+            )
+
         elif result_type == ResultTypes.ContingencyAnalysisReport:
 
             return ResultsTable(
@@ -16,18 +16,22 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import numpy as np
-from typing import Union
+from typing import Union, List
 
-from GridCalEngine.basic_structures import IntVec, StrVec
+from GridCalEngine.basic_structures import IntVec, StrVec, Mat
 from GridCalEngine.enumerations import EngineType, ContingencyMethod
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
-from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearMultiContingencies
+from GridCalEngine.Devices.Aggregation.contingency import Contingency
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
+from GridCalEngine.DataStructures.numerical_circuit_ts import NumericalCircuitTimeSeries
+from GridCalEngine.Simulations.LinearFactors.linear_analysis import (LinearAnalysis, LinearMultiContingencies,
+                                                                     SparseLinearFactors)
 from GridCalEngine.Simulations.LinearFactors.linear_analysis_options import LinearAnalysisOptions
-from GridCalEngine.Simulations.LinearFactors.linear_analysis_ts_driver import LinearAnalysisTimeSeriesDriver
 from GridCalEngine.Simulations.ContingencyAnalysis.contingency_analysis_driver import (ContingencyAnalysisOptions,
                                                                                        ContingencyAnalysisDriver)
 from GridCalEngine.Simulations.ContingencyAnalysis.contingency_analysis_ts_results import (
     ContingencyAnalysisTimeSeriesResults)
+from GridCalEngine.Simulations.ContingencyAnalysis.contingency_statistics import ContingencyStatistics
 from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.Simulations.driver_template import TimeSeriesDriverTemplate
 from GridCalEngine.Simulations.Clustering.clustering_results import ClusteringResults
@@ -80,23 +84,18 @@ class ContingencyAnalysisTimeSeriesDriver(TimeSeriesDriverTemplate):
 
         self.branch_names: StrVec = np.empty(shape=grid.get_branch_number_wo_hvdc(), dtype=str)
 
-    def run_contingency_analysis(self) -> ContingencyAnalysisTimeSeriesResults:
+    def get_empty_results(self) -> ContingencyAnalysisTimeSeriesResults:
         """
-        Run a contngency analysis in series
-        :return: returns the results
+        Create the results of the time series
+        :return: ContingencyAnalysisTimeSeriesResults
         """
-
-        self.report_text("Analyzing...")
-
         nb = self.grid.get_bus_number()
 
-        time_array = self.grid.time_profile[self.time_indices]
-
-        results = ContingencyAnalysisTimeSeriesResults(
+        return ContingencyAnalysisTimeSeriesResults(
             n=nb,
             nbr=self.grid.get_branch_number_wo_hvdc(),
             nc=self.grid.get_contingency_number(),
-            time_array=time_array,
+            time_array=self.grid.time_profile[self.time_indices],
             branch_names=self.grid.get_branch_names_wo_hvdc(),
             bus_names=self.grid.get_bus_names(),
             bus_types=np.ones(nb, dtype=int),
@@ -104,20 +103,99 @@ class ContingencyAnalysisTimeSeriesDriver(TimeSeriesDriverTemplate):
             clustering_results=self.clustering_results
         )
 
+    def get_time_probability(self, it: int) -> float:
+        """
+        Get the probability of a time step
+        :param it: position in the time indices
+        :return: probability
+        """
+        if self.clustering_results is not None:
+            return self.clustering_results.sampled_probabilities[it]
+        else:
+            return 1.0 / len(self.time_indices)
+
+    @staticmethod
+    def gather_step_results(results: ContingencyAnalysisTimeSeriesResults,
+                            std_dev_counter: WeldorfOnlineStdDevMat,
+                            it: int,
+                            Pbus,
+                            flows: Mat,
+                            loading: Mat):
+        """
+        Store the aggregated results of a time step
+        :param results: ContingencyAnalysisTimeSeriesResults
+        :param std_dev_counter: WeldorfOnlineStdDevMat
+        :param it: position in the time indices
+        :param Pbus: bus active power injections (nbus)
+        :param flows: contingency flows (ncon, nbranch)
+        :param loading: contingency loadings (ncon, nbranch)
+        """
+        results.S[it, :] = Pbus
+
+        results.max_flows[it, :] = np.abs(flows).max(axis=0)
+
+        # Note: Loading is (ncon, nbranch)
+
+        loading_abs = np.abs(loading)
+        overloading = loading_abs.copy()
+        overloading[overloading <= 1.0] = 0
+
+        for k in range(results.ncon):
+            std_dev_counter.update(it, overloading[k, :])
+
+        results.max_loading[it, :] = loading_abs.max(axis=0)
+        results.overload_count[it, :] = np.count_nonzero(overloading > 1.0)
+        results.sum_overload[it, :] = overloading.sum(axis=0)
+
+        results.std_dev_overload[it, :] = loading_abs.max(axis=0)
+
+    @staticmethod
+    def gather_step_statistics(results: ContingencyAnalysisTimeSeriesResults,
+                               std_dev_counter: WeldorfOnlineStdDevMat,
+                               it: int,
+                               statistics: ContingencyStatistics):
+        """
+        Store the aggregated results of a time step from the streamed contingency statistics
+        (same values as gather_step_results, without the dense contingency matrices)
+        :param results: ContingencyAnalysisTimeSeriesResults
+        :param std_dev_counter: WeldorfOnlineStdDevMat
+        :param it: position in the time indices
+        :param statistics: ContingencyStatistics of the time step
+        """
+        results.S[it, :] = statistics.max_injection
+        results.max_flows[it, :] = statistics.max_flow
+
+        std_dev_counter.merge_row(t=it,
+                                  count=statistics.overload_count,
+                                  mean=statistics.overload_mean,
+                                  M2=statistics.overload_m2,
+                                  steps=statistics.n_updates)
+
+        max_loading = statistics.max_loading
+        results.max_loading[it, :] = max_loading
+        results.overload_count[it, :] = statistics.overload_count.sum()
+        results.sum_overload[it, :] = statistics.overload_count * statistics.overload_mean
+
+        results.std_dev_overload[it, :] = max_loading
+
+    def run_contingency_analysis(self) -> ContingencyAnalysisTimeSeriesResults:
+        """
+        Run a contngency analysis in series
+        :return: returns the results
+        """
+        if self.options.contingency_method == ContingencyMethod.PTDF:
+            return self.run_linear_contingency_analysis()
+
+        self.report_text("Analyzing...")
+
+        results = self.get_empty_results()
+
         linear_multiple_contingencies = LinearMultiContingencies(grid=self.grid)
 
         cdriver = ContingencyAnalysisDriver(grid=self.grid,
                                             options=self.options,
                                             linear_multiple_contingencies=linear_multiple_contingencies)
 
-        if self.options.contingency_method == ContingencyMethod.PTDF:
-            linear = LinearAnalysisTimeSeriesDriver(
-                grid=self.grid,
-                options=self.options,
-                time_indices=self.time_indices
-            )
-            linear.run()
-
         std_dev_counter = WeldorfOnlineStdDevMat(nrow=results.nt, ncol=results.nbranch)
 
         for it, t in enumerate(self.time_indices):
@@ -125,31 +203,14 @@ class ContingencyAnalysisTimeSeriesDriver(TimeSeriesDriverTemplate):
             self.report_text('Contingency at ' + str(self.grid.time_profile[t]))
             self.report_progress2(it, len(self.time_indices))
 
-            if self.clustering_results is not None:
-                t_prob = self.clustering_results.sampled_probabilities[it]
-            else:
-                t_prob = 1.0/len(self.time_indices)
+            t_prob = self.get_time_probability(it)
 
             res_t = cdriver.run_at(t=t, t_prob=t_prob)
 
-            results.S[it, :] = res_t.Sbus.real.max(axis=0)
-
-            results.max_flows[it, :] = np.abs(res_t.Sf).max(axis=0)
-
-            # Note: Loading is (ncon, nbranch)
-
-            loading_abs = np.abs(res_t.loading)
-            overloading = loading_abs.copy()
-            overloading[overloading <= 1.0] = 0
-
-            for k in range(results.ncon):
-                std_dev_counter.update(it, overloading[k, :])
-
-            results.max_loading[it, :] = loading_abs.max(axis=0)
-            results.overload_count[it, :] = np.count_nonzero(overloading > 1.0)
-            results.sum_overload[it, :] = overloading.sum(axis=0)
-
-            results.std_dev_overload[it, :] = np.abs(res_t.loading).max(axis=0)
+            self.gather_step_statistics(results=results,
+                                        std_dev_counter=std_dev_counter,
+                                        it=it,
+                                        statistics=res_t.statistics)
 
             results.srap_used_power += res_t.srap_used_power
             results.report += res_t.report
@@ -167,6 +228,231 @@ class ContingencyAnalysisTimeSeriesDriver(TimeSeriesDriverTemplate):
 
         return results
 
+    def run_linear_contingency_analysis(self,
+                                        max_block_elements: int = 10_000_000) -> ContingencyAnalysisTimeSeriesResults:
+        """
+        Run the PTDF contingency analysis of the time series.
+        The linear factors are only computed when the grid structure changes, and the contingency flows of
+        the consecutive time steps that share the factors are computed together with the stacked MLODF factors
+        :param max_block_elements: maximum number of flow values (time steps x contingencies x branches)
+                                   computed at once
+        :return: returns the results
+        """
+        self.report_text("Analyzing...")
+
+        results = self.get_empty_results()
+
+        linear_multiple_contingencies = LinearMultiContingencies(grid=self.grid)
+
+        cg_dict = self.grid.get_contingency_group_dict()
+        contingencies_list = [cg_dict[cg.idtag] for cg in self.grid.contingency_groups]
+
+        area_names, bus_area_indices, F, T, hvdc_F, hvdc_T = self.grid.get_branch_areas_info()
+
+        nc_ts = NumericalCircuitTimeSeries(circuit=self.grid, time_indices=self.time_indices)
+
+        std_dev_counter = WeldorfOnlineStdDevMat(nrow=results.nt, ncol=results.nbranch)
+
+        max_block_size = max(1, max_block_elements // max(1, results.ncon * results.nbranch))
+
+        structure = None
+        factors = None
+        block_pos = list()
+        block_nc = list()
+        block_flows = list()
+
+        for it, t in enumerate(self.time_indices):
+
+            self.report_text('Contingency at ' + str(self.grid.time_profile[t]))
+            self.report_progress2(it, len(self.time_indices))
+
+            nc = nc_ts.get_at(t)
+            structure_t = nc.get_structure_hash()
+
+            if structure_t != structure or len(block_pos) >= max_block_size:
+
+                # process the time steps computed with the previous factors
+                self.process_linear_block(results=results,
+                                          std_dev_counter=std_dev_counter,
+                                          linear_multiple_contingencies=linear_multiple_contingencies,
+                                          contingencies_list=contingencies_list,
+                                          factors=factors,
+                                          block_pos=block_pos,
+                                          block_nc=block_nc,
+                                          block_flows=block_flows,
+                                          F=F,
+                                          T=T,
+                                          bus_area_indices=bus_area_indices,
+                                          area_names=area_names)
+                block_pos = list()
+                block_nc = list()
+                block_flows = list()
+
+                if self.__cancel__:
+                    return results
+
+                if structure_t != structure:
+                    factors = self.compute_linear_factors(nc=nc,
+                                                          linear_multiple_contingencies=linear_multiple_contingencies)
+                    structure = structure_t
+
+            # compute the branch flows in "n"
+            if self.options.use_provided_flows:
+                if self.options.Pf is None:
+                    msg = 'The option to use the provided flows is enabled, but no flows are available'
+                    self.logger.add_error(msg)
+                    raise Exception(msg)
+                flows_n = self.options.Pf
+            else:
+                flows_n = factors.get_flows(nc.Sbus) * nc.Sbase
+
+            block_pos.append(it)
+            block_nc.append(nc)
+            block_flows.append(flows_n)
+
+        self.process_linear_block(results=results,
+                                  std_dev_counter=std_dev_counter,
+                                  linear_multiple_contingencies=linear_multiple_contingencies,
+                                  contingencies_list=contingencies_list,
+                                  factors=factors,
+                                  block_pos=block_pos,
+                                  block_nc=block_nc,
+                                  block_flows=block_flows,
+                                  F=F,
+                                  T=T,
+                                  bus_area_indices=bus_area_indices,
+                                  area_names=area_names)
+
+        # compute the mean
+        std_dev_counter.finalize()
+        results.mean_overload = std_dev_counter.mean
+        results.std_dev_overload = std_dev_counter.std_dev
+
+        return results
+
+    def compute_linear_factors(self,
+                               nc: NumericalCircuit,
+                               linear_multiple_contingencies: LinearMultiContingencies
+                               ) -> Union[LinearAnalysis, SparseLinearFactors]:
+        """
+        Compute the linear factors of a circuit and the multi-contingency factors
+        :param nc: NumericalCircuit
+        :param linear_multiple_contingencies: LinearMultiContingencies to compute
+        :return: LinearAnalysis or SparseLinearFactors
+        """
+        lin_options = self.options.lin_options
+
+        linear_analysis = LinearAnalysis(numerical_circuit=nc,
+                                         distributed_slack=lin_options.distribute_slack,
+                                         correct_values=lin_options.correct_values)
+        if lin_options.use_sparse_factors:
+            factors = linear_analysis.get_sparse_factors(ptdf_threshold=lin_options.ptdf_threshold,
+                                                         lodf_threshold=lin_options.lodf_threshold)
+        else:
+            linear_analysis.run()
+            factors = linear_analysis
+
+        linear_multiple_contingencies.compute(lodf=factors.LODF,
+                                              ptdf=factors.PTDF,
+                                              ptdf_threshold=lin_options.ptdf_threshold,
+                                              lodf_threshold=lin_options.lodf_threshold,
+                                              prepare_for_srap=self.options.use_srap)
+        return factors
+
+    def process_linear_block(self,
+                             results: ContingencyAnalysisTimeSeriesResults,
+                             std_dev_counter: WeldorfOnlineStdDevMat,
+                             linear_multiple_contingencies: LinearMultiContingencies,
+                             contingencies_list: List[List[Contingency]],
+                             factors: Union[LinearAnalysis, SparseLinearFactors, None],
+                             block_pos: List[int],
+                             block_nc: List[NumericalCircuit],
+                             block_flows: List[Mat],
+                             F: IntVec,
+                             T: IntVec,
+                             bus_area_indices: IntVec,
+                             area_names: StrVec) -> None:
+        """
+        Compute the contingencies of a block of time steps that share the linear factors
+        :param results: ContingencyAnalysisTimeSeriesResults to fill
+        :param std_dev_counter: WeldorfOnlineStdDevMat
+        :param linear_multiple_contingencies: LinearMultiContingencies computed with the factors
+        :param contingencies_list: list of the contingencies of each group
+        :param factors: linear factors
+        :param block_pos: positions of the block's time steps in the time indices
+        :param block_nc: NumericalCircuit of each time step of the block
+        :param block_flows: base flows of each time step of the block
+        :param F: branches' from bus indices
+        :param T: branches' to bus indices
+        :param bus_area_indices: area index of each bus
+        :param area_names: area names
+        """
+        if len(block_pos) == 0:
+            return
+
+        base_flows = np.array(block_flows)
+
+        # flows of the contingencies without injection changes for all the block's time steps at once
+        c_flows = linear_multiple_contingencies.get_contingency_flows_batch(base_flows=base_flows)
+
+        injection_contingencies = linear_multiple_contingencies.get_injection_contingency_indices()
+
+        for i, it in enumerate(block_pos):
+
+            t = self.time_indices[it]
+            nc = block_nc[i]
+            flows_n = base_flows[i, :]
+            flows = c_flows[i, :, :]
+            t_prob = self.get_time_probability(it)
+
+            for ic in injection_contingencies:
+                injections = nc.set_linear_contingency_status(contingencies_list=contingencies_list[ic])
+                nc.set_linear_contingency_status(contingencies_list=contingencies_list[ic], revert=True)
+                flows[ic, :] = linear_multiple_contingencies.multi_contingencies[ic].get_contingency_flows(
+                    base_flow=flows_n,
+                    injections=injections
+                )
+
+            rates = nc.rates + 1e-9
+            loading = flows / rates
+
+            self.gather_step_results(results=results,
+                                     std_dev_counter=std_dev_counter,
+                                     it=it,
+                                     Pbus=nc.get_injections(normalize=False).real,
+                                     flows=flows,
+                                     loading=loading)
+
+            mon_idx = nc.branch_data.get_monitor_enabled_indices()
+            loadings_n = flows_n / rates
+
+            for ic, multi_contingency in enumerate(linear_multiple_contingencies.multi_contingencies):
+                results.report.analyze(t=t,
+                                       t_prob=t_prob,
+                                       mon_idx=mon_idx,
+                                       numerical_circuit=nc,
+                                       base_flow=flows_n,
+                                       base_loading=loadings_n,
+                                       contingency_flows=flows[ic, :],
+                                       contingency_loadings=loading[ic, :],
+                                       contingency_idx=ic,
+                                       contingency_group=self.grid.contingency_groups[ic],
+                                       using_srap=self.options.use_srap,
+                                       srap_ratings=nc.branch_data.protection_rates,
+                                       srap_max_power=self.options.srap_max_power,
+                                       srap_deadband=self.options.srap_deadband,
+                                       contingency_deadband=self.options.contingency_deadband,
+                                       srap_rever_to_nominal_rating=self.options.srap_rever_to_nominal_rating,
+                                       multi_contingency=multi_contingency,
+                                       PTDF=factors.PTDF,
+                                       available_power=nc.bus_data.srap_availbale_power,
+                                       srap_used_power=results.srap_used_power,
+                                       F=F,
+                                       T=T,
+                                       bus_area_indices=bus_area_indices,
+                                       area_names=area_names,
+                                       top_n=self.options.srap_top_n)
+
     def run_newton_pa(self) -> ContingencyAnalysisTimeSeriesResults:
         """
         Run with Newton Power Analytics
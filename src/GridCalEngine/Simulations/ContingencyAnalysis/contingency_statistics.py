@@ -0,0 +1,252 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from typing import List, Tuple, Union
+import numpy as np
+from GridCalEngine.basic_structures import Vec, IntVec, Mat, IntMat, CxMat, ObjMat, StrVec
+
+
+class ContingencyStatistics:
+    """
+    Bounded-memory reduction of the contingency results.
+    The post-contingency flows are streamed in batches of contingencies and only the following is kept:
+        - per branch worst flow and loading
+        - per branch count, mean and variance (Welford) of the overloads (loading > 1)
+        - per branch top-K contingencies by loading
+        - the (contingency, branch) pairs whose loading exceeds a threshold
+    The statistics of different sets of contingencies can be merged, i.e. from parallel processes
+    """
+
+    def __init__(self, nbr: int, nbus: int, top_k: int = 5, loading_threshold: float = 1.0):
+        """
+        Constructor
+        :param nbr: number of branches
+        :param nbus: number of buses
+        :param top_k: number of worst contingencies stored per branch
+        :param loading_threshold: loading (p.u.) over which the (contingency, branch) pairs are stored
+        """
+        self.top_k = max(1, top_k)
+        self.loading_threshold = loading_threshold
+
+        # number of contingencies processed
+        self.n_updates = 0
+
+        self.max_flow: Vec = np.zeros(nbr, dtype=float)
+        self.max_injection: Vec = np.zeros(nbus, dtype=float)
+
+        # Welford's aggregates of the overloads of every branch
+        self.overload_count: IntVec = np.zeros(nbr, dtype=int)
+        self.overload_mean: Vec = np.zeros(nbr, dtype=float)
+        self.overload_m2: Vec = np.zeros(nbr, dtype=float)
+
+        # worst contingencies of every branch, sorted by decreasing loading (-1 is an empty slot)
+        self.top_k_loading: Mat = np.full((nbr, self.top_k), -1.0, dtype=float)
+        self.top_k_contingency: IntMat = np.full((nbr, self.top_k), -1, dtype=int)
+
+        # exceedances stored in chunks: contingency indices, branch indices, flows and loadings
+        self._exceedances: List[Tuple[IntVec, IntVec, Vec, Vec]] = list()
+
+    @property
+    def nbr(self) -> int:
+        """
+        Number of branches
+        """
+        return self.max_flow.shape[0]
+
+    @property
+    def max_loading(self) -> Vec:
+        """
+        Worst loading of every branch (p.u.)
+        """
+        return np.maximum(self.top_k_loading[:, 0], 0.0)
+
+    @property
+    def worst_contingency(self) -> IntVec:
+        """
+        Index of the contingency that produces the worst loading of every branch (-1 if none)
+        """
+        return self.top_k_contingency[:, 0]
+
+    @property
+    def overload_std_dev(self) -> Vec:
+        """
+        Standard deviation of the overloads of every branch
+        """
+        std_dev = np.zeros(self.nbr, dtype=float)
+        idx = np.where(self.overload_count > 0)[0]
+        std_dev[idx] = np.sqrt(self.overload_m2[idx] / self.overload_count[idx])
+        return std_dev
+
+    def update(self, contingency_indices: IntVec, flows: Union[Mat, CxMat], loading: Union[Mat, CxMat],
+               Sbus: Union[Mat, CxMat, None] = None):
+        """
+        Add the results of a batch of contingencies
+        :param contingency_indices: indices of the contingencies of the batch (nk)
+        :param flows: post-contingency branch flows (nk, nbr)
+        :param loading: post-contingency branch loadings (nk, nbr)
+        :param Sbus: post-contingency bus injections (nk, nbus) (optional)
+        """
+        contingency_indices = np.atleast_1d(contingency_indices)
+        flows_abs = np.abs(np.atleast_2d(flows))
+        loading_abs = np.abs(np.atleast_2d(loading))
+        nk = loading_abs.shape[0]
+
+        if nk == 0:
+            return
+
+        np.maximum(self.max_flow, flows_abs.max(axis=0), out=self.max_flow)
+
+        if Sbus is not None:
+            self.combine_max_injection(np.atleast_2d(Sbus).real.max(axis=0))
+
+        self.n_updates += nk
+
+        # Welford's aggregates of the batch overloads, combined with the stored ones
+        is_overload = loading_abs > 1.0
+        count = is_overload.sum(axis=0)
+        mean = np.where(is_overload, loading_abs, 0.0).sum(axis=0) / np.maximum(count, 1)
+        m2 = (np.where(is_overload, loading_abs - mean, 0.0) ** 2).sum(axis=0)
+        self.combine_overloads(count=count, mean=mean, m2=m2)
+
+        self.combine_top_k(loading=loading_abs.T,
+                           contingencies=np.broadcast_to(contingency_indices, (self.nbr, nk)))
+
+        k_idx, br_idx = np.nonzero(loading_abs > self.loading_threshold)
+        if len(k_idx):
+            self._exceedances.append((contingency_indices[k_idx],
+                                      br_idx,
+                                      flows_abs[k_idx, br_idx],
+                                      loading_abs[k_idx, br_idx]))
+
+    def combine_max_injection(self, max_injection: Vec):
+        """
+        Combine the maximum bus injections (the injections may be negative)
+        :param max_injection: maximum injection of every bus
+        """
+        if self.n_updates == 0:
+            self.max_injection = max_injection.copy()
+        else:
+            np.maximum(self.max_injection, max_injection, out=self.max_injection)
+
+    def combine_overloads(self, count: IntVec, mean: Vec, m2: Vec):
+        """
+        Combine Welford's aggregates of another set of overloads (Chan's parallel formula)
+        :param count: number of overloads of every branch
+        :param mean: mean overload of every branch
+        :param m2: sum of the squared deviations of every branch
+        """
+        n = self.overload_count + count
+        n_safe = np.maximum(n, 1)
+        delta = mean - self.overload_mean
+        self.overload_m2 = self.overload_m2 + m2 + delta * delta * self.overload_count * count / n_safe
+        self.overload_mean = self.overload_mean + delta * count / n_safe
+        self.overload_count = n
+
+    def combine_top_k(self, loading: Mat, contingencies: IntMat):
+        """
+        Combine the stored top-K contingencies with new candidates
+        :param loading: candidate loadings (nbr, n)
+        :param contingencies: candidate contingency indices (nbr, n)
+        """
+        cand_loading = np.c_[self.top_k_loading, loading]
+        cand_contingency = np.c_[self.top_k_contingency, contingencies]
+
+        if cand_loading.shape[1] > self.top_k:
+            # select the K largest candidates of every branch in linear time
+            sel = np.argpartition(-cand_loading, self.top_k - 1, axis=1)[:, :self.top_k]
+            cand_loading = np.take_along_axis(cand_loading, sel, axis=1)
+            cand_contingency = np.take_along_axis(cand_contingency, sel, axis=1)
+
+        # sort the K selected by decreasing loading, the lowest contingency index first on ties
+        order = np.lexsort((cand_contingency, -cand_loading), axis=1)
+        self.top_k_loading = np.take_along_axis(cand_loading, order, axis=1)
+        self.top_k_contingency = np.take_along_axis(cand_contingency, order, axis=1)
+
+    def merge(self, other: "ContingencyStatistics", contingency_indices: Union[IntVec, None] = None):
+        """
+        Merge the statistics of another set of contingencies in-place
+        :param other: ContingencyStatistics
+        :param contingency_indices: indices of the other's contingencies in this study,
+                                    if None the other's indices are used as-is
+        """
+        if other.n_updates > 0:
+            self.combine_max_injection(other.max_injection)
+        self.n_updates += other.n_updates
+        np.maximum(self.max_flow, other.max_flow, out=self.max_flow)
+
+        self.combine_overloads(count=other.overload_count, mean=other.overload_mean, m2=other.overload_m2)
+        self.combine_top_k(loading=other.top_k_loading,
+                           contingencies=self.map_contingencies(other.top_k_contingency, contingency_indices))
+
+        for con_idx, br_idx, flows, loading in other._exceedances:
+            self._exceedances.append((self.map_contingencies(con_idx, contingency_indices), br_idx, flows, loading))
+
+    @staticmethod
+    def map_contingencies(idx: Union[IntVec, IntMat], contingency_indices: Union[IntVec, None]) -> Union[IntVec, IntMat]:
+        """
+        Translate local contingency indices to the study indices
+        :param idx: local contingency indices (-1 for empty slots)
+        :param contingency_indices: study index of every local contingency, if None the indices are kept
+        :return: study contingency indices (-1 for empty slots)
+        """
+        if contingency_indices is None:
+            return idx
+
+        contingency_indices = np.asarray(contingency_indices, dtype=int)
+        if len(contingency_indices) == 0:
+            return np.full_like(idx, -1)
+
+        return np.where(idx >= 0, contingency_indices[np.maximum(idx, 0)], -1)
+
+    def get_exceedances(self) -> Tuple[IntVec, IntVec, Vec, Vec]:
+        """
+        Get the (contingency, branch) pairs whose loading exceeds the threshold
+        :return: contingency indices, branch indices, flows, loadings
+        """
+        if len(self._exceedances) == 0:
+            return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                    np.zeros(0, dtype=float), np.zeros(0, dtype=float))
+
+        if len(self._exceedances) > 1:
+            # consolidate the chunks
+            self._exceedances = [tuple(np.concatenate(x) for x in zip(*self._exceedances))]
+
+        return self._exceedances[0]
+
+    def get_top_k_table(self, branch_names: StrVec, con_names: StrVec) -> Tuple[ObjMat, StrVec]:
+        """
+        Get the per branch worst-case table
+        :param branch_names: names of the branches
+        :param con_names: names of the contingencies
+        :return: data (nbr, 4 + 2 * top_k), columns
+        """
+        columns = ['Max flow (MW)', 'Overloads', 'Mean overload (%)', 'Std-dev overload (%)']
+        for k in range(self.top_k):
+            columns += [f'Contingency {k + 1}', f'Loading {k + 1} (%)']
+
+        data = np.empty((self.nbr, len(columns)), dtype=object)
+        data[:, 0] = self.max_flow
+        data[:, 1] = self.overload_count
+        data[:, 2] = self.overload_mean * 100.0
+        data[:, 3] = self.overload_std_dev * 100.0
+
+        con_names = np.append(np.asarray(con_names, dtype=object), "")  # -1 -> ""
+        for k in range(self.top_k):
+            data[:, 4 + 2 * k] = con_names[self.top_k_contingency[:, k]]
+            data[:, 5 + 2 * k] = np.maximum(self.top_k_loading[:, k], 0.0) * 100.0
+
+        return data, np.array(columns)
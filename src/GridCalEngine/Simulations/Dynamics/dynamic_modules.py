@@ -18,11 +18,14 @@
 
 import numpy as np
 import pandas as pd
-from scipy.sparse.linalg import splu
-from scipy.sparse import csr_matrix as sparse
+import scipy.sparse as sp
+from typing import List, Tuple, Callable, Dict
 from enum import Enum
 from warnings import warn
 from matplotlib import pyplot as plt
+from GridCalEngine.basic_structures import Vec, CxVec, IntVec
+from GridCalEngine.enumerations import SparseSolver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import SparseLinearSolver
 
 
 class DiffEqSolver(Enum):
@@ -90,6 +93,9 @@ class TransientStabilityResults:
 
         self.time = None
 
+        # number of network factorizations performed
+        self.n_factorizations = 0
+
         self.available_results = ['Bus voltage']
 
     def plot(self, result_type, ax=None, indices=None, names=None, LINEWIDTH=2):
@@ -140,6 +146,22 @@ class TransientStabilityResults:
             return None
 
 
+def runge_kutta4(function: Callable[..., Tuple[Vec, ...]], x: List[Vec], h: float) -> List[Vec]:
+    """
+    Classic 4th order Runge-Kutta step of the state arrays of a group of machines
+    :param function: function that returns the derivatives of the states, given the states
+    :param x: list of state arrays
+    :param h: step length (s)
+    :return: list of state arrays after the step
+    """
+    k1 = function(*x)
+    k2 = function(*[xi + 0.5 * h * ki for xi, ki in zip(x, k1)])
+    k3 = function(*[xi + 0.5 * h * ki for xi, ki in zip(x, k2)])
+    k4 = function(*[xi + h * ki for xi, ki in zip(x, k3)])
+
+    return [xi + h / 6.0 * (a + 2.0 * b + 2.0 * c + d) for xi, a, b, c, d in zip(x, k1, k2, k3, k4)]
+
+
 class SynchronousMachineOrder4:
     """
     4th Order Synchronous Machine Model
@@ -162,6 +184,9 @@ class SynchronousMachineOrder4:
     H = 2
     """
 
+    # integrated states
+    state_names = ['Eqp', 'Edp', 'omega', 'delta']
+
     def __init__(self, H, Ra, Xd, Xdp, Xdpp, Xq, Xqp, Xqpp, Td0p, Tq0p, base_mva, Sbase, bus_idx, fn=50,
                  speed_volt=False, solver=DiffEqSolver.RUNGE_KUTTA):
         """
@@ -185,7 +210,7 @@ class SynchronousMachineOrder4:
 
         self.solver = solver
 
-        self.bus_idx = bus_idx
+        self.bus_idx = np.array(bus_idx, dtype=int)
 
         self.Vfd = 0.0
 
@@ -289,27 +314,23 @@ class SynchronousMachineOrder4:
         # Initialise the rest
         self.Vt = np.abs(vt0)
         self.Pm = self.P
-        self.omega = 1
+        self.omega = np.ones_like(self.H)
 
         self.check_diffs()
 
-    def calc_currents(self, Vbus, Ibus):
+    def calc_currents(self, vt):
         """
         Calculate machine current Injections (in network reference frame)
-        :param vt: complex initial voltage
-        :return:
+        :param vt: complex voltage at the machines' buses
+        :return: current injections
         """
 
-        vt = Vbus[self.bus_idx]
-
         # Calculate terminal voltage in dq reference frame
         self.Vd = np.abs(vt) * np.sin(self.delta - np.angle(vt))
         self.Vq = np.abs(vt) * np.cos(self.delta - np.angle(vt))
 
         # Check if speed-voltage term should be included
-        k = np.where(self.speed_volt == False)[0]
-        omega = self.omega
-        omega[k] = np.ones_like(k)
+        omega = np.where(self.speed_volt, self.omega, 1.0)
 
         # Calculate Id and Iq (Norton equivalent current injection in dq frame)
         self.Id = (self.Eqp - self.Ra / (self.Xqp * omega) * (self.Vd - self.Edp) - self.Vq / omega) / (
@@ -327,8 +348,7 @@ class SynchronousMachineOrder4:
         self.Vt = np.abs(vt)
         self.Vang = np.angle(vt)
 
-        # apply th currents to the passed vector
-        Ibus[self.bus_idx] = self.Im
+        return self.Im
 
     def check_diffs(self):
         """
@@ -343,13 +363,14 @@ class SynchronousMachineOrder4:
             warn('Warning: differential equations not zero on initialisation...')
             print('dEdp = ' + str(dEdp) + ', dEqp = ' + str(dEqp))
 
-    def function(self, h, Eqp, Edp, omega):
+    def function(self, Eqp, Edp, omega, delta):
         """
-        Compute the magnitude's derivatives
+        Compute the states derivatives
         :param Eqp:
         :param Edp:
         :param omega:
-        :return:
+        :param delta:
+        :return: derivatives of Eqp, Edp, omega and delta
         """
         # Electrical differential equations
         f1 = (self.Vfd - (self.Xd - self.Xdp) * self.Id - Eqp) / self.Td0p
@@ -361,48 +382,15 @@ class SynchronousMachineOrder4:
 
         f4 = self.omega_n * (omega - 1.0)
 
-        return h * f1, h * f2, h * f3, h * f4
+        return f1, f2, f3, f4
 
-    def solve(self, h):
+    def step(self, h):
         """
-        Solve using Runge-Kutta
-        Args:
-            h: step size
-
-        Returns: self.Eqp, self.Edp, self.omega, self.delta
+        Integrate the states of all the machines one step using Runge-Kutta
+        :param h: step length (s)
         """
-        # step 1
-        k1_Eqp, k1_Edp, k1_omega, k1_delta = self.function(h, self.Eqp, self.Edp, self.omega)
-
-        # step 2
-        k2_Eqp, k2_Edp, k2_omega, k2_delta = self.function(h, self.Eqp + 0.5 * k1_Eqp,
-                                                           self.Edp + 0.5 * k1_Edp,
-                                                           self.omega + 0.5 * k1_omega)
-
-        # step 3
-        k3_Eqp, k3_Edp, k3_omega, k3_delta = self.function(h, self.Eqp + 0.5 * k2_Eqp,
-                                                           self.Edp + 0.5 * k2_Edp,
-                                                           self.omega + 0.5 * k2_omega)
-
-        # step 4
-        k4_Eqp, k4_Edp, k4_omega, k4_delta = self.function(h, self.Eqp + 0.5 * k3_Eqp,
-                                                           self.Edp + 0.5 * k3_Edp,
-                                                           self.omega + 0.5 * k3_omega)
-        a = 1.0 / 6.0
-
-        # Tm = Pm / omega_0
-
-        # update the values
-
-        self.Eqp += a * (k1_Eqp + 2.0 * k2_Eqp + 2.0 * k3_Eqp + k4_Eqp)
-
-        self.Edp += a * (k1_Edp + 2.0 * k2_Edp + 2.0 * k3_Edp + k4_Edp)
-
-        self.omega += a * (k1_omega + 2.0 * k2_omega + 2.0 * k3_omega + k4_omega)
-
-        self.delta += a * (k1_delta + 2.0 * k2_delta + 2.0 * k3_delta + k4_delta)
-
-        return self.Eqp, self.Edp, self.omega, self.delta
+        self.Eqp, self.Edp, self.omega, self.delta = runge_kutta4(self.function,
+                                                                  [self.Eqp, self.Edp, self.omega, self.delta], h)
 
 
 class SynchronousMachineOrder6SauerPai:
@@ -413,12 +401,15 @@ class SynchronousMachineOrder6SauerPai:
     Sauer, P.W., Pai, M. A., "Power System Dynamics and Stability", Stipes Publishing, 2006 
     """
 
+    # integrated states
+    state_names = ['Eqp', 'Edp', 'phid_pp', 'phiq_pp', 'omega', 'delta']
+
     def __init__(self, H, Ra, Xa, Xd, Xdp, Xdpp, Xq, Xqp, Xqpp, Td0p, Tq0p, Td0pp, Tq0pp, base_mva, Sbase, bus_idx,
                  fn=50, speed_volt=False):
 
         self.omega_n = 2 * np.pi * fn
 
-        self.bus_idx = bus_idx
+        self.bus_idx = np.array(bus_idx, dtype=int)
 
         # Check for speed-voltage term option 
         self.speed_volt = speed_volt
@@ -468,9 +459,9 @@ class SynchronousMachineOrder6SauerPai:
     def get_yg(self):
         """
         Get the generator admittance
-        :return: shunt admittance
+        :return: shunt admittance (the same subtransient Norton admittance used in calc_currents)
         """
-        return (self.Ra - 1j * 0.5 * (self.Xdp + self.Xqp)) / (self.Ra ** 2.0 + (self.Xdp * self.Xqp))
+        return self.Yg
 
     def initialise(self, vt0, S0):
         """
@@ -511,7 +502,7 @@ class SynchronousMachineOrder6SauerPai:
         self.Vang = 0
         self.Pm = self.P
         self.Tm = self.P
-        self.omega = 1
+        self.omega = np.ones_like(self.H)
 
         self.check_diffs()
 
@@ -547,10 +538,7 @@ class SynchronousMachineOrder6SauerPai:
         self.Vq = np.abs(vt) * np.cos(self.delta - np.angle(vt))
 
         # Check if speed-voltage term should be included
-        if self.speed_volt:
-            omega = self.omega
-        else:
-            omega = 1
+        omega = np.where(self.speed_volt, self.omega, 1.0)
 
         # Calculate Id and Iq (Norton equivalent current injection in dq frame)
         self.Id = (-self.Vq / omega + self.gamma_d1 * self.Eqp + (1 - self.gamma_d1) * self.phid_pp
@@ -577,29 +565,32 @@ class SynchronousMachineOrder6SauerPai:
 
         return self.Im
 
-    def function(self, Eqp, Edp, omega):
+    def function(self, Eqp, Edp, phid_pp, phiq_pp, omega, delta):
         """
         Solve machine differential equations for the next stage in the integration step
         :param Eqp:
         :param Edp:
+        :param phid_pp:
+        :param phiq_pp:
         :param omega:
-        :return:
+        :param delta:
+        :return: derivatives of Eqp, Edp, phid_pp, phiq_pp, omega and delta
         """
 
         # Eq'
         f1 = (self.Vfd
-              - (self.Xd - self.Xdp) * (self.Id - self.gamma_d2 * self.phid_pp
+              - (self.Xd - self.Xdp) * (self.Id - self.gamma_d2 * phid_pp
                                         - (1 - self.gamma_d1) * self.Id + self.gamma_d2 * Eqp) - Eqp) / self.Td0p
 
         # Ed'
-        f2 = ((self.Xq - self.Xqp) * (self.Iq - self.gamma_q2 * self.phiq_pp
+        f2 = ((self.Xq - self.Xqp) * (self.Iq - self.gamma_q2 * phiq_pp
                                       - (1 - self.gamma_q1) * self.Iq - self.gamma_q2 * Edp) - Edp) / self.Tq0p
 
         # phi d pp
-        f3 = (Eqp - (self.Xdp - self.Xa) * self.Id - self.phid_pp) / self.Td0pp
+        f3 = (Eqp - (self.Xdp - self.Xa) * self.Id - phid_pp) / self.Td0pp
 
         # phi_q''
-        f4 = (-Edp - (self.Xqp - self.Xa) * self.Iq - self.phiq_pp) / self.Tq0pp
+        f4 = (-Edp - (self.Xqp - self.Xa) * self.Iq - phiq_pp) / self.Tq0pp
 
         # omega
         f5 = 0.5 / self.H * (self.Pm / omega - self.P)
@@ -609,6 +600,16 @@ class SynchronousMachineOrder6SauerPai:
 
         return f1, f2, f3, f4, f5, f6
 
+    def step(self, h):
+        """
+        Integrate the states of all the machines one step using Runge-Kutta
+        :param h: step length (s)
+        """
+        (self.Eqp, self.Edp, self.phid_pp,
+         self.phiq_pp, self.omega, self.delta) = runge_kutta4(self.function,
+                                                              [self.Eqp, self.Edp, self.phid_pp,
+                                                               self.phiq_pp, self.omega, self.delta], h)
+
 
 class VoltageSourceConverterAverage:
     """
@@ -617,8 +618,11 @@ class VoltageSourceConverterAverage:
     Copyright (C) 2014-2015 Julius Susanto. All rights reserved.
     """
 
+    # integrated states
+    state_names = []
+
     def __init__(self, Rl, Xl, fn, bus_idx):
-        self.bus_idx = bus_idx
+        self.bus_idx = np.array(bus_idx, dtype=int)
 
         self.Rl = Rl
         self.Xl = Xl
@@ -670,7 +674,7 @@ class VoltageSourceConverterAverage:
         self.Vt = np.abs(vt0)
         self.Ed = np.real(self.Edq)
         self.Eq = np.imag(self.Edq)
-        self.omega = 1.0
+        self.omega = np.ones(len(self.bus_idx))
 
     def calc_currents(self, vt):
         """
@@ -700,10 +704,17 @@ class VoltageSourceConverterAverage:
 
         return self.Im
 
-    def function(self, h, d):
+    def function(self):
         """
         Solve machine differential equations for the next stage in the integration step
-        :param h: solve step in seconds
+        :return: no derivatives, this model has no states
+        """
+        return tuple()
+
+    def step(self, h):
+        """
+        Integrate the states one step
+        :param h: step length (s)
         """
 
         # State variables do not change in this model
@@ -717,8 +728,11 @@ class ExternalGrid:
     and two differential equations representing the swing equations.
     """
 
+    # integrated states
+    state_names = ['omega', 'delta']
+
     def __init__(self, Xdp, H, fn, bus_idx):
-        self.bus_idx = bus_idx
+        self.bus_idx = np.array(bus_idx, dtype=int)
 
         self.Xdp = Xdp
         self.H = H
@@ -751,7 +765,7 @@ class ExternalGrid:
         self.P = p0
         self.Pm = p0
         self.Eq = np.abs(Eq0)
-        self.omega = 1
+        self.omega = np.ones_like(self.H)
         self.delta = delta0
 
     def get_yg(self):
@@ -776,9 +790,12 @@ class ExternalGrid:
 
         return i_grid
 
-    def function(self, Eqp, Edp, omega):
+    def function(self, omega, delta):
         """
         Solve machine differential equations for the next stage in the integration step
+        :param omega:
+        :param delta:
+        :return: derivatives of omega and delta
         """
 
         # Solve swing equation
@@ -786,11 +803,14 @@ class ExternalGrid:
 
         f2 = 2 * np.pi * self.fn * (omega - 1.0)
 
-        f3 = np.zeros_like(Eqp)
-
-        f4 = np.zeros_like(Eqp)
+        return f1, f2
 
-        return f1, f2, f3, f4
+    def step(self, h):
+        """
+        Integrate the states one step using Runge-Kutta
+        :param h: step length (s)
+        """
+        self.omega, self.delta = runge_kutta4(self.function, [self.omega, self.delta], h)
 
 
 class SingleCageAsynchronousMotor:
@@ -802,6 +822,9 @@ class SingleCageAsynchronousMotor:
 
     """
 
+    # integrated states
+    state_names = ['Eqp', 'Edp', 'slip']
+
     def __init__(self, H, Rr, Xr, Rs, Xs, a, Xm, MVA_Rating, Sbase, bus_idx, fn=50):
         """
         
@@ -816,7 +839,7 @@ class SingleCageAsynchronousMotor:
         :param fn: system frequency
         """
 
-        self.bus_idx = bus_idx
+        self.bus_idx = np.array(bus_idx, dtype=int)
 
         self.omega_n = 2 * np.pi * fn
 
@@ -873,19 +896,20 @@ class SingleCageAsynchronousMotor:
         """
 
         # Initialise signals, states and parameters
-        self.Id = 0
-        self.Iq = 0
-        self.Vd = 0
-        self.Vq = 0
+        n = len(self.bus_idx)
+        self.Id = np.zeros(n)
+        self.Iq = np.zeros(n)
+        self.Vd = np.zeros(n)
+        self.Vq = np.zeros(n)
         self.Vt = np.abs(vt0)
-        self.P = 0
-        self.Q = 0
-        self.Te = 0
-        self.omega = 1 - 0
+        self.P = np.zeros(n)
+        self.Q = np.zeros(n)
+        self.Te = np.zeros(n)
 
-        self.slip = 1
-        self.Eqp = 0
-        self.Edp = 0
+        self.slip = np.ones(n)
+        self.omega = 1 - self.slip
+        self.Eqp = np.zeros(n)
+        self.Edp = np.zeros(n)
 
         self.check_diffs()
 
@@ -930,27 +954,31 @@ class SingleCageAsynchronousMotor:
             self.omega = 1 - self.slip
 
         else:
-            self.Im = 0
+            self.Im = np.zeros(len(vt), dtype=complex)
 
         return self.Im
 
-    def function(self, Edp, Eqp):
+    def function(self, Eqp, Edp, slip):
         """
         Solve machine differential equations for the next stage in the integration step
+        :param Eqp:
+        :param Edp:
+        :param slip:
+        :return: derivatives of Eqp, Edp and slip
         """
 
         if self.start == 1:
 
             # Eq'
-            f1 = (-self.omega_n * self.slip * Edp - (
+            f1 = (-self.omega_n * slip * Edp - (
                         Eqp - (self.X0 - self.Xp) * self.Id) / self.T0p) * self.base_mva / self.Sbase
 
             # Ed'
-            f2 = (self.omega_n * self.slip * Eqp - (
+            f2 = (self.omega_n * slip * Eqp - (
                         Edp + (self.X0 - self.Xp) * self.Iq) / self.T0p) * self.base_mva / self.Sbase
 
             # Tm
-            Tm = self.calc_tmech(self.slip)
+            Tm = self.calc_tmech(slip)
             f3 = (Tm - self.Te) / (2 * self.H)
 
         else:
@@ -960,6 +988,14 @@ class SingleCageAsynchronousMotor:
 
         return f1, f2, f3
 
+    def step(self, h):
+        """
+        Integrate the states of all the motors one step using Runge-Kutta
+        :param h: step length (s)
+        """
+        self.Eqp, self.Edp, self.slip = runge_kutta4(self.function, [self.Eqp, self.Edp, self.slip], h)
+        self.omega = 1 - self.slip
+
     def check_diffs(self):
         """
         Check if differential equations are zero (on initialisation)
@@ -986,9 +1022,12 @@ class DoubleCageAsynchronousMotor:
 
     """
 
+    # integrated states
+    state_names = ['Eqp', 'Edp', 'Eqpp', 'Edpp', 'slip']
+
     def __init__(self, H, Rr, Xr, Rs, Xs, a, Xm, Rr2, Xr2, MVA_Rating, Sbase, bus_idx, fn=50):
 
-        self.bus_idx = bus_idx
+        self.bus_idx = np.array(bus_idx, dtype=int)
 
         self.omega_n = 2 * np.pi * fn
 
@@ -1052,21 +1091,22 @@ class DoubleCageAsynchronousMotor:
         """
 
         # Initialise signals, states and parameters
-        self.Id = 0
-        self.Iq = 0
-        self.Vd = 0
-        self.Vq = 0
+        n = len(self.bus_idx)
+        self.Id = np.zeros(n)
+        self.Iq = np.zeros(n)
+        self.Vd = np.zeros(n)
+        self.Vq = np.zeros(n)
         self.Vt = np.abs(vt0)
-        self.P = 0
-        self.Q = 0
-        self.Te = 0
-        self.slip = 1
+        self.P = np.zeros(n)
+        self.Q = np.zeros(n)
+        self.Te = np.zeros(n)
+        self.slip = np.ones(n)
         self.omega = 1 - self.slip
 
-        self.Eqp = 0
-        self.Edp = 0
-        self.Eqpp = 0
-        self.Edpp = 0
+        self.Eqp = np.zeros(n)
+        self.Edp = np.zeros(n)
+        self.Eqpp = np.zeros(n)
+        self.Edpp = np.zeros(n)
 
         self.check_diffs()
 
@@ -1109,39 +1149,45 @@ class DoubleCageAsynchronousMotor:
             self.omega = 1 - self.slip
 
         else:
-            self.Im = 0
+            self.Im = np.zeros(len(vt), dtype=complex)
 
         return self.Im
 
-    def solve_step(self, Edp, Eqp, Edpp, Eqpp):
+    def function(self, Eqp, Edp, Eqpp, Edpp, slip):
         """
         Solve machine differential equations for the next stage in the integration step
+        :param Eqp:
+        :param Edp:
+        :param Eqpp:
+        :param Edpp:
+        :param slip:
+        :return: derivatives of Eqp, Edp, Eqpp, Edpp and slip
         """
 
         if self.start == 1:
 
             # Eq'
-            f1 = (-self.omega_n * self.slip * Edp - (
+            f1 = (-self.omega_n * slip * Edp - (
                         Eqp - (self.X0 - self.Xp) * self.Id) / self.T0p) * self.base_mva / self.Sbase
             # k_Eqp = h * f1
 
             # Ed'
-            f2 = (self.omega_n * self.slip * Eqp - (
+            f2 = (self.omega_n * slip * Eqp - (
                         Edp + (self.X0 - self.Xp) * self.Iq) / self.T0p) * self.base_mva / self.Sbase
             # k_Edp = h * f2
 
             # Eq''
-            f3 = f1 + (self.omega_n * self.slip * (Edp - Edpp) + (
+            f3 = f1 + (self.omega_n * slip * (Edp - Edpp) + (
                     Eqp - Eqpp + (self.Xp - self.Xpp) * self.Id) / self.T0pp) * self.base_mva / self.Sbase
             # k_Eqpp = h * f3
 
             # Ed''
-            f4 = f2 + (-self.omega_n * self.slip * (Eqp - Eqpp) + (
+            f4 = f2 + (-self.omega_n * slip * (Eqp - Eqpp) + (
                     Edp - Edpp - (self.Xp - self.Xpp) * self.Iq) / self.T0pp) * self.base_mva / self.Sbase
             # k_Edpp = h * f4
 
             # Mechanical equation
-            Tm = self.calc_tmech(self.slip)
+            Tm = self.calc_tmech(slip)
             f5 = (Tm - self.Te) / (2 * self.H)
             # k_s = h * f5
 
@@ -1154,6 +1200,16 @@ class DoubleCageAsynchronousMotor:
 
         return f1, f2, f3, f4, f5
 
+    def step(self, h):
+        """
+        Integrate the states of all the motors one step using Runge-Kutta
+        :param h: step length (s)
+        """
+        (self.Eqp, self.Edp, self.Eqpp,
+         self.Edpp, self.slip) = runge_kutta4(self.function,
+                                              [self.Eqp, self.Edp, self.Eqpp, self.Edpp, self.slip], h)
+        self.omega = 1 - self.slip
+
     def check_diffs(self):
         """
         Check if differential equations are zero (on initialisation)
@@ -1184,8 +1240,331 @@ class DoubleCageAsynchronousMotor:
             print('dEdp = ' + str(dEdp) + ', dEqp = ' + str(dEqp) + ', ds = ' + str(ds))
 
 
+def get_parameter_array(devices: List[object], name: str, dtype=float) -> Vec:
+    """
+    Gather a parameter of a group of dynamic devices into an array
+    :param devices: list of dynamic devices
+    :param name: name of the parameter
+    :param dtype: data type of the array
+    :return: array of the parameter values
+    """
+    return np.array([getattr(elm, name) for elm in devices], dtype=dtype)
+
+
+def build_dynamic_models(dynamic_devices: List[object],
+                         bus_indices: IntVec,
+                         Sbase: float,
+                         fBase: float) -> List[Tuple[object, IntVec]]:
+    """
+    Group the dynamic devices by model and create one vectorized model object per group,
+    so that each step evaluates all the machines of the same model at once
+    :param dynamic_devices: objects of each machine
+    :param bus_indices: bus index of each machine
+    :param Sbase: system base power (MVA)
+    :param fBase: base frequency i.e. 50Hz
+    :return: list of (model object, positions of its machines in dynamic_devices)
+    """
+    bus_indices = np.array(bus_indices, dtype=int)
+
+    # positions of the devices of each model
+    groups: Dict[DynamicModels, List[int]] = dict()
+    for k, machine in enumerate(dynamic_devices):
+        groups.setdefault(machine.machine_model, list()).append(k)
+
+    models = list()
+    for model, pos in groups.items():
+
+        pos = np.array(pos, dtype=int)
+        devices = [dynamic_devices[k] for k in pos]
+        bus_idx = bus_indices[pos]
+
+        if model == DynamicModels.SynchronousGeneratorOrder4:  # fourth order synchronous machine
+            mdl = SynchronousMachineOrder4(H=get_parameter_array(devices, 'H'),
+                                           Ra=get_parameter_array(devices, 'Ra'),
+                                           Xd=get_parameter_array(devices, 'Xd'),
+                                           Xdp=get_parameter_array(devices, 'Xdp'),
+                                           Xdpp=get_parameter_array(devices, 'Xdpp'),
+                                           Xq=get_parameter_array(devices, 'Xq'),
+                                           Xqp=get_parameter_array(devices, 'Xqp'),
+                                           Xqpp=get_parameter_array(devices, 'Xqpp'),
+                                           Td0p=get_parameter_array(devices, 'Td0p'),
+                                           Tq0p=get_parameter_array(devices, 'Tq0p'),
+                                           base_mva=get_parameter_array(devices, 'Snom'),
+                                           Sbase=Sbase,
+                                           bus_idx=bus_idx,
+                                           fn=fBase,
+                                           speed_volt=get_parameter_array(devices, 'speed_volt', dtype=bool))
+
+        elif model == DynamicModels.SynchronousGeneratorOrder6:  # sixth order synchronous machine
+            mdl = SynchronousMachineOrder6SauerPai(H=get_parameter_array(devices, 'H'),
+                                                   Ra=get_parameter_array(devices, 'Ra'),
+                                                   Xa=get_parameter_array(devices, 'Xa'),
+                                                   Xd=get_parameter_array(devices, 'Xd'),
+                                                   Xdp=get_parameter_array(devices, 'Xdp'),
+                                                   Xdpp=get_parameter_array(devices, 'Xdpp'),
+                                                   Xq=get_parameter_array(devices, 'Xq'),
+                                                   Xqp=get_parameter_array(devices, 'Xqp'),
+                                                   Xqpp=get_parameter_array(devices, 'Xqpp'),
+                                                   Td0p=get_parameter_array(devices, 'Td0p'),
+                                                   Tq0p=get_parameter_array(devices, 'Tq0p'),
+                                                   Td0pp=get_parameter_array(devices, 'Td0pp'),
+                                                   Tq0pp=get_parameter_array(devices, 'Tq0pp'),
+                                                   base_mva=get_parameter_array(devices, 'Snom'),
+                                                   Sbase=Sbase,
+                                                   bus_idx=bus_idx,
+                                                   fn=fBase,
+                                                   speed_volt=get_parameter_array(devices, 'speed_volt', dtype=bool))
+
+        elif model == DynamicModels.VoltageSourceConverter:  # voltage source converter
+            mdl = VoltageSourceConverterAverage(Rl=get_parameter_array(devices, 'R1'),
+                                                Xl=get_parameter_array(devices, 'X1'),
+                                                fn=fBase,
+                                                bus_idx=bus_idx)
+
+        elif model == DynamicModels.ExternalGrid:  # external grid
+            mdl = ExternalGrid(Xdp=get_parameter_array(devices, 'Xdp'),
+                               H=get_parameter_array(devices, 'H'),
+                               fn=fBase,
+                               bus_idx=bus_idx)
+
+        elif model == DynamicModels.AsynchronousSingleCageMotor:  # single cage asynchronous motor
+            mdl = SingleCageAsynchronousMotor(H=get_parameter_array(devices, 'H'),
+                                              Rr=get_parameter_array(devices, 'Rr'),
+                                              Xr=get_parameter_array(devices, 'Xr'),
+                                              Rs=get_parameter_array(devices, 'Rs'),
+                                              Xs=get_parameter_array(devices, 'Xs'),
+                                              a=get_parameter_array(devices, 'a'),
+                                              Xm=get_parameter_array(devices, 'Xm'),
+                                              MVA_Rating=get_parameter_array(devices, 'MVA_Rating'),
+                                              Sbase=Sbase,
+                                              bus_idx=bus_idx,
+                                              fn=fBase)
+
+        elif model == DynamicModels.AsynchronousDoubleCageMotor:  # double cage asynchronous motor
+            mdl = DoubleCageAsynchronousMotor(H=get_parameter_array(devices, 'H'),
+                                              Rr=get_parameter_array(devices, 'Rr'),
+                                              Xr=get_parameter_array(devices, 'Xr'),
+                                              Rs=get_parameter_array(devices, 'Rs'),
+                                              Xs=get_parameter_array(devices, 'Xs'),
+                                              a=get_parameter_array(devices, 'a'),
+                                              Xm=get_parameter_array(devices, 'Xm'),
+                                              Rr2=get_parameter_array(devices, 'Rr2'),
+                                              Xr2=get_parameter_array(devices, 'Xr2'),
+                                              MVA_Rating=get_parameter_array(devices, 'MVA_Rating'),
+                                              Sbase=Sbase,
+                                              bus_idx=bus_idx,
+                                              fn=fBase)
+
+        else:  # no model
+            continue
+
+        models.append((mdl, pos))
+
+    return models
+
+
+def get_augmented_ybus(Ybus: sp.csc_matrix, Vbus: CxVec, Sbus: CxVec, models: List[Tuple[object, IntVec]]) -> sp.csc_matrix:
+    """
+    Compose the admittance matrix used during the dynamic simulation:
+    the buses without dynamic devices keep their power flow injection as a constant admittance,
+    and the dynamic devices add their Norton admittance.
+    :param Ybus: network admittance matrix
+    :param Vbus: power flow voltages
+    :param Sbus: power flow injections
+    :param models: list of (model object, positions) from build_dynamic_models
+    :return: augmented admittance matrix
+    """
+    n = len(Vbus)
+    Y_shunt = np.zeros(n, dtype=complex)
+
+    # add the passive injections as admittances
+    passive = np.ones(n, dtype=bool)
+    for mdl, pos in models:
+        passive[mdl.bus_idx] = False
+    load_idx = np.where(passive)[0]
+    Y_shunt[load_idx] = -np.conj(Sbus[load_idx]) / np.power(np.abs(Vbus[load_idx]), 2)
+
+    for mdl, pos in models:
+        np.add.at(Y_shunt, mdl.bus_idx, mdl.get_yg())
+
+    return (Ybus + sp.diags(Y_shunt)).tocsc()
+
+
+def get_dynamic_injections(n: int, V: CxVec, models: List[Tuple[object, IntVec]]) -> CxVec:
+    """
+    Compute the current injections of all the dynamic devices
+    :param n: number of nodes
+    :param V: bus voltages
+    :param models: list of (model object, positions) from build_dynamic_models
+    :return: bus current injections
+    """
+    I = np.zeros(n, dtype=complex)
+    for mdl, pos in models:
+        np.add.at(I, mdl.bus_idx, mdl.calc_currents(V[mdl.bus_idx]))
+    return I
+
+
+def solve_network(solver: SparseLinearSolver, V: CxVec, models: List[Tuple[object, IntVec]],
+                  max_err: float, max_iter: int) -> CxVec:
+    """
+    Solve the network voltages consistent with the machines' current injections
+    :param solver: factorized augmented admittance matrix
+    :param V: initial bus voltages
+    :param models: list of (model object, positions) from build_dynamic_models
+    :param max_err: maximum voltage mismatch
+    :param max_iter: maximum number of network iterations
+    :return: bus voltages
+    """
+    for it in range(max_iter):
+        V_new = solver.solve(get_dynamic_injections(len(V), V, models))
+        err = np.max(np.abs(V_new - V)) if len(V) else 0.0
+        V = V_new
+        if err < max_err:
+            break
+
+    return V
+
+
+def get_states(models: List[Tuple[object, IntVec]]) -> List[Vec]:
+    """
+    Copy the integrated states of all the models
+    :param models: list of (model object, positions) from build_dynamic_models
+    :return: list of state arrays
+    """
+    return [np.array(getattr(mdl, name), dtype=float) for mdl, pos in models for name in mdl.state_names]
+
+
+def set_states(models: List[Tuple[object, IntVec]], x: List[Vec]) -> None:
+    """
+    Restore the integrated states of all the models
+    :param models: list of (model object, positions) from build_dynamic_models
+    :param x: list of state arrays as given by get_states
+    """
+    k = 0
+    for mdl, pos in models:
+        for name in mdl.state_names:
+            setattr(mdl, name, x[k].copy())
+            k += 1
+
+
+def get_derivatives(models: List[Tuple[object, IntVec]]) -> List[Vec]:
+    """
+    Evaluate the states derivatives of all the models at their current states and algebraic variables
+    :param models: list of (model object, positions) from build_dynamic_models
+    :return: list of derivative arrays (same layout as get_states)
+    """
+    return [np.asarray(d, dtype=float)
+            for mdl, pos in models
+            for d in mdl.function(*[getattr(mdl, name) for name in mdl.state_names])]
+
+
+def coupled_runge_kutta4_step(models: List[Tuple[object, IntVec]], solver: SparseLinearSolver, V: CxVec, h: float,
+                              max_err: float, max_iter: int) -> CxVec:
+    """
+    Runge-Kutta step of all the machines solving the network at every stage,
+    so that the step is of 4th order for the machines and the network together
+    :param models: list of (model object, positions) from build_dynamic_models
+    :param solver: factorized augmented admittance matrix
+    :param V: bus voltages at the beginning of the step
+    :param h: step length (s)
+    :param max_err: maximum voltage mismatch of the network iterations
+    :param max_iter: maximum number of network iterations
+    :return: bus voltages at the end of the step
+    """
+
+    def function(*x):
+        nonlocal V
+        set_states(models, list(x))
+        V = solve_network(solver=solver, V=V, models=models, max_err=max_err, max_iter=max_iter)
+        return get_derivatives(models)
+
+    x = runge_kutta4(function, get_states(models), h)
+    set_states(models, x)
+
+    return solve_network(solver=solver, V=V, models=models, max_err=max_err, max_iter=max_iter)
+
+
+class DynamicNetwork:
+    """
+    Network of the dynamic simulation:
+    the augmented admittance matrix modified by the events (faults and branch outages) and its factorization.
+    The matrix is only refactorized when an event changes it, between events the factorization is reused.
+    """
+
+    def __init__(self, Y_aug: sp.csc_matrix,
+                 Cf: sp.csc_matrix = None,
+                 Ct: sp.csc_matrix = None,
+                 Yf: sp.csc_matrix = None,
+                 Yt: sp.csc_matrix = None):
+        """
+        Constructor
+        :param Y_aug: augmented admittance matrix (see get_augmented_ybus)
+        :param Cf: branch-from bus connectivity matrix (only needed for branch events)
+        :param Ct: branch-to bus connectivity matrix (only needed for branch events)
+        :param Yf: from admittance matrix (only needed for branch events)
+        :param Yt: to admittance matrix (only needed for branch events)
+        """
+        self.Y_aug = Y_aug
+        self.Cf = sp.csr_matrix(Cf) if Cf is not None else None
+        self.Ct = sp.csr_matrix(Ct) if Ct is not None else None
+        self.Yf = sp.csr_matrix(Yf) if Yf is not None else None
+        self.Yt = sp.csr_matrix(Yt) if Yt is not None else None
+
+        # bus fault admittances
+        self.Y_fault = np.zeros(Y_aug.shape[0], dtype=complex)
+
+        # branch status
+        self.branch_active = np.ones(self.Cf.shape[0] if Cf is not None else 0, dtype=bool)
+
+        self.solver = SparseLinearSolver(solver_type=SparseSolver.SuperLU)
+        self.factorize()
+
+    def apply_event(self, event_type: str, obj: int, param=None) -> None:
+        """
+        Modify the network with an event (the network must be refactorized afterwards)
+        :param event_type: one of TransientStabilityEvents.events_available
+        :param obj: index of the bus or branch
+        :param param: fault impedance (p.u.) for the bus short circuits (None for a bolted fault)
+        """
+        if event_type == 'Bus short circuit':
+            Zf = complex(param) if param else 1e-6
+            self.Y_fault[obj] = 1.0 / Zf
+
+        elif event_type == 'Bus recovery':
+            self.Y_fault[obj] = 0.0
+
+        elif event_type in ['Line failure', 'Line recovery']:
+            if self.Cf is None:
+                raise Exception('The branch matrices are needed to simulate branch events')
+            self.branch_active[obj] = event_type == 'Line recovery'
+
+        else:
+            raise Exception('Event not supported!')
+
+    def get_matrix(self) -> sp.csc_matrix:
+        """
+        Compose the admittance matrix with the current faults and branch outages
+        :return: admittance matrix
+        """
+        Y = self.Y_aug + sp.diags(self.Y_fault)
+
+        off = np.where(~self.branch_active)[0]
+        if len(off):
+            Y = Y - (self.Cf[off, :].T @ self.Yf[off, :] + self.Ct[off, :].T @ self.Yt[off, :])
+
+        return sp.csc_matrix(Y)
+
+    def factorize(self) -> None:
+        """
+        Factorize the current admittance matrix
+        """
+        self.solver.factorize(self.get_matrix())
+
+
 def dynamic_simulation(n, Vbus, Sbus, Ybus, Sbase, fBase, t_sim, h, dynamic_devices=list(), bus_indices=list(),
-                       callback=None):
+                       callback=None, max_err=1e-3, max_iter=20, events: TransientStabilityEvents = None,
+                       Cf=None, Ct=None, Yf=None, Yt=None,
+                       adaptive=False, h_min=1e-4, h_max=0.1, integration_tol=1e-4):
     """
     Dynamic transient simulation of a power system
     Args:
@@ -1195,280 +1574,129 @@ def dynamic_simulation(n, Vbus, Sbus, Ybus, Sbase, fBase, t_sim, h, dynamic_devi
         Sbase:
         fBase: base frequency i.e. 50Hz
         t_sim:
-        h:
+        h: step length (s), initial step length after each event in adaptive mode
         dynamic_devices: objects of each machine
         bus_indices:
+        max_err: maximum voltage mismatch of the network iterations
+        max_iter: maximum number of network iterations
+        events: TransientStabilityEvents (the objects are bus or branch indices)
+        Cf, Ct, Yf, Yt: branch matrices, only needed for the branch events
+        adaptive: adapt the step length with the integration error (step doubling)
+        h_min: minimum step length in adaptive mode (s)
+        h_max: maximum step length in adaptive mode (s)
+        integration_tol: tolerance of the local integration error in adaptive mode
 
     Returns:
 
     """
-    max_err = 1e-3
-    max_iter = 20
-
-    # compose dynamic controllers
-    '''
-    class DynamicModels(Enum):
-    NoModel = 0,
-    SM4 = 1,
-    SM6b = 2,
-    VSC = 3,
-    EG = 4,
-    SAM = 5,
-    DAM = 6  
-    '''
-    sm4_idx = list()
-    sm6b_idx = list()
-    vsc_idx = list()
-    eg_idx = list()
-    sam_idx = list()
-    dam_idx = list()
-
-    sm4_bus_idx = list()
-    sm6b_bus_idx = list()
-    vsc_bus_idx = list()
-    eg_bus_idx = list()
-    sam_bus_idx = list()
-    dam_bus_idx = list()
-
-    n_obj = len(dynamic_devices)
-    H = np.zeros(n_obj)
-    a = np.zeros(n_obj)
-    Xm = np.zeros(n_obj)
-    Ra = np.zeros(n_obj)
-    Rs = np.zeros(n_obj)
-    Xs = np.zeros(n_obj)
-    Xd = np.zeros(n_obj)
-    Xa = np.zeros(n_obj)
-    Xdp = np.zeros(n_obj)
-    Xdpp = np.zeros(n_obj)
-    Xq = np.zeros(n_obj)
-    Xqp = np.zeros(n_obj)
-    Xqpp = np.zeros(n_obj)
-    Td0p = np.zeros(n_obj)
-    Tq0p = np.zeros(n_obj)
-    Td0pp = np.zeros(n_obj)
-    Tq0pp = np.zeros(n_obj)
-    base_mva = np.zeros(n_obj)
-
-    Rr = np.zeros(n_obj)
-    Rr2 = np.zeros(n_obj)
-    Xr = np.zeros(n_obj)
-    Xr2 = np.zeros(n_obj)
-    speed_volt = np.zeros(n_obj, dtype=bool)
-
-    machine_types = [None] * n_obj
-
-    # extract the parameters from the objects into the arrays
-    for k, machine in enumerate(dynamic_devices):
+    # compose one vectorized model per machine type
+    models = build_dynamic_models(dynamic_devices=dynamic_devices,
+                                  bus_indices=bus_indices,
+                                  Sbase=Sbase,
+                                  fBase=fBase)
 
-        # store the machine model in a list for later
-        machine_types[k] = machine.machine_model
-
-        # store the machine data into the representing vector
-        if machine.machine_model == DynamicModels.NoModel:  # no model
-            pass
-
-        elif machine.machine_model == DynamicModels.SynchronousGeneratorOrder4:  # fourth order synchronous machine
-
-            H[k] = dynamic_devices[k].H
-            Ra[k] = dynamic_devices[k].Ra
-            Xd[k] = dynamic_devices[k].Xd
-            Xa[k] = dynamic_devices[k].Xa
-            Xdp[k] = dynamic_devices[k].Xdp
-            Xdpp[k] = dynamic_devices[k].Xdpp
-            Xq[k] = dynamic_devices[k].Xq
-            Xqp[k] = dynamic_devices[k].Xqp
-            Xqpp[k] = dynamic_devices[k].Xqpp
-            Td0p[k] = dynamic_devices[k].Td0p
-            Tq0p[k] = dynamic_devices[k].Tq0p
-            base_mva[k] = dynamic_devices[k].Snom
-            speed_volt[k] = dynamic_devices[k].speed_volt
-            sm4_idx.append(k)
-            sm4_bus_idx.append(bus_indices[k])
-
-        elif machine.machine_model == DynamicModels.SynchronousGeneratorOrder6:  # sixth order synchronous machine
-
-            H[k] = dynamic_devices[k].H
-            Ra[k] = dynamic_devices[k].Ra
-            Xd[k] = dynamic_devices[k].Xd
-            Xdp[k] = dynamic_devices[k].Xdp
-            Xdpp[k] = dynamic_devices[k].Xdpp
-            Xq[k] = dynamic_devices[k].Xq
-            Xqp[k] = dynamic_devices[k].Xqp
-            Xqpp[k] = dynamic_devices[k].Xqpp
-            Td0p[k] = dynamic_devices[k].Td0p
-            Tq0p[k] = dynamic_devices[k].Tq0p
-            Td0pp[k] = dynamic_devices[k].Td0pp
-            Tq0pp[k] = dynamic_devices[k].Tq0pp
-            base_mva[k] = dynamic_devices[k].Snom
-            speed_volt[k] = dynamic_devices[k].speed_volt
-            sm6b_idx.append(k)
-            sm6b_bus_idx.append(bus_indices[k])
-
-        elif machine.machine_model == DynamicModels.VoltageSourceConverter:  # voltage source converter
-
-            # R1, X1, fn
-            Ra[k] = dynamic_devices[k].R1
-            Xd[k] = dynamic_devices[k].X1
-            vsc_idx.append(k)
-            vsc_bus_idx.append(bus_indices[k])
-
-        elif machine.machine_model == DynamicModels.ExternalGrid:  # external grid
-            # Xdp, H
-            H[k] = dynamic_devices[k].H
-            Xdp[k] = dynamic_devices[k].Xdp
-            eg_idx.append(k)
-            eg_bus_idx.append(bus_indices[k])
-
-        elif machine.machine_model == DynamicModels.AsynchronousSingleCageMotor:  # single cage asynchronous motor
-            # H, Rr, Xr, Rs, Xs, a, Xm, Sbase, MVA_Rating
-            H[k] = dynamic_devices[k].H
-            Rr[k] = dynamic_devices[k].Rr
-            Xr[k] = dynamic_devices[k].Xr
-            Rs[k] = dynamic_devices[k].Rs
-            Xs[k] = dynamic_devices[k].Xs
-            Xq[k] = dynamic_devices[k].Xq
-            a[k] = dynamic_devices[k].a
-            Xm[k] = dynamic_devices[k].Xm
-            base_mva[k] = dynamic_devices[k].MVA_Rating
-            sam_idx.append(k)
-            sam_bus_idx.append(bus_indices[k])
-
-        elif machine.machine_model == DynamicModels.AsynchronousDoubleCageMotor:  # double cage asynchronous motor
-            # H, Rr, Xr, Rs, Xs, a, Xm, Rr2, Xr2, MVA_Rating, Sbase
-            H[k] = dynamic_devices[k].H
-            Rr[k] = dynamic_devices[k].Rr
-            Xr[k] = dynamic_devices[k].Xr
-            Rs[k] = dynamic_devices[k].Rs
-            Xs[k] = dynamic_devices[k].Xs
-            Rr2[k] = dynamic_devices[k].Rr2
-            Xr2[k] = dynamic_devices[k].Xr2
-            a[k] = dynamic_devices[k].a
-            Xm[k] = dynamic_devices[k].Xm
-            base_mva[k] = dynamic_devices[k].MVA_Rating
-            dam_idx.append(k)
-            dam_bus_idx.append(bus_indices[k])
-
-    # create the controllers
-    sm4 = SynchronousMachineOrder4(H=H[sm4_idx],
-                                   Ra=Ra[sm4_idx],
-                                   Xd=Xd[sm4_idx],
-                                   Xdp=Xdp[sm4_idx],
-                                   Xdpp=Xdpp[sm4_idx],
-                                   Xq=Xq[sm4_idx],
-                                   Xqp=Xqp[sm4_idx],
-                                   Xqpp=Xqp[sm4_idx],
-                                   Td0p=Td0p[sm4_idx],
-                                   Tq0p=Tq0p[sm4_idx],
-                                   base_mva=base_mva[sm4_idx],
-                                   Sbase=Sbase,
-                                   bus_idx=sm4_bus_idx,
-                                   fn=fBase,
-                                   speed_volt=speed_volt[sm4_idx])
-
-    sm6 = SynchronousMachineOrder6SauerPai(H=H[sm6b_idx],
-                                           Ra=Ra[sm6b_idx],
-                                           Xa=Xa[sm6b_idx],
-                                           Xd=Xd[sm6b_idx],
-                                           Xdp=Xdp[sm6b_idx],
-                                           Xdpp=Xdpp[sm6b_idx],
-                                           Xq=Xq[sm6b_idx],
-                                           Xqp=Xqp[sm6b_idx],
-                                           Xqpp=Xqpp[sm6b_idx],
-                                           Td0p=Td0p[sm6b_idx],
-                                           Tq0p=Tq0p[sm6b_idx],
-                                           Td0pp=Td0pp[sm6b_idx],
-                                           Tq0pp=Tq0pp[sm6b_idx],
-                                           base_mva=base_mva[sm6b_idx],
-                                           Sbase=Sbase,
-                                           bus_idx=sm6b_bus_idx,
-                                           fn=fBase,
-                                           speed_volt=speed_volt[sm6b_idx])
-
-    vsc = VoltageSourceConverterAverage(Rl=Ra[vsc_idx], Xl=Xd[vsc_idx], fn=fBase, bus_idx=vsc_bus_idx)
-
-    exg = ExternalGrid(Xdp=Xdp[eg_idx], H=H[eg_idx], fn=fBase, bus_idx=eg_bus_idx)
-
-    sam = SingleCageAsynchronousMotor(H=H[sam_idx],
-                                      Rr=Rr[sam_idx],
-                                      Xr=Xr[sam_idx],
-                                      Rs=Rs[sam_idx],
-                                      Xs=Xs[sam_idx],
-                                      a=a[sam_idx],
-                                      Xm=Xm[sam_idx],
-                                      MVA_Rating=base_mva[sam_idx],
-                                      Sbase=Sbase,
-                                      bus_idx=sam_bus_idx,
-                                      fn=fBase)
-
-    dam = DoubleCageAsynchronousMotor(H=H[dam_idx],
-                                      Rr=Rr[dam_idx],
-                                      Xr=Xr[dam_idx],
-                                      Rs=Rs[dam_idx],
-                                      Xs=Xs[dam_idx],
-                                      a=a[dam_idx],
-                                      Xm=Xm[dam_idx],
-                                      Rr2=Rr2[dam_idx],
-                                      Xr2=Xr2[dam_idx],
-                                      MVA_Rating=base_mva[dam_idx],
-                                      Sbase=Sbase,
-                                      bus_idx=dam_bus_idx,
-                                      fn=fBase)
-
-    # modify Ybus to add the admittances
+    # split the injection among the devices connected to the same bus
+    n_dev_per_bus = np.bincount(np.array(bus_indices, dtype=int), minlength=n)
 
-    Y_shunt = np.zeros(n, dtype=complex)
-    load_idx = np.where(Sbus > 0)[0]
-    Y_shunt[load_idx] = Sbus[load_idx] / np.power(Vbus[load_idx], 2)  # add loads as admittances
-
-    Y_shunt[sm4.bus_idx] += sm4.get_yg()
-    Y_shunt[sm6.bus_idx] += sm6.get_yg()
-    Y_shunt[vsc.bus_idx] += vsc.get_yg()
-    Y_shunt[exg.bus_idx] += exg.get_yg()
-    Y_shunt[sam.bus_idx] += sam.get_yg()
-    Y_shunt[dam.bus_idx] += dam.get_yg()
+    # initialize machines
+    for mdl, pos in models:
+        mdl.initialise(vt0=Vbus[mdl.bus_idx], S0=Sbus[mdl.bus_idx] / n_dev_per_bus[mdl.bus_idx])
 
-    ib = range(n)
-    Ydiag = sparse((Y_shunt, (ib, ib)))
+    # factorize the augmented admittance matrix, it is reused until the next event
+    network = DynamicNetwork(Y_aug=get_augmented_ybus(Ybus=Ybus, Vbus=Vbus, Sbus=Sbus, models=models),
+                             Cf=Cf, Ct=Ct, Yf=Yf, Yt=Yt)
 
-    # factorize the impedance matrix
-    Zbus = splu(Ybus + Ydiag)
+    # events in chronological order
+    if events is not None:
+        event_order = np.argsort(events.time, kind='stable')
+        event_times = np.array(events.time, dtype=float)[event_order]
+    else:
+        event_order = np.zeros(0, dtype=int)
+        event_times = np.zeros(0)
 
     # copy the initial voltage
     V = Vbus.copy()
-    I = np.zeros(n, dtype=complex)
-
-    # initialize machines
-    sm4.initialise(vt0=Vbus[sm4_bus_idx], S0=Sbus[sm4_bus_idx])
-    sm6.initialise(vt0=Vbus[sm6b_bus_idx], S0=Sbus[sm6b_bus_idx])
-    vsc.initialise(vt0=Vbus[vsc_bus_idx], S0=Sbus[vsc_bus_idx])
-    exg.initialise(vt0=Vbus[eg_bus_idx], S0=Sbus[eg_bus_idx])
-    sam.initialise(vt0=Vbus[sam_bus_idx], S0=Sbus[sam_bus_idx])
-    dam.initialise(vt0=Vbus[dam_bus_idx], S0=Sbus[dam_bus_idx])
+    omega = np.ones(len(dynamic_devices))
 
     voltages = list()
     omegas = list()
 
     # iterate
+    eps = 1e-9
     t = 0.0
+    h_step = h
+    k_evt = 0
     time = list()
-    while t < t_sim:
+    while t < t_sim - eps:
+
+        # apply the events of this instant and refactorize the network only then
+        if k_evt < len(event_times) and event_times[k_evt] <= t + eps:
+            while k_evt < len(event_times) and event_times[k_evt] <= t + eps:
+                e = event_order[k_evt]
+                network.apply_event(event_type=events.event_type[e], obj=events.object[e], param=events.params[e])
+                k_evt += 1
+
+            network.factorize()
+            V = solve_network(solver=network.solver, V=V, models=models, max_err=max_err, max_iter=max_iter)
+
+            # restart with small steps after the disturbance
+            h_step = h
+
+        # do not step over the next event
+        t_stop = min(t_sim, event_times[k_evt]) if k_evt < len(event_times) else t_sim
+        h_k = min(h_step, t_stop - t)
+
+        if adaptive:
+            x0 = get_states(models)
+            V0 = V
+
+            # one full step
+            coupled_runge_kutta4_step(models=models, solver=network.solver, V=V0, h=h_k,
+                                      max_err=max_err, max_iter=max_iter)
+            x_full = get_states(models)
+
+            # two half steps from the same point
+            set_states(models, x0)
+            V = V0
+            for i in range(2):
+                V = coupled_runge_kutta4_step(models=models, solver=network.solver, V=V, h=0.5 * h_k,
+                                              max_err=max_err, max_iter=max_iter)
+            x_half = get_states(models)
+
+            # Richardson estimate of the local error of the 4th order method
+            err = 0.0
+            for xf, xh in zip(x_full, x_half):
+                if len(xh):
+                    err = max(err, np.max(np.abs(xh - xf)) / (15.0 * integration_tol))
+
+            factor = 0.9 * err ** -0.2 if err > 0 else 2.0
+
+            if err > 1.0 and h_k > h_min:
+                # reject the step and go back to the initial point
+                set_states(models, x0)
+                V = solve_network(solver=network.solver, V=V0, models=models, max_err=max_err, max_iter=max_iter)
+                h_step = max(h_min, h_k * max(0.2, factor))
+                continue
+
+            h_step = min(h_max, max(h_min, h_k * min(2.0, factor)))
 
-        sm4.solve(h)
+        else:
+            # integrate all the machines of each model at once
+            for mdl, pos in models:
+                mdl.step(h_k)
 
-        # compute machine currents
+            # solve voltages
+            V = solve_network(solver=network.solver, V=V, models=models, max_err=max_err, max_iter=max_iter)
 
-        sm4.calc_currents(V, I)
+        t += h_k
 
-        # solve voltages
-        V = Zbus.solve(I)
+        for mdl, pos in models:
+            omega[pos] = mdl.omega
 
         voltages.append(V)
-        omegas.append(sm4.omega)
+        omegas.append(omega.copy())
         time.append(t)
 
-        t += h
-
         if callback is not None:
             progress = t / t_sim * 100
             txt = 'Running transient stability t:' + str(t)
@@ -1476,7 +1704,8 @@ def dynamic_simulation(n, Vbus, Sbus, Ybus, Sbase, fBase, t_sim, h, dynamic_devi
 
     res = TransientStabilityResults()
     res.voltage = np.array(voltages)
-    res.omegas = np.array(omegas)
+    res.omega = np.array(omegas)
     res.time = np.array(time)
+    res.n_factorizations = network.solver.n_factorizations
 
     return res
@@ -15,9 +15,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import numpy as np
+from typing import Dict, Union
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
+from GridCalEngine.Devices.types import BRANCH_TYPES
+from GridCalEngine.Devices.Substation.bus import Bus
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit, compile_numerical_circuit_at
 from GridCalEngine.Simulations.PowerFlow.power_flow_driver import PowerFlowResults
-from GridCalEngine.Simulations.Dynamics.dynamic_modules import dynamic_simulation
+from GridCalEngine.Simulations.Dynamics.dynamic_modules import dynamic_simulation, TransientStabilityEvents
 from GridCalEngine.Simulations.driver_template import DriverTemplate
 
 ########################################################################################################################
@@ -27,9 +32,10 @@ from GridCalEngine.Simulations.driver_template import DriverTemplate
 
 class TransientStabilityOptions:
 
-    def __init__(self, h=0.001, t_sim=15, max_err=0.0001, max_iter=25):
+    def __init__(self, h=0.001, t_sim=15, max_err=0.0001, max_iter=25,
+                 adaptive=False, h_min=1e-4, h_max=0.1, integration_tol=1e-4):
 
-        # step length (s)
+        # step length (s), in adaptive mode this is the step length after each event
         self.h = h
 
         # simulation time (s)
@@ -41,14 +47,27 @@ class TransientStabilityOptions:
         # Maximum number of network iterations
         self.max_iter = max_iter
 
+        # adapt the step length to the integration error?
+        self.adaptive = adaptive
+
+        # minimum and maximum step lengths in adaptive mode (s)
+        self.h_min = h_min
+        self.h_max = h_max
+
+        # tolerance of the local integration error in adaptive mode
+        self.integration_tol = integration_tol
+
 
 class TransientStability(DriverTemplate):
 
-    def __init__(self, grid: MultiCircuit, options: TransientStabilityOptions, pf_res: PowerFlowResults):
+    def __init__(self, grid: MultiCircuit, options: TransientStabilityOptions, pf_res: PowerFlowResults,
+                 events: TransientStabilityEvents = None):
         """
         TimeSeries constructor
         @param grid: MultiCircuit instance
         @param options: PowerFlowOptions instance
+        @param pf_res: PowerFlowResults instance
+        @param events: TransientStabilityEvents instance whose objects are bus or branch devices (optional)
         """
         DriverTemplate.__init__(self, grid=grid)
 
@@ -58,6 +77,8 @@ class TransientStability(DriverTemplate):
 
         self.pf_res = pf_res
 
+        self.events = events
+
         self.results = None
 
     def get_steps(self):
@@ -75,6 +96,41 @@ class TransientStability(DriverTemplate):
         self.report_progress(progress)
         self.report_text(txt)
 
+    def get_island_events(self, island: NumericalCircuit, nbus: int, nbr: int,
+                          bus_dict: Dict[Bus, int],
+                          branch_dict: Dict[BRANCH_TYPES, int]) -> Union[TransientStabilityEvents, None]:
+        """
+        Translate the events to the bus and branch indices of an island
+        :param island: NumericalCircuit of the island
+        :param nbus: number of buses of the circuit
+        :param nbr: number of branches of the circuit
+        :param bus_dict: bus device to circuit index dictionary
+        :param branch_dict: branch device to circuit index dictionary
+        :return: TransientStabilityEvents whose objects are island indices, the events of other islands are skipped
+        """
+        if self.events is None:
+            return None
+
+        # circuit index -> island index (-1 if not in the island)
+        bus_map = np.full(nbus, -1, dtype=int)
+        bus_map[island.original_bus_idx] = np.arange(island.nbus)
+        branch_map = np.full(nbr, -1, dtype=int)
+        branch_map[island.original_branch_idx] = np.arange(island.nbr)
+
+        island_events = TransientStabilityEvents()
+        for t, evt_type, obj, param in zip(self.events.time, self.events.event_type,
+                                           self.events.object, self.events.params):
+
+            if evt_type in ('Bus short circuit', 'Bus recovery'):
+                idx = bus_map[bus_dict[obj]]
+            else:
+                idx = branch_map[branch_dict[obj]]
+
+            if idx > -1:
+                island_events.add(t=t, evt_type=evt_type, obj=int(idx), param=param)
+
+        return island_events
+
     def run(self):
         """
         Run transient stability
@@ -83,26 +139,48 @@ class TransientStability(DriverTemplate):
         self.report_progress(0.0)
         self.report_text('Running transient stability...')
 
-        # print('Compiling...', end='')
-        numerical_circuit = self.grid.compile_snapshot()
-        calculation_inputs = numerical_circuit.compute()
+        numerical_circuit = compile_numerical_circuit_at(circuit=self.grid, t_idx=None)
+        islands = numerical_circuit.split_into_islands()
+
+        # the generators carry the dynamic model parameters
+        generators = self.grid.get_generators()
+
+        # the event objects are bus or branch devices
+        bus_dict = self.grid.get_bus_index_dict()
+        branch_dict = self.grid.get_branches_wo_hvdc_index_dict()
 
-        for calculation_input in calculation_inputs:
+        res = None
+        for island in islands:
 
-            dynamic_devices = calculation_input.get_generators()
-            bus_indices = [calculation_input.buses_dict[elm.bus] for elm in dynamic_devices]
+            dynamic_devices = [generators[i] for i in island.original_generator_idx]
+            bus_indices = island.generator_data.get_bus_indices()
 
-            res = dynamic_simulation(n=len(calculation_input.buses),
-                                     Vbus=self.pf_res.voltage[calculation_input.original_bus_idx],
-                                     Sbus=self.pf_res.Sbus[calculation_input.original_bus_idx],
-                                     Ybus=calculation_input.Ybus,
-                                     Sbase=calculation_input.Sbase,
-                                     fBase=calculation_input.fBase,
+            res = dynamic_simulation(n=island.nbus,
+                                     Vbus=self.pf_res.voltage[island.original_bus_idx],
+                                     Sbus=self.pf_res.Sbus[island.original_bus_idx] / island.Sbase,  # MVA -> p.u.
+                                     Ybus=island.Ybus,
+                                     Sbase=island.Sbase,
+                                     fBase=self.grid.fBase,
                                      t_sim=self.options.t_sim,
                                      h=self.options.h,
                                      dynamic_devices=dynamic_devices,
                                      bus_indices=bus_indices,
-                                     callback=self.status)
+                                     callback=self.status,
+                                     max_err=self.options.max_err,
+                                     max_iter=self.options.max_iter,
+                                     events=self.get_island_events(island=island,
+                                                                   nbus=numerical_circuit.nbus,
+                                                                   nbr=numerical_circuit.nbr,
+                                                                   bus_dict=bus_dict,
+                                                                   branch_dict=branch_dict),
+                                     Cf=island.Cf,
+                                     Ct=island.Ct,
+                                     Yf=island.Yf,
+                                     Yt=island.Yt,
+                                     adaptive=self.options.adaptive,
+                                     h_min=self.options.h_min,
+                                     h_max=self.options.h_max,
+                                     integration_tol=self.options.integration_tol)
 
         self.results = res
         self.toc()
@@ -18,10 +18,10 @@
 import numpy as np
 import numba as nb
 import scipy.sparse as sp
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, Generator, Iterable
 from scipy.sparse.linalg import spsolve
 
-from GridCalEngine.basic_structures import Logger, Vec, IntVec, CxVec, Mat, ObjVec, CxMat
+from GridCalEngine.basic_structures import Logger, Vec, IntVec, IntMat, CxVec, Mat, ObjVec, CxMat
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.Devices.Aggregation.contingency_group import ContingencyGroup
@@ -29,6 +29,7 @@ from GridCalEngine.Devices.Aggregation.contingency import Contingency
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.ac_jacobian import AC_jacobian
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.derivatives import dSf_dV_csc
 from GridCalEngine.Utils.Sparse.csc import dense_to_csc
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import SparseLinearSolver
 from GridCalEngine.Utils.MIP.selected_interface import lpDot
 
 
@@ -226,6 +227,370 @@ def make_lodf(Cf: sp.csc_matrix,
     return LODF
 
 
+def get_output_matrix(out: Union[Mat, str, None], shape: Tuple[int, int]) -> Mat:
+    """
+    Get the matrix where to write a result
+    :param out: None to create a new array, a file name (.npy) to create a memory-mapped array or an existing array
+    :param shape: shape of the matrix
+    :return: matrix
+    """
+    if out is None:
+        return np.zeros(shape)
+    elif isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=float, shape=shape)
+    else:
+        if out.shape != shape:
+            raise ValueError(f'The output matrix shape {out.shape} does not match {shape}')
+        return out
+
+
+def get_injection_increments(n: int, cols: IntVec, distribute_slack: bool) -> Mat:
+    """
+    Get the columns of the unitary injection increments matrix dP used to compute the PTDF
+    :param n: number of buses
+    :param cols: bus indices of the columns
+    :param distribute_slack: distribute the slack?
+    :return: dP[:, cols] (n, len(cols))
+    """
+    if distribute_slack:
+        dP = np.full((n, len(cols)), -1.0 / (n - 1))
+    else:
+        dP = np.zeros((n, len(cols)))
+
+    dP[cols, np.arange(len(cols))] = 1.0
+    return dP
+
+
+def iter_ptdf_blocks(Bpqpv: sp.csc_matrix,
+                     Bf: sp.csc_matrix,
+                     pqpv: IntVec,
+                     distribute_slack: bool,
+                     block_size: int,
+                     branch_idx: IntVec,
+                     bus_idx: IntVec) -> Generator[Tuple[int, int, Mat], None, None]:
+    """
+    Generate the PTDF by blocks of columns.
+    Bpqpv is factorized once and the peak memory is proportional to the block size
+    :param Bpqpv: DC-linear susceptance matrix already sliced
+    :param Bf: Bus-branch "from" susceptance matrix
+    :param pqpv: array of sorted pq and pv node indices
+    :param distribute_slack: distribute the slack?
+    :param block_size: number of columns solved at once
+    :param branch_idx: indices of the branches (rows) to compute
+    :param bus_idx: indices of the buses (columns) to compute
+    :return: generator of (first column, last column + 1, PTDF block (len(branch_idx), b - a))
+    """
+    n = Bf.shape[1]
+
+    # Bf restricted to the monitored branches and the non-slack buses
+    Bf_mon = Bf.tocsr()[branch_idx, :].tocsc()[:, pqpv]
+
+    solver = SparseLinearSolver()
+    solver.factorize(Bpqpv)
+
+    for a in range(0, len(bus_idx), block_size):
+        b = min(a + block_size, len(bus_idx))
+        dP = get_injection_increments(n=n, cols=bus_idx[a:b], distribute_slack=distribute_slack)
+
+        # solve the change in voltage angles of the block
+        dtheta = solver.solve(dP[pqpv, :])
+
+        # compute corresponding change in branch Sf
+        yield a, b, Bf_mon @ dtheta
+
+
+def make_ptdf_blocked(Bpqpv: sp.csc_matrix,
+                      Bf: sp.csc_matrix,
+                      pqpv: IntVec,
+                      distribute_slack: bool = True,
+                      block_size: int = 1000,
+                      branch_idx: Union[IntVec, None] = None,
+                      bus_idx: Union[IntVec, None] = None,
+                      out: Union[Mat, str, None] = None) -> Mat:
+    """
+    Build the PTDF matrix by blocks of columns.
+    Bpqpv is factorized once and the peak memory is proportional to the block size
+    :param Bpqpv: DC-linear susceptance matrix already sliced
+    :param Bf: Bus-branch "from" susceptance matrix
+    :param pqpv: array of sorted pq and pv node indices
+    :param distribute_slack: distribute the slack?
+    :param block_size: number of columns solved at once
+    :param branch_idx: indices of the branches (rows) to compute, if None all are computed
+    :param bus_idx: indices of the buses (columns) to compute, if None all are computed
+    :param out: None, file name (.npy) to write a memory-mapped matrix or array to write into
+    :return: PTDF matrix (len(branch_idx), len(bus_idx))
+    """
+    branch_idx = np.arange(Bf.shape[0]) if branch_idx is None else branch_idx
+    bus_idx = np.arange(Bf.shape[1]) if bus_idx is None else bus_idx
+
+    H = get_output_matrix(out=out, shape=(len(branch_idx), len(bus_idx)))
+
+    for a, b, blk in iter_ptdf_blocks(Bpqpv=Bpqpv, Bf=Bf, pqpv=pqpv, distribute_slack=distribute_slack,
+                                      block_size=block_size, branch_idx=branch_idx, bus_idx=bus_idx):
+        H[:, a:b] = blk
+
+    return H
+
+
+def make_ptdf_blocked_sparse(Bpqpv: sp.csc_matrix,
+                             Bf: sp.csc_matrix,
+                             pqpv: IntVec,
+                             threshold: float,
+                             distribute_slack: bool = True,
+                             block_size: int = 1000,
+                             branch_idx: Union[IntVec, None] = None,
+                             bus_idx: Union[IntVec, None] = None) -> Tuple[sp.csc_matrix, Vec]:
+    """
+    Build the thresholded sparse PTDF by blocks of columns, the dense PTDF is never allocated
+    :param Bpqpv: DC-linear susceptance matrix already sliced
+    :param Bf: Bus-branch "from" susceptance matrix
+    :param pqpv: array of sorted pq and pv node indices
+    :param threshold: values with an absolute value below or equal to this are discarded
+    :param distribute_slack: distribute the slack?
+    :param block_size: number of columns solved at once
+    :param branch_idx: indices of the branches (rows) to compute, if None all are computed
+    :param bus_idx: indices of the buses (columns) to compute, if None all are computed
+    :return: sparse PTDF (len(branch_idx), len(bus_idx)), absolute sum of the discarded values per row
+    """
+    branch_idx = np.arange(Bf.shape[0]) if branch_idx is None else branch_idx
+    bus_idx = np.arange(Bf.shape[1]) if bus_idx is None else bus_idx
+
+    blocks = iter_ptdf_blocks(Bpqpv=Bpqpv, Bf=Bf, pqpv=pqpv, distribute_slack=distribute_slack,
+                              block_size=block_size, branch_idx=branch_idx, bus_idx=bus_idx)
+
+    return blocks_to_csc(blocks=blocks, shape=(len(branch_idx), len(bus_idx)), threshold=threshold)
+
+
+def iter_lodf_blocks(Bpqpv: sp.csc_matrix,
+                     Bf: sp.csc_matrix,
+                     Cf: sp.csc_matrix,
+                     Ct: sp.csc_matrix,
+                     pqpv: IntVec,
+                     distribute_slack: bool,
+                     block_size: int,
+                     monitored_idx: IntVec,
+                     contingency_idx: IntVec,
+                     correct_values: bool,
+                     numerical_zero: float) -> Generator[Tuple[int, int, Mat], None, None]:
+    """
+    Generate the LODF by blocks of contingency columns without forming the full PTDF.
+    Bpqpv is factorized once and the peak memory is proportional to the block size
+    :param Bpqpv: DC-linear susceptance matrix already sliced
+    :param Bf: Bus-branch "from" susceptance matrix
+    :param Cf: Branch "from" -bus connectivity matrix
+    :param Ct: Branch "to" -bus connectivity matrix
+    :param pqpv: array of sorted pq and pv node indices
+    :param distribute_slack: distribute the slack?
+    :param block_size: number of contingencies solved at once
+    :param monitored_idx: indices of the monitored branches (rows)
+    :param contingency_idx: indices of the contingency branches (columns)
+    :param correct_values: correct values out of the interval
+    :param numerical_zero: value considered zero in numerical terms (i.e. 1e-10)
+    :return: generator of (first column, last column + 1, LODF block (len(monitored_idx), b - a))
+    """
+    n = Bf.shape[1]
+    nl = Bf.shape[0]
+
+    Bf_csr = Bf.tocsr()
+    Bf_mon = Bf_csr[monitored_idx, :].tocsc()[:, pqpv]
+    Cft = (Cf - Ct).tocsr()
+
+    # position of each branch in the monitored set (-1 if not monitored)
+    mon_pos = np.full(nl, -1, dtype=int)
+    mon_pos[monitored_idx] = np.arange(len(monitored_idx))
+
+    solver = SparseLinearSolver()
+    solver.factorize(Bpqpv)
+
+    for a in range(0, len(contingency_idx), block_size):
+        b = min(a + block_size, len(contingency_idx))
+        cnt = contingency_idx[a:b]
+
+        # injection increments of a transfer between the ends of each contingency branch:
+        # H[:, c] = PTDF x Cft[c, :]^T = Bf x B^-1 x (dP x Cft[c, :]^T)
+        Cft_blk = Cft[cnt, :]
+        if distribute_slack:
+            # dP = (1 + 1/(n-1)) I - 1/(n-1) 1 1^T and 1^T x Cft^T = 0
+            dP = Cft_blk.T.toarray() * (1.0 + 1.0 / (n - 1))
+        else:
+            dP = Cft_blk.T.toarray()
+
+        dtheta = solver.solve(dP[pqpv, :])
+
+        H = Bf_mon @ dtheta
+        H_diag = np.einsum('ij,ji->i', Bf_csr[cnt, :].tocsc()[:, pqpv].toarray(), dtheta)
+
+        # avoid the divisions by zero, in those cases the LODF column should be zero
+        div = 1.0 - H_diag
+        ok = np.abs(div) > numerical_zero
+        blk = np.zeros_like(H)
+        blk[:, ok] = H[:, ok] / div[ok]
+
+        # replace the diagonal elements by -1
+        pos = mon_pos[cnt]
+        mask = pos > -1
+        blk[pos[mask], np.where(mask)[0]] = -1.0
+
+        if correct_values:
+            blk[blk > 1.2] = 0
+            blk[blk < -1.2] = 0
+
+        yield a, b, blk
+
+
+def make_lodf_blocked(Bpqpv: sp.csc_matrix,
+                      Bf: sp.csc_matrix,
+                      Cf: sp.csc_matrix,
+                      Ct: sp.csc_matrix,
+                      pqpv: IntVec,
+                      distribute_slack: bool = True,
+                      block_size: int = 1000,
+                      monitored_idx: Union[IntVec, None] = None,
+                      contingency_idx: Union[IntVec, None] = None,
+                      correct_values: bool = False,
+                      numerical_zero: float = 1e-10,
+                      out: Union[Mat, str, None] = None) -> Mat:
+    """
+    Compute the LODF matrix by blocks of contingency columns without forming the full PTDF.
+    Bpqpv is factorized once and the peak memory is proportional to the block size
+    :param Bpqpv: DC-linear susceptance matrix already sliced
+    :param Bf: Bus-branch "from" susceptance matrix
+    :param Cf: Branch "from" -bus connectivity matrix
+    :param Ct: Branch "to" -bus connectivity matrix
+    :param pqpv: array of sorted pq and pv node indices
+    :param distribute_slack: distribute the slack?
+    :param block_size: number of contingencies solved at once
+    :param monitored_idx: indices of the monitored branches (rows), if None all are computed
+    :param contingency_idx: indices of the contingency branches (columns), if None all are computed
+    :param correct_values: correct values out of the interval
+    :param numerical_zero: value considered zero in numerical terms (i.e. 1e-10)
+    :param out: None, file name (.npy) to write a memory-mapped matrix or array to write into
+    :return: LODF matrix (len(monitored_idx), len(contingency_idx))
+    """
+    nl = Bf.shape[0]
+    monitored_idx = np.arange(nl) if monitored_idx is None else monitored_idx
+    contingency_idx = np.arange(nl) if contingency_idx is None else contingency_idx
+
+    LODF = get_output_matrix(out=out, shape=(len(monitored_idx), len(contingency_idx)))
+
+    for a, b, blk in iter_lodf_blocks(Bpqpv=Bpqpv, Bf=Bf, Cf=Cf, Ct=Ct, pqpv=pqpv,
+                                      distribute_slack=distribute_slack, block_size=block_size,
+                                      monitored_idx=monitored_idx, contingency_idx=contingency_idx,
+                                      correct_values=correct_values, numerical_zero=numerical_zero):
+        LODF[:, a:b] = blk
+
+    return LODF
+
+
+def make_lodf_blocked_sparse(Bpqpv: sp.csc_matrix,
+                             Bf: sp.csc_matrix,
+                             Cf: sp.csc_matrix,
+                             Ct: sp.csc_matrix,
+                             pqpv: IntVec,
+                             threshold: float,
+                             distribute_slack: bool = True,
+                             block_size: int = 1000,
+                             monitored_idx: Union[IntVec, None] = None,
+                             contingency_idx: Union[IntVec, None] = None,
+                             correct_values: bool = False,
+                             numerical_zero: float = 1e-10) -> Tuple[sp.csc_matrix, Vec]:
+    """
+    Build the thresholded sparse LODF by blocks of contingency columns, the dense LODF is never allocated
+    :param Bpqpv: DC-linear susceptance matrix already sliced
+    :param Bf: Bus-branch "from" susceptance matrix
+    :param Cf: Branch "from" -bus connectivity matrix
+    :param Ct: Branch "to" -bus connectivity matrix
+    :param pqpv: array of sorted pq and pv node indices
+    :param threshold: values with an absolute value below or equal to this are discarded
+    :param distribute_slack: distribute the slack?
+    :param block_size: number of contingencies solved at once
+    :param monitored_idx: indices of the monitored branches (rows), if None all are computed
+    :param contingency_idx: indices of the contingency branches (columns), if None all are computed
+    :param correct_values: correct values out of the interval
+    :param numerical_zero: value considered zero in numerical terms (i.e. 1e-10)
+    :return: sparse LODF (len(monitored_idx), len(contingency_idx)), absolute sum of the discarded values per row
+    """
+    nl = Bf.shape[0]
+    monitored_idx = np.arange(nl) if monitored_idx is None else monitored_idx
+    contingency_idx = np.arange(nl) if contingency_idx is None else contingency_idx
+
+    blocks = iter_lodf_blocks(Bpqpv=Bpqpv, Bf=Bf, Cf=Cf, Ct=Ct, pqpv=pqpv,
+                              distribute_slack=distribute_slack, block_size=block_size,
+                              monitored_idx=monitored_idx, contingency_idx=contingency_idx,
+                              correct_values=correct_values, numerical_zero=numerical_zero)
+
+    return blocks_to_csc(blocks=blocks, shape=(len(monitored_idx), len(contingency_idx)), threshold=threshold)
+
+
+def blocks_to_csc(blocks: Iterable[Tuple[int, int, Mat]],
+                  shape: Tuple[int, int],
+                  threshold: float) -> Tuple[sp.csc_matrix, Vec]:
+    """
+    Assemble a CSC matrix from consecutive dense blocks of columns keeping the entries above a threshold
+    :param blocks: iterable of (first column, last column + 1, dense block)
+    :param shape: shape of the assembled matrix
+    :param threshold: values with an absolute value below or equal to this are discarded
+    :return: CSC matrix, absolute sum of the discarded values per row
+    """
+    error = np.zeros(shape[0])
+    parts = list()
+    for a, b, blk in blocks:
+        abs_blk = np.abs(blk)
+        error += np.where(abs_blk <= threshold, abs_blk, 0.0).sum(axis=1)
+        parts.append(dense_to_csc(mat=blk, threshold=threshold))
+
+    if len(parts):
+        return sp.hstack(parts, format='csc'), error
+    else:
+        return sp.csc_matrix(shape), error
+
+
+def to_csc(mat: Union[Mat, sp.csc_matrix], threshold: float) -> sp.csc_matrix:
+    """
+    Get the CSC matrix with the entries whose absolute value is above a threshold
+    :param mat: dense or sparse matrix
+    :param threshold: threshold
+    :return: CSC sparse matrix
+    """
+    if sp.issparse(mat):
+        res = sp.csc_matrix(mat, copy=True)
+        res.data[np.abs(res.data) <= threshold] = 0.0
+        res.eliminate_zeros()
+        return res
+    else:
+        return dense_to_csc(mat=mat, threshold=threshold)
+
+
+def coo_list_to_csc(coo_list: List[Tuple[IntVec, IntVec, Vec]], shape: Tuple[int, int]) -> sp.csc_matrix:
+    """
+    Assemble a CSC matrix from a list of coordinate triplets
+    :param coo_list: list of (rows, columns, values)
+    :param shape: shape of the matrix
+    :return: CSC matrix
+    """
+    if len(coo_list):
+        rows = np.concatenate([r for r, c, d in coo_list])
+        cols = np.concatenate([c for r, c, d in coo_list])
+        data = np.concatenate([d for r, c, d in coo_list])
+        return sp.csc_matrix((data, (rows, cols)), shape=shape)
+    else:
+        return sp.csc_matrix(shape)
+
+
+def get_dense_block(mat: Union[Mat, sp.csc_matrix], rows: IntVec, cols: IntVec) -> Mat:
+    """
+    Get a dense sub-matrix from a dense or sparse matrix
+    :param mat: dense or sparse matrix
+    :param rows: row indices
+    :param cols: column indices
+    :return: dense matrix (len(rows), len(cols))
+    """
+    if sp.issparse(mat):
+        return mat.tocsc()[:, cols].tocsr()[rows, :].toarray()
+    else:
+        return mat[np.ix_(rows, cols)]
+
+
 # @nb.njit(cache=True)
 def make_mlodf(circuit, lodf):
     """
@@ -326,6 +691,37 @@ def make_transfer_limits(ptdf: Mat,
     return tmc
 
 
+@nb.njit(cache=True)
+def make_transfer_limits_sparse(data: Vec,
+                                indices: IntVec,
+                                indptr: IntVec,
+                                flows: Vec,
+                                rates: Vec) -> Vec:
+    """
+    Compute the maximum transfer limits of each branch in normal operation using a sparse PTDF
+    :param data: PTDF CSR data
+    :param indices: PTDF CSR column indices (sorted)
+    :param indptr: PTDF CSR row pointers
+    :param flows: base Sf in MW
+    :param rates: array of branch rates
+    :return: Max transfer limits vector  (n-branch)
+    """
+    nbr = len(indptr) - 1
+    tmc = np.zeros(nbr)
+
+    for m in range(nbr):
+        for k in range(indptr[m], indptr[m + 1]):
+
+            if data[k] != 0.0:
+                val = (rates[m] - flows[m]) / data[k]  # I want it with sign
+
+                # update the transference value
+                if abs(val) > abs(tmc[m]):
+                    tmc[m] = val
+
+    return tmc
+
+
 @nb.njit(cache=True)
 def create_M_numba(lodf: Mat, branch_contingency_indices) -> Mat:
     """
@@ -529,6 +925,83 @@ class ContingencyIndices:
         return branch_contingency_indices, bus_contingency_indices, injections_factors
 
 
+class LinearMultiContingencyGroup:
+    """
+    Multi-contingencies that fail the same number of branches and that do not change the injections.
+    Their MLODF factors are stacked so that the flows of all of them are computed with a single sparse product
+    """
+
+    # density of the stacked factors over which the dense evaluation is used
+    DENSE_FRACTION = 0.1
+
+    def __init__(self, contingency_indices: IntVec, branch_indices: IntMat, mlodf_factors: sp.csc_matrix):
+        """
+        Constructor
+        :param contingency_indices: indices of the contingencies of the group (nk)
+        :param branch_indices: failed branch indices of each contingency (nk, k)
+        :param mlodf_factors: stacked MLODF factors (all_branches, nk * k),
+                              the k columns of every contingency are contiguous
+        """
+        self.contingency_indices: IntVec = contingency_indices
+        self.branch_indices: IntMat = branch_indices
+        self.mlodf_factors: sp.csc_matrix = mlodf_factors
+
+        # dense copy of the factors (nk, k, all_branches), used when the factors are not sparse
+        self._mlodf_dense: Union[None, np.ndarray] = None
+
+    @property
+    def cardinality(self) -> int:
+        """
+        Number of failed branches of the contingencies of the group
+        :return: int
+        """
+        return self.branch_indices.shape[1]
+
+    @property
+    def size(self) -> int:
+        """
+        Number of contingencies of the group
+        :return: int
+        """
+        return len(self.contingency_indices)
+
+    def get_flows_increment(self, base_flows: Mat) -> Mat:
+        """
+        Get the flow increments of all the contingencies of the group for many base flows
+        :param base_flows: base branch flows (nt, all_branches)
+        :return: flow increments (nt, nk, all_branches)
+        """
+        nt = base_flows.shape[0]
+        nk, k = self.branch_indices.shape
+        nbr = self.mlodf_factors.shape[0]
+
+        if k == 0 or nk == 0:
+            return np.zeros((nt, nk, nbr))
+
+        if self.mlodf_factors.nnz > self.DENSE_FRACTION * nbr * nk * k:
+            # the factors are mostly full: broadcast products with the dense factors
+            if self._mlodf_dense is None:
+                self._mlodf_dense = self.mlodf_factors.T.toarray().reshape(nk, k, nbr)
+
+            pf_bd = base_flows[:, self.branch_indices]  # (nt, nk, k)
+            delta = pf_bd[:, :, 0, np.newaxis] * self._mlodf_dense[np.newaxis, :, 0, :]
+            for j in range(1, k):
+                delta += pf_bd[:, :, j, np.newaxis] * self._mlodf_dense[np.newaxis, :, j, :]
+            return delta
+
+        # block diagonal matrix with the flows of the failed branches:
+        # D[t * nk + c, c * k + j] = Pf0[t, βδ[c, j]]
+        rows = np.repeat(np.arange(nt * nk), k)
+        cols = np.tile(np.arange(nk * k), nt)
+        data = base_flows[:, self.branch_indices.ravel()].ravel()
+        D = sp.csr_matrix((data, (rows, cols)), shape=(nt * nk, nk * k))
+
+        # (MLODF[k, βδ] x Pf0[βδ])^T for every contingency and time
+        delta = (D @ self.mlodf_factors.T).toarray()  # (nt * nk, all_branches)
+
+        return delta.reshape(nt, nk, nbr)
+
+
 class LinearMultiContingencies:
     """
     LinearMultiContingencies
@@ -560,16 +1033,19 @@ class LinearMultiContingencies:
         # list of LinearMultiContingency objects that are used later to compute the contingency flows
         self.multi_contingencies: List[LinearMultiContingency] = list()
 
+        # the multi contingencies without injection changes grouped by the number of failed branches
+        self.contingency_groups_by_cardinality: List[LinearMultiContingencyGroup] = list()
+
     def compute(self,
-                lodf: Mat,
-                ptdf: Mat,
+                lodf: Union[Mat, sp.csc_matrix],
+                ptdf: Union[Mat, sp.csc_matrix],
                 ptdf_threshold: float = 0.0001,
                 lodf_threshold: float = 0.0001,
                 prepare_for_srap: bool = False) -> None:
         """
         Make the LODF with any contingency combination using the declared contingency objects
-        :param lodf: original LODF matrix (nbr, nbr)
-        :param ptdf: original PTDF matrix (nbr, nbus)
+        :param lodf: original LODF matrix (nbr, nbr), dense or sparse (i.e. SparseLinearFactors.LODF)
+        :param ptdf: original PTDF matrix (nbr, nbus), dense or sparse (i.e. SparseLinearFactors.PTDF)
         :param ptdf_threshold: threshold to discard values
         :param lodf_threshold: Threshold for LODF conversion to sparse
         :param prepare_for_srap: if we are going to check with SRAP conditions, we must add the PTDF factors
@@ -592,22 +1068,26 @@ class LinearMultiContingencies:
                 # + PTDF[k, i] * dPi
 
                 # Compute M matrix [n, n] (lodf relating the outaged lines to each other)
-                M = create_M_numba(lodf=lodf,
-                                   branch_contingency_indices=contingency_indices.branch_contingency_indices)
+                n_bd = len(contingency_indices.branch_contingency_indices)
+                lodf_bd = get_dense_block(mat=lodf,
+                                          rows=contingency_indices.branch_contingency_indices,
+                                          cols=contingency_indices.branch_contingency_indices)
+                M = create_M_numba(lodf=lodf_bd, branch_contingency_indices=np.arange(n_bd))
                 L = lodf[:, contingency_indices.branch_contingency_indices]
 
                 # Compute LODF for the multiple failure MLODF[k, βδ]
-                mlodf_factors = dense_to_csc(mat=L @ np.linalg.inv(M),
-                                             threshold=lodf_threshold)
+                mlodf_factors = to_csc(mat=L @ np.linalg.inv(M),
+                                       threshold=lodf_threshold)
 
                 if len(contingency_indices.bus_contingency_indices) > 0:
                     # this is PTDF[k, i]
-                    ptdf_k_i = dense_to_csc(mat=ptdf[:, contingency_indices.bus_contingency_indices],
-                                            threshold=ptdf_threshold)
+                    ptdf_k_i = to_csc(mat=ptdf[:, contingency_indices.bus_contingency_indices],
+                                      threshold=ptdf_threshold)
                     # PTDF[βδ, i]
-                    ptdf_bd_i = dense_to_csc(
-                        mat=ptdf[np.ix_(contingency_indices.branch_contingency_indices,
-                                        contingency_indices.bus_contingency_indices)],
+                    ptdf_bd_i = to_csc(
+                        mat=get_dense_block(mat=ptdf,
+                                            rows=contingency_indices.branch_contingency_indices,
+                                            cols=contingency_indices.bus_contingency_indices),
                         threshold=ptdf_threshold
                     )
 
@@ -615,8 +1095,8 @@ class LinearMultiContingencies:
                     ptdf_k_i = sp.csc_matrix((ptdf.shape[0], ptdf.shape[1]))
 
                     # PTDF[βδ, i]
-                    ptdf_bd_i = dense_to_csc(mat=ptdf[contingency_indices.branch_contingency_indices, :],
-                                             threshold=ptdf_threshold)
+                    ptdf_bd_i = to_csc(mat=ptdf[contingency_indices.branch_contingency_indices, :],
+                                       threshold=ptdf_threshold)
 
                 # must compute: MLODF[k, βδ] x PTDF[βδ, i] + PTDF[k, i]
                 compensated_ptdf_factors = mlodf_factors @ ptdf_bd_i + ptdf_k_i
@@ -629,19 +1109,20 @@ class LinearMultiContingencies:
                 # + PTDF[k, i] * dPi
 
                 # append values
-                mlodf_factors = dense_to_csc(mat=lodf[:, contingency_indices.branch_contingency_indices],
-                                             threshold=lodf_threshold)
+                mlodf_factors = to_csc(mat=lodf[:, contingency_indices.branch_contingency_indices],
+                                       threshold=lodf_threshold)
 
                 if len(contingency_indices.bus_contingency_indices) > 0:
                     # single branch and single bus contingency
 
                     # this is PTDF[k, i]
-                    ptdf_k_i = dense_to_csc(mat=ptdf[:, contingency_indices.bus_contingency_indices],
-                                            threshold=ptdf_threshold)
+                    ptdf_k_i = to_csc(mat=ptdf[:, contingency_indices.bus_contingency_indices],
+                                      threshold=ptdf_threshold)
                     # PTDF[βδ, i]
-                    ptdf_bd_i = dense_to_csc(
-                        mat=ptdf[np.ix_(contingency_indices.branch_contingency_indices,
-                                 contingency_indices.bus_contingency_indices)],
+                    ptdf_bd_i = to_csc(
+                        mat=get_dense_block(mat=ptdf,
+                                            rows=contingency_indices.branch_contingency_indices,
+                                            cols=contingency_indices.bus_contingency_indices),
                         threshold=ptdf_threshold
                     )
 
@@ -671,6 +1152,219 @@ class LinearMultiContingencies:
                 )
             )
 
+        self.contingency_groups_by_cardinality = self.group_by_cardinality()
+
+    def group_by_cardinality(self) -> List[LinearMultiContingencyGroup]:
+        """
+        Group the multi contingencies that do not change the injections by the number of failed branches
+        :return: list of LinearMultiContingencyGroup
+        """
+        groups = dict()
+        for ic, multi_contingency in enumerate(self.multi_contingencies):
+            if not multi_contingency.has_injection_contingencies():
+                k = len(multi_contingency.branch_indices)
+                groups.setdefault(k, list()).append(ic)
+
+        res = list()
+        for k, indices in sorted(groups.items()):
+            nbr = self.multi_contingencies[indices[0]].mlodf_factors.shape[0]
+            if k > 0:
+                mlodf_factors = sp.hstack([sp.csc_matrix(self.multi_contingencies[ic].mlodf_factors)
+                                           for ic in indices], format='csc')
+            else:
+                mlodf_factors = sp.csc_matrix((nbr, 0))
+
+            branch_indices = np.array([self.multi_contingencies[ic].branch_indices for ic in indices],
+                                      dtype=int).reshape(len(indices), k)
+
+            res.append(LinearMultiContingencyGroup(contingency_indices=np.array(indices, dtype=int),
+                                                   branch_indices=branch_indices,
+                                                   mlodf_factors=mlodf_factors))
+        return res
+
+    def get_injection_contingency_indices(self) -> IntVec:
+        """
+        Get the indices of the multi contingencies that change the injections,
+        these are not evaluated by get_contingency_flows_batch
+        :return: array of contingency indices
+        """
+        return np.array([ic for ic, mc in enumerate(self.multi_contingencies)
+                         if mc.has_injection_contingencies()], dtype=int)
+
+    def get_contingency_flows_batch(self, base_flows: Mat) -> Mat:
+        """
+        Compute the flows of all the contingencies for many base flows (i.e. time steps) at once.
+        The contingencies with injection changes (see get_injection_contingency_indices) are left
+        with the base flows, those must be evaluated with LinearMultiContingency.get_contingency_flows
+        :param base_flows: base branch flows (nt, all_branches)
+        :return: contingency flows (nt, n_contingencies, all_branches)
+        """
+        nt = base_flows.shape[0]
+        flows = np.empty((nt, len(self.multi_contingencies), base_flows.shape[1]))
+        flows[:, :, :] = base_flows[:, np.newaxis, :]
+
+        for group in self.contingency_groups_by_cardinality:
+            if group.cardinality > 0:
+                idx = group.contingency_indices
+                if idx[-1] - idx[0] + 1 == len(idx):
+                    # contiguous contingencies (usual when declared in order), avoid the fancy indexing copy
+                    flows[:, idx[0]:idx[-1] + 1, :] += group.get_flows_increment(base_flows=base_flows)
+                else:
+                    flows[:, idx, :] += group.get_flows_increment(base_flows=base_flows)
+
+        return flows
+
+
+class SparseLinearFactors:
+    """
+    PTDF and LODF stored in CSC form keeping only the entries above a threshold.
+    The absolute sum of the discarded entries of every row is kept to bound the error of the flows
+    """
+
+    def __init__(self,
+                 PTDF: sp.csc_matrix,
+                 LODF: sp.csc_matrix,
+                 ptdf_threshold: float,
+                 lodf_threshold: float,
+                 ptdf_error: Vec,
+                 lodf_error: Vec):
+        """
+        Sparse linear factors constructor
+        :param PTDF: sparse PTDF (n-branch, n-bus)
+        :param LODF: sparse LODF (n-branch, n-branch)
+        :param ptdf_threshold: threshold used to discard the PTDF values
+        :param lodf_threshold: threshold used to discard the LODF values
+        :param ptdf_error: absolute sum of the discarded PTDF values per branch (n-branch)
+        :param lodf_error: absolute sum of the discarded LODF values per branch (n-branch)
+        """
+        self.PTDF: sp.csc_matrix = PTDF
+        self.LODF: sp.csc_matrix = LODF
+        self.ptdf_threshold: float = ptdf_threshold
+        self.lodf_threshold: float = lodf_threshold
+        self.ptdf_error: Vec = ptdf_error
+        self.lodf_error: Vec = lodf_error
+
+    @staticmethod
+    def from_dense(ptdf: Mat,
+                   lodf: Mat,
+                   ptdf_threshold: float = 1e-4,
+                   lodf_threshold: float = 1e-4) -> "SparseLinearFactors":
+        """
+        Build the sparse factors from the dense matrices
+        :param ptdf: PTDF matrix (n-branch, n-bus)
+        :param lodf: LODF matrix (n-branch, n-branch)
+        :param ptdf_threshold: values with an absolute value below or equal to this are discarded
+        :param lodf_threshold: values with an absolute value below or equal to this are discarded
+        :return: SparseLinearFactors
+        """
+        PTDF = dense_to_csc(mat=ptdf, threshold=ptdf_threshold)
+        LODF = dense_to_csc(mat=lodf, threshold=lodf_threshold)
+
+        ptdf_error = np.abs(ptdf).sum(axis=1) - np.asarray(abs(PTDF).sum(axis=1)).ravel()
+        lodf_error = np.abs(lodf).sum(axis=1) - np.asarray(abs(LODF).sum(axis=1)).ravel()
+
+        return SparseLinearFactors(PTDF=PTDF,
+                                   LODF=LODF,
+                                   ptdf_threshold=ptdf_threshold,
+                                   lodf_threshold=lodf_threshold,
+                                   ptdf_error=np.maximum(ptdf_error, 0.0),
+                                   lodf_error=np.maximum(lodf_error, 0.0))
+
+    @property
+    def nbr(self) -> int:
+        """
+        Number of branches
+        :return: int
+        """
+        return self.PTDF.shape[0]
+
+    @property
+    def nbus(self) -> int:
+        """
+        Number of buses
+        :return: int
+        """
+        return self.PTDF.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the sparse structures
+        :return: number of bytes
+        """
+        return sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in (self.PTDF, self.LODF))
+
+    def get_flows(self, Sbus: Union[CxVec, CxMat]) -> Union[Vec, Mat]:
+        """
+        Compute the branch Sf using the sparse PTDF
+        :param Sbus: Power Injections array (nbus) for 1D, (time, nbus) for 2D
+        :return: branch active power Sf (nbr) for 1D, (time, nbr) for 2D
+        """
+        if Sbus.ndim == 1:
+            return self.PTDF @ Sbus.real
+        elif Sbus.ndim == 2:
+            return (self.PTDF @ Sbus.real.T).T
+        else:
+            raise Exception(f'Sbus has unsupported dimensions: {Sbus.shape}')
+
+    def get_flows_error_bound(self, Sbus: Union[CxVec, CxMat]) -> Union[Vec, Mat]:
+        """
+        Upper bound of the absolute error of get_flows with respect to the dense PTDF
+        |Sf - Sf_sparse| <= sum(|discarded PTDF[m, :]|) x max(|Sbus|)
+        :param Sbus: Power Injections array (nbus) for 1D, (time, nbus) for 2D
+        :return: error bound (nbr) for 1D, (time, nbr) for 2D
+        """
+        if Sbus.ndim == 1:
+            return self.ptdf_error * np.max(np.abs(Sbus.real))
+        elif Sbus.ndim == 2:
+            return np.outer(np.max(np.abs(Sbus.real), axis=1), self.ptdf_error)
+        else:
+            raise Exception(f'Sbus has unsupported dimensions: {Sbus.shape}')
+
+    def get_otdf(self,
+                 j: int,
+                 contingency_idx: Union[IntVec, None] = None,
+                 threshold: Union[float, None] = None,
+                 block_size: int = 1000) -> sp.csc_matrix:
+        """
+        Outage sensitivity of the branches when transferring power from the bus j to the slack
+            OTDF[k, c] = PTDF[k, j] + LODF[k, c] x PTDF[c, j]
+        :param j: index of the bus injection
+        :param contingency_idx: indices of the contingency branches (columns), if None all are computed
+        :param threshold: values below or equal to this are discarded, if None the LODF threshold is used
+        :param block_size: number of contingency columns processed at once
+        :return: sparse OTDF matrix (n-branch, len(contingency_idx))
+        """
+        contingency_idx = np.arange(self.nbr) if contingency_idx is None else contingency_idx
+        threshold = self.lodf_threshold if threshold is None else threshold
+
+        ptdf_j = self.PTDF[:, j].toarray().ravel()
+        blocks = list()
+        for a in range(0, len(contingency_idx), block_size):
+            cnt = contingency_idx[a:a + block_size]
+            blk = self.LODF[:, cnt].multiply(ptdf_j[cnt]).toarray() + ptdf_j[:, np.newaxis]
+            blocks.append(dense_to_csc(mat=blk, threshold=threshold))
+
+        if len(blocks):
+            return sp.hstack(blocks, format='csc')
+        else:
+            return sp.csc_matrix((self.nbr, 0))
+
+    def get_transfer_limits(self, flows: Vec, rates: Vec) -> Vec:
+        """
+        Compute the maximum transfer limits of each branch in normal operation
+        :param flows: base Sf in MW
+        :param rates: array of branch rates
+        :return: Max transfer limits vector (n-branch)
+        """
+        ptdf = self.PTDF.tocsr()
+        ptdf.sort_indices()
+        return make_transfer_limits_sparse(data=ptdf.data,
+                                           indices=ptdf.indices,
+                                           indptr=ptdf.indptr,
+                                           flows=flows,
+                                           rates=rates)
+
 
 class LinearAnalysis:
     """
@@ -680,20 +1374,31 @@ class LinearAnalysis:
     def __init__(self,
                  numerical_circuit: NumericalCircuit,
                  distributed_slack: bool = True,
-                 correct_values: bool = False):
+                 correct_values: bool = False,
+                 block_size: Union[int, None] = None,
+                 ptdf_threshold: float = 0.0,
+                 lodf_threshold: float = 0.0):
         """
         Linear Analysis constructor
         :param numerical_circuit: numerical circuit instance
         :param distributed_slack: boolean to distribute slack
         :param correct_values: boolean to fix out layer values
+        :param block_size: if provided, the PTDF and LODF are computed by blocks of this number of columns
+                           and stored as sparse matrices, so that the dense matrices are never allocated
+        :param ptdf_threshold: PTDF values at or below this are discarded when computing by blocks
+        :param lodf_threshold: LODF values at or below this are discarded when computing by blocks
         """
 
         self.numerical_circuit: NumericalCircuit = numerical_circuit
         self.distributed_slack: bool = distributed_slack
         self.correct_values: bool = correct_values
+        self.block_size: Union[int, None] = block_size
+        self.ptdf_threshold: float = ptdf_threshold
+        self.lodf_threshold: float = lodf_threshold
 
-        self.PTDF: Union[np.ndarray, None] = None
-        self.LODF: Union[np.ndarray, None] = None
+        # dense matrices, or CSC matrices when computed by blocks
+        self.PTDF: Union[np.ndarray, sp.csc_matrix, None] = None
+        self.LODF: Union[np.ndarray, sp.csc_matrix, None] = None
 
         self.logger: Logger = Logger()
 
@@ -701,6 +1406,13 @@ class LinearAnalysis:
         """
         Compute the PTDF and LODF for all the islands
         """
+        if self.block_size:
+            # the blocks are written straight into the sparse matrices
+            factors = self.get_sparse_factors(ptdf_threshold=self.ptdf_threshold,
+                                              lodf_threshold=self.lodf_threshold)
+            self.PTDF = factors.PTDF
+            self.LODF = factors.LODF
+            return
 
         # self.numerical_circuit = compile_snapshot_circuit(self.grid)
         islands = self.numerical_circuit.split_into_islands()
@@ -763,6 +1475,15 @@ class LinearAnalysis:
         :param flows: base Sf in MW
         :return: Max transfer limits vector (n-branch)
         """
+        if sp.issparse(self.PTDF):
+            ptdf = self.PTDF.tocsr()
+            ptdf.sort_indices()
+            return make_transfer_limits_sparse(data=ptdf.data,
+                                               indices=ptdf.indices,
+                                               indptr=ptdf.indptr,
+                                               flows=flows,
+                                               rates=self.numerical_circuit.Rates)
+
         return make_transfer_limits(
             ptdf=self.PTDF,
             flows=flows,
@@ -776,8 +1497,81 @@ class LinearAnalysis:
         :return: branch active power Sf (nbus) for 1D, (time, nbus) for 2D
         """
         if Sbus.ndim == 1:
-            return np.dot(self.PTDF, Sbus.real)
+            return self.PTDF @ Sbus.real
         elif Sbus.ndim == 2:
-            return np.dot(self.PTDF, Sbus.real.T).T
+            return (self.PTDF @ Sbus.real.T).T
         else:
             raise Exception(f'Sbus has unsupported dimensions: {Sbus.shape}')
+
+    def get_sparse_factors(self,
+                           ptdf_threshold: float = 1e-4,
+                           lodf_threshold: float = 1e-4) -> SparseLinearFactors:
+        """
+        Get the thresholded sparse PTDF and LODF.
+        If the dense factors were computed already (see run) they are thresholded, otherwise the sparse factors
+        are built per island by blocks of columns and the dense PTDF and LODF are never allocated
+        :param ptdf_threshold: values with an absolute value below or equal to this are discarded
+        :param lodf_threshold: values with an absolute value below or equal to this are discarded
+        :return: SparseLinearFactors
+        """
+        if isinstance(self.PTDF, np.ndarray):
+            return SparseLinearFactors.from_dense(ptdf=self.PTDF,
+                                                  lodf=self.LODF,
+                                                  ptdf_threshold=ptdf_threshold,
+                                                  lodf_threshold=lodf_threshold)
+
+        islands = self.numerical_circuit.split_into_islands()
+        n_br = self.numerical_circuit.nbr
+        n_bus = self.numerical_circuit.nbus
+        block_size = self.block_size if self.block_size else 1000
+
+        ptdf_error = np.zeros(n_br)
+        lodf_error = np.zeros(n_br)
+        ptdf_coo = list()  # list of (rows, cols, data) of each island in the original indices
+        lodf_coo = list()
+
+        for n_island, island in enumerate(islands):
+
+            # no slacks will make it impossible to compute the PTDF analytically
+            if len(island.vd) == 1:
+                if len(island.pqpv) > 0:
+
+                    br_idx = island.original_branch_idx
+
+                    ptdf_island, ptdf_error_island = make_ptdf_blocked_sparse(Bpqpv=island.Bpqpv,
+                                                                              Bf=island.Bf,
+                                                                              pqpv=island.pqpv,
+                                                                              threshold=ptdf_threshold,
+                                                                              distribute_slack=self.distributed_slack,
+                                                                              block_size=block_size)
+                    coo = ptdf_island.tocoo()
+                    ptdf_coo.append((br_idx[coo.row], island.original_bus_idx[coo.col], coo.data))
+                    ptdf_error[br_idx] = ptdf_error_island
+
+                    lodf_island, lodf_error_island = make_lodf_blocked_sparse(Bpqpv=island.Bpqpv,
+                                                                              Bf=island.Bf,
+                                                                              Cf=island.Cf,
+                                                                              Ct=island.Ct,
+                                                                              pqpv=island.pqpv,
+                                                                              threshold=lodf_threshold,
+                                                                              distribute_slack=self.distributed_slack,
+                                                                              block_size=block_size,
+                                                                              correct_values=self.correct_values)
+                    coo = lodf_island.tocoo()
+                    lodf_coo.append((br_idx[coo.row], br_idx[coo.col], coo.data))
+                    lodf_error[br_idx] = lodf_error_island
+                else:
+                    self.logger.add_error('No PQ or PV nodes', 'Island {}'.format(n_island))
+
+            elif len(island.vd) == 0:
+                self.logger.add_warning('No slack bus', 'Island {}'.format(n_island))
+
+            else:
+                self.logger.add_error('More than one slack bus', 'Island {}'.format(n_island))
+
+        return SparseLinearFactors(PTDF=coo_list_to_csc(coo_list=ptdf_coo, shape=(n_br, n_bus)),
+                                   LODF=coo_list_to_csc(coo_list=lodf_coo, shape=(n_br, n_br)),
+                                   ptdf_threshold=ptdf_threshold,
+                                   lodf_threshold=lodf_threshold,
+                                   ptdf_error=ptdf_error,
+                                   lodf_error=lodf_error)
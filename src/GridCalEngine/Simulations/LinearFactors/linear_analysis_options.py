@@ -25,13 +25,15 @@ class LinearAnalysisOptions:
                  distribute_slack=False,
                  correct_values=True,
                  ptdf_threshold: float = 1e-3,
-                 lodf_threshold: float = 1e-3):
+                 lodf_threshold: float = 1e-3,
+                 use_sparse_factors: bool = False):
         """
         Power Transfer Distribution Factors' options
         :param distribute_slack: Distribute the slack effect?
         :param correct_values: correct out of bounds values?
         :param ptdf_threshold: threshold for PTDF's to be converted to sparse
         :param lodf_threshold: threshold for LODF's to be converted to sparse
+        :param use_sparse_factors: use the thresholded sparse PTDF and LODF (SparseLinearFactors) in the simulations
         """
         self.distribute_slack = distribute_slack
 
@@ -40,3 +42,5 @@ class LinearAnalysisOptions:
         self.ptdf_threshold = ptdf_threshold
 
         self.lodf_threshold = lodf_threshold
+
+        self.use_sparse_factors = use_sparse_factors
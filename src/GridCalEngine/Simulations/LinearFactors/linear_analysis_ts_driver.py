@@ -16,13 +16,14 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import time
-from typing import Dict, Union
+from typing import Dict, List, Union
 from GridCalEngine.basic_structures import IntVec
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
-from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearAnalysis
+from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearAnalysis, SparseLinearFactors
 from GridCalEngine.Simulations.LinearFactors.linear_analysis_options import LinearAnalysisOptions
 # from GridCalEngine.Simulations.LinearFactors.linear_analysis_driver import LinearAnalysisOptions
-from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
+from GridCalEngine.DataStructures.numerical_circuit_ts import NumericalCircuitTimeSeries
 from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.Simulations.driver_template import TimeSeriesDriverTemplate
 from GridCalEngine.Simulations.LinearFactors.linear_analysis_ts_results import LinearAnalysisTimeSeriesResults
@@ -69,6 +70,25 @@ class LinearAnalysisTimeSeriesDriver(TimeSeriesDriverTemplate):
             clustering_results=self.clustering_results,
         )
 
+    def compute_factors(self, nc: NumericalCircuit) -> Union[LinearAnalysis, SparseLinearFactors]:
+        """
+        Compute the linear factors of a circuit
+        :param nc: NumericalCircuit
+        :return: LinearAnalysis or SparseLinearFactors
+        """
+        driver_ = LinearAnalysis(
+            numerical_circuit=nc,
+            distributed_slack=True,
+            correct_values=False,
+        )
+
+        if self.options.use_sparse_factors:
+            return driver_.get_sparse_factors(ptdf_threshold=self.options.ptdf_threshold,
+                                              lodf_threshold=self.options.lodf_threshold)
+        else:
+            driver_.run()
+            return driver_
+
     def run(self):
         """
         Run the time series simulation
@@ -81,32 +101,38 @@ class LinearAnalysisTimeSeriesDriver(TimeSeriesDriverTemplate):
 
         self.__cancel__ = False
 
-        # Compute bus Injections
-        # Pbus = self.grid.get_Pbus_prof()
+        nc_ts = NumericalCircuitTimeSeries(circuit=self.grid,
+                                           time_indices=self.time_indices,
+                                           opf_results=self.opf_time_series_results)
 
-        # Compute different topologies to consider
-        # tpg = self.get_topologic_groups()
+        # the factors are computed once per topology group and swept over its time steps
+        it = 0
+        for pos, t_group in self.get_topology_execution_plan():
 
-        for it, t in enumerate(self.time_indices):
-            self.report_text('Contingency at ' + str(self.grid.time_profile[t]))
-            self.report_progress2(it, len(self.time_indices))
+            # the steps of a topology group may still differ in the taps or bus types: factors per structure
+            factors_dict: Dict[bytes, Union[LinearAnalysis, SparseLinearFactors]] = dict()
+            structure_pos: Dict[bytes, List[int]] = dict()
 
-            nc = compile_numerical_circuit_at(circuit=self.grid,
-                                              t_idx=t,
-                                              opf_results=self.opf_time_series_results)
+            for i, t in enumerate(t_group):
+                self.report_text('Linear analysis at ' + str(self.grid.time_profile[t]))
+                self.report_progress2(it, len(self.time_indices))
+                it += 1
 
-            driver_ = LinearAnalysis(
-                numerical_circuit=nc,
-                distributed_slack=True,
-                correct_values=False,
-            )
+                nc = nc_ts.get_at(t)
+                structure = nc.get_structure_hash()
 
-            driver_.run()
+                if structure not in factors_dict:
+                    factors_dict[structure] = self.compute_factors(nc=nc)
+
+                self.results.S[pos[i], :] = nc.Sbus
+                structure_pos.setdefault(structure, list()).append(pos[i])
 
-            # Sf = driver_.get_flows(Sbus=Pbus[time_indices_, :])
+            # compute the flows of all the steps that share the factors at once
+            for structure, pos_s in structure_pos.items():
+                self.results.Sf[pos_s, :] = factors_dict[structure].get_flows(Sbus=self.results.S[pos_s, :])
 
-            self.results.S[it, :] = nc.Sbus
-            self.results.Sf[it, :] = driver_.get_flows(Sbus=nc.Sbus)
+            if self.__cancel__:
+                break
 
         rates = self.grid.get_branch_rates_wo_hvdc()
         self.results.loading = self.results.Sf / (rates + 1e-9)
@@ -70,7 +70,9 @@ class OptimalNetTransferCapacityDriver(DriverTemplate):
             zonal_grouping=self.options.opf_options.zonal_grouping,
             skip_generation_limits=self.options.skip_generation_limits,
             consider_contingencies=self.options.consider_contingencies,
+            ptdf_threshold=self.options.lin_options.ptdf_threshold,
             lodf_threshold=self.options.lin_options.lodf_threshold,
+            use_sparse_factors=self.options.lin_options.use_sparse_factors,
             buses_areas_1=self.options.area_from_bus_idx,
             buses_areas_2=self.options.area_to_bus_idx,
             transfer_method=self.options.transfer_method,
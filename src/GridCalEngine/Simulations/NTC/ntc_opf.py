@@ -20,6 +20,7 @@ This file implements a DC-OPF for time series
 That means that solves the OPF problem for a complete time series at once
 """
 import numpy as np
+import scipy.sparse as sp
 from typing import List, Union, Tuple, Callable
 from GridCalEngine.enumerations import MIPSolvers, ZonalGrouping
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
@@ -30,10 +31,10 @@ from GridCalEngine.DataStructures.branch_data import BranchData
 from GridCalEngine.DataStructures.hvdc_data import HvdcData
 from GridCalEngine.DataStructures.bus_data import BusData
 from GridCalEngine.basic_structures import Logger, Vec, IntVec, BoolVec, StrVec, CxMat
-from GridCalEngine.Utils.MIP.selected_interface import LpExp, LpVar, LpModel, lpDot, set_var_bounds, join
+from GridCalEngine.Utils.MIP.selected_interface import LpExp, LpVar, LpModel, set_var_bounds, join
 from GridCalEngine.enumerations import TransformerControlType, HvdcControlType, AvailableTransferMode
 from GridCalEngine.Simulations.LinearFactors.linear_analysis import LinearAnalysis, LinearMultiContingencies
-from GridCalEngine.Simulations.ATC.available_transfer_capacity_driver import compute_alpha
+from GridCalEngine.Simulations.ATC.available_transfer_capacity_driver import get_alpha
 
 
 # def get_structural_ntc(inter_area_branches, inter_area_hvdcs, branch_ratings, hvdc_ratings):
@@ -397,8 +398,6 @@ class BranchNtcVars:
                 data.flow_slacks_pos[t, i] = model.get_value(self.flow_slacks_pos[t, i]) * Sbase
                 data.flow_slacks_neg[t, i] = model.get_value(self.flow_slacks_neg[t, i]) * Sbase
                 data.tap_angles[t, i] = model.get_value(self.tap_angles[t, i])
-                data.flow_constraints_ub[t, i] = model.get_value(self.flow_constraints_ub[t, i])
-                data.flow_constraints_lb[t, i] = model.get_value(self.flow_constraints_lb[t, i])
 
         for i in range(len(self.contingency_flow_data)):
             t, m, c, var, neg_slack, pos_slack = self.contingency_flow_data[i]
@@ -413,6 +412,13 @@ class BranchNtcVars:
         data.flow_slacks_neg = data.flow_slacks_neg.astype(float, copy=False)
         data.tap_angles = data.tap_angles.astype(float, copy=False)
 
+        # the value of the rate constraints is the value of their expression (flow + slack_pos - slack_neg)
+        constrained_value = (data.flows + data.flow_slacks_pos - data.flow_slacks_neg) / Sbase
+        has_ub = np.vectorize(lambda x: not isinstance(x, (int, float)), otypes=[bool])(self.flow_constraints_ub)
+        has_lb = np.vectorize(lambda x: not isinstance(x, (int, float)), otypes=[bool])(self.flow_constraints_lb)
+        data.flow_constraints_ub[has_ub] = constrained_value[has_ub]
+        data.flow_constraints_lb[has_lb] = constrained_value[has_lb]
+
         # compute loading
         data.loading = data.flows / (data.rates + 1e-20)
 
@@ -666,117 +672,108 @@ def add_linear_branches_formulation(t_idx: int,
     """
     f_obj = 0.0
 
-    # for each branch
-    for m in range(branch_data_t.nelm):
-        fr = branch_data_t.F[m]
-        to = branch_data_t.T[m]
-
-        # copy rates
-        branch_vars.rates[t_idx, m] = branch_data_t.rates[m]
-
-        if branch_data_t.active[m]:
-
-            # declare the flow LPVar
-            branch_vars.flows[t_idx, m] = prob.add_var(
-                lb=-inf,
-                ub=inf,
-                name=join("flow_", [t_idx, m], "_"))
-
-            # compute the branch susceptance
-            if branch_data_t.X[m] == 0.0:
-                if branch_data_t.R[m] != 0.0:
-                    bk = 1.0 / branch_data_t.R[m]
-                else:
-                    bk = 1e-20
-            else:
-                bk = 1.0 / branch_data_t.X[m]
-
-            # compute the flow
-            if branch_data_t.control_mode[m] == TransformerControlType.Pf:
-
-                # add angle
-                branch_vars.tap_angles[t_idx, m] = prob.add_var(
-                    lb=branch_data_t.tap_angle_min[m],
-                    ub=branch_data_t.tap_angle_max[m],
-                    name=join("tap_ang_", [t_idx, m], "_"))
-
-                # is a phase shifter device (like phase shifter transformer or VSC with P control)
-                prob.add_cst(
-                    cst=branch_vars.flows[t_idx, m] == bk * (bus_vars.theta[t_idx, fr] -
-                                                             bus_vars.theta[t_idx, to] +
-                                                             branch_vars.tap_angles[t_idx, m]),
-                    name=join("Branch_flow_set_with_ps_", [t_idx, m], "_"))
+    # compute the branches susceptance (only the active ones participate in the flow equations)
+    with np.errstate(divide='ignore'):
+        bk = np.where(branch_data_t.X == 0.0,
+                      np.where(branch_data_t.R != 0.0, 1.0 / branch_data_t.R, 1e-20),
+                      1.0 / branch_data_t.X)
+    bk = bk * branch_data_t.active.astype(bool)
+    is_ps = branch_data_t.control_mode == TransformerControlType.Pf
 
-                # power injected and subtracted due to the phase shift
-                bus_vars.Pcalc[t_idx, fr] = -bk * branch_vars.tap_angles[t_idx, m]
-                bus_vars.Pcalc[t_idx, to] = bk * branch_vars.tap_angles[t_idx, m]
+    # copy rates
+    branch_vars.rates[t_idx, :] = branch_data_t.rates
 
-            else:  # rest of the branches
-                # is a phase shifter device (like phase shifter transformer or VSC with P control)
-                prob.add_cst(
-                    cst=branch_vars.flows[t_idx, m] == bk * (bus_vars.theta[t_idx, fr] -
-                                                             bus_vars.theta[t_idx, to]),
-                    name=join("Branch_flow_set_", [t_idx, m], "_"))
-
-            # Monitoring logic: Avoid unrealistic ntc flows over CEP rule limit in N condition
-            if monitor_only_ntc_load_rule_branches:
-                """
-                Calculo el porcentaje del ratio de la línea que se reserva al intercambio según la regla de ACER, 
-                y paso dicho valor a la frontera, y si el valor es mayor que el máximo intercambio estructural 
-                significa que la linea no puede limitar el intercambio
-                Ejemplo:
-                    ntc_load_rule = 0.7
-                    rate = 1700
-                    alpha = 0.05
-                    structural_rate = 5200
-                    0.7 * 1700 --> 1190 mw para el intercambio
-                    1190 / 0.05 --> 23.800 MW en la frontera en N
-                    23.800 >>>> 5200 --> esta linea no puede ser declarada como limitante en la NTC en N.
-                   """
-                monitor_by_load_rule_n = ntc_load_rule * branch_data_t.rates[m] / (alpha[m] + 1e-20) <= structural_ntc
-            else:
-                monitor_by_load_rule_n = True
+    # declare the flow LPVars of the active branches
+    active = np.where(branch_data_t.active.astype(bool))[0]
+    branch_vars.flows[t_idx, active] = prob.add_vars(size=len(active), lb=-inf, ub=inf,
+                                                     name=join("flow_", [t_idx]), labels=active)
 
-            # Monitoring logic: Exclude branches with not enough sensibility to exchange in N condition
-            if monitor_only_sensitive_branches:
-                monitor_by_sensitivity_n = alpha[m] > alpha_threshold
-            else:
-                monitor_by_sensitivity_n = True
-
-            # add the flow constraint if monitored
-            if branch_data_t.monitor_loading[m] and monitor_by_sensitivity_n and monitor_by_load_rule_n:
-                branch_vars.flow_slacks_pos[t_idx, m] = prob.add_var(
-                    lb=0,
-                    ub=inf,
-                    name=join("flow_slack_pos_", [t_idx, m], "_"))
-
-                branch_vars.flow_slacks_neg[t_idx, m] = prob.add_var(
-                    lb=0,
-                    ub=inf,
-                    name=join("flow_slack_neg_", [t_idx, m], "_"))
-
-                # add upper rate constraint
-                branch_vars.flow_constraints_ub[t_idx, m] = ((branch_vars.flows[t_idx, m] +
-                                                              branch_vars.flow_slacks_pos[t_idx, m] -
-                                                              branch_vars.flow_slacks_neg[t_idx, m])
-                                                             <= branch_data_t.rates[m] / Sbase)
-                prob.add_cst(
-                    cst=branch_vars.flow_constraints_ub[t_idx, m],
-                    name=join("br_flow_upper_lim_", [t_idx, m]))
-
-                # add lower rate constraint
-                branch_vars.flow_constraints_lb[t_idx, m] = ((branch_vars.flows[t_idx, m] +
-                                                              branch_vars.flow_slacks_pos[t_idx, m] -
-                                                              branch_vars.flow_slacks_neg[t_idx, m])
-                                                             >= -branch_data_t.rates[m] / Sbase)
-
-                prob.add_cst(
-                    cst=branch_vars.flow_constraints_lb[t_idx, m],
-                    name=join("br_flow_lower_lim_", [t_idx, m]))
+    # is a phase shifter device (like phase shifter transformer or VSC with P control)
+    for m in active[is_ps[active]]:
+        fr = branch_data_t.F[m]
+        to = branch_data_t.T[m]
 
-                # add to the objective function
-                f_obj += branch_data_t.overload_cost[m] * branch_vars.flow_slacks_pos[t_idx, m]
-                f_obj += branch_data_t.overload_cost[m] * branch_vars.flow_slacks_neg[t_idx, m]
+        branch_vars.tap_angles[t_idx, m] = prob.add_var(
+            lb=branch_data_t.tap_angle_min[m],
+            ub=branch_data_t.tap_angle_max[m],
+            name=join("tap_ang_", [t_idx, m], "_"))
+
+        # power injected and subtracted due to the phase shift
+        bus_vars.Pcalc[t_idx, fr] = -bk[m] * branch_vars.tap_angles[t_idx, m]
+        bus_vars.Pcalc[t_idx, to] = bk[m] * branch_vars.tap_angles[t_idx, m]
+
+    # add the flow definitions as one matrix block:
+    # flow - bk·(theta_f - theta_t) - bk·tap_angle = 0
+    nbr = branch_data_t.nelm
+    nbus = bus_vars.theta.shape[1]
+    br_idx = np.arange(nbr)
+    A_theta = sp.csc_matrix((np.r_[-bk, bk], (np.r_[br_idx, br_idx], np.r_[branch_data_t.F, branch_data_t.T])),
+                            shape=(nbr, nbus))
+    prob.add_matrix_cst(terms=[(sp.identity(nbr, format='csc'), branch_vars.flows[t_idx, :]),
+                               (A_theta, bus_vars.theta[t_idx, :]),
+                               (sp.diags(-bk * is_ps, format='csc'), branch_vars.tap_angles[t_idx, :])],
+                        lb=np.zeros(nbr),
+                        ub=np.zeros(nbr),
+                        name=join("Branch_flow_set_", [t_idx], "_") + "_")
+
+    monitored = branch_data_t.monitor_loading[active].astype(bool)
+
+    # Monitoring logic: Avoid unrealistic ntc flows over CEP rule limit in N condition
+    if monitor_only_ntc_load_rule_branches:
+        """
+        Calculo el porcentaje del ratio de la línea que se reserva al intercambio según la regla de ACER, 
+        y paso dicho valor a la frontera, y si el valor es mayor que el máximo intercambio estructural 
+        significa que la linea no puede limitar el intercambio
+        Ejemplo:
+            ntc_load_rule = 0.7
+            rate = 1700
+            alpha = 0.05
+            structural_rate = 5200
+            0.7 * 1700 --> 1190 mw para el intercambio
+            1190 / 0.05 --> 23.800 MW en la frontera en N
+            23.800 >>>> 5200 --> esta linea no puede ser declarada como limitante en la NTC en N.
+           """
+        monitored &= ntc_load_rule * branch_data_t.rates[active] / (alpha[active] + 1e-20) <= structural_ntc
+
+    # Monitoring logic: Exclude branches with not enough sensibility to exchange in N condition
+    if monitor_only_sensitive_branches:
+        monitored &= alpha[active] > alpha_threshold
+
+    # add the flow constraints of the monitored branches as two matrix blocks:
+    # -rate <= flow + slack_pos - slack_neg <= rate
+    mon = active[monitored]
+    if len(mon):
+        branch_vars.flow_slacks_pos[t_idx, mon] = prob.add_vars(size=len(mon), lb=0, ub=inf,
+                                                                name=join("flow_slack_pos_", [t_idx]), labels=mon)
+        branch_vars.flow_slacks_neg[t_idx, mon] = prob.add_vars(size=len(mon), lb=0, ub=inf,
+                                                                name=join("flow_slack_neg_", [t_idx]), labels=mon)
+
+        n_mon = len(mon)
+        I_mon = sp.identity(n_mon, format='csc')
+        terms = [(I_mon, branch_vars.flows[t_idx, mon]),
+                 (I_mon, branch_vars.flow_slacks_pos[t_idx, mon]),
+                 (-I_mon, branch_vars.flow_slacks_neg[t_idx, mon])]
+        rates = branch_data_t.rates[mon] / Sbase
+
+        # add upper rate constraint
+        branch_vars.flow_constraints_ub[t_idx, mon] = prob.add_matrix_cst(
+            terms=terms,
+            lb=np.full(n_mon, -inf),
+            ub=rates,
+            name=join("br_flow_upper_lim_", [t_idx]) + "_",
+            row_labels=mon)
+
+        # add lower rate constraint
+        branch_vars.flow_constraints_lb[t_idx, mon] = prob.add_matrix_cst(
+            terms=terms,
+            lb=-rates,
+            ub=np.full(n_mon, inf),
+            name=join("br_flow_lower_lim_", [t_idx]) + "_",
+            row_labels=mon)
+
+        # add to the objective function
+        f_obj += prob.sum(branch_data_t.overload_cost[mon] * branch_vars.flow_slacks_pos[t_idx, mon])
+        f_obj += prob.sum(branch_data_t.overload_cost[mon] * branch_vars.flow_slacks_neg[t_idx, mon])
 
     return f_obj
 
@@ -815,62 +812,75 @@ def add_linear_branches_contingencies_formulation(t_idx: int,
         contingency_flows = contingency.get_lp_contingency_flows(base_flow=branch_vars.flows[t_idx, :],
                                                                  injections=bus_vars.Pcalc[t_idx, :])
 
-        for m, contingency_flow in enumerate(contingency_flows):
-            if isinstance(contingency_flow, LpExp):
-
-                # Monitoring logic: Avoid unrealistic ntc flows over CEP rule limit in N-1 condition
-                # if monitor_only_ntc_load_rule_branches:
-                #     """
-                #     Calculo el porcentaje del ratio de la línea que se reserva al intercambio según la regla de ACER,
-                #     y paso dicho valor a la frontera, y si el valor es mayor que el máximo intercambio estructural
-                #     significa que la linea no puede limitar el intercambio
-                #     Ejemplo:
-                #         ntc_load_rule = 0.7
-                #         rate = 1700
-                #         alpha_n1 = 0.05
-                #         structural_rate = 5200
-                #         0.7 * 1700 --> 1190 mw para el intercambio
-                #         1190 / 0.05 --> 23.800 MW en la frontera en N
-                #         23.800 >>>> 5200 --> esta linea no puede ser declarada como limitante en la NTC en N.
-                #        """
-                #     monitor_by_load_rule_n1 = ntc_load_rule * branch_data_t.rates[m] / (alpha_n1[m, c] + 1e-20) <= structural_ntc
-                # else:
-                #     monitor_by_load_rule_n1 = True
-                #
-                # # Monitoring logic: Exclude branches with not enough sensibility to exchange in N-1 condition
-                # if monitor_only_sensitive_branches:
-                #     monitor_by_sensitivity_n1 = alpha_n1[m, c] > alpha_threshold
-                # else:
-                #     monitor_by_sensitivity_n1 = True
-
-                # TODO: Figure out how to compute Alpha N-1 to be able to uncomment the block above
-                monitor_by_load_rule_n1 = True
-                monitor_by_sensitivity_n1 = True
-
-                if monitor_by_load_rule_n1 and monitor_by_sensitivity_n1:
-                    # declare slack variables
-                    pos_slack = prob.add_var(0, 1e20, join("br_cst_flow_pos_sl_", [t_idx, m, c]))
-                    neg_slack = prob.add_var(0, 1e20, join("br_cst_flow_neg_sl_", [t_idx, m, c]))
-
-                    # register the contingency data to evaluate the result at the end
-                    branch_vars.add_contingency_flow(t=t_idx, m=m, c=c,
-                                                     flow_var=contingency_flow,
-                                                     neg_slack=neg_slack,
-                                                     pos_slack=pos_slack)
-
-                    # add upper rate constraint
-                    prob.add_cst(
-                        cst=contingency_flow + pos_slack - neg_slack <= branch_data_t.rates[m] / Sbase,
-                        name=join("br_cst_flow_upper_lim_", [t_idx, m, c])
-                    )
-
-                    # add lower rate constraint
-                    prob.add_cst(
-                        cst=contingency_flow + pos_slack - neg_slack >= -branch_data_t.rates[m] / Sbase,
-                        name=join("br_cst_flow_lower_lim_", [t_idx, m, c])
-                    )
-
-                    f_obj += pos_slack + neg_slack
+        # Monitoring logic: Avoid unrealistic ntc flows over CEP rule limit in N-1 condition
+        # if monitor_only_ntc_load_rule_branches:
+        #     """
+        #     Calculo el porcentaje del ratio de la línea que se reserva al intercambio según la regla de ACER,
+        #     y paso dicho valor a la frontera, y si el valor es mayor que el máximo intercambio estructural
+        #     significa que la linea no puede limitar el intercambio
+        #     Ejemplo:
+        #         ntc_load_rule = 0.7
+        #         rate = 1700
+        #         alpha_n1 = 0.05
+        #         structural_rate = 5200
+        #         0.7 * 1700 --> 1190 mw para el intercambio
+        #         1190 / 0.05 --> 23.800 MW en la frontera en N
+        #         23.800 >>>> 5200 --> esta linea no puede ser declarada como limitante en la NTC en N.
+        #        """
+        #     monitor_by_load_rule_n1 = ntc_load_rule * branch_data_t.rates / (alpha_n1[:, c] + 1e-20) <= structural_ntc
+        # else:
+        #     monitor_by_load_rule_n1 = True
+        #
+        # # Monitoring logic: Exclude branches with not enough sensibility to exchange in N-1 condition
+        # if monitor_only_sensitive_branches:
+        #     monitor_by_sensitivity_n1 = alpha_n1[:, c] > alpha_threshold
+        # else:
+        #     monitor_by_sensitivity_n1 = True
+
+        # TODO: Figure out how to compute Alpha N-1 to be able to uncomment the block above
+        # only the branches whose contingency flow is not 0 are constrained
+        mon = np.where(np.fromiter((isinstance(x, LpExp) for x in contingency_flows),
+                                   dtype=bool, count=len(contingency_flows)))[0]
+        if len(mon) == 0:
+            continue
+
+        # declare slack variables
+        labels = [f"{m}_{c}" for m in mon]
+        pos_slack = prob.add_vars(size=len(mon), lb=0, ub=1e20,
+                                  name=join("br_cst_flow_pos_sl_", [t_idx]), labels=labels)
+        neg_slack = prob.add_vars(size=len(mon), lb=0, ub=1e20,
+                                  name=join("br_cst_flow_neg_sl_", [t_idx]), labels=labels)
+
+        # register the contingency data to evaluate the result at the end
+        for k, m in enumerate(mon):
+            branch_vars.add_contingency_flow(t=t_idx, m=m, c=c,
+                                             flow_var=contingency_flows[m],
+                                             neg_slack=neg_slack[k],
+                                             pos_slack=pos_slack[k])
+
+        # -rate <= contingency_flow + pos_slack - neg_slack <= rate as two matrix blocks
+        n_mon = len(mon)
+        I_mon = sp.identity(n_mon, format='csc')
+        terms = [(I_mon, contingency_flows[mon]),
+                 (I_mon, np.array(pos_slack, dtype=object)),
+                 (-I_mon, np.array(neg_slack, dtype=object))]
+        rates = branch_data_t.rates[mon] / Sbase
+
+        # add upper rate constraint
+        prob.add_matrix_cst(terms=terms,
+                            lb=np.full(n_mon, -1e20),
+                            ub=rates,
+                            name=join("br_cst_flow_upper_lim_", [t_idx]) + "_",
+                            row_labels=labels)
+
+        # add lower rate constraint
+        prob.add_matrix_cst(terms=terms,
+                            lb=-rates,
+                            ub=np.full(n_mon, 1e20),
+                            name=join("br_cst_flow_lower_lim_", [t_idx]) + "_",
+                            row_labels=labels)
+
+        f_obj += prob.sum(pos_slack) + prob.sum(neg_slack)
 
     return f_obj
 
@@ -972,16 +982,13 @@ def add_linear_node_balance(t_idx: int,
     """
     B = Bbus.tocsc()
 
-    P_esp = bus_vars.Pcalc[t_idx, :]
-
-    # calculate the linear nodal inyection
-    P_calc = lpDot(B, bus_vars.theta[t_idx, :])
-
-    # add the equality restrictions
-    for k in range(bus_data.nbus):
-        bus_vars.kirchhoff[t_idx, k] = prob.add_cst(
-            cst=P_calc[k] == P_esp[k],
-            name=join("kirchoff_", [t_idx, k], "_"))
+    # add the equality restrictions B·theta - P_esp = 0 as a single matrix block
+    bus_vars.kirchhoff[t_idx, :] = prob.add_matrix_cst(
+        terms=[(B, bus_vars.theta[t_idx, :]),
+               (-sp.identity(bus_data.nbus, format='csc'), bus_vars.Pcalc[t_idx, :])],
+        lb=np.zeros(bus_data.nbus),
+        ub=np.zeros(bus_data.nbus),
+        name=join("kirchoff_", [t_idx], "_") + "_")
 
     for i in vd:
         set_var_bounds(var=bus_vars.theta[t_idx, i], lb=0.0, ub=0.0)
@@ -994,7 +1001,9 @@ def run_linear_ntc_opf_ts(grid: MultiCircuit,
                           skip_generation_limits: bool = False,
                           consider_contingencies: bool = False,
                           alpha_threshold: float = 0.001,
+                          ptdf_threshold: float = 0.001,
                           lodf_threshold: float = 0.001,
+                          use_sparse_factors: bool = False,
                           buses_areas_1: IntVec = None,
                           buses_areas_2: IntVec = None,
                           transfer_method: AvailableTransferMode = AvailableTransferMode.InstalledPower,
@@ -1014,7 +1023,9 @@ def run_linear_ntc_opf_ts(grid: MultiCircuit,
     :param skip_generation_limits: Skip the generation limits?
     :param consider_contingencies: Consider the contingencies?
     :param alpha_threshold: threshold to consider the exchange sensitivity
+    :param ptdf_threshold: threshold to consider PTDF sensitivities
     :param lodf_threshold: threshold to consider LODF sensitivities
+    :param use_sparse_factors: use the PTDF and LODF thresholded as sparse matrices (SparseLinearFactors)
     :param buses_areas_1: array of bus indices in the area 1
     :param buses_areas_2: array of bus indices in the area 2
     :param transfer_method: AvailableTransferMode
@@ -1108,6 +1119,7 @@ def run_linear_ntc_opf_ts(grid: MultiCircuit,
 
             # declare the linear analysis
             ls = LinearAnalysis(numerical_circuit=nc, distributed_slack=False, correct_values=True)
+            factors = None
 
             # compute exchange sensitivities
             if monitor_only_sensitive_branches or monitor_only_ntc_load_rule_branches:
@@ -1115,17 +1127,20 @@ def run_linear_ntc_opf_ts(grid: MultiCircuit,
                 # TODO, these conditions are confusing and maybe conflicting with the consider_contingencies option
 
                 # compute the PTDF and LODF
-                ls.run()
-
-                alpha = compute_alpha(ptdf=ls.PTDF,
-                                      lodf=ls.LODF,
-                                      P0=nc.Sbus.real,
-                                      Pinstalled=nc.bus_installed_power,
-                                      Pgen=nc.generator_data.get_injections_per_bus().real,
-                                      Pload=nc.load_data.get_injections_per_bus().real,
-                                      idx1=buses_areas_1,
-                                      idx2=buses_areas_2,
-                                      mode=mode_2_int[transfer_method])
+                if use_sparse_factors:
+                    factors = ls.get_sparse_factors(ptdf_threshold=ptdf_threshold, lodf_threshold=lodf_threshold)
+                else:
+                    ls.run()
+                    factors = ls
+
+                alpha = get_alpha(ptdf=factors.PTDF,
+                                  P0=nc.Sbus.real,
+                                  Pinstalled=nc.bus_installed_power,
+                                  Pgen=nc.generator_data.get_injections_per_bus().real,
+                                  Pload=nc.load_data.get_injections_per_bus().real,
+                                  idx1=buses_areas_1,
+                                  idx2=buses_areas_2,
+                                  mode=mode_2_int[transfer_method])
             else:
                 alpha = None
 
@@ -1158,12 +1173,17 @@ def run_linear_ntc_opf_ts(grid: MultiCircuit,
 
             if consider_contingencies:
                 # if we want to include contingencies, we'll need the LODF at this time step
-                if ls.PTDF is None:
-                    ls.run()
+                if factors is None:
+                    if use_sparse_factors:
+                        factors = ls.get_sparse_factors(ptdf_threshold=ptdf_threshold, lodf_threshold=lodf_threshold)
+                    else:
+                        ls.run()
+                        factors = ls
 
                 # Compute the more generalistic contingency structures
                 mctg = LinearMultiContingencies(grid=grid)
-                mctg.compute(lodf=ls.LODF, ptdf=ls.PTDF, ptdf_threshold=lodf_threshold, lodf_threshold=lodf_threshold)
+                mctg.compute(lodf=factors.LODF, ptdf=factors.PTDF,
+                             ptdf_threshold=ptdf_threshold, lodf_threshold=lodf_threshold)
 
                 # formulate the contingencies
                 f_obj += add_linear_branches_contingencies_formulation(
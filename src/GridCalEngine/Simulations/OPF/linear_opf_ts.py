@@ -21,6 +21,7 @@ That means that solves the OPF problem for a complete time series at once
 """
 import numpy as np
 from typing import List, Union, Tuple, Callable
+import scipy.sparse as sp
 from scipy.sparse import csc_matrix
 
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
@@ -296,8 +297,6 @@ class BranchVars:
                 data.flow_slacks_pos[t, i] = model.get_value(self.flow_slacks_pos[t, i]) * Sbase
                 data.flow_slacks_neg[t, i] = model.get_value(self.flow_slacks_neg[t, i]) * Sbase
                 data.tap_angles[t, i] = model.get_value(self.tap_angles[t, i])
-                data.flow_constraints_ub[t, i] = model.get_value(self.flow_constraints_ub[t, i])
-                data.flow_constraints_lb[t, i] = model.get_value(self.flow_constraints_lb[t, i])
 
         for i in range(len(self.contingency_flow_data)):
             t, m, c, var, neg_slack, pos_slack = self.contingency_flow_data[i]
@@ -312,6 +311,13 @@ class BranchVars:
         data.flow_slacks_neg = data.flow_slacks_neg.astype(float, copy=False)
         data.tap_angles = data.tap_angles.astype(float, copy=False)
 
+        # the value of the rate constraints is the value of their expression (flow + slack_pos - slack_neg)
+        constrained_value = (data.flows + data.flow_slacks_pos - data.flow_slacks_neg) / Sbase
+        has_ub = np.vectorize(lambda x: not isinstance(x, (int, float)), otypes=[bool])(self.flow_constraints_ub)
+        has_lb = np.vectorize(lambda x: not isinstance(x, (int, float)), otypes=[bool])(self.flow_constraints_lb)
+        data.flow_constraints_ub[has_ub] = constrained_value[has_ub]
+        data.flow_constraints_lb[has_lb] = constrained_value[has_lb]
+
         # compute loading
         data.loading = data.flows / (data.rates + 1e-20)
 
@@ -1005,78 +1011,82 @@ def add_linear_branches_formulation(t: int,
     """
     f_obj = 0.0
 
-    # for each branch
-    for m in range(branch_data_t.nelm):
-        fr = branch_data_t.F[m]
-        to = branch_data_t.T[m]
+    # compute the branches susceptance (only the active ones participate in the flow equations)
+    with np.errstate(divide='ignore'):
+        bk = np.where(branch_data_t.X == 0.0,
+                      np.where(branch_data_t.R != 0.0, 1.0 / branch_data_t.R, 1e-20),
+                      1.0 / branch_data_t.X)
+    bk = bk * branch_data_t.active.astype(bool)
+    is_ps = branch_data_t.control_mode == TransformerControlType.Pf
 
-        # copy rates
-        branch_vars.rates[t, m] = branch_data_t.rates[m]
+    # copy rates
+    branch_vars.rates[t, :] = branch_data_t.rates
 
-        if branch_data_t.active[m]:
+    # declare the flow LPVars of the active branches
+    active = np.where(branch_data_t.active.astype(bool))[0]
+    branch_vars.flows[t, active] = prob.add_vars(size=len(active), lb=-inf, ub=inf,
+                                                 name=join("flow_", [t]), labels=active)
 
-            # declare the flow LPVar
-            branch_vars.flows[t, m] = prob.add_var(lb=-inf,
-                                                   ub=inf,
-                                                   name=join("flow_", [t, m], "_"))
+    # is a phase shifter device (like phase shifter transformer or VSC with P control)
+    for m in active[is_ps[active]]:
+        fr = branch_data_t.F[m]
+        to = branch_data_t.T[m]
 
-            # compute the branch susceptance
-            if branch_data_t.X[m] == 0.0:
-                if branch_data_t.R[m] != 0.0:
-                    bk = 1.0 / branch_data_t.R[m]
-                else:
-                    bk = 1e-20
-            else:
-                bk = 1.0 / branch_data_t.X[m]
-
-            # compute the flow
-            if branch_data_t.control_mode[m] == TransformerControlType.Pf:
-
-                # add angle
-                branch_vars.tap_angles[t, m] = prob.add_var(lb=branch_data_t.tap_angle_min[m],
-                                                            ub=branch_data_t.tap_angle_max[m],
-                                                            name=join("tap_ang_", [t, m], "_"))
-
-                # is a phase shifter device (like phase shifter transformer or VSC with P control)
-                flow_ctr = branch_vars.flows[t, m] == bk * (
-                        bus_vars.theta[t, fr] - bus_vars.theta[t, to] + branch_vars.tap_angles[t, m])
-                prob.add_cst(cst=flow_ctr, name=join("Branch_flow_set_with_ps_", [t, m], "_"))
-
-                # power injected and subtracted due to the phase shift
-                bus_vars.branch_injections[t, fr] = -bk * branch_vars.tap_angles[t, m]
-                bus_vars.branch_injections[t, to] = bk * branch_vars.tap_angles[t, m]
-
-            else:  # rest of the branches
-                # is a phase shifter device (like phase shifter transformer or VSC with P control)
-                flow_ctr = branch_vars.flows[t, m] == bk * (bus_vars.theta[t, fr] - bus_vars.theta[t, to])
-                prob.add_cst(cst=flow_ctr, name=join("Branch_flow_set_", [t, m], "_"))
-
-            # add the flow constraint if monitored
-            if branch_data_t.monitor_loading[m]:
-                branch_vars.flow_slacks_pos[t, m] = prob.add_var(0, inf,
-                                                                 name=join("flow_slack_pos_", [t, m], "_"))
-                branch_vars.flow_slacks_neg[t, m] = prob.add_var(0, inf,
-                                                                 name=join("flow_slack_neg_", [t, m], "_"))
-
-                # add upper rate constraint
-                branch_vars.flow_constraints_ub[t, m] = (branch_vars.flows[t, m] +
-                                                         branch_vars.flow_slacks_pos[t, m] -
-                                                         branch_vars.flow_slacks_neg[t, m]
-                                                         <= branch_data_t.rates[m] / Sbase)
-                prob.add_cst(cst=branch_vars.flow_constraints_ub[t, m],
-                             name=join("br_flow_upper_lim_", [t, m]))
-
-                # add lower rate constraint
-                branch_vars.flow_constraints_lb[t, m] = (branch_vars.flows[t, m] +
-                                                         branch_vars.flow_slacks_pos[t, m] -
-                                                         branch_vars.flow_slacks_neg[t, m]
-                                                         >= -branch_data_t.rates[m] / Sbase)
-                prob.add_cst(cst=branch_vars.flow_constraints_lb[t, m],
-                             name=join("br_flow_lower_lim_", [t, m]))
-
-                # add to the objective function
-                f_obj += branch_data_t.overload_cost[m] * branch_vars.flow_slacks_pos[t, m]
-                f_obj += branch_data_t.overload_cost[m] * branch_vars.flow_slacks_neg[t, m]
+        branch_vars.tap_angles[t, m] = prob.add_var(lb=branch_data_t.tap_angle_min[m],
+                                                    ub=branch_data_t.tap_angle_max[m],
+                                                    name=join("tap_ang_", [t, m], "_"))
+
+        # power injected and subtracted due to the phase shift
+        bus_vars.branch_injections[t, fr] = -bk[m] * branch_vars.tap_angles[t, m]
+        bus_vars.branch_injections[t, to] = bk[m] * branch_vars.tap_angles[t, m]
+
+    # add the flow constraints of the monitored branches as two matrix blocks:
+    # -rate <= flow + slack_pos - slack_neg <= rate
+    mon = active[branch_data_t.monitor_loading[active].astype(bool)]
+    if len(mon):
+        branch_vars.flow_slacks_pos[t, mon] = prob.add_vars(size=len(mon), lb=0, ub=inf,
+                                                            name=join("flow_slack_pos_", [t]), labels=mon)
+        branch_vars.flow_slacks_neg[t, mon] = prob.add_vars(size=len(mon), lb=0, ub=inf,
+                                                            name=join("flow_slack_neg_", [t]), labels=mon)
+
+        n_mon = len(mon)
+        I_mon = sp.identity(n_mon, format='csc')
+        terms = [(I_mon, branch_vars.flows[t, mon]),
+                 (I_mon, branch_vars.flow_slacks_pos[t, mon]),
+                 (-I_mon, branch_vars.flow_slacks_neg[t, mon])]
+        rates = branch_data_t.rates[mon] / Sbase
+
+        # add upper rate constraint
+        branch_vars.flow_constraints_ub[t, mon] = prob.add_matrix_cst(terms=terms,
+                                                                      lb=np.full(n_mon, -inf),
+                                                                      ub=rates,
+                                                                      name=join("br_flow_upper_lim_", [t]) + "_",
+                                                                      row_labels=mon)
+
+        # add lower rate constraint
+        branch_vars.flow_constraints_lb[t, mon] = prob.add_matrix_cst(terms=terms,
+                                                                      lb=-rates,
+                                                                      ub=np.full(n_mon, inf),
+                                                                      name=join("br_flow_lower_lim_", [t]) + "_",
+                                                                      row_labels=mon)
+
+        # add to the objective function
+        f_obj += prob.sum(branch_data_t.overload_cost[mon] * branch_vars.flow_slacks_pos[t, mon])
+        f_obj += prob.sum(branch_data_t.overload_cost[mon] * branch_vars.flow_slacks_neg[t, mon])
+
+    # add the flow definitions as one matrix block:
+    # flow - bk·(theta_f - theta_t) - bk·tap_angle = 0
+    nbr = branch_data_t.nelm
+    nbus = bus_vars.theta.shape[1]
+    br_idx = np.arange(nbr)
+    A_theta = sp.csc_matrix((np.r_[-bk, bk], (np.r_[br_idx, br_idx], np.r_[branch_data_t.F, branch_data_t.T])),
+                            shape=(nbr, nbus))
+    prob.add_matrix_cst(terms=[(sp.identity(nbr, format='csc'), branch_vars.flows[t, :]),
+                               (A_theta, bus_vars.theta[t, :]),
+                               (sp.diags(-bk * is_ps, format='csc'), branch_vars.tap_angles[t, :])],
+                        lb=np.zeros(nbr),
+                        ub=np.zeros(nbr),
+                        name=join("Branch_flow_set_", [t], "_") + "_")
 
     return f_obj
 
@@ -1106,33 +1116,49 @@ def add_linear_branches_contingencies_formulation(t_idx: int,
         contingency_flows = contingency.get_lp_contingency_flows(base_flow=branch_vars.flows[t_idx, :],
                                                                  injections=bus_vars.Pcalc[t_idx, :])
 
-        for m, contingency_flow in enumerate(contingency_flows):
-
-            if isinstance(contingency_flow, LpExp):  # if the contingency is not 0
-
-                # declare slack variables
-                pos_slack = prob.add_var(0, 1e20, join("br_cst_flow_pos_sl_", [t_idx, m, c]))
-                neg_slack = prob.add_var(0, 1e20, join("br_cst_flow_neg_sl_", [t_idx, m, c]))
-
-                # register the contingency data to evaluate the result at the end
-                branch_vars.add_contingency_flow(t=t_idx, m=m, c=c,
-                                                 flow_var=contingency_flow,
-                                                 neg_slack=neg_slack,
-                                                 pos_slack=pos_slack)
-
-                # add upper rate constraint
-                prob.add_cst(
-                    cst=contingency_flow + pos_slack - neg_slack <= branch_data_t.rates[m] / Sbase,
-                    name=join("br_cst_flow_upper_lim_", [t_idx, m, c])
-                )
-
-                # add lower rate constraint
-                prob.add_cst(
-                    cst=contingency_flow + pos_slack - neg_slack >= -branch_data_t.rates[m] / Sbase,
-                    name=join("br_cst_flow_lower_lim_", [t_idx, m, c])
-                )
-
-                f_obj += pos_slack + neg_slack
+        # only the branches whose contingency flow is not 0 are constrained
+        mon = np.where(np.fromiter((isinstance(x, LpExp) for x in contingency_flows),
+                                   dtype=bool, count=len(contingency_flows)))[0]
+        if len(mon) == 0:
+            continue
+
+        # declare slack variables
+        labels = [f"{m}_{c}" for m in mon]
+        pos_slack = prob.add_vars(size=len(mon), lb=0, ub=1e20,
+                                  name=join("br_cst_flow_pos_sl_", [t_idx]), labels=labels)
+        neg_slack = prob.add_vars(size=len(mon), lb=0, ub=1e20,
+                                  name=join("br_cst_flow_neg_sl_", [t_idx]), labels=labels)
+
+        # register the contingency data to evaluate the result at the end
+        for k, m in enumerate(mon):
+            branch_vars.add_contingency_flow(t=t_idx, m=m, c=c,
+                                             flow_var=contingency_flows[m],
+                                             neg_slack=neg_slack[k],
+                                             pos_slack=pos_slack[k])
+
+        # -rate <= contingency_flow + pos_slack - neg_slack <= rate as two matrix blocks
+        n_mon = len(mon)
+        I_mon = sp.identity(n_mon, format='csc')
+        terms = [(I_mon, contingency_flows[mon]),
+                 (I_mon, np.array(pos_slack, dtype=object)),
+                 (-I_mon, np.array(neg_slack, dtype=object))]
+        rates = branch_data_t.rates[mon] / Sbase
+
+        # add upper rate constraint
+        prob.add_matrix_cst(terms=terms,
+                            lb=np.full(n_mon, -1e20),
+                            ub=rates,
+                            name=join("br_cst_flow_upper_lim_", [t_idx]) + "_",
+                            row_labels=labels)
+
+        # add lower rate constraint
+        prob.add_matrix_cst(terms=terms,
+                            lb=-rates,
+                            ub=np.full(n_mon, 1e20),
+                            name=join("br_cst_flow_lower_lim_", [t_idx]) + "_",
+                            row_labels=labels)
+
+        f_obj += prob.sum(pos_slack) + prob.sum(neg_slack)
 
     return f_obj
 
@@ -1241,31 +1267,53 @@ def add_linear_node_balance(t_idx: int,
     """
     B = Bbus.tocsc()
 
-    P_esp = bus_vars.branch_injections[t_idx, :]
-    P_esp += lpDot(generator_data.C_bus_elm.tocsc(),
-                   gen_vars.p[t_idx, :] - gen_vars.shedding[t_idx, :])
-    P_esp += lpDot(battery_data.C_bus_elm.tocsc(),
-                   batt_vars.p[t_idx, :] - batt_vars.shedding[t_idx, :])
-    P_esp += lpDot(load_data.C_bus_elm.tocsc(),
-                   load_vars.shedding[t_idx, :] - load_vars.p[t_idx, :])
+    # buses without any susceptance connection are isolated
+    isolated = np.diff(B.tocsr().indptr) == 0
+    bus_idx = np.where(~isolated)[0]
+
+    # B·theta - Cgen·(p - shedding) - Cbatt·(p - shedding) - Cload·(shedding - p) - branch_injections = 0
+    # is added as a single matrix block; the load values are numeric and go to the bounds
+    Cgen = generator_data.C_bus_elm.tocsc()
+    Cbatt = battery_data.C_bus_elm.tocsc()
+    Cload = load_data.C_bus_elm.tocsc()
+    Ibus = sp.identity(bus_data.nbus, format='csc')
+    cst = prob.add_matrix_cst(terms=[(B[bus_idx, :], bus_vars.theta[t_idx, :]),
+                                     (-Cgen[bus_idx, :], gen_vars.p[t_idx, :]),
+                                     (Cgen[bus_idx, :], gen_vars.shedding[t_idx, :]),
+                                     (-Cbatt[bus_idx, :], batt_vars.p[t_idx, :]),
+                                     (Cbatt[bus_idx, :], batt_vars.shedding[t_idx, :]),
+                                     (-Cload[bus_idx, :], load_vars.shedding[t_idx, :]),
+                                     (Cload[bus_idx, :], load_vars.p[t_idx, :]),
+                                     (-Ibus[bus_idx, :], bus_vars.branch_injections[t_idx, :])],
+                              lb=np.zeros(len(bus_idx)),
+                              ub=np.zeros(len(bus_idx)),
+                              name=join("kirchoff_", [t_idx], "_") + "_",
+                              row_labels=bus_idx)
+    bus_vars.kirchhoff[t_idx, bus_idx] = cst
+
+    # the branch injections result holds the complete specified power
+    # P_esp = branch_injections + Cgen·(p - shedding) + Cbatt·(p - shedding) + Cload·(shedding - p)
+    bus_vars.branch_injections[t_idx, :] = prob.matrix_expressions(
+        terms=[(Ibus, bus_vars.branch_injections[t_idx, :]),
+               (Cgen, gen_vars.p[t_idx, :]),
+               (-Cgen, gen_vars.shedding[t_idx, :]),
+               (Cbatt, batt_vars.p[t_idx, :]),
+               (-Cbatt, batt_vars.shedding[t_idx, :]),
+               (Cload, load_vars.shedding[t_idx, :]),
+               (-Cload, load_vars.p[t_idx, :])],
+        n_rows=bus_data.nbus
+    )
 
     # calculate the linear nodal injection
-    bus_vars.Pcalc[t_idx, :] = lpDot(B, bus_vars.theta[t_idx, :])
-
-    # add the equality restrictions
-    for k in range(bus_data.nbus):
-        if isinstance(bus_vars.Pcalc[t_idx, k], (int, float)):
-            bus_vars.kirchhoff[t_idx, k] = prob.add_cst(
-                cst=bus_vars.theta[t_idx, k] == 0,
-                name=join("island_bus_", [t_idx, k], "_")
-            )
-            logger.add_warning("bus isolated",
-                               device=bus_data.names[k] + f'@t={t_idx}')
-        else:
-            bus_vars.kirchhoff[t_idx, k] = prob.add_cst(
-                cst=bus_vars.Pcalc[t_idx, k] == P_esp[k],
-                name=join("kirchoff_", [t_idx, k], "_")
-            )
+    bus_vars.Pcalc[t_idx, :] = prob.dot(B, bus_vars.theta[t_idx, :])
+
+    for k in np.where(isolated)[0]:
+        bus_vars.kirchhoff[t_idx, k] = prob.add_cst(
+            cst=bus_vars.theta[t_idx, k] == 0,
+            name=join("island_bus_", [t_idx, k], "_")
+        )
+        logger.add_warning("bus isolated",
+                           device=bus_data.names[k] + f'@t={t_idx}')
 
     for i in vd:
         set_var_bounds(var=bus_vars.theta[t_idx, i], lb=0.0, ub=0.0)
@@ -18,6 +18,7 @@ from GridCalEngine.Simulations.PowerFlow.NumericalMethods.fast_decoupled import
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.iwamoto_newton_raphson import IwamotoNR
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.levenberg_marquardt import levenberg_marquardt_pf
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.newton_raphson import NR_LS
+from GridCalEngine.Simulations.PowerFlow.NumericalMethods.newton_raphson_batch import NR_LS_batch
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.newton_raphson_current import NR_I_LS
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.newton_raphson_ode import ContinuousNR
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.gauss_power_flow import gausspf
@@ -18,14 +18,13 @@
 import time
 import scipy
 import numpy as np
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.ac_jacobian import AC_jacobian
 import GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions as cf
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
 from GridCalEngine.enumerations import ReactivePowerControlMode
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.discrete_controls import control_q_inside_method
 
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 scipy.ALLOW_THREADS = True
 np.set_printoptions(precision=8, suppress=True, linewidth=320)
@@ -66,7 +65,8 @@ def mu(Ybus, J, incS, dV, dx, pvpq, pq):
 
 
 def IwamotoNR(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=15,
-              control_q=ReactivePowerControlMode.NoControl, robust=False) -> NumericPowerFlowResults:
+              control_q=ReactivePowerControlMode.NoControl, robust=False,
+              lin_solver: SparseLinearSolver = None) -> NumericPowerFlowResults:
     """
     Solves the power flow using a full Newton's method with the Iwamoto optimal step factor.
     :param Ybus: Admittance matrix
@@ -82,10 +82,14 @@ def IwamotoNR(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=15,
     :param max_it: Maximum number of iterations
     :param control_q: ReactivePowerControlMode
     :param robust: use of the Iwamoto optimal step factor?.
+    :param lin_solver: (optional) SparseLinearSolver to reuse the symbolic factorization, if None a new one is used
     :return: Voltage solution, converged?, error, calculated power Injections
     """
     start = time.time()
 
+    if lin_solver is None:
+        lin_solver = SparseLinearSolver()
+
     # initialize
     converged = 0
     iter_ = 0
@@ -124,7 +128,7 @@ def IwamotoNR(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=15,
 
             # compute update step
             try:
-                dx = linear_solver(J, f)
+                dx = lin_solver(J, f)
             except:
                 print(J)
                 converged = False
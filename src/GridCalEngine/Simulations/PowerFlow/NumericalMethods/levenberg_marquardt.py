@@ -19,7 +19,7 @@ import time
 import scipy
 import numpy as np
 import scipy.sparse as sp
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.ac_jacobian import AC_jacobian
 import GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions as cf
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
@@ -27,7 +27,6 @@ from GridCalEngine.enumerations import ReactivePowerControlMode
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.discrete_controls import control_q_inside_method
 from GridCalEngine.basic_structures import Logger
 
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 scipy.ALLOW_THREADS = True
 np.set_printoptions(precision=8, suppress=True, linewidth=320)
@@ -35,7 +34,8 @@ np.set_printoptions(precision=8, suppress=True, linewidth=320)
 
 def levenberg_marquardt_pf(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=50,
                            control_q=ReactivePowerControlMode.NoControl,
-                           verbose=False, logger: Logger = None) -> NumericPowerFlowResults:
+                           verbose=False, logger: Logger = None,
+                           lin_solver: SparseLinearSolver = None) -> NumericPowerFlowResults:
     """
     Solves the power flow problem by the Levenberg-Marquardt power flow algorithm.
     It is usually better than Newton-Raphson, but it takes an order of magnitude more time to converge.
@@ -54,10 +54,14 @@ def levenberg_marquardt_pf(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_
     :param control_q: Type of reactive power control
     :param verbose: Display console information
     :param logger: Logger instance
+    :param lin_solver: (optional) SparseLinearSolver to reuse the symbolic factorization, if None a new one is used
     :return: NumericPowerFlowResults instance
     """
     start = time.time()
 
+    if lin_solver is None:
+        lin_solver = SparseLinearSolver()
+
     # initialize
     V = V0
     Va = np.angle(V)
@@ -130,7 +134,7 @@ def levenberg_marquardt_pf(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_
             rhs = Ht.dot(dz)
 
             # Solve the increment
-            dx = linear_solver(A, rhs)
+            dx = lin_solver(A, rhs)
 
             # objective function to minimize
             f = 0.5 * dz.dot(dz)
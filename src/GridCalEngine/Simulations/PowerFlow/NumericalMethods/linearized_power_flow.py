@@ -20,11 +20,10 @@ import time
 import scipy.sparse as sp
 import numpy as np
 
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
 import GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions as cf
 from GridCalEngine.basic_structures import CxVec, Vec, IntVec
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 
 
@@ -70,7 +69,7 @@ def dcpf(Ybus: sp.csc_matrix, Bpqpv: sp.csc_matrix, Bref: sp.csc_matrix, Bf: sp.
         Pinj = Sbus[pvpq].real - (Bref @ Va_ref) * Vm[pvpq] + Pps[pvpq]  # TODO: add G from shunts
 
         # update angles for non-reference buses
-        Va[pvpq] = linear_solver(Bpqpv, Pinj)
+        Va[pvpq] = SparseLinearSolver().factorize(Bpqpv).solve(Pinj)
         Va[vd] = Va_ref
 
         # re assemble the voltage
@@ -143,7 +142,7 @@ def lacpf(Ybus, Ys, S0: CxVec, I0: CxVec, V0: CxVec, pq: IntVec, pv: IntVec) ->
 
         # solve the linear system
         try:
-            x = linear_solver(Asys, rhs)
+            x = SparseLinearSolver().factorize(Asys).solve(rhs)
         except Exception as e:
             V = V0
             # Calculate the error and check the convergence
@@ -18,7 +18,7 @@
 import time
 import scipy
 import numpy as np
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.ac_jacobian import AC_jacobian
 import GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions as cf
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
@@ -26,7 +26,6 @@ from GridCalEngine.enumerations import ReactivePowerControlMode
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.discrete_controls import control_q_inside_method
 from GridCalEngine.basic_structures import Logger
 
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 scipy.ALLOW_THREADS = True
 np.set_printoptions(precision=8, suppress=True, linewidth=320)
@@ -34,7 +33,8 @@ np.set_printoptions(precision=8, suppress=True, linewidth=320)
 
 def NR_LS(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=15, mu_0=1.0,
           acceleration_parameter=0.05, control_q=ReactivePowerControlMode.NoControl,
-          verbose=False, logger: Logger = None) -> NumericPowerFlowResults:
+          verbose=False, logger: Logger = None,
+          lin_solver: SparseLinearSolver = None) -> NumericPowerFlowResults:
     """
     Solves the power flow using a full Newton's method with backtracking correction.
     @Author: Santiago Peñate-Vera
@@ -54,10 +54,14 @@ def NR_LS(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=15, mu_0=1.0,
     :param control_q: Control reactive power
     :param verbose: Display console information
     :param logger: Logger instance
+    :param lin_solver: (optional) SparseLinearSolver to reuse the symbolic factorization, if None a new one is used
     :return: NumericPowerFlowResults instance
     """
     start = time.time()
 
+    if lin_solver is None:
+        lin_solver = SparseLinearSolver()
+
     # initialize
     iteration = 0
     V = V0
@@ -97,7 +101,7 @@ def NR_LS(Ybus, S0, V0, I0, Y0, pv_, pq_, Qmin, Qmax, tol, max_it=15, mu_0=1.0,
 
             # compute update step
             try:
-                dx = linear_solver(J, f)
+                dx = lin_solver(J, f)
 
                 if np.isnan(dx).any():
                     end = time.time()
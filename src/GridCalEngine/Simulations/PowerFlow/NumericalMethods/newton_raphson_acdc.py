@@ -28,7 +28,7 @@ from GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions impor
                                                                                    compute_converter_losses,
                                                                                    compute_power, compute_zip_power)
 from GridCalEngine.basic_structures import CxVec
-from GridCalEngine.enumerations import ReactivePowerControlMode
+from GridCalEngine.enumerations import ReactivePowerControlMode, SparseSolver
 import GridCalEngine.Utils.NumericalMethods.sparse_solve as gcsp
 
 
@@ -42,7 +42,8 @@ def NR_LS_ACDC(nc: NumericalCircuit,
                mu_0=1.0,
                acceleration_parameter=0.05,
                verbose=False,
-               control_q=ReactivePowerControlMode.NoControl) -> NumericPowerFlowResults:
+               control_q=ReactivePowerControlMode.NoControl,
+               lin_solver: gcsp.SparseLinearSolver = None) -> NumericPowerFlowResults:
     """
     Newton-Raphson Line search with the FUBM formulation
     :param nc: NumericalCircuit
@@ -56,10 +57,14 @@ def NR_LS_ACDC(nc: NumericalCircuit,
     :param acceleration_parameter: Acceleration parameter (rate to decrease mu)
     :param verbose: Verbose?
     :param control_q: Reactive power control mode
+    :param lin_solver: (optional) SparseLinearSolver to reuse the symbolic factorization, if None a new one is used
     :return: NumericPowerFlowResults
     """
     start = time.time()
 
+    if lin_solver is None:
+        lin_solver = gcsp.SparseLinearSolver(solver_type=SparseSolver.SuperLU)
+
     # initialize the variables
     nb = nc.nbus
     nl = nc.nbr
@@ -181,7 +186,7 @@ def NR_LS_ACDC(nc: NumericalCircuit,
                           F, T, Ys, k2, tap, m, Bc, Beq, Kdp, V, Ybus, Yf, Yt, Cf, Ct, pvpq, pq)
 
         # solve the linear system
-        dx = gcsp.super_lu_linsolver(J, -fx)
+        dx = lin_solver(J, -fx)
 
         if not np.isnan(dx).any():  # check if the solution worked
 
@@ -0,0 +1,357 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import copy
+import time
+from typing import List, Union
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csc_matrix
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import SparseLinearSolver
+from GridCalEngine.basic_structures import Vec, IntVec, BoolVec, CxVec, Mat, CxMat
+
+
+class NumericPowerFlowBatchResults:
+    """
+    NumericPowerFlowBatchResults, used to return the values of the batched numerical methods.
+    The arrays are stacked by rows: (scenario, bus)
+    """
+
+    def __init__(self,
+                 V: CxMat,
+                 Scalc: CxMat,
+                 converged: BoolVec,
+                 norm_f: Vec,
+                 iterations: IntVec,
+                 n_factorizations: int = 0,
+                 elapsed: float = 0.0):
+        """
+        Object to store the results returned by a batched numeric power flow routine
+        :param V: Voltage matrix (scenario, bus)
+        :param Scalc: Calculated power matrix (scenario, bus)
+        :param converged: converged? per scenario
+        :param norm_f: error per scenario
+        :param iterations: number of iterations per scenario
+        :param n_factorizations: number of Jacobian factorizations used by all the scenarios
+        :param elapsed: time elapsed
+        """
+        self.V = V
+        self.Scalc = Scalc
+        self.converged = converged
+        self.norm_f = norm_f
+        self.iterations = iterations
+        self.n_factorizations = n_factorizations
+        self.elapsed = elapsed
+
+
+class JacobianPattern:
+    """
+    Sparsity pattern of the power flow Jacobian of an admittance matrix and a set of bus types.
+    J = [[dP/dVa(pvpq, pvpq), dP/dVm(pvpq, pq)],
+         [dQ/dVa(pq, pvpq),   dQ/dVm(pq, pq)]]
+    The pattern is computed once, and then the values of many voltage vectors
+    are assembled at once with the gather indices of the admittance entries
+    """
+
+    def __init__(self, Ybus: csc_matrix, pvpq: IntVec, pq: IntVec):
+        """
+        Constructor
+        :param Ybus: Admittance matrix
+        :param pvpq: array of pv and pq bus indices
+        :param pq: array of pq bus indices
+        """
+        n = Ybus.shape[0]
+        npvpq = len(pvpq)
+        npq = len(pq)
+        self.Ybus = Ybus
+
+        # the diagonal entries are needed even if they are zero
+        Y = (Ybus.tocoo() + sp.coo_matrix((np.zeros(n), (np.arange(n), np.arange(n))), shape=(n, n))).tocoo()
+        Y.sum_duplicates()
+        self.y_rows = Y.row
+        self.y_cols = Y.col
+        self.y_data = Y.data
+        self.y_diag = np.where(Y.row == Y.col)[0]
+
+        pvpq_lookup = np.full(n, -1, dtype=int)
+        pvpq_lookup[pvpq] = np.arange(npvpq)
+        pq_lookup = np.full(n, -1, dtype=int)
+        pq_lookup[pq] = np.arange(npq)
+
+        r_pvpq = pvpq_lookup[Y.row]
+        c_pvpq = pvpq_lookup[Y.col]
+        r_pq = pq_lookup[Y.row]
+        c_pq = pq_lookup[Y.col]
+
+        # entries of each block: (admittance entry index, Jacobian row, Jacobian column)
+        e11 = np.where((r_pvpq >= 0) & (c_pvpq >= 0))[0]
+        e12 = np.where((r_pvpq >= 0) & (c_pq >= 0))[0]
+        e21 = np.where((r_pq >= 0) & (c_pvpq >= 0))[0]
+        e22 = np.where((r_pq >= 0) & (c_pq >= 0))[0]
+
+        self.e11, self.e12, self.e21, self.e22 = e11, e12, e21, e22
+        self.n11, self.n12, self.n21 = len(e11), len(e12), len(e21)
+
+        rows = np.r_[r_pvpq[e11], r_pvpq[e12], npvpq + r_pq[e21], npvpq + r_pq[e22]]
+        cols = np.r_[c_pvpq[e11], npvpq + c_pq[e12], c_pvpq[e21], npvpq + c_pq[e22]]
+        nnz = len(rows)
+
+        # pattern and the order of the values in the csc structure
+        J = sp.coo_matrix((np.arange(1, nnz + 1, dtype=float), (rows, cols)), shape=(npvpq + npq, npvpq + npq)).tocsc()
+        self.indptr = J.indptr
+        self.indices = J.indices
+        self.order = J.data.astype(int) - 1
+        self.shape = J.shape
+
+    @property
+    def nnz(self) -> int:
+        """
+        Number of non-zeros of the Jacobian
+        :return: int
+        """
+        return len(self.order)
+
+    def values(self, V: CxMat) -> Mat:
+        """
+        Compute the Jacobian values of several voltage vectors
+        :param V: Voltage matrix (scenario, bus)
+        :return: Jacobian values in csc order (scenario, non-zero)
+        """
+        Ibus = (self.Ybus @ V.T).T
+        Vnorm = V / np.abs(V)
+
+        Vi = V[:, self.y_rows]
+        # dS/dVm = diag(V) conj(Ybus diag(Vnorm)) + conj(diag(Ibus)) diag(Vnorm)
+        dVm = Vi * np.conj(self.y_data * Vnorm[:, self.y_cols])
+        # dS/dVa = 1j diag(V) conj(diag(Ibus) - Ybus diag(V))
+        dVa = -1j * Vi * np.conj(self.y_data * V[:, self.y_cols])
+
+        d = self.y_diag
+        di = self.y_rows[d]
+        dVm[:, d] += np.conj(Ibus[:, di]) * Vnorm[:, di]
+        dVa[:, d] += 1j * V[:, di] * np.conj(Ibus[:, di])
+
+        vals = np.r_['1',
+                     dVa[:, self.e11].real,
+                     dVm[:, self.e12].real,
+                     dVa[:, self.e21].imag,
+                     dVm[:, self.e22].imag]
+
+        return vals[:, self.order]
+
+    def get_matrix(self, data: Vec) -> csc_matrix:
+        """
+        Get a Jacobian matrix from its values
+        :param data: values in csc order
+        :return: csc matrix
+        """
+        return csc_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+
+def compute_fx_batch(V: CxMat, S0: CxMat, I0: CxMat, Y0: CxMat, Ybus: csc_matrix,
+                     pvpq: IntVec, pq: IntVec):
+    """
+    Compute the NR-like error function of several scenarios
+    f = [∆P(pqpv), ∆Q(pq)]
+    :param V: Voltage matrix (scenario, bus)
+    :param S0: Base power matrix (scenario, bus)
+    :param I0: Base current matrix (scenario, bus)
+    :param Y0: Base admittance matrix (scenario, bus)
+    :param Ybus: Admittance matrix
+    :param pvpq: Array pf pq and pv node indices
+    :param pq: Array of pq node indices
+    :return: error matrix (scenario, equation), Scalc (scenario, bus)
+    """
+    Vm = np.abs(V)
+    Sbus = S0 + np.conj(I0 + Y0 * Vm) * Vm
+    Scalc = V * np.conj((Ybus @ V.T).T)
+    dS = Scalc - Sbus
+    return np.c_[dS[:, pvpq].real, dS[:, pq].imag], Scalc
+
+
+def NR_LS_batch(Ybus: csc_matrix,
+                S0: CxMat,
+                V0: Union[CxVec, CxMat],
+                I0: Union[CxVec, CxMat],
+                Y0: Union[CxVec, CxMat],
+                pv: IntVec,
+                pq: IntVec,
+                tol: float,
+                max_it: int = 15,
+                mu_0: float = 1.0,
+                acceleration_parameter: float = 0.05,
+                reuse_tol: float = 1e-2,
+                max_factorizations_kept: int = 16,
+                lin_solver: Union[SparseLinearSolver, None] = None) -> NumericPowerFlowBatchResults:
+    """
+    Solves several power flows that share the admittance matrix and the bus types
+    using Newton's method with backtracking correction.
+    All the scenarios advance at once: the mismatches and the Jacobian values are computed
+    for all of them with vectorized operations over a shared Jacobian sparsity pattern.
+    A Jacobian factorization is reused by the scenarios whose Jacobian is close to it
+    (relative difference under reuse_tol), in which case the step is a simplified Newton step.
+    If a reused factorization does not improve a scenario, the next step of that scenario uses its own Jacobian.
+    :param Ybus: Admittance matrix
+    :param S0: Matrix of nodal power Injections (scenario, bus)
+    :param V0: Nodal voltages, initial solution (common vector or matrix (scenario, bus))
+    :param I0: Nodal current Injections (common vector or matrix (scenario, bus))
+    :param Y0: Nodal admittance Injections (common vector or matrix (scenario, bus))
+    :param pv: Array with the indices of the PV buses
+    :param pq: Array with the indices of the PQ buses
+    :param tol: Tolerance
+    :param max_it: Maximum number of iterations
+    :param mu_0: initial acceleration value
+    :param acceleration_parameter: parameter used to correct the "bad" iterations, should be between 1e-3 ~ 0.5
+    :param reuse_tol: maximum relative difference between Jacobians to reuse a factorization (0 to never reuse)
+    :param max_factorizations_kept: maximum number of factorizations kept for reuse
+    :param lin_solver: (optional) SparseLinearSolver to take the symbolic factorization from
+    :return: NumericPowerFlowBatchResults instance
+    """
+    start = time.time()
+
+    nk, n = S0.shape
+    V = np.array(np.broadcast_to(V0, (nk, n)), dtype=complex)
+    I0 = np.broadcast_to(I0, (nk, n))
+    Y0 = np.broadcast_to(Y0, (nk, n))
+
+    pvpq = np.r_[pv, pq].astype(int)
+    npvpq = len(pvpq)
+
+    iterations = np.zeros(nk, dtype=int)
+    failed = np.zeros(nk, dtype=bool)
+    exact_next = np.zeros(nk, dtype=bool)
+
+    f, Scalc = compute_fx_batch(V, S0, I0, Y0, Ybus, pvpq, pq)
+    norm_f = np.max(np.abs(f), axis=1) if f.shape[1] else np.zeros(nk)
+    converged = norm_f < tol
+
+    if npvpq == 0:
+        return NumericPowerFlowBatchResults(V=V, Scalc=Scalc, converged=converged, norm_f=norm_f,
+                                            iterations=iterations, elapsed=time.time() - start)
+
+    pattern = JacobianPattern(Ybus=Ybus, pvpq=pvpq, pq=pq)
+
+    # factorizations available for reuse, all of them share the symbolic analysis
+    base_solver = SparseLinearSolver() if lin_solver is None else lin_solver
+    refs_data: List[Vec] = list()
+    refs_solver: List[SparseLinearSolver] = list()
+    n_factorizations = 0
+
+    Vm = np.abs(V)
+    Va = np.angle(V)
+    iteration = 0
+    active = ~converged
+
+    while active.any() and iteration < max_it:
+        iteration += 1
+        idx = np.where(active)[0]
+        iterations[idx] += 1
+
+        # Jacobian values of all the active scenarios
+        J_data = pattern.values(V[idx])
+
+        # assign a factorization to each scenario
+        assign = np.empty(len(idx), dtype=int)
+        exact = np.zeros(len(idx), dtype=bool)
+        for a, k in enumerate(idx):
+            r = -1
+            if len(refs_data) and reuse_tol > 0 and not exact_next[k]:
+                scale = np.max(np.abs(J_data[a])) + 1e-20
+                dist = np.max(np.abs(np.array(refs_data) - J_data[a]), axis=1) / scale
+                best = int(np.argmin(dist))
+                if dist[best] <= reuse_tol:
+                    r = best
+                    exact[a] = dist[best] == 0.0
+
+            if r == -1:
+                J = pattern.get_matrix(J_data[a])
+                solver = copy.copy(base_solver).factorize(J)
+                if not base_solver.same_pattern(J):
+                    # the next factorizations take the symbolic analysis from this one
+                    base_solver = solver
+                refs_data.append(J_data[a])
+                refs_solver.append(solver)
+                n_factorizations += 1
+                r = len(refs_data) - 1
+                exact[a] = True
+
+            assign[a] = r
+            exact_next[k] = False
+
+        # solve the scenarios that share a factorization at once
+        dx = np.empty((len(idx), pattern.shape[0]))
+        for r in np.unique(assign):
+            members = np.where(assign == r)[0]
+            dx[members, :] = refs_solver[r].solve(f[idx[members], :].T).T
+
+        bad = np.isnan(dx).any(axis=1)
+        failed[idx[bad]] = True
+
+        dVa = np.zeros((len(idx), n))
+        dVm = np.zeros((len(idx), n))
+        dVa[:, pvpq] = dx[:, :npvpq]
+        dVm[:, pq] = dx[:, npvpq:]
+
+        # update the voltages with back-tracking where needed
+        mu = np.full(len(idx), mu_0)
+        pending = ~bad
+        l_iter = 0
+        while pending.any() and l_iter < max_it:
+            p = np.where(pending)[0]
+            kp = idx[p]
+            Vm2 = Vm[kp] - mu[p, np.newaxis] * dVm[p]
+            Va2 = Va[kp] - mu[p, np.newaxis] * dVa[p]
+            V2 = Vm2 * np.exp(1j * Va2)
+            f2, Scalc2 = compute_fx_batch(V2, S0[kp], I0[kp], Y0[kp], Ybus, pvpq, pq)
+            norm_f2 = np.max(np.abs(f2), axis=1)
+
+            # accept the improvements
+            ok = norm_f2 <= norm_f[kp]
+            acc = kp[ok]
+            Vm[acc] = Vm2[ok]
+            Va[acc] = Va2[ok]
+            V[acc] = V2[ok]
+            f[acc] = f2[ok]
+            Scalc[acc] = Scalc2[ok]
+            norm_f[acc] = norm_f2[ok]
+            pending[p[ok]] = False
+
+            # reused factorizations that did not improve: use the own Jacobian in the next iteration
+            approx = p[~ok & ~exact[p]]
+            exact_next[idx[approx]] = True
+            pending[approx] = False
+
+            # exact steps that did not improve: back-track
+            mu[p[~ok & exact[p]]] *= acceleration_parameter
+            pending &= mu > tol
+            l_iter += 1
+
+        # the exact steps that could not be corrected terminate
+        stuck = np.where(~bad & exact & (norm_f[idx] > tol))[0]
+        not_improved = stuck[mu[stuck] <= tol]
+        failed[idx[not_improved]] = True
+
+        converged = norm_f < tol
+        active = ~converged & ~failed
+
+        # forget the oldest factorizations
+        if len(refs_data) > max_factorizations_kept:
+            refs_data = refs_data[-max_factorizations_kept:]
+            refs_solver = refs_solver[-max_factorizations_kept:]
+
+    return NumericPowerFlowBatchResults(V=V, Scalc=Scalc, converged=converged, norm_f=norm_f,
+                                        iterations=iterations, n_factorizations=n_factorizations,
+                                        elapsed=time.time() - start)
@@ -20,10 +20,9 @@ import scipy
 import scipy.sparse as sp
 import numpy as np
 
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
 
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 scipy.ALLOW_THREADS = True
 np.set_printoptions(precision=8, suppress=True, linewidth=320)
@@ -110,6 +109,9 @@ def NR_I_LS(Ybus, Sbus_sp, V0, Ibus_sp, pv, pq, tol, max_it=15, acceleration_par
 
     converged = normF < tol
 
+    # the Jacobian structure does not change among iterations
+    lin_solver = SparseLinearSolver()
+
     # do Newton iterations
     while not converged and iter_ < max_it:
         # update iteration counter
@@ -119,7 +121,7 @@ def NR_I_LS(Ybus, Sbus_sp, V0, Ibus_sp, pv, pq, tol, max_it=15, acceleration_par
         J = Jacobian_I(Ybus, V, pq, pvpq)
 
         # compute update step
-        dx = linear_solver(J, F)
+        dx = lin_solver(J, F)
 
         # reassign the solution vector
         dVa[pvpq] = dx[j1:j4]
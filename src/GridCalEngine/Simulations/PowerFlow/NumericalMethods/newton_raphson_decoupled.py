@@ -19,11 +19,10 @@ import time
 import scipy
 import numpy as np
 import scipy.sparse as sp
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 import GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions as cf
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
 
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 scipy.ALLOW_THREADS = True
 np.set_printoptions(precision=8, suppress=True, linewidth=320)
@@ -113,6 +112,10 @@ def NRD_LS(Ybus, S0, V0, I0, Y0, pv, pq, tol, max_it=15,
     if norm_f < tol:
         converged = 1
 
+    # one factorization handle per Jacobian block, their structures do not change among iterations
+    lin_solver_p = SparseLinearSolver()
+    lin_solver_q = SparseLinearSolver()
+
     # do Newton iterations
     while not converged and iter_ < max_it:
         # update iteration counter
@@ -122,8 +125,8 @@ def NRD_LS(Ybus, S0, V0, I0, Y0, pv, pq, tol, max_it=15,
         J1, J4 = Jacobian_decoupled(Ybus, V, I0, pq, pvpq)
 
         # compute update step and reassign the solution vector
-        dVa[pvpq] = linear_solver(J1, f[pvpq])
-        dVm[pq] = linear_solver(J4, f[pq])
+        dVa[pvpq] = lin_solver_p(J1, f[pvpq])
+        dVm[pq] = lin_solver_q(J4, f[pq])
 
         # update voltage the Newton way (mu=1)
         mu_ = 1.0
@@ -19,11 +19,10 @@ import time
 import scipy
 import numpy as np
 
-from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, get_linear_solver
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import get_sparse_type, SparseLinearSolver
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.ac_jacobian import AC_jacobian
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
 
-linear_solver = get_linear_solver()
 sparse = get_sparse_type()
 scipy.ALLOW_THREADS = True
 np.set_printoptions(precision=8, suppress=True, linewidth=320)
@@ -45,7 +44,7 @@ def F(V, Ybus, S, I, pq, pvpq):
     return np.r_[dS[pvpq].real, dS[pq].imag]  # concatenate to form the mismatch function
 
 
-def compute_fx(x, Ybus, S, I, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm):
+def compute_fx(x, Ybus, S, I, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm, lin_solver: SparseLinearSolver):
     """
 
     :param x:
@@ -63,6 +62,7 @@ def compute_fx(x, Ybus, S, I, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm):
     :param j6:
     :param Va:
     :param Vm:
+    :param lin_solver: SparseLinearSolver to factorize the Jacobian
     :return:
     """
     n = len(S)
@@ -85,7 +85,7 @@ def compute_fx(x, Ybus, S, I, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm):
     gx = AC_jacobian(Ybus, V, pvpq, pq)
 
     # return the increment of x
-    return linear_solver(gx, g)
+    return lin_solver(gx, g)
 
 
 def ContinuousNR(Ybus, Sbus, V0, Ibus, pv, pq, tol, max_it=15) -> NumericPowerFlowResults:
@@ -144,6 +144,9 @@ def ContinuousNR(Ybus, Sbus, V0, Ibus, pv, pq, tol, max_it=15) -> NumericPowerFl
     Va = np.angle(V)
     Vm = np.abs(V)
 
+    # the Jacobian structure does not change among the Runge-Kutta steps
+    lin_solver = SparseLinearSolver()
+
     # do Newton iterations
     while not converged and iter_ < max_it:
         # update iteration counter
@@ -154,16 +157,16 @@ def ContinuousNR(Ybus, Sbus, V0, Ibus, pv, pq, tol, max_it=15) -> NumericPowerFl
 
         # Compute the Runge-Kutta steps
         k1 = compute_fx(x,
-                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm)
+                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm, lin_solver)
 
         k2 = compute_fx(x + 0.5 * dt * k1,
-                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm)
+                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm, lin_solver)
 
         k3 = compute_fx(x + 0.5 * dt * k2,
-                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm)
+                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm, lin_solver)
 
         k4 = compute_fx(x + dt * k3,
-                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm)
+                        Ybus, Sbus, Ibus, pq, pv, pvpq, j1, j2, j3, j4, j5, j6, Va, Vm, lin_solver)
 
         x -= dt * (k1 + 2.0 * k2 + 2.0 * k3 + k4) / 6.0
 
@@ -52,6 +52,15 @@ class PowerFlowOptions:
 
         **multi_core** (bool, False): Use multi-core processing? applicable for time series
 
+        **n_workers** (int, 0): Number of parallel processes when multi_core is True (0: number of CPUs)
+
+        **warm_start** (bool, False): In time series, initialize every step with the solution of the previous one
+        (voltages, reactive power limit bus types and controlled tap modules). With batch_size > 0, the steps of every
+        batch start from the voltages of the last step of the previous batch
+
+        **batch_size** (int, 0): In time series and stochastic power flows, number of scenarios solved at once with
+        the batched Newton-Raphson when the grid structure allows it (0: disabled)
+
         **dispatch_storage** (bool, False): Dispatch storage?
 
         **control_p** (bool, False): Control active power (optimization dispatch)
@@ -96,7 +105,10 @@ class PowerFlowOptions:
                  use_stored_guess=False,
                  override_branch_controls=False,
                  generate_report=False,
-                 generalised_pf=False):
+                 generalised_pf=False,
+                 n_workers: int = 0,
+                 warm_start: bool = False,
+                 batch_size: int = 0):
 
         self.solver_type = solver_type
 
@@ -118,6 +130,12 @@ class PowerFlowOptions:
 
         self.multi_thread = multi_core
 
+        self.n_workers = n_workers
+
+        self.warm_start = warm_start
+
+        self.batch_size = batch_size
+
         self.dispatch_storage = dispatch_storage
 
         self.control_taps = control_taps
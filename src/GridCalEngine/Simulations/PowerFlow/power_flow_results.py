@@ -23,7 +23,7 @@ from typing import Union
 from GridCalEngine.Simulations.results_table import ResultsTable
 from GridCalEngine.Simulations.results_template import ResultsTemplate
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
-from GridCalEngine.basic_structures import IntVec, Vec, StrVec, CxVec, CscMat
+from GridCalEngine.basic_structures import IntVec, Vec, Mat, BoolVec, StrVec, CxVec, CxMat, CscMat
 from GridCalEngine.enumerations import StudyResultsType, ResultTypes, DeviceType
 
 
@@ -75,6 +75,62 @@ class NumericPowerFlowResults:
         self.method = None
 
 
+class PowerFlowBatchResults:
+    """
+    Results of several power flows of the same grid structure (the same admittances and bus types)
+    The arrays are stacked by rows: (scenario, element)
+    """
+
+    def __init__(self, nk: int, n: int, m: int, n_hvdc: int):
+        """
+        Constructor
+        :param nk: number of scenarios
+        :param n: number of buses
+        :param m: number of branches
+        :param n_hvdc: number of hvdc lines
+        """
+        self.voltage: CxMat = np.zeros((nk, n), dtype=complex)
+        self.Sbus: CxMat = np.zeros((nk, n), dtype=complex)
+        self.Sf: CxMat = np.zeros((nk, m), dtype=complex)
+        self.St: CxMat = np.zeros((nk, m), dtype=complex)
+        self.If: CxMat = np.zeros((nk, m), dtype=complex)
+        self.It: CxMat = np.zeros((nk, m), dtype=complex)
+        self.Vbranch: CxMat = np.zeros((nk, m), dtype=complex)
+        self.loading: CxMat = np.zeros((nk, m), dtype=complex)
+        self.losses: CxMat = np.zeros((nk, m), dtype=complex)
+        self.hvdc_losses: Mat = np.zeros((nk, n_hvdc))
+        self.hvdc_Pf: Mat = np.zeros((nk, n_hvdc))
+        self.hvdc_Pt: Mat = np.zeros((nk, n_hvdc))
+        self.hvdc_loading: Mat = np.zeros((nk, n_hvdc))
+        self.error: Vec = np.zeros(nk)
+        self.converged: BoolVec = np.ones(nk, dtype=bool)
+        self.iterations: IntVec = np.zeros(nk, dtype=int)
+        self.n_factorizations: int = 0
+
+    def set_at(self, k: int, results: "PowerFlowResults") -> None:
+        """
+        Set the results of a scenario from a single power flow
+        :param k: scenario index
+        :param results: PowerFlowResults
+        """
+        self.voltage[k, :] = results.voltage
+        self.Sbus[k, :] = results.Sbus
+        self.Sf[k, :] = results.Sf
+        self.St[k, :] = results.St
+        self.If[k, :] = results.If
+        self.It[k, :] = results.It
+        self.Vbranch[k, :] = results.Vbranch
+        self.loading[k, :] = results.loading
+        self.losses[k, :] = results.losses
+        self.hvdc_losses[k, :] = results.hvdc_losses
+        self.hvdc_Pf[k, :] = results.hvdc_Pf
+        self.hvdc_Pt[k, :] = results.hvdc_Pt
+        self.hvdc_loading[k, :] = results.hvdc_loading
+        self.error[k] = results.error
+        self.converged[k] = results.converged
+        self.iterations[k] = results.iterations
+
+
 class PowerFlowResults(ResultsTemplate):
 
     def __init__(
@@ -254,6 +310,17 @@ class PowerFlowResults(ResultsTemplate):
             val = max(val, conv.error())
         return val
 
+    @property
+    def iterations(self) -> int:
+        """
+        Total number of iterations of all the islands and methods
+        :return: int
+        """
+        val = 0
+        for conv in self.convergence_reports:
+            val += int(np.sum(conv.iterations_))
+        return val
+
     @property
     def elapsed(self):
         """
@@ -298,6 +365,10 @@ class PowerFlowResults(ResultsTemplate):
 
         self.losses[br_idx] = results.losses
 
+        self.tap_module[br_idx] = results.tap_module
+
+        self.tap_angle[br_idx] = results.tap_angle
+
         self.convergence_reports += results.convergence_reports
 
         if generalised_pf:
@@ -15,20 +15,339 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import os
+import copy
 import numpy as np
-from typing import Union
+from typing import Union, Dict, Tuple, List
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from GridCalEngine.Simulations.PowerFlow.power_flow_ts_results import PowerFlowTimeSeriesResults
+from GridCalEngine.Simulations.PowerFlow.power_flow_results import PowerFlowResults, PowerFlowBatchResults
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.Simulations.PowerFlow.power_flow_options import PowerFlowOptions
 from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.Simulations.driver_template import TimeSeriesDriverTemplate
 from GridCalEngine.Simulations.Clustering.clustering_results import ClusteringResults
 import GridCalEngine.Simulations.PowerFlow.power_flow_worker as pf_worker
+from GridCalEngine.DataStructures.numerical_circuit_ts import NumericalCircuitTimeSeries
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
 from GridCalEngine.Compilers.circuit_to_bentayga import bentayga_pf
 from GridCalEngine.Compilers.circuit_to_newton_pa import newton_pa_pf
 from GridCalEngine.Compilers.circuit_to_pgm import pgm_pf
-from GridCalEngine.basic_structures import IntVec
-from GridCalEngine.enumerations import EngineType
+from GridCalEngine.basic_structures import IntVec, CxVec, Logger
+from GridCalEngine.enumerations import EngineType, BusMode, ReactivePowerControlMode
+
+
+def get_warm_start_voltage(nc: NumericalCircuit, V: CxVec) -> CxVec:
+    """
+    Get the voltage guess of a time step from the solution of a previous one:
+    the previous voltages with the voltage set points of this step
+    :param nc: NumericalCircuit of the time step
+    :param V: previous converged voltage solution
+    :return: voltage guess
+    """
+    # (also for the buses at their limit, in case they have to be solved as PV again)
+    V0 = nc.bus_data.Vbus
+    types = nc.bus_data.bus_types
+    fixed_vm = (types == BusMode.PV.value) | (types == BusMode.Slack.value)
+    V_guess = V.copy()
+    V_guess[fixed_vm] = np.abs(V0[fixed_vm]) * np.exp(1j * np.angle(V[fixed_vm]))
+    V_guess[V == 0] = V0[V == 0]
+    return V_guess
+
+
+class PowerFlowWarmStart:
+    """
+    State of the previous time step power flow, used to initialize the next one:
+    voltages, bus types settled by the reactive power limits control and controlled tap modules
+    """
+
+    def __init__(self, options: PowerFlowOptions):
+        """
+        PowerFlowWarmStart constructor
+        :param options: PowerFlowOptions
+        """
+        self.options = options
+
+        # previous converged voltage solution
+        self.V: Union[CxVec, None] = None
+
+        # buses converted from PV to PQ because of the reactive power limits
+        self.at_qmax: Union[IntVec, None] = None
+        self.at_qmin: Union[IntVec, None] = None
+
+        # previous tap modules
+        self.tap_module: Union[np.ndarray, None] = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        Is there a previous solution to start from?
+        :return: bool
+        """
+        return self.V is not None
+
+    def reset(self) -> None:
+        """
+        Forget the previous solution
+        """
+        self.V = None
+        self.at_qmax = None
+        self.at_qmin = None
+        self.tap_module = None
+
+    def prepare(self, nc: NumericalCircuit) -> Tuple[CxVec, Union[CxVec, None]]:
+        """
+        Apply the previous state to the circuit of the next step (modified in-place)
+        :param nc: NumericalCircuit of the time step
+        :return: voltage guess, power injections (p.u.) to use or None if they are not modified
+        """
+        Sbus_input = None
+
+        # previous voltages with the voltage set points of this step
+        V_guess = get_warm_start_voltage(nc=nc, V=self.V)
+        types = nc.bus_data.bus_types
+
+        # controlled taps start where the previous step left them
+        k_m = nc.k_m
+        if len(k_m):
+            nc.branch_data.tap_module = nc.branch_data.tap_module.copy()
+            nc.branch_data.tap_module[k_m] = self.tap_module[k_m]
+
+        # the buses that ended at their reactive power limit remain as PQ at the limit, only if they are
+        # still PV buses with a reactive power range in this step (i.e. their generators were not switched off)
+        pv = np.where(types == BusMode.PV.value)[0]
+        pv = pv[nc.Qmax_bus[pv] > nc.Qmin_bus[pv]]
+        self.at_qmax = np.intersect1d(self.at_qmax, pv)
+        self.at_qmin = np.intersect1d(self.at_qmin, pv)
+
+        if len(self.at_qmax) or len(self.at_qmin):
+            nc.bus_data.bus_types = nc.bus_data.bus_types.copy()
+            nc.bus_data.bus_types[self.at_qmax] = BusMode.PQ.value
+            nc.bus_data.bus_types[self.at_qmin] = BusMode.PQ.value
+
+        if len(k_m) or len(self.at_qmax) or len(self.at_qmin):
+            nc.reset_calculations()
+            nc.simulation_indices_ = None
+
+        if len(self.at_qmax) or len(self.at_qmin):
+            Sbus_input = nc.Sbus.copy()
+            Sbus_input.imag[self.at_qmax] = nc.Qmax_bus[self.at_qmax]
+            Sbus_input.imag[self.at_qmin] = nc.Qmin_bus[self.at_qmin]
+
+        return V_guess, Sbus_input
+
+    def is_valid(self, nc: NumericalCircuit, pf_res: PowerFlowResults) -> bool:
+        """
+        Check that the buses kept at their reactive power limit should not return to PV:
+        a bus at its maximum reactive power with a voltage over the set point
+        (or at its minimum with a voltage under the set point) is able to control the voltage again
+        :param nc: NumericalCircuit of the time step (with the original bus types)
+        :param pf_res: power flow results
+        :return: bool
+        """
+        if not pf_res.converged:
+            return False
+
+        Vm = np.abs(pf_res.voltage)
+        Vset = np.abs(nc.bus_data.Vbus)
+        if np.any(Vm[self.at_qmax] > Vset[self.at_qmax]) or np.any(Vm[self.at_qmin] < Vset[self.at_qmin]):
+            return False
+
+        return True
+
+    def update(self, nc: NumericalCircuit, pf_res: PowerFlowResults) -> None:
+        """
+        Store the state of a solved time step
+        :param nc: NumericalCircuit of the time step
+        :param pf_res: power flow results
+        """
+        if not pf_res.converged:
+            self.reset()
+            return
+
+        self.V = pf_res.voltage.copy()
+        self.tap_module = pf_res.tap_module.copy()
+
+        if self.options.control_Q != ReactivePowerControlMode.NoControl:
+            # the PV buses with the reactive power at the limit were converted to PQ by the control
+            pv = np.where(nc.bus_data.bus_types == BusMode.PV.value)[0]
+            Q = pf_res.Sbus.imag[pv] / nc.Sbase
+            q_tol = 10.0 * self.options.tolerance
+            self.at_qmax = pv[Q >= nc.Qmax_bus[pv] - q_tol]
+            self.at_qmin = pv[Q <= nc.Qmin_bus[pv] + q_tol]
+        else:
+            self.at_qmax = np.zeros(0, dtype=int)
+            self.at_qmin = np.zeros(0, dtype=int)
+
+
+def run_power_flow_step(nc: NumericalCircuit,
+                        options: PowerFlowOptions,
+                        logger: Logger,
+                        warm_start: Union[PowerFlowWarmStart, None] = None) -> Tuple[PowerFlowResults, int, bool]:
+    """
+    Run the power flow of a time step, optionally initialized with the previous step solution
+    :param nc: NumericalCircuit of the time step
+    :param options: PowerFlowOptions
+    :param logger: Logger
+    :param warm_start: PowerFlowWarmStart (updated in-place) or None to always start from the stored guess
+    :return: PowerFlowResults, number of iterations, was it warm-started?
+    """
+    if warm_start is None or not warm_start.ready:
+        pf_res = pf_worker.multi_island_pf_nc(nc=nc, options=options, logger=logger)
+        if warm_start is not None:
+            warm_start.update(nc=nc, pf_res=pf_res)
+        return pf_res, pf_res.iterations, False
+
+    # keep the bus types of the step to run it again if the warm start is not valid
+    nc_warm = copy.copy(nc)
+    nc_warm.bus_data = copy.copy(nc.bus_data)
+    nc_warm.branch_data = copy.copy(nc.branch_data)
+    V_guess, Sbus_input = warm_start.prepare(nc=nc_warm)
+
+    pf_res = pf_worker.multi_island_pf_nc(nc=nc_warm, options=options, logger=logger,
+                                          V_guess=V_guess, Sbus_input=Sbus_input)
+    iterations = pf_res.iterations
+
+    if not warm_start.is_valid(nc=nc, pf_res=pf_res):
+        # some limited bus may control the voltage again: solve with the original bus types
+        pf_res = pf_worker.multi_island_pf_nc(nc=nc, options=options, logger=logger,
+                                              V_guess=V_guess if pf_res.converged else None)
+        iterations += pf_res.iterations
+
+    warm_start.update(nc=nc, pf_res=pf_res)
+
+    return pf_res, iterations, True
+
+
+def power_flow_time_series_batches(nc_ts: NumericalCircuitTimeSeries,
+                                   options: PowerFlowOptions,
+                                   time_indices: IntVec,
+                                   res: Dict[str, np.ndarray],
+                                   logger: Logger,
+                                   V_guess: Union[CxVec, None] = None) -> None:
+    """
+    Run the power flow of a number of time steps with the batched Newton-Raphson.
+    The steps are taken in blocks of options.batch_size, and the steps of a block
+    that share the grid structure (admittances, islands and bus types) are solved together.
+    With options.warm_start, every block starts from the last solution of the previous block:
+    the steps of a block are solved at once, so they all start from the same voltages
+    :param nc_ts: NumericalCircuitTimeSeries (it must contain the time indices)
+    :param options: PowerFlowOptions
+    :param time_indices: array of time indices to run
+    :param res: dictionary of result arrays (time_indices, ...) to fill in
+    :param logger: Logger
+    :param V_guess: converged voltages of the step before the first one to warm start from (optional)
+    """
+    batch_keys = [('voltage', 'voltage'), ('S', 'Sbus'), ('Sf', 'Sf'), ('St', 'St'), ('Vbranch', 'Vbranch'),
+                  ('loading', 'loading'), ('losses', 'losses'), ('hvdc_losses', 'hvdc_losses'),
+                  ('hvdc_Pf', 'hvdc_Pf'), ('hvdc_Pt', 'hvdc_Pt'), ('hvdc_loading', 'hvdc_loading'),
+                  ('error_values', 'error'), ('converged_values', 'converged'), ('iteration_values', 'iterations')]
+
+    V_last = V_guess if options.warm_start else None
+
+    for start in range(0, len(time_indices), options.batch_size):
+        end = min(start + options.batch_size, len(time_indices))
+
+        # group the steps of the block by structure
+        groups: Dict[bytes, List[Tuple[int, NumericalCircuit]]] = dict()
+        for it in range(start, end):
+            nc = nc_ts.get_at(time_indices[it])
+            groups.setdefault(nc.get_structure_hash(), list()).append((it, nc))
+
+        for group in groups.values():
+            pos = np.array([it for it, _ in group], dtype=int)
+            nc_list = [nc for _, nc in group]
+
+            if V_last is None:
+                V0 = None
+            else:
+                V0 = np.array([get_warm_start_voltage(nc=nc, V=V_last) for nc in nc_list])
+                res['warm_started_values'][pos] = True
+
+            if pf_worker.batch_power_flow_supported(nc=nc_list[0], options=options):
+                batch_res = pf_worker.multi_island_pf_nc_batch(nc_list=nc_list, options=options, logger=logger,
+                                                               V_guess=V0)
+                for key, attr in batch_keys:
+                    res[key][pos] = getattr(batch_res, attr)
+            else:
+                for i, (it, nc) in enumerate(group):
+                    pf_res = pf_worker.multi_island_pf_nc(nc=nc, options=options, logger=logger,
+                                                          V_guess=None if V0 is None else V0[i, :])
+                    batch_res = PowerFlowBatchResults(nk=1, n=nc.nbus, m=nc.nbr, n_hvdc=nc.nhvdc)
+                    batch_res.set_at(0, pf_res)
+                    for key, attr in batch_keys:
+                        res[key][it] = getattr(batch_res, attr)[0]
+
+        if options.warm_start:
+            # a step that did not converge is not a valid starting point
+            V_last = res['voltage'][end - 1, :].copy() if res['converged_values'][end - 1] else None
+
+
+def power_flow_time_series_chunk(nc_ts: NumericalCircuitTimeSeries,
+                                 options: PowerFlowOptions,
+                                 time_indices: IntVec,
+                                 V_guess: Union[CxVec, None] = None) -> Tuple[Dict[str, np.ndarray], Logger]:
+    """
+    Run the power flow of a chunk of time steps.
+    This function is the unit of work of the parallel time series and it is also used by the serial path
+    :param nc_ts: NumericalCircuitTimeSeries (it must contain the time indices)
+    :param options: PowerFlowOptions
+    :param time_indices: array of time indices to run
+    :param V_guess: converged voltages of the step before the chunk to warm start the batches from
+                    (optional, only used with options.batch_size > 0)
+    :return: dictionary of result arrays (time_indices, ...), Logger
+    """
+    logger = Logger()
+    nt = len(time_indices)
+    nc = nc_ts.base
+    res = {
+        'voltage': np.zeros((nt, nc.nbus), dtype=complex),
+        'S': np.zeros((nt, nc.nbus), dtype=complex),
+        'Sf': np.zeros((nt, nc.nbr), dtype=complex),
+        'St': np.zeros((nt, nc.nbr), dtype=complex),
+        'Vbranch': np.zeros((nt, nc.nbr), dtype=complex),
+        'loading': np.zeros((nt, nc.nbr), dtype=complex),
+        'losses': np.zeros((nt, nc.nbr), dtype=complex),
+        'hvdc_losses': np.zeros((nt, nc.nhvdc)),
+        'hvdc_Pf': np.zeros((nt, nc.nhvdc)),
+        'hvdc_Pt': np.zeros((nt, nc.nhvdc)),
+        'hvdc_loading': np.zeros((nt, nc.nhvdc)),
+        'error_values': np.zeros(nt),
+        'converged_values': np.zeros(nt, dtype=bool),
+        'iteration_values': np.zeros(nt, dtype=int),
+        'warm_started_values': np.zeros(nt, dtype=bool),
+    }
+
+    if options.batch_size > 0:
+        power_flow_time_series_batches(nc_ts=nc_ts, options=options, time_indices=time_indices,
+                                       res=res, logger=logger, V_guess=V_guess)
+        return res, logger
+
+    # the warm start is chained inside the chunk: the first step of every chunk starts cold
+    warm_start = PowerFlowWarmStart(options=options) if options.warm_start else None
+
+    for it, t in enumerate(time_indices):
+        pf_res, iterations, warm_started = run_power_flow_step(nc=nc_ts.get_at(t),
+                                                               options=options,
+                                                               logger=logger,
+                                                               warm_start=warm_start)
+        res['voltage'][it, :] = pf_res.voltage
+        res['S'][it, :] = pf_res.Sbus
+        res['Sf'][it, :] = pf_res.Sf
+        res['St'][it, :] = pf_res.St
+        res['Vbranch'][it, :] = pf_res.Vbranch
+        res['loading'][it, :] = pf_res.loading
+        res['losses'][it, :] = pf_res.losses
+        res['hvdc_losses'][it, :] = pf_res.hvdc_losses
+        res['hvdc_Pf'][it, :] = pf_res.hvdc_Pf
+        res['hvdc_Pt'][it, :] = pf_res.hvdc_Pt
+        res['hvdc_loading'][it, :] = pf_res.hvdc_loading
+        res['error_values'][it] = pf_res.error
+        res['converged_values'][it] = pf_res.converged
+        res['iteration_values'][it] = iterations
+        res['warm_started_values'][it] = warm_started
+
+    return res, logger
 
 
 class PowerFlowTimeSeriesDriver(TimeSeriesDriverTemplate):
@@ -73,6 +392,39 @@ class PowerFlowTimeSeriesDriver(TimeSeriesDriverTemplate):
                                                   area_names=None,
                                                   clustering_results=None)
 
+    def get_empty_results(self, time_indices: IntVec) -> PowerFlowTimeSeriesResults:
+        """
+        Initialize the time series results
+        :param time_indices: array of time indices to consider
+        :return: PowerFlowTimeSeriesResults instance
+        """
+        n = self.grid.get_bus_number()
+        m = self.grid.get_branch_number_wo_hvdc()
+
+        return PowerFlowTimeSeriesResults(n=n,
+                                          m=m,
+                                          n_hvdc=self.grid.get_hvdc_number(),
+                                          bus_names=self.grid.get_bus_names(),
+                                          branch_names=self.grid.get_branch_names_wo_hvdc(),
+                                          hvdc_names=self.grid.get_hvdc_names(),
+                                          bus_types=np.zeros(m),
+                                          time_array=self.grid.time_profile[time_indices],
+                                          clustering_results=self.clustering_results)
+
+    def compile_time_series(self, time_indices: IntVec) -> NumericalCircuitTimeSeries:
+        """
+        Compile the static information once, the time-dependent values are patched per step
+        :param time_indices: array of time indices to consider
+        :return: NumericalCircuitTimeSeries
+        """
+        self.report_text('Compiling the time series...')
+        return NumericalCircuitTimeSeries(circuit=self.grid,
+                                          time_indices=time_indices,
+                                          apply_temperature=self.options.apply_temperature_correction,
+                                          branch_tolerance_mode=self.options.branch_impedance_tolerance_mode,
+                                          opf_results=self.opf_time_series_results,
+                                          use_stored_guess=self.options.use_stored_guess)
+
     def run_single_thread(self, time_indices) -> PowerFlowTimeSeriesResults:
         """
         Run single thread time series
@@ -80,23 +432,21 @@ class PowerFlowTimeSeriesDriver(TimeSeriesDriverTemplate):
         :return: TimeSeriesResults instance
         """
 
-        n = self.grid.get_bus_number()
-        m = self.grid.get_branch_number_wo_hvdc()
-
         # initialize the grid time series results we will append the island results with another function
-        time_series_results = PowerFlowTimeSeriesResults(n=n,
-                                                         m=m,
-                                                         n_hvdc=self.grid.get_hvdc_number(),
-                                                         bus_names=self.grid.get_bus_names(),
-                                                         branch_names=self.grid.get_branch_names_wo_hvdc(),
-                                                         hvdc_names=self.grid.get_hvdc_names(),
-                                                         bus_types=np.zeros(m),
-                                                         time_array=self.grid.time_profile[time_indices],
-                                                         clustering_results=self.clustering_results)
+        time_series_results = self.get_empty_results(time_indices=time_indices)
 
         # compile dictionaries once for speed
         bus_dict = {bus: i for i, bus in enumerate(self.grid.buses)}
         areas_dict = {elm: i for i, elm in enumerate(self.grid.areas)}
+
+        # the generalised power flow uses its own compiler
+        nc_ts = None if self.options.generalised_pf else self.compile_time_series(time_indices=time_indices)
+
+        if nc_ts is not None and self.options.batch_size > 0:
+            return self.run_batches(time_indices=time_indices, nc_ts=nc_ts, results=time_series_results)
+
+        warm_start = PowerFlowWarmStart(options=self.options) if self.options.warm_start else None
+
         self.report_progress(0.0)
         for it, t in enumerate(time_indices):
 
@@ -104,12 +454,20 @@ class PowerFlowTimeSeriesDriver(TimeSeriesDriverTemplate):
             self.report_progress2(it, len(time_indices))
 
             # run power flow
-            pf_res = pf_worker.multi_island_pf(multi_circuit=self.grid,
-                                               t=t,
-                                               options=self.options,
-                                               opf_results=self.opf_time_series_results,
-                                               bus_dict=bus_dict,
-                                               areas_dict=areas_dict)
+            if nc_ts is None:
+                pf_res = pf_worker.multi_island_pf(multi_circuit=self.grid,
+                                                   t=t,
+                                                   options=self.options,
+                                                   opf_results=self.opf_time_series_results,
+                                                   bus_dict=bus_dict,
+                                                   areas_dict=areas_dict)
+                iterations = pf_res.iterations
+                warm_started = False
+            else:
+                pf_res, iterations, warm_started = run_power_flow_step(nc=nc_ts.get_at(t),
+                                                                       options=self.options,
+                                                                       logger=self.logger,
+                                                                       warm_start=warm_start)
 
             # gather results
             time_series_results.voltage[it, :] = pf_res.voltage
@@ -125,12 +483,122 @@ class PowerFlowTimeSeriesDriver(TimeSeriesDriverTemplate):
             time_series_results.hvdc_loading[it, :] = pf_res.hvdc_loading
             time_series_results.error_values[it] = pf_res.error
             time_series_results.converged_values[it] = pf_res.converged
+            time_series_results.iteration_values[it] = iterations
+            time_series_results.warm_started_values[it] = warm_started
 
             if self.__cancel__:
                 return time_series_results
 
         return time_series_results
 
+    def run_batches(self,
+                    time_indices: IntVec,
+                    nc_ts: NumericalCircuitTimeSeries,
+                    results: PowerFlowTimeSeriesResults) -> PowerFlowTimeSeriesResults:
+        """
+        Run the time series in blocks of steps solved with the batched Newton-Raphson
+        :param time_indices: array of time indices to consider
+        :param nc_ts: NumericalCircuitTimeSeries
+        :param results: PowerFlowTimeSeriesResults to fill in
+        :return: PowerFlowTimeSeriesResults instance
+        """
+        # with the warm start, every block starts from the last solution of the previous block
+        V_last = None
+
+        blocks = range(0, len(time_indices), self.options.batch_size)
+        for i, start in enumerate(blocks):
+            pos = np.arange(start, min(start + self.options.batch_size, len(time_indices)))
+
+            self.report_text('Time series at ' + str(self.grid.time_profile[time_indices[start]]) + '...')
+            self.report_progress2(i, len(blocks))
+
+            res, logger = power_flow_time_series_chunk(nc_ts, self.options, time_indices[pos], V_guess=V_last)
+
+            for key, val in res.items():
+                getattr(results, key)[pos] = val
+
+            V_last = res['voltage'][-1, :] if res['converged_values'][-1] else None
+
+            self.logger += logger
+
+            if self.__cancel__:
+                return results
+
+        return results
+
+    def run_multi_thread(self, time_indices: IntVec) -> PowerFlowTimeSeriesResults:
+        """
+        Run the time series in parallel processes.
+        The time indices are split in chunks, and each worker receives only the
+        compiled information of its chunk, the results are identical to the serial run.
+        :param time_indices: array of time indices to consider
+        :return: PowerFlowTimeSeriesResults instance
+        """
+        time_series_results = self.get_empty_results(time_indices=time_indices)
+
+        nc_ts = self.compile_time_series(time_indices=time_indices)
+
+        n_workers = self.options.n_workers if self.options.n_workers > 0 else os.cpu_count()
+        n_workers = max(1, min(n_workers, len(time_indices)))
+
+        # use more chunks than workers to have a smoother progress and a quicker cancellation
+        n_chunks = min(len(time_indices), n_workers * 4)
+        chunks = [c for c in np.array_split(np.arange(len(time_indices)), n_chunks) if len(c)]
+
+        self.report_text('Running the time series in {} processes...'.format(n_workers))
+        self.report_progress(0.0)
+
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+
+            futures = dict()
+            for pos in chunks:
+                fut = executor.submit(power_flow_time_series_chunk,
+                                      nc_ts.get_slice(time_indices[pos]),
+                                      self.options,
+                                      time_indices[pos])
+                futures[fut] = pos
+
+            for i, fut in enumerate(as_completed(futures)):
+
+                pos = futures[fut]
+                res, logger = fut.result()
+
+                # write the chunk in place
+                for key, val in res.items():
+                    getattr(time_series_results, key)[pos] = val
+
+                self.logger += logger
+                self.report_progress2(i, len(chunks))
+
+                if self.__cancel__:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return time_series_results
+
+        return time_series_results
+
+    def report_warm_start(self, results: PowerFlowTimeSeriesResults) -> None:
+        """
+        Log the iterations saved by the warm start.
+        The saving is estimated with the average iterations of the steps that started from the stored guess
+        :param results: PowerFlowTimeSeriesResults
+        """
+        warm = results.warm_started_values
+        n_warm = int(np.sum(warm))
+        if n_warm == 0 or n_warm == len(warm):
+            return
+
+        cold_avg = float(np.mean(results.iteration_values[~warm]))
+        warm_avg = float(np.mean(results.iteration_values[warm]))
+        saved = (cold_avg - warm_avg) * n_warm
+
+        self.logger.add_info('Warm start iterations saved (estimate)',
+                             device='Time series',
+                             value=round(saved, 1),
+                             expected_value=int(np.sum(results.iteration_values)),
+                             comment='Average iterations: {:.2f} cold start, {:.2f} warm start'.format(cold_avg,
+                                                                                                       warm_avg))
+        self.report_text('Warm start saved {:.0f} iterations'.format(saved))
+
     def run_bentayga(self):
 
         res = bentayga_pf(self.grid, self.options, time_series=True)
@@ -215,7 +683,13 @@ class PowerFlowTimeSeriesDriver(TimeSeriesDriverTemplate):
         self.tic()
 
         if self.engine == EngineType.GridCal:
-            self.results = self.run_single_thread(time_indices=self.time_indices)
+            if self.options.multi_thread and not self.options.generalised_pf and len(self.time_indices) > 1:
+                self.results = self.run_multi_thread(time_indices=self.time_indices)
+            else:
+                self.results = self.run_single_thread(time_indices=self.time_indices)
+
+            if self.options.warm_start:
+                self.report_warm_start(self.results)
 
         elif self.engine == EngineType.Bentayga:
             self.report_text('Running Bentayga... ')
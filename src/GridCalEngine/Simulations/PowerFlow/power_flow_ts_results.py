@@ -25,7 +25,7 @@ from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import PowerFlowResults
 from GridCalEngine.Simulations.results_table import ResultsTable
 from GridCalEngine.Simulations.results_template import ResultsTemplate
-from GridCalEngine.basic_structures import DateVec, IntVec, StrVec, CxMat, Mat
+from GridCalEngine.basic_structures import DateVec, IntVec, BoolVec, StrVec, CxMat, Mat
 from GridCalEngine.enumerations import StudyResultsType, ResultTypes, DeviceType
 from GridCalEngine.Simulations.Clustering.clustering_results import ClusteringResults
 
@@ -145,6 +145,8 @@ class PowerFlowTimeSeriesResults(ResultsTemplate):
 
         self.error_values = np.zeros(nt)
         self.converged_values = np.ones(nt, dtype=bool)  # guilty assumption
+        self.iteration_values = np.zeros(nt, dtype=int)
+        self.warm_started_values = np.zeros(nt, dtype=bool)
 
         self.register(name='bus_names', tpe=StrVec)
         self.register(name='branch_names', tpe=StrVec)
@@ -178,6 +180,9 @@ class PowerFlowTimeSeriesResults(ResultsTemplate):
         self.register(name='hvdc_Pt', tpe=Mat)
         self.register(name='hvdc_loading', tpe=Mat)
 
+        self.register(name='iteration_values', tpe=IntVec)
+        self.register(name='warm_started_values', tpe=BoolVec)
+
     def apply_new_time_series_rates(self, nc: NumericalCircuit):
         """
         Recompute the loading with new rates
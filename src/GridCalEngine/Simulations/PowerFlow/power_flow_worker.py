@@ -16,12 +16,12 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 from __future__ import annotations
 import numpy as np
-from typing import Union, Dict, Tuple, TYPE_CHECKING
+from typing import Union, Dict, Tuple, List, TYPE_CHECKING
 
 import GridCalEngine.Simulations.PowerFlow as pflw
-from GridCalEngine.enumerations import SolverType
+from GridCalEngine.enumerations import SolverType, ReactivePowerControlMode, HvdcControlType
 from GridCalEngine.basic_structures import Logger, ConvergenceReport
-from GridCalEngine.Simulations.PowerFlow.power_flow_results import PowerFlowResults
+from GridCalEngine.Simulations.PowerFlow.power_flow_results import PowerFlowResults, PowerFlowBatchResults
 from GridCalEngine.Simulations.PowerFlow.power_flow_options import PowerFlowOptions
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import NumericPowerFlowResults
 from GridCalEngine.DataStructures.numerical_circuit_general_pf import NumericalCircuit
@@ -30,7 +30,7 @@ from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_cir
 from GridCalEngine.DataStructures.numerical_circuit_general_pf import compile_numerical_circuit_at as compile_numerical_circuit_at_generalised_pf
 from GridCalEngine.Devices.Substation.bus import Bus
 from GridCalEngine.Devices.Aggregation.area import Area
-from GridCalEngine.basic_structures import CxVec, Vec, IntVec, CscMat
+from GridCalEngine.basic_structures import CxVec, CxMat, Vec, Mat, IntVec, CscMat
 
 if TYPE_CHECKING:  # Only imports the below statements during type checking
     from GridCalEngine.Simulations.OPF.opf_results import OptimalPowerFlowResults
@@ -200,7 +200,8 @@ def solve(circuit: NumericalCircuit,
                                                        max_it=options.max_iter,
                                                        control_q=options.control_Q,
                                                        verbose=options.verbose,
-                                                       logger=logger)
+                                                       logger=logger,
+                                                       lin_solver=circuit.sparse_solver)
 
         # Fast decoupled
         elif solver_type == SolverType.FASTDECOUPLED:
@@ -243,7 +244,8 @@ def solve(circuit: NumericalCircuit,
                                            max_iter=options.max_iter,
                                            acceleration_parameter=options.backtracking_parameter,
                                            mu_0=options.trust_radius,
-                                           control_q=options.control_Q)
+                                           control_q=options.control_Q,
+                                           lin_solver=circuit.sparse_solver)
             else:
                 # Solve NR with the AC algorithm
                 solution = pflw.NR_LS(Ybus=circuit.Ybus,
@@ -261,7 +263,8 @@ def solve(circuit: NumericalCircuit,
                                       acceleration_parameter=options.backtracking_parameter,
                                       control_q=options.control_Q,
                                       verbose=options.verbose,
-                                      logger=logger)
+                                      logger=logger,
+                                      lin_solver=circuit.sparse_solver)
 
         # Newton-Raphson-Decpupled
         elif solver_type == SolverType.NRD:
@@ -291,7 +294,8 @@ def solve(circuit: NumericalCircuit,
                                       tol=options.tolerance,
                                       max_it=options.max_iter,
                                       control_q=options.control_Q,
-                                      robust=True)
+                                      robust=True,
+                                      lin_solver=circuit.sparse_solver)
 
         # Newton-Raphson in current equations
         elif solver_type == SolverType.NRI:
@@ -737,6 +741,143 @@ def multi_island_pf_nc(nc: NumericalCircuit,
     return results
 
 
+def batch_power_flow_supported(nc: NumericalCircuit, options: PowerFlowOptions) -> bool:
+    """
+    Check if the power flows of a circuit can be solved with the batched Newton-Raphson
+    (plain AC Newton-Raphson without controls, distributed slack or free HVDC lines)
+    :param nc: NumericalCircuit
+    :param options: PowerFlowOptions
+    :return: bool
+    """
+    if options.solver_type != SolverType.NR or options.generalised_pf or options.distributed_slack:
+        return False
+
+    if options.control_Q != ReactivePowerControlMode.NoControl:
+        return False
+
+    if nc.any_control:
+        return False
+
+    if nc.nhvdc > 0 and np.any(nc.hvdc_data.active & (nc.hvdc_data.control_mode == HvdcControlType.type_0_free)):
+        return False
+
+    return True
+
+
+def power_flow_post_process_batch(nc: NumericalCircuit, V: CxMat, branch_rates: Mat, results: PowerFlowBatchResults):
+    """
+    Compute the branch flows of several voltage solutions (vectorized version of power_flow_post_process)
+    :param nc: NumericalCircuit
+    :param V: Voltage matrix (scenario, bus)
+    :param branch_rates: Branch rates matrix (scenario, branch)
+    :param results: PowerFlowBatchResults (modified in-place)
+    """
+    F = nc.branch_data.F
+    T = nc.branch_data.T
+
+    If = (nc.Yf @ V.T).T
+    It = (nc.Yt @ V.T).T
+    Vf = V[:, F]
+    Vt = V[:, T]
+    Sf = Vf * np.conj(If) * nc.Sbase
+    St = Vt * np.conj(It) * nc.Sbase
+
+    results.voltage = V
+    results.Sbus = V * np.conj((nc.Ybus @ V.T).T) * nc.Sbase
+    results.If = If
+    results.It = It
+    results.Sf = Sf
+    results.St = St
+    results.Vbranch = Vf - Vt
+    results.losses = Sf + St
+    results.loading = Sf / (branch_rates + 1e-9)
+
+
+def multi_island_pf_nc_batch(nc_list: List[NumericalCircuit],
+                             options: PowerFlowOptions,
+                             logger: Logger = Logger(),
+                             V_guess: Union[CxMat, None] = None,
+                             Sbus_input: Union[CxMat, None] = None) -> PowerFlowBatchResults:
+    """
+    Run the power flow of several circuits that share the same structure
+    (admittances, islands and bus types, see NumericalCircuit.get_structure_hash), and only differ in their
+    injections and set points, with the batched Newton-Raphson.
+    The scenarios that do not converge are run again one by one with multi_island_pf_nc
+    if the options allow trying other methods.
+    :param nc_list: list of NumericalCircuit with the same structure (the same object may be repeated)
+    :param options: PowerFlowOptions instance (see batch_power_flow_supported)
+    :param logger: logger
+    :param V_guess: voltage guess (scenario, bus), if not provided the circuits voltages are used
+    :param Sbus_input: Use these power injections (scenario, bus) in p.u. if provided
+    :return: PowerFlowBatchResults
+    """
+    nc = nc_list[0]
+    nk = len(nc_list)
+
+    results = PowerFlowBatchResults(nk=nk, n=nc.nbus, m=nc.nbr, n_hvdc=nc.nhvdc)
+
+    # scenario data
+    S = np.empty((nk, nc.nbus), dtype=complex)
+    I0 = np.empty((nk, nc.nbus), dtype=complex)
+    Y0 = np.empty((nk, nc.nbus), dtype=complex)
+    V0 = np.empty((nk, nc.nbus), dtype=complex)
+    rates = np.empty((nk, nc.nbr))
+    for k, nc_k in enumerate(nc_list):
+        Shvdc, Losses_hvdc, Pf_hvdc, Pt_hvdc, loading_hvdc, n_free = nc_k.hvdc_data.get_power(
+            Sbase=nc_k.Sbase,
+            theta=np.zeros(nc_k.nbus),
+        )
+        S[k, :] = (nc_k.Sbus if Sbus_input is None else Sbus_input[k, :]) + Shvdc
+        I0[k, :] = nc_k.Ibus
+        Y0[k, :] = nc_k.YLoadBus
+        V0[k, :] = nc_k.Vbus if V_guess is None else V_guess[k, :]
+        rates[k, :] = nc_k.Rates
+        results.hvdc_Pf[k, :] = - Pf_hvdc * nc_k.Sbase
+        results.hvdc_Pt[k, :] = - Pt_hvdc * nc_k.Sbase
+        results.hvdc_loading[k, :] = loading_hvdc
+        results.hvdc_losses[k, :] = Losses_hvdc * nc_k.Sbase
+
+    V = np.zeros((nk, nc.nbus), dtype=complex)
+
+    islands = nc.split_into_islands(ignore_single_node_islands=options.ignore_single_node_islands)
+    for i, island in enumerate(islands):
+
+        if len(island.vd) > 0:
+            b_idx = island.original_bus_idx
+            res = pflw.NR_LS_batch(Ybus=island.Ybus,
+                                   S0=S[:, b_idx],
+                                   V0=V0[:, b_idx],
+                                   I0=I0[:, b_idx],
+                                   Y0=Y0[:, b_idx],
+                                   pv=island.pv,
+                                   pq=island.pq,
+                                   tol=options.tolerance,
+                                   max_it=options.max_iter,
+                                   mu_0=options.trust_radius,
+                                   acceleration_parameter=options.backtracking_parameter,
+                                   lin_solver=island.sparse_solver)
+            V[:, b_idx] = res.V
+            results.error = np.maximum(results.error, res.norm_f)
+            results.converged &= res.converged
+            results.iterations += res.iterations
+            results.n_factorizations += res.n_factorizations
+        else:
+            logger.add_info('No slack nodes in the island', str(i))
+
+    power_flow_post_process_batch(nc=nc, V=V, branch_rates=rates, results=results)
+
+    # the scenarios that did not converge try the power flow with all the options
+    if options.retry_with_other_methods:
+        for k in np.where(~results.converged)[0]:
+            res = multi_island_pf_nc(nc=nc_list[k],
+                                     options=options,
+                                     logger=logger,
+                                     Sbus_input=None if Sbus_input is None else Sbus_input[k, :])
+            results.set_at(k, res)
+
+    return results
+
+
 def multi_island_pf(multi_circuit: MultiCircuit,
                     options: PowerFlowOptions,
                     opf_results: Union[OptimalPowerFlowResults, None] = None,
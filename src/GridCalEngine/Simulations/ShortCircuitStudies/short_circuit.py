@@ -15,12 +15,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import numpy as np
-from typing import Tuple
+from typing import Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
 from scipy.sparse.linalg import spsolve
 from scipy.sparse.linalg import inv
 from scipy.sparse import csc_matrix
-from GridCalEngine.enumerations import FaultType
-from GridCalEngine.basic_structures import CxVec
+from GridCalEngine.enumerations import FaultType, SparseSolver
+from GridCalEngine.basic_structures import CxVec, IntVec
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import SparseLinearSolver
 
 
 def short_circuit_3p(bus_idx: int, Ybus: csc_matrix, Vbus: CxVec, Zf: CxVec, baseMVA: float) -> Tuple[CxVec, float]:
@@ -124,3 +126,103 @@ def short_circuit_unbalance(bus_idx: int,
     SCC[bus_idx] = baseMVA * V1_fin[bus_idx] * V1_fin[bus_idx] / Zth1
 
     return V0_fin, V1_fin, V2_fin, SCC
+
+
+def get_zbus_diagonal(Y: csc_matrix, bus_idx: IntVec, block_size: int = 256, n_workers: int = 1) -> CxVec:
+    """
+    Compute the diagonal entries Zbus[i, i] of the impedance matrix (Zbus = inv(Y)) for a set of buses
+    The matrix is factorized only once (per process) and the unit columns are solved
+    in blocks of several right hand sides, so Zbus is never formed entirely.
+    :param Y: Admittance matrix
+    :param bus_idx: indices of the buses where Zbus[i, i] is needed
+    :param block_size: number of right hand sides solved at once
+    :param n_workers: number of processes among which the buses are split (1: serial)
+    :return: Zbus[bus_idx, bus_idx]
+    """
+    bus_idx = np.asarray(bus_idx, dtype=int)
+
+    if n_workers > 1 and len(bus_idx) > block_size:
+        # every process factorizes its copy of the matrix once and solves its share of the buses
+        chunks = [c for c in np.array_split(bus_idx, n_workers) if len(c)]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(get_zbus_diagonal, Y, chunk, block_size, 1) for chunk in chunks]
+            return np.concatenate([fut.result() for fut in futures])
+
+    n = Y.shape[0]
+    solver = SparseLinearSolver(solver_type=SparseSolver.SuperLU).factorize(Y)
+
+    z_diag = np.empty(len(bus_idx), dtype=complex)
+    for a in range(0, len(bus_idx), block_size):
+        block = bus_idx[a:a + block_size]
+        k = np.arange(len(block))
+        rhs = np.zeros((n, len(block)), dtype=complex)
+        rhs[block, k] = 1.0
+        z_diag[a:a + len(block)] = solver.solve(rhs)[block, k]
+
+    return z_diag
+
+
+def short_circuit_sweep(Vbus: CxVec,
+                        Zf: CxVec,
+                        Zth0: Union[CxVec, None],
+                        Zth1: CxVec,
+                        Zth2: Union[CxVec, None],
+                        fault_type: FaultType,
+                        baseMVA: float) -> Tuple[CxVec, CxVec, CxVec, CxVec]:
+    """
+    Compute a short circuit of the given type at every bus at once
+    Each bus fault is the same as in short_circuit_3p and short_circuit_unbalance,
+    but only the fault sequence currents and the short circuit power are computed.
+    :param Vbus: pre-fault voltage (positive sequence) at the faulted buses
+    :param Zf: fault impedance at the faulted buses
+    :param Zth0: Thevenin impedance (Zbus diagonal) of the zero sequence at the faulted buses (not used by 3-phase faults)
+    :param Zth1: Thevenin impedance (Zbus diagonal) of the positive sequence at the faulted buses
+    :param Zth2: Thevenin impedance (Zbus diagonal) of the negative sequence at the faulted buses (not used by 3-phase faults)
+    :param fault_type: FaultType
+    :param baseMVA: base MVA (100 MVA)
+    :return: I0, I1, I2 fault sequence currents (p.u.), short circuit power (MVA)
+    """
+
+    if fault_type == FaultType.ph3:
+        I1 = Vbus / (Zth1 + Zf)
+        I0 = np.zeros_like(I1)
+        I2 = np.zeros_like(I1)
+
+        # the 3-phase short circuit power is computed with the pre-fault voltage
+        return I0, I1, I2, baseMVA * Vbus * Vbus / Zth1
+
+    elif fault_type == FaultType.LG:
+        I0 = Vbus / (Zth0 + Zth1 + Zth2 + 3 * Zf)
+        I1 = I0
+        I2 = I0
+    elif fault_type == FaultType.LL:  # between phases b and c
+        I0 = np.zeros_like(Vbus)
+        I1 = Vbus / (Zth1 + Zth2 + Zf)
+        I2 = - I1
+    elif fault_type == FaultType.LLG:  # between phases b and c
+        I1 = Vbus / (Zth1 + Zth2 * (Zth0 + 3 * Zf) / (Zth2 + Zth0 + 3 * Zf))
+        I0 = -I1 * Zth2 / (Zth2 + Zth0 + 3 * Zf)
+        I2 = -I1 * (Zth0 + 3 * Zf) / (Zth2 + Zth0 + 3 * Zf)
+    else:
+        raise Exception('Unknown unbalanced fault type')
+
+    # positive sequence voltage at the faulted bus
+    V1 = Vbus - Zth1 * I1
+    SCC = baseMVA * V1 * V1 / Zth1
+
+    return I0, I1, I2, SCC
+
+
+def sequence_to_phase_currents(I0: CxVec, I1: CxVec, I2: CxVec) -> Tuple[CxVec, CxVec, CxVec]:
+    """
+    Transform sequence currents into phase currents
+    :param I0: zero sequence current
+    :param I1: positive sequence current
+    :param I2: negative sequence current
+    :return: Ia, Ib, Ic
+    """
+    a = np.exp(2j * np.pi / 3)
+    Ia = I0 + I1 + I2
+    Ib = I0 + a * a * I1 + a * I2
+    Ic = I0 + a * I1 + a * a * I2
+    return Ia, Ib, Ic
@@ -15,14 +15,16 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import os
 import numpy as np
-from typing import Union
+from typing import Union, List
 from GridCalEngine.basic_structures import Logger
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.basic_structures import CxVec
 from GridCalEngine.Simulations.PowerFlow.power_flow_driver import PowerFlowResults, PowerFlowOptions
 from GridCalEngine.Simulations.ShortCircuitStudies.short_circuit_worker import (short_circuit_ph3,
-                                                                                short_circuit_unbalanced)
+                                                                                short_circuit_unbalanced,
+                                                                                short_circuit_sweep_island)
 from GridCalEngine.Simulations.ShortCircuitStudies.short_circuit_results import ShortCircuitResults
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
 from GridCalEngine.Devices import Branch, Bus
@@ -43,7 +45,12 @@ class ShortCircuitOptions:
                  branch_fault_locations=None,
                  branch_fault_impedance=None,
                  branch_impedance_tolerance_mode=BranchImpedanceMode.Specified,
-                 verbose=False):
+                 verbose=False,
+                 sweep: bool = False,
+                 sweep_fault_types: Union[List[FaultType], None] = None,
+                 sweep_block_size: int = 256,
+                 multi_core: bool = False,
+                 n_workers: int = 0):
         """
 
         :param bus_index:
@@ -53,6 +60,11 @@ class ShortCircuitOptions:
         :param branch_fault_impedance:
         :param branch_impedance_tolerance_mode:
         :param verbose:
+        :param sweep: If true, compute the short circuit power and current of a fault at every bus
+        :param sweep_fault_types: fault types to compute in the sweep (None: all of them)
+        :param sweep_block_size: number of Zbus columns solved at once in the sweep
+        :param multi_core: split the sweep buses among several processes
+        :param n_workers: Number of parallel processes when multi_core is True (0: number of CPUs)
         """
 
         if branch_index is not None:
@@ -82,6 +94,19 @@ class ShortCircuitOptions:
 
         self.verbose = verbose
 
+        self.sweep = sweep
+
+        if sweep_fault_types is None:
+            self.sweep_fault_types = [FaultType.ph3, FaultType.LG, FaultType.LL, FaultType.LLG]
+        else:
+            self.sweep_fault_types = sweep_fault_types
+
+        self.sweep_block_size = sweep_block_size
+
+        self.multi_core = multi_core
+
+        self.n_workers = n_workers
+
 
 class ShortCircuitDriver(DriverTemplate):
     name = 'Short Circuit'
@@ -254,6 +279,61 @@ class ShortCircuitDriver(DriverTemplate):
 
         return results
 
+    def run_sweep(self) -> ShortCircuitResults:
+        """
+        Compute a short circuit at every bus for each of the sweep fault types
+        The admittance matrices of every island are factorized once for all the buses
+        :return: ShortCircuitResults with the sweep arrays filled in
+        """
+        numerical_circuit = compile_numerical_circuit_at(circuit=self.grid,
+                                                         t_idx=None,
+                                                         apply_temperature=self.pf_options.apply_temperature_correction,
+                                                         branch_tolerance_mode=self.pf_options.branch_impedance_tolerance_mode,
+                                                         opf_results=self.opf_results)
+
+        islands = numerical_circuit.split_into_islands(
+            ignore_single_node_islands=self.pf_options.ignore_single_node_islands)
+
+        results = ShortCircuitResults(n=numerical_circuit.nbus,
+                                      m=numerical_circuit.nbr,
+                                      n_hvdc=numerical_circuit.nhvdc,
+                                      bus_names=numerical_circuit.bus_names,
+                                      branch_names=numerical_circuit.branch_names,
+                                      hvdc_names=numerical_circuit.hvdc_names,
+                                      bus_types=numerical_circuit.bus_types)
+
+        fault_types = self.options.sweep_fault_types
+        results.sweep_fault_types = fault_types
+        results.sweep_SCpower = np.zeros((numerical_circuit.nbus, len(fault_types)), dtype=complex)
+        results.sweep_Ik = np.zeros((numerical_circuit.nbus, len(fault_types)), dtype=float)
+
+        if self.options.multi_core:
+            n_workers = self.options.n_workers if self.options.n_workers > 0 else os.cpu_count()
+        else:
+            n_workers = 1
+
+        Zf = self.compile_zf(self.grid)
+
+        for i, island in enumerate(islands):
+
+            if island.nbus > 1:
+                bus_idx = island.original_bus_idx
+                SCC, Ik = short_circuit_sweep_island(calculation_inputs=island,
+                                                     Vpf=self.pf_results.voltage[bus_idx],
+                                                     Zf=Zf[bus_idx],
+                                                     fault_types=fault_types,
+                                                     block_size=self.options.sweep_block_size,
+                                                     n_workers=n_workers)
+                results.sweep_SCpower[bus_idx, :] = SCC
+                results.sweep_Ik[bus_idx, :] = Ik
+
+            self.report_progress2(i, len(islands))
+
+            if self.is_cancel():
+                break
+
+        return results
+
     def run(self):
         """
         Run a power flow for every circuit
@@ -261,6 +341,14 @@ class ShortCircuitDriver(DriverTemplate):
         """
         self.tic()
         self._is_running = True
+
+        if self.options.sweep:
+            self.results = self.run_sweep()
+            self.grid.short_circuit_results = self.results
+            self._is_running = False
+            self.toc()
+            return
+
         if self.options.branch_index:
 
             # if there are branch indices where to perform short circuits, modify the grid accordingly
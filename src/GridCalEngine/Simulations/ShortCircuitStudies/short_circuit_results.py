@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-
+from typing import List
 import numpy as np
 import pandas as pd
 from GridCalEngine.Simulations.results_template import ResultsTemplate
@@ -52,7 +52,9 @@ class ShortCircuitResults(ResultsTemplate):
                                                               ResultTypes.BusVoltageAngle2,
 
                                                               ResultTypes.BusShortCircuitActivePower,
-                                                              ResultTypes.BusShortCircuitReactivePower],
+                                                              ResultTypes.BusShortCircuitReactivePower,
+                                                              ResultTypes.BusShortCircuitSweepPower,
+                                                              ResultTypes.BusShortCircuitSweepCurrent],
 
                                      ResultTypes.BranchResults: [ResultTypes.BranchActivePowerFrom0,
                                                                  ResultTypes.BranchActivePowerFrom1,
@@ -141,6 +143,11 @@ class ShortCircuitResults(ResultsTemplate):
         self.sc_type = FaultType.ph3
         self.SCpower = np.zeros(n, dtype=complex)
 
+        # all-bus fault sweep: one column per fault type
+        self.sweep_fault_types: List[FaultType] = list()
+        self.sweep_SCpower = np.zeros((n, 0), dtype=complex)
+        self.sweep_Ik = np.zeros((n, 0), dtype=float)
+
         # TODO: Register results
 
     @property
@@ -293,6 +300,34 @@ class ShortCircuitResults(ResultsTemplate):
                                 ylabel=y_label,
                                 units=y_label)
 
+        elif result_type == ResultTypes.BusShortCircuitSweepPower:
+            labels = self.bus_names
+            y = np.abs(self.sweep_SCpower)
+            y_label = '(MVA)'
+
+            return ResultsTable(data=y,
+                                index=labels,
+                                idx_device_type=DeviceType.BusDevice,
+                                columns=[str(ft) for ft in self.sweep_fault_types],
+                                cols_device_type=DeviceType.NoDevice,
+                                title=title,
+                                ylabel=y_label,
+                                units=y_label)
+
+        elif result_type == ResultTypes.BusShortCircuitSweepCurrent:
+            labels = self.bus_names
+            y = self.sweep_Ik
+            y_label = '(kA)'
+
+            return ResultsTable(data=y,
+                                index=labels,
+                                idx_device_type=DeviceType.BusDevice,
+                                columns=[str(ft) for ft in self.sweep_fault_types],
+                                cols_device_type=DeviceType.NoDevice,
+                                title=title,
+                                ylabel=y_label,
+                                units=y_label)
+
         elif result_type == ResultTypes.BranchActivePowerFrom0:
             labels = self.branch_names
             y = self.Sf0.real
@@ -15,17 +15,19 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-from typing import Tuple
+from typing import Tuple, List
 import numpy as np
 import scipy.sparse as sp
 from scipy.sparse.linalg import inv
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
-from GridCalEngine.Simulations.ShortCircuitStudies.short_circuit import short_circuit_3p, short_circuit_unbalance
-from GridCalEngine.Topology.admittance_matrices import compute_admittances
+from GridCalEngine.Simulations.ShortCircuitStudies.short_circuit import (short_circuit_3p, short_circuit_unbalance,
+                                                                         get_zbus_diagonal, short_circuit_sweep,
+                                                                         sequence_to_phase_currents)
+from GridCalEngine.Topology.admittance_matrices import compute_admittances, AdmittanceMatrices
 from GridCalEngine.Simulations.ShortCircuitStudies.short_circuit_results import ShortCircuitResults
 from GridCalEngine.Simulations.PowerFlow.NumericalMethods.common_functions import polar_to_rect
 from GridCalEngine.enumerations import FaultType
-from GridCalEngine.basic_structures import CxVec, Vec
+from GridCalEngine.basic_structures import CxVec, Vec, CxMat, Mat
 
 
 # Sfb, Stb, If, It, Vbranch, loading, losses
@@ -120,22 +122,14 @@ def short_circuit_ph3(calculation_inputs: NumericalCircuit, Vpf: CxVec, Zf: CxVe
     return results
 
 
-def short_circuit_unbalanced(calculation_inputs: NumericalCircuit,
-                             Vpf: CxVec,
-                             Zf: complex,
-                             bus_index: int,
-                             fault_type: FaultType):
+def get_sequence_admittances(
+        calculation_inputs: NumericalCircuit) -> Tuple[AdmittanceMatrices, AdmittanceMatrices, AdmittanceMatrices]:
     """
-    Run an unbalanced short circuit simulation for a single island
-    :param calculation_inputs:
-    :param Vpf: Power flow voltage vector applicable to the island
-    :param Zf: Short circuit impedance vector applicable to the island
-    :param bus_index:
-    :param fault_type:
-    :return: short circuit results
+    Build the zero, positive and negative sequence admittances of an island,
+    including the generators and batteries impedances
+    :param calculation_inputs: NumericalCircuit
+    :return: zero, positive and negative sequence AdmittanceMatrices
     """
-
-    # build Y0, Y1, Y2
     nbr = calculation_inputs.nbr
     nbus = calculation_inputs.nbus
 
@@ -217,6 +211,10 @@ def short_circuit_unbalanced(calculation_inputs: NumericalCircuit,
                                seq=2,
                                add_windings_phase=True)
 
+    return adm0, adm1, adm2
+
+
+def get_phase_shifted_voltage(calculation_inputs: NumericalCircuit, Vpf: CxVec) -> CxVec:
     """
     Initialize Vpf introducing phase shifts
     No search algo is needed. Instead, we need to solve YV=0,
@@ -237,7 +235,12 @@ def short_circuit_unbalanced(calculation_inputs: NumericalCircuit,
     V = - inv(Yx) Yu Vvd
     ph_add = np.angle(V)
     Vpf[pqpv] *= np.exp(1j * ph_add)
+    :param calculation_inputs: NumericalCircuit
+    :param Vpf: Power flow voltage vector applicable to the island (modified in place)
+    :return: Phase shifted voltage vector
     """
+    nbr = calculation_inputs.nbr
+    nbus = calculation_inputs.nbus
 
     adm_series = compute_admittances(R=calculation_inputs.branch_data.R,
                                      X=calculation_inputs.branch_data.X,
@@ -277,6 +280,30 @@ def short_circuit_unbalanced(calculation_inputs: NumericalCircuit,
     ph_add = np.angle(Vpqpv_ph)
     Vpf[pqpv] = polar_to_rect(np.abs(Vpf[pqpv]), np.angle(Vpf[pqpv]) + ph_add.T)
 
+    return Vpf
+
+
+def short_circuit_unbalanced(calculation_inputs: NumericalCircuit,
+                             Vpf: CxVec,
+                             Zf: complex,
+                             bus_index: int,
+                             fault_type: FaultType):
+    """
+    Run an unbalanced short circuit simulation for a single island
+    :param calculation_inputs:
+    :param Vpf: Power flow voltage vector applicable to the island
+    :param Zf: Short circuit impedance vector applicable to the island
+    :param bus_index:
+    :param fault_type:
+    :return: short circuit results
+    """
+
+    # build Y0, Y1, Y2
+    adm0, adm1, adm2 = get_sequence_admittances(calculation_inputs=calculation_inputs)
+
+    # add the voltage phase due to the slack, to the rest of the nodes
+    Vpf = get_phase_shifted_voltage(calculation_inputs=calculation_inputs, Vpf=Vpf)
+
     # solve the fault
     V0, V1, V2, SCC = short_circuit_unbalance(bus_idx=bus_index,
                                               Y0=adm0.Ybus,
@@ -349,3 +376,76 @@ def short_circuit_unbalanced(calculation_inputs: NumericalCircuit,
     results.losses2 = losses2
 
     return results
+
+
+def short_circuit_sweep_island(calculation_inputs: NumericalCircuit,
+                               Vpf: CxVec,
+                               Zf: CxVec,
+                               fault_types: List[FaultType],
+                               block_size: int = 256,
+                               n_workers: int = 1) -> Tuple[CxMat, Mat]:
+    """
+    Run a short circuit at every bus of a single island for each of the fault types
+    Each sequence admittance matrix is factorized once and only the diagonal of Zbus is computed,
+    instead of solving the complete network for every faulted bus.
+    :param calculation_inputs: NumericalCircuit
+    :param Vpf: Power flow voltage vector applicable to the island
+    :param Zf: Short circuit impedance vector applicable to the island
+    :param fault_types: list of FaultType to compute
+    :param block_size: number of Zbus columns solved at once
+    :param n_workers: number of processes among which the buses are split (1: serial)
+    :return: short circuit power (MVA), maximum phase fault current (kA); both of size (nbus, n fault types)
+    """
+    nbus = calculation_inputs.nbus
+    bus_idx = np.arange(nbus)
+    SCC = np.zeros((nbus, len(fault_types)), dtype=complex)
+    Ik = np.zeros((nbus, len(fault_types)), dtype=float)
+
+    if FaultType.ph3 in fault_types:
+        # same admittances as in short_circuit_ph3
+        Y_gen = calculation_inputs.generator_data.get_Yshunt(seq=1)
+        Y_batt = calculation_inputs.battery_data.get_Yshunt(seq=1)
+        Ybus_gen_batt = (calculation_inputs.Ybus + sp.diags(Y_gen) + sp.diags(Y_batt)).tocsc()
+        Zth_ph3 = get_zbus_diagonal(Y=Ybus_gen_batt, bus_idx=bus_idx, block_size=block_size, n_workers=n_workers)
+    else:
+        Ybus_gen_batt = None
+        Zth_ph3 = None
+
+    if any(ft != FaultType.ph3 for ft in fault_types):
+        # same admittances and pre-fault voltage as in short_circuit_unbalanced
+        adm0, adm1, adm2 = get_sequence_admittances(calculation_inputs=calculation_inputs)
+        V_shifted = get_phase_shifted_voltage(calculation_inputs=calculation_inputs, Vpf=Vpf.copy())
+
+        Zth0 = get_zbus_diagonal(Y=adm0.Ybus.tocsc(), bus_idx=bus_idx, block_size=block_size, n_workers=n_workers)
+        Zth2 = get_zbus_diagonal(Y=adm2.Ybus.tocsc(), bus_idx=bus_idx, block_size=block_size, n_workers=n_workers)
+
+        if Zth_ph3 is not None and (adm1.Ybus - Ybus_gen_batt).count_nonzero() == 0:
+            # the positive sequence matrix is the same one, do not factorize it again
+            Zth1 = Zth_ph3
+        else:
+            Zth1 = get_zbus_diagonal(Y=adm1.Ybus.tocsc(), bus_idx=bus_idx, block_size=block_size,
+                                     n_workers=n_workers)
+    else:
+        V_shifted = None
+        Zth0 = None
+        Zth1 = None
+        Zth2 = None
+
+    # base current of each bus in kA
+    Ibase = calculation_inputs.Sbase / (np.sqrt(3) * calculation_inputs.bus_data.Vnom)
+
+    for k, fault_type in enumerate(fault_types):
+
+        if fault_type == FaultType.ph3:
+            I0, I1, I2, SCC[:, k] = short_circuit_sweep(Vbus=Vpf, Zf=Zf, Zth0=None, Zth1=Zth_ph3, Zth2=None,
+                                                        fault_type=fault_type,
+                                                        baseMVA=calculation_inputs.Sbase)
+        else:
+            I0, I1, I2, SCC[:, k] = short_circuit_sweep(Vbus=V_shifted, Zf=Zf, Zth0=Zth0, Zth1=Zth1, Zth2=Zth2,
+                                                        fault_type=fault_type,
+                                                        baseMVA=calculation_inputs.Sbase)
+
+        Ia, Ib, Ic = sequence_to_phase_currents(I0=I0, I1=I1, I2=I2)
+        Ik[:, k] = np.max(np.abs(np.c_[Ia, Ib, Ic]), axis=1) * Ibase
+
+    return SCC, Ik
@@ -23,7 +23,8 @@ __all__ = ['lhs']
 def lhs(n: int,
         samples: Union[Mat, None] = None,
         criterion: str = 'center',
-        iterations: int = 5):
+        iterations: int = 5,
+        rng: Union[np.random.Generator, None] = None):
     """
     Generate a latin-hypercube design
 
@@ -40,6 +41,8 @@ def lhs(n: int,
     iterations : int
         The number of iterations in the maximin and correlations algorithms
         (Default: 5).
+    rng : numpy.random.Generator
+        Random generator to use (Default: the numpy global random state)
 
     Returns
     -------
@@ -92,6 +95,9 @@ def lhs(n: int,
     """
     H = None
 
+    if rng is None:
+        rng = np.random
+
     if samples is None:
         samples = n
 
@@ -101,7 +107,7 @@ def lhs(n: int,
                                      'corr'):
             raise Exception('Invalid value for "criterion": {}'.format(criterion))
     else:
-        H = _lhsclassic(n, samples)
+        H = _lhsclassic(n, samples, rng)
 
     # if criterion is None:
     #     criterion = 'center'
@@ -111,13 +117,13 @@ def lhs(n: int,
 
     if H is None:
         if criterion.lower() in ('center', 'c'):
-            H = _lhscentered(n, samples)
+            H = _lhscentered(n, samples, rng)
         elif criterion.lower() in ('maximin', 'm'):
-            H = _lhsmaximin(n, samples, iterations, 'maximin')
+            H = _lhsmaximin(n, samples, iterations, 'maximin', rng)
         elif criterion.lower() in ('centermaximin', 'cm'):
-            H = _lhsmaximin(n, samples, iterations, 'centermaximin')
+            H = _lhsmaximin(n, samples, iterations, 'centermaximin', rng)
         elif criterion.lower() in ('correlate', 'corr'):
-            H = _lhscorrelate(n, samples, iterations)
+            H = _lhscorrelate(n, samples, iterations, rng)
         else:
             raise Exception('Invalid value for "criterion": {}'.format(criterion))
 
@@ -126,18 +132,19 @@ def lhs(n: int,
 
 ################################################################################
 
-def _lhsclassic(n: int, samples: int) -> Mat:
+def _lhsclassic(n: int, samples: int, rng=np.random) -> Mat:
     """
 
     :param n:
     :param samples:
+    :param rng: random generator
     :return:
     """
     # Generate the intervals
     cut = np.linspace(0, 1, samples + 1)
 
     # Fill points uniformly in each interval
-    u = np.random.rand(samples, n)
+    u = rng.random((samples, n))
     a = cut[:samples]
     b = cut[1:samples + 1]
     rdpoints = np.zeros_like(u)
@@ -147,7 +154,7 @@ def _lhsclassic(n: int, samples: int) -> Mat:
     # Make the random pairings
     H = np.zeros_like(rdpoints)
     for j in range(n):
-        order = np.random.permutation(range(samples))
+        order = rng.permutation(samples)
         H[:, j] = rdpoints[order, j]
 
     return H
@@ -155,18 +162,19 @@ def _lhsclassic(n: int, samples: int) -> Mat:
 
 ################################################################################
 
-def _lhscentered(n: int, samples: int) -> Mat:
+def _lhscentered(n: int, samples: int, rng=np.random) -> Mat:
     """
 
     :param n:
     :param samples:
+    :param rng: random generator
     :return:
     """
     # Generate the intervals
     cut = np.linspace(0, 1, samples + 1)
 
     # Fill points uniformly in each interval
-    u = np.random.rand(samples, n)
+    u = rng.random((samples, n))
     a = cut[:samples]
     b = cut[1:samples + 1]
     _center = (a + b) / 2
@@ -174,20 +182,21 @@ def _lhscentered(n: int, samples: int) -> Mat:
     # Make the random pairings
     H = np.zeros_like(u)
     for j in range(n):
-        H[:, j] = np.random.permutation(_center)
+        H[:, j] = rng.permutation(_center)
 
     return H
 
 
 ################################################################################
 
-def _lhsmaximin(n, samples, iterations, lhstype) -> Mat:
+def _lhsmaximin(n, samples, iterations, lhstype, rng=np.random) -> Mat:
     """
 
     :param n:
     :param samples:
     :param iterations:
     :param lhstype:
+    :param rng: random generator
     :return:
     """
     maxdist = 0
@@ -195,9 +204,9 @@ def _lhsmaximin(n, samples, iterations, lhstype) -> Mat:
     # Maximize the minimum distance between points
     for i in range(iterations):
         if lhstype == 'maximin':
-            Hcandidate = _lhsclassic(n, samples)
+            Hcandidate = _lhsclassic(n, samples, rng)
         else:
-            Hcandidate = _lhscentered(n, samples)
+            Hcandidate = _lhscentered(n, samples, rng)
 
         d = _pdist(Hcandidate)
         if maxdist < np.min(d):
@@ -211,12 +220,13 @@ def _lhsmaximin(n, samples, iterations, lhstype) -> Mat:
 
 ################################################################################
 
-def _lhscorrelate(n: int, samples: int, iterations: int) -> Mat:
+def _lhscorrelate(n: int, samples: int, iterations: int, rng=np.random) -> Mat:
     """
 
     :param n:
     :param samples:
     :param iterations:
+    :param rng: random generator
     :return:
     """
     mincorr = np.inf
@@ -224,7 +234,7 @@ def _lhscorrelate(n: int, samples: int, iterations: int) -> Mat:
     # Minimize the components correlation coefficients
     for i in range(iterations):
         # Generate a random LHS
-        Hcandidate = _lhsclassic(n, samples)
+        Hcandidate = _lhsclassic(n, samples, rng)
         R = np.corrcoef(Hcandidate)
         if np.max(np.abs(R[R != 1])) < mincorr:
             mincorr = np.max(np.abs(R - np.eye(R.shape[0])))
@@ -14,202 +14,370 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-
+from typing import Dict, Tuple, Union
 import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
 
-from GridCalEngine.Simulations.PowerFlow.power_flow_worker import PowerFlowOptions
+from GridCalEngine.Simulations.PowerFlow.power_flow_worker import PowerFlowOptions, multi_island_pf_nc
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
 from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit, compile_numerical_circuit_at
-from GridCalEngine.enumerations import DeviceType
+from GridCalEngine.Simulations.Stochastic.reliability_results import ReliabilityResults
+from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.Simulations.driver_template import DriverTemplate
+from GridCalEngine.basic_structures import Vec, IntVec, BoolVec
+from GridCalEngine.enumerations import MIPSolvers
+from GridCalEngine.Utils.MIP.selected_interface import LpModel, join
 
-
-def get_failure_time(mttf):
-    """
-    Get an array of possible failure times
-    :param mttf: mean time to failure
-    """
-    n_samples = len(mttf)
-    return -1.0 * mttf * np.log(np.random.rand(n_samples))
-
-
-def get_repair_time(mttr):
-    """
-    Get an array of possible repair times
-    :param mttr: mean time to recovery
-    """
-    n_samples = len(mttr)
-    return -1.0 * mttr * np.log(np.random.rand(n_samples))
+HOURS_PER_YEAR = 8760
 
 
-def get_reliability_events(horizon, mttf, mttr, tpe: DeviceType):
+def sample_device_availability(n_years: int, n_hours: int, mttf: float, mttr: float,
+                               rng: np.random.Generator) -> np.ndarray:
     """
-    Get random fail-repair events until a given time horizon in hours
-
-    :param horizon: maximum horizon in hours
+    Sample the hourly availability trajectories of a device with exponentially distributed
+    times to failure and to repair. Every year starts from the stationary distribution of the states,
+    which for exponential times is the same as continuing the previous year.
+    :param n_years: number of years
+    :param n_hours: number of hours per year
     :param mttf: Mean time to failure (h)
     :param mttr: Mean time to repair (h)
-    :param tpe: device type (DeviceType)
-    :return: list of events, each event tuple has: (time in hours, element index, activation state (True/False))
+    :param rng: random generator
+    :return: boolean array (years, hours), True when the device is available
     """
-    n_samples = len(mttf)
-    t = np.zeros(n_samples)
-    done = np.zeros(n_samples, dtype=bool)
-    events = list()
-
-    if mttf.all() == 0.0:
-        return events
+    # initial state, from the stationary probability of being available
+    up0 = rng.random(n_years) < mttf / (mttf + mttr)
+
+    # alternate up and down durations starting by the initial state, until the horizon is covered,
+    # the expected number of cycles per year is drawn at once, hence the memory is bounded by the states
+    n_cycles = int(np.ceil(n_hours / (mttf + mttr))) + 1
+    t_end = np.zeros(n_years)
+    times = list()
+    while np.any(t_end < n_hours):
+        up = rng.exponential(mttf, (n_years, n_cycles))
+        down = rng.exponential(mttr, (n_years, n_cycles))
+        durations = np.empty((n_years, 2 * n_cycles))
+        durations[:, 0::2] = np.where(up0[:, np.newaxis], up, down)
+        durations[:, 1::2] = np.where(up0[:, np.newaxis], down, up)
+        t = t_end[:, np.newaxis] + np.cumsum(durations, axis=1)
+        t_end = t[:, -1]
+        times.append(t)
+
+    # every transition toggles the state from the hour it happens on
+    t = np.concatenate(times, axis=1)
+    y, c = np.where(t < n_hours)
+    h = np.ceil(t[y, c]).astype(int)
+    keep = h < n_hours
+    toggles = np.zeros((n_years, n_hours), dtype=np.uint8)
+    np.bitwise_xor.at(toggles, (y[keep], h[keep]), 1)
+
+    return up0[:, np.newaxis] ^ np.bitwise_xor.accumulate(toggles, axis=1).astype(bool)
+
+
+def sample_availability(n_years: int, n_hours: int, mttf: Vec, mttr: Vec, rng: np.random.Generator) -> np.ndarray:
+    """
+    Sample the hourly availability trajectories of a set of devices (see sample_device_availability).
+    The devices are sampled one by one, so the temporary memory is that of a single device.
+    Devices without MTTF or MTTR never fail.
+    :param n_years: number of years
+    :param n_hours: number of hours per year
+    :param mttf: Mean time to failure of the devices (h)
+    :param mttr: Mean time to repair of the devices (h)
+    :param rng: random generator
+    :return: boolean array (years, hours, devices), True when the device is available
+    """
+    states = np.ones((n_years, n_hours, len(mttf)), dtype=bool)
 
-    not_done = np.where(done == False)[0]
-    not_done_s = set(not_done)
-    while len(not_done) > 0:  # if all event get to the horizon, finnish the sampling
+    for d in np.where((mttf > 0) & (mttr > 0))[0]:
+        states[:, :, d] = sample_device_availability(n_years=n_years, n_hours=n_hours,
+                                                     mttf=mttf[d], mttr=mttr[d], rng=rng)
 
-        # simulate failure
-        t[not_done] += get_failure_time(mttf[not_done])
-        idx = np.where(t >= horizon)[0]
-        done[idx] = True
+    return states
 
-        # store failure events
-        events += [(t[i], tpe, i, False) for i in (not_done_s - set(idx))]
 
-        # simulate repair
-        t[not_done] += get_repair_time(mttr[not_done])
-        idx = np.where(t >= horizon)[0]
-        done[idx] = True
+def get_unique_states(states: np.ndarray, t_idx: IntVec) -> Tuple[np.ndarray, IntVec, IntVec]:
+    """
+    Find the distinct system states, a state being the availability of the devices at a time index
+    :param states: availability of the devices (steps, devices)
+    :param t_idx: time index of every step
+    :return: unique state keys (bytes matrix), index of the first step of every unique state,
+             index of the unique state of every step
+    """
+    n = states.shape[0]
+    keys = np.c_[np.packbits(states, axis=1),
+                 t_idx.astype('>i4').view(np.uint8).reshape(-1, 4)]
 
-        # store recovery events
-        events += [(t[i], tpe, i, True) for i in (not_done_s - set(idx))]
+    # sort the keys as words of 64 bits, which is much faster than sorting the rows as bytes
+    pad = (-keys.shape[1]) % 8
+    words = np.ascontiguousarray(np.c_[keys, np.zeros((n, pad), dtype=np.uint8)]).view(np.uint64)
+    order = np.lexsort(words.T[::-1])
+    sorted_words = words[order]
 
-        # update not done
-        not_done = np.where(done == False)[0]
-        not_done_s = set(not_done)
+    # the sort is stable, so the first element of every group is its first occurrence
+    is_new = np.r_[True, np.any(sorted_words[1:] != sorted_words[:-1], axis=1)]
+    inverse = np.empty(n, dtype=int)
+    inverse[order] = np.cumsum(is_new) - 1
+    first = order[is_new]
 
-    # sort in place
-    # events.sort(key=lambda tup: tup[0])
-    return events
+    return keys[first], first, inverse
 
 
-def get_reliability_scenario(nc: NumericalCircuit, horizon=10000):
+def get_island_capacity_deficit(nc: NumericalCircuit, br_active: BoolVec, gen_active: BoolVec) -> Vec:
     """
-    Get reliability events
-    :param nc: numerical circuit instance
-    :param horizon: time horizon in hours
-    :return: dictionary of events, each event tuple has:
-    (time in hours, DataType, element index, activation state (True/False))
+    Get the load curtailment of a state ignoring the branch ratings: every island has to cover its demand
+    with the capacity of its available generators, the deficit is shared among the island loads
+    :param nc: NumericalCircuit
+    :param br_active: sampled availability of the branches
+    :param gen_active: sampled availability of the generators
+    :return: curtailment per bus (MW)
     """
-    all_events = list()
-
-    # TODO: Add MTTF and MTTR to data devices
+    active = nc.branch_data.active.astype(bool) & br_active
+    adj = sp.coo_matrix((np.ones(active.sum()), (nc.branch_data.F[active], nc.branch_data.T[active])),
+                        shape=(nc.nbus, nc.nbus))
+    n_islands, labels = connected_components(adj, directed=False)
 
-    # Branches
-    all_events += get_reliability_events(horizon,
-                                         nc.branch_data.mttf,
-                                         nc.branch_data.mttr,
-                                         DeviceType.BranchDevice)
+    demand = -nc.load_data.get_injections_per_bus().real
+    capacity = get_bus_capacity(nc=nc, gen_active=gen_active)
 
-    all_events += get_reliability_events(horizon,
-                                         nc.generator_data.mttf,
-                                         nc.generator_data.mttr,
-                                         DeviceType.GeneratorDevice)
+    island_deficit = np.maximum(np.bincount(labels, weights=demand, minlength=n_islands) -
+                                np.bincount(labels, weights=capacity, minlength=n_islands), 0.0)
 
-    all_events += get_reliability_events(horizon,
-                                         nc.battery_data.mttf,
-                                         nc.battery_data.mttr,
-                                         DeviceType.BatteryDevice)
+    positive_demand = np.maximum(demand, 0.0)
+    island_demand = np.bincount(labels, weights=positive_demand, minlength=n_islands)
+    share = np.divide(positive_demand, island_demand[labels],
+                      out=np.zeros(nc.nbus), where=island_demand[labels] > 0)
 
-    all_events += get_reliability_events(horizon,
-                                         nc.load_data.mttf,
-                                         nc.load_data.mttr,
-                                         DeviceType.LoadDevice)
+    return island_deficit[labels] * share
 
-    all_events += get_reliability_events(horizon,
-                                         nc.shunt_data.mttf,
-                                         nc.shunt_data.mttr,
-                                         DeviceType.ShuntDevice)
 
-    # sort all
-    all_events.sort(key=lambda tup: tup[0])
-
-    return all_events
+def get_bus_capacity(nc: NumericalCircuit, gen_active: BoolVec) -> Vec:
+    """
+    Get the generation capacity available at every bus
+    :param nc: NumericalCircuit
+    :param gen_active: sampled availability of the generators
+    :return: capacity per bus (MW)
+    """
+    return (nc.generator_data.C_bus_elm @ (nc.generator_data.pmax *
+                                           (nc.generator_data.active.astype(bool) & gen_active)) +
+            nc.battery_data.C_bus_elm @ (nc.battery_data.pmax * nc.battery_data.active))
 
 
-def run_events(nc: NumericalCircuit, events_list: list):
+def get_state_curtailment(nc: NumericalCircuit, br_active: BoolVec, gen_active: BoolVec,
+                          solver_type: MIPSolvers = MIPSolvers.HIGHS) -> Vec:
     """
-
-    :param nc:
-    :param events_list:
+    Get the minimum load curtailment of a state with the DC power flow model:
+    the available generators are re-dispatched within their capacity and the branch
+    flows are kept within their ratings (branches with a null rating are not limited).
+    If no branch is limited, the problem reduces to the capacity balance of every island
+    and it is solved without the LP.
+    :param nc: NumericalCircuit
+    :param br_active: sampled availability of the branches
+    :param gen_active: sampled availability of the generators
+    :param solver_type: MIP solver to use
+    :return: curtailment per bus (MW)
     """
-    for t, tpe, i, state in events_list:
+    active = np.where(nc.branch_data.active.astype(bool) & br_active)[0]
+    rates = nc.branch_data.rates[active]
 
-        # Set the state of the event
-        if tpe == DeviceType.BusDevice:
-            pass
+    if not np.any(rates > 0):
+        return get_island_capacity_deficit(nc=nc, br_active=br_active, gen_active=gen_active)
 
-        elif tpe == DeviceType.BranchDevice:
-            nc.branch_data.active[i] = state
+    demand = -nc.load_data.get_injections_per_bus().real
+    capacity = get_bus_capacity(nc=nc, gen_active=gen_active)
+    F = nc.branch_data.F[active]
+    T = nc.branch_data.T[active]
+    x = nc.branch_data.X[active]
+    b = 1.0 / np.where(np.abs(x) > 1e-20, x, 1e-20)
 
-        elif tpe == DeviceType.GeneratorDevice:
-            nc.generator_data.active[i] = state
+    lp_model = LpModel(solver_type)
 
-        elif tpe == DeviceType.BatteryDevice:
-            nc.battery_data.active[i] = state
+    theta = np.array([lp_model.add_var(lb=-lp_model.INFINITY, ub=lp_model.INFINITY, name=join("theta_", [i]))
+                      for i in range(nc.nbus)], dtype=object)
+    gen = np.array([lp_model.add_var(lb=0.0, ub=float(capacity[i]), name=join("gen_", [i]))
+                    if capacity[i] > 0 else 0.0 for i in range(nc.nbus)], dtype=object)
+    curtail = np.array([lp_model.add_var(lb=0.0, ub=float(demand[i]), name=join("curtail_", [i]))
+                        if demand[i] > 0 else 0.0 for i in range(nc.nbus)], dtype=object)
+    spill = np.array([lp_model.add_var(lb=0.0, ub=float(-demand[i]), name=join("spill_", [i]))
+                      if demand[i] < 0 else 0.0 for i in range(nc.nbus)], dtype=object)
 
-        elif tpe == DeviceType.ShuntDevice:
-            nc.shunt_data.active[i] = state
+    # branch flows and ratings
+    flow_out = np.zeros(nc.nbus, dtype=object)
+    for k in range(len(active)):
+        flow = float(b[k]) * (theta[F[k]] - theta[T[k]])
+        flow_out[F[k]] += flow
+        flow_out[T[k]] -= flow
+        if rates[k] > 0:
+            lp_model.add_cst(flow <= float(rates[k]), name=join("rate_f_", [k]))
+            lp_model.add_cst(flow >= -float(rates[k]), name=join("rate_t_", [k]))
 
-        elif tpe == DeviceType.LoadDevice:
-            nc.load_data.active[i] = state
+    # nodal balance
+    for i in range(nc.nbus):
+        lp_model.add_cst(flow_out[i] - gen[i] - curtail[i] + spill[i] == -float(demand[i]),
+                         name=join("balance_", [i]))
 
-        else:
-            pass
+    lp_model.minimize(lp_model.sum(curtail))
 
-        # compile the grid information
-        calculation_islands = nc.split_into_islands()
+    status = lp_model.solve(robust=False)
 
+    if status != LpModel.OPTIMAL:
+        return get_island_capacity_deficit(nc=nc, br_active=br_active, gen_active=gen_active)
 
-class ReliabilityStudy(DriverTemplate):
+    return np.array([lp_model.get_value(c) for c in curtail])
 
-    def __init__(self, circuit: MultiCircuit, pf_options: PowerFlowOptions):
+
+class ReliabilityStudy(DriverTemplate):
+    name = 'Reliability'
+    tpe = SimulationTypes.Reliability_run
+
+    def __init__(self, circuit: MultiCircuit, pf_options: PowerFlowOptions,
+                 n_years: int = 100,
+                 seed: Union[int, None] = None,
+                 use_time_series: bool = False,
+                 compute_flows: bool = False,
+                 max_block_size: int = 20000000):
         """
-        ContinuationPowerFlowDriver constructor
-        @param circuit: NumericalCircuit instance
-        @param pf_options: power flow options instance
+        Sequential Monte Carlo reliability study.
+        The hourly availability of the branches and generators is sampled for blocks of years at once,
+        the distinct states are solved only once and the results are used to compute the
+        LOLE, EENS and LOLF indices. The load curtailment of a state is the minimum curtailment
+        of the DC power flow model with the available generation and the branch ratings.
+        :param circuit: MultiCircuit instance
+        :param pf_options: power flow options, used to compute the flows of every state if compute_flows
+                           (the solver type sets a DC, linear or AC computation)
+        :param n_years: number of years to simulate
+        :param seed: random seed
+        :param use_time_series: if true, the hour h uses the time index h % nt of the profiles, else the snapshot
+        :param compute_flows: compute the power flow of every distinct state to get the branch overload hours
+        :param max_block_size: maximum number of years x hours x devices sampled at once
         """
         DriverTemplate.__init__(self, grid=circuit)
 
-        # voltage stability options
         self.pf_options = pf_options
 
-        self.results = list()
+        self.n_years = n_years
+
+        self.seed = seed
+
+        self.use_time_series = use_time_series
+
+        self.compute_flows = compute_flows
+
+        self.max_block_size = max_block_size
+
+        self.results = ReliabilityResults(n_years=0, bus_names=np.empty(0), branch_names=np.empty(0))
 
         self.__cancel__ = False
 
-    def progress_callback(self, l):
+    def solve_state(self, nc: NumericalCircuit, br_active: BoolVec,
+                    gen_active: BoolVec) -> Tuple[float, Union[Vec, None], Union[IntVec, None]]:
         """
-        Send progress report
-        :param l: lambda value
-        :return: None
+        Solve a system state
+        :param nc: NumericalCircuit of the time index of the state
+        :param br_active: sampled availability of the branches
+        :param gen_active: sampled availability of the generators
+        :return: total curtailment (MW), curtailment per bus if any (MW), indices of the overloaded branches
         """
-        self.report_text('Running voltage collapse lambda:' + "{0:.2f}".format(l) + '...')
+        curtailment = get_state_curtailment(nc=nc, br_active=br_active, gen_active=gen_active)
+        total = float(curtailment.sum())
+
+        overloaded = None
+        if self.compute_flows:
+            # the generators stay at their set points, and the slacks absorb the imbalance
+            nc_state = nc.copy()
+            nc_state.branch_data.active = nc.branch_data.active * br_active
+            nc_state.generator_data.active = nc.generator_data.active * gen_active
+            if total > 0:
+                demand = -nc.load_data.get_injections_per_bus().real
+                bus_factor = 1.0 - np.divide(curtailment, demand, out=np.zeros(nc.nbus), where=demand > 0)
+                nc_state.load_data.S = nc.load_data.S * (nc.load_data.C_bus_elm.T @ bus_factor)
+            nc_state.reset_calculations()
+
+            pf_res = multi_island_pf_nc(nc=nc_state, options=self.pf_options)
+            overloaded = np.where(np.abs(pf_res.loading) > 1.0)[0]
+
+        return total, (curtailment if total > 0 else None), overloaded
 
     def run(self):
         """
-        run the voltage collapse simulation
-        @return:
+        Run the sequential Monte Carlo reliability simulation
         """
         self.tic()
+        self.__cancel__ = False
+
+        nc = compile_numerical_circuit_at(self.grid, t_idx=None)
+        nbr = nc.nbr
+
+        self.results = ReliabilityResults(n_years=self.n_years,
+                                          bus_names=nc.bus_names,
+                                          branch_names=nc.branch_names)
+
+        # time index of every hour of the year
+        if self.use_time_series and self.grid.time_profile is not None:
+            hour_t = np.arange(HOURS_PER_YEAR) % self.grid.get_time_number()
+        else:
+            hour_t = np.full(HOURS_PER_YEAR, -1)
+
+        mttf = np.r_[nc.branch_data.mttf, nc.generator_data.mttf]
+        mttr = np.r_[nc.branch_data.mttr, nc.generator_data.mttr]
+        block_years = max(1, min(self.n_years, self.max_block_size // (HOURS_PER_YEAR * max(len(mttf), 1))))
+
+        rng = np.random.default_rng(self.seed)
+
+        # numerical circuits per time index and solved states, shared by all the blocks of years
+        nc_dict: Dict[int, NumericalCircuit] = {-1: nc}
+        state_cache: Dict[bytes, Tuple[float, Union[Vec, None], Union[IntVec, None]]] = dict()
 
-        # compile the numerical circuit
-        numerical_circuit = compile_numerical_circuit_at(self.grid, t_idx=None)
+        self.report_text('Running the reliability simulation...')
 
-        evt = get_reliability_scenario(numerical_circuit,
-                                       horizon=1)
+        for y0 in range(0, self.n_years, block_years):
+            ny = min(block_years, self.n_years - y0)
 
-        run_events(nc=numerical_circuit, events_list=evt)
+            states = sample_availability(n_years=ny, n_hours=HOURS_PER_YEAR, mttf=mttf, mttr=mttr, rng=rng)
+            states = states.reshape(ny * HOURS_PER_YEAR, len(mttf))
+            t_idx = np.tile(hour_t, ny)
+
+            keys, first, inverse = get_unique_states(states=states, t_idx=t_idx)
+            counts = np.bincount(inverse, minlength=len(first))
+
+            curtailment = np.zeros(len(first))
+            for u, k in enumerate(first):
+                key = keys[u].tobytes()
+                sol = state_cache.get(key, None)
+
+                if sol is None:
+                    t = int(t_idx[k])
+                    if t not in nc_dict:
+                        nc_dict[t] = compile_numerical_circuit_at(self.grid, t_idx=t)
+
+                    sol = self.solve_state(nc=nc_dict[t], br_active=states[k, :nbr], gen_active=states[k, nbr:])
+                    state_cache[key] = sol
+
+                total, bus_curtailment, overloaded = sol
+                curtailment[u] = total
+                if bus_curtailment is not None:
+                    self.results.bus_eens += counts[u] * bus_curtailment
+                if overloaded is not None:
+                    self.results.branch_overload_hours[overloaded] += counts[u]
+
+            # hourly curtailment of the years of the block
+            hourly = curtailment[inverse].reshape(ny, HOURS_PER_YEAR)
+            lol = hourly > 1e-6
+            self.results.lol_hours[y0:y0 + ny] = lol.sum(axis=1)
+            self.results.ens[y0:y0 + ny] = hourly.sum(axis=1)
+            self.results.lol_events[y0:y0 + ny] = lol[:, 0] + (lol[:, 1:] & ~lol[:, :-1]).sum(axis=1)
+            self.results.n_years = y0 + ny
+
+            self.report_progress2(y0 + ny, self.n_years)
+
+            if self.__cancel__:
+                break
+
+        if self.results.n_years > 0:
+            self.results.bus_eens /= self.results.n_years
+            self.results.branch_overload_hours /= self.results.n_years
+        self.results.n_unique_states = len(state_cache)
 
         self.toc()
 
     def cancel(self):
         self.__cancel__ = True
-
-
@@ -0,0 +1,162 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import numpy as np
+from GridCalEngine.basic_structures import IntVec, Vec, StrVec
+from GridCalEngine.Simulations.results_table import ResultsTable
+from GridCalEngine.Simulations.results_template import ResultsTemplate
+from GridCalEngine.enumerations import StudyResultsType, ResultTypes, DeviceType
+
+
+class ReliabilityResults(ResultsTemplate):
+    """
+    Sequential Monte Carlo reliability results
+    """
+
+    def __init__(self, n_years: int, bus_names: StrVec, branch_names: StrVec):
+        """
+        Constructor
+        :param n_years: number of simulated years
+        :param bus_names: names of the buses
+        :param branch_names: names of the branches
+        """
+        ResultsTemplate.__init__(self,
+                                 name='Reliability',
+                                 available_results={
+                                     ResultTypes.ReportsResults: [ResultTypes.ReliabilityIndices,
+                                                                  ResultTypes.ReliabilityYearlyIndices],
+                                     ResultTypes.BusResults: [ResultTypes.BusExpectedEnergyNotServed],
+                                     ResultTypes.BranchResults: [ResultTypes.BranchExpectedOverloadHours]
+                                 },
+                                 time_array=None,
+                                 clustering_results=None,
+                                 study_results_type=StudyResultsType.Reliability)
+
+        self.bus_names: StrVec = bus_names
+        self.branch_names: StrVec = branch_names
+
+        # number of years actually simulated (the simulation may be cancelled)
+        self.n_years: int = 0
+
+        # yearly loss of load hours, energy not served (MWh) and loss of load events
+        self.lol_hours: Vec = np.zeros(n_years)
+        self.ens: Vec = np.zeros(n_years)
+        self.lol_events: IntVec = np.zeros(n_years, dtype=int)
+
+        # expected energy not served per bus (MWh/year)
+        self.bus_eens: Vec = np.zeros(len(bus_names))
+
+        # expected hours per year that every branch is overloaded (only when the flows are computed)
+        self.branch_overload_hours: Vec = np.zeros(len(branch_names))
+
+        # number of distinct states found and solved
+        self.n_unique_states: int = 0
+
+        self.register(name='bus_names', tpe=StrVec)
+        self.register(name='branch_names', tpe=StrVec)
+        self.register(name='n_years', tpe=int)
+        self.register(name='lol_hours', tpe=Vec)
+        self.register(name='ens', tpe=Vec)
+        self.register(name='lol_events', tpe=IntVec)
+        self.register(name='bus_eens', tpe=Vec)
+        self.register(name='branch_overload_hours', tpe=Vec)
+        self.register(name='n_unique_states', tpe=int)
+
+    @property
+    def lole(self) -> float:
+        """
+        Loss of load expectation (h/year)
+        :return: float
+        """
+        return float(self.lol_hours[:self.n_years].mean()) if self.n_years > 0 else 0.0
+
+    @property
+    def eens(self) -> float:
+        """
+        Expected energy not served (MWh/year)
+        :return: float
+        """
+        return float(self.ens[:self.n_years].mean()) if self.n_years > 0 else 0.0
+
+    @property
+    def lolf(self) -> float:
+        """
+        Loss of load frequency (occurrences/year)
+        :return: float
+        """
+        return float(self.lol_events[:self.n_years].mean()) if self.n_years > 0 else 0.0
+
+    @property
+    def eens_cov(self) -> float:
+        """
+        Coefficient of variation of the EENS estimate, used as convergence measure of the simulation
+        :return: float
+        """
+        if self.n_years > 1 and self.eens > 0:
+            return float(self.ens[:self.n_years].std(ddof=1) / np.sqrt(self.n_years) / self.eens)
+        else:
+            return 0.0
+
+    def mdl(self, result_type: ResultTypes) -> ResultsTable:
+        """
+        Plot the results
+        :param result_type: ResultTypes
+        :return: ResultsTable
+        """
+        if result_type == ResultTypes.ReliabilityIndices:
+            data = np.array([self.lole, self.eens, self.lolf, self.eens_cov, self.n_years, self.n_unique_states])
+            return ResultsTable(data=data,
+                                index=np.array(['LOLE (h/year)',
+                                                'EENS (MWh/year)',
+                                                'LOLF (occ/year)',
+                                                'EENS coefficient of variation',
+                                                'Simulated years',
+                                                'Unique states']),
+                                idx_device_type=DeviceType.NoDevice,
+                                columns=np.array([result_type.value]),
+                                cols_device_type=DeviceType.NoDevice,
+                                title=result_type.value)
+
+        elif result_type == ResultTypes.ReliabilityYearlyIndices:
+            n = self.n_years
+            data = np.c_[self.lol_hours[:n], self.ens[:n], self.lol_events[:n]]
+            return ResultsTable(data=data,
+                                index=np.array(['Year {}'.format(y + 1) for y in range(n)]),
+                                idx_device_type=DeviceType.NoDevice,
+                                columns=np.array(['LOL (h)', 'ENS (MWh)', 'LOL events']),
+                                cols_device_type=DeviceType.NoDevice,
+                                title=result_type.value)
+
+        elif result_type == ResultTypes.BusExpectedEnergyNotServed:
+            return ResultsTable(data=self.bus_eens,
+                                index=self.bus_names,
+                                idx_device_type=DeviceType.BusDevice,
+                                columns=np.array(['EENS (MWh/year)']),
+                                cols_device_type=DeviceType.NoDevice,
+                                title=result_type.value,
+                                units='(MWh/year)')
+
+        elif result_type == ResultTypes.BranchExpectedOverloadHours:
+            return ResultsTable(data=self.branch_overload_hours,
+                                index=self.branch_names,
+                                idx_device_type=DeviceType.BranchDevice,
+                                columns=np.array(['Overload (h/year)']),
+                                cols_device_type=DeviceType.NoDevice,
+                                title=result_type.value,
+                                units='(h/year)')
+
+        else:
+            raise Exception('Result type not understood:' + str(result_type))
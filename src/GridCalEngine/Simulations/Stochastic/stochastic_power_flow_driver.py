@@ -14,17 +14,27 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from enum import Enum
+from typing import Tuple, Union, Dict, Any
+from scipy import stats
 
-from GridCalEngine.basic_structures import Logger
+from GridCalEngine.basic_structures import Logger, CxMat, Mat
 from GridCalEngine.Simulations.PowerFlow.power_flow_results import PowerFlowResults
 from GridCalEngine.Simulations.Stochastic.stochastic_power_flow_results import StochasticPowerFlowResults
 from GridCalEngine.Simulations.Stochastic.stochastic_power_flow_input import StochasticPowerFlowInput
+from GridCalEngine.Simulations.Stochastic.latin_hypercube_sampling import lhs
 from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at, BranchImpedanceMode
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
-from GridCalEngine.Simulations.PowerFlow.power_flow_worker import PowerFlowOptions, multi_island_pf_nc
+from GridCalEngine.Simulations.PowerFlow.power_flow_worker import (PowerFlowOptions, multi_island_pf_nc,
+                                                                   multi_island_pf_nc_batch,
+                                                                   batch_power_flow_supported)
 
+from GridCalEngine.DataStructures.numerical_circuit import NumericalCircuit
+from GridCalEngine.Utils.NumericalMethods.weldorf_online_stddev import WeldorfOnlineStdDevVec
 from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.Simulations.driver_template import DriverTemplate
 
@@ -39,6 +49,119 @@ class StochasticPowerFlowType(Enum):
     LatinHypercube = 'Latin Hypercube'
 
 
+def solve_stochastic_block(numerical_circuit: NumericalCircuit,
+                           options: PowerFlowOptions,
+                           S_block: CxMat,
+                           logger: Logger) -> Tuple[CxMat, CxMat, CxMat, CxMat]:
+    """
+    Solve the power flow of a block of samples
+    :param numerical_circuit: NumericalCircuit
+    :param options: PowerFlowOptions
+    :param S_block: power injections of the samples (p.u.)
+    :param logger: Logger
+    :return: voltages, branch flows, loading and losses of the samples
+    """
+    nb = S_block.shape[0]
+    V = np.zeros((nb, numerical_circuit.nbus), dtype=complex)
+    Sf = np.zeros((nb, numerical_circuit.nbr), dtype=complex)
+    loading = np.zeros((nb, numerical_circuit.nbr), dtype=complex)
+    losses = np.zeros((nb, numerical_circuit.nbr), dtype=complex)
+
+    # the samples share the grid structure, so they may be solved in batches
+    if options.batch_size > 0 and batch_power_flow_supported(nc=numerical_circuit, options=options):
+        for a in range(0, nb, options.batch_size):
+            b = min(a + options.batch_size, nb)
+            batch_res = multi_island_pf_nc_batch(nc_list=[numerical_circuit] * (b - a),
+                                                 options=options,
+                                                 logger=logger,
+                                                 Sbus_input=S_block[a:b, :])
+            V[a:b, :] = batch_res.voltage
+            Sf[a:b, :] = batch_res.Sf
+            loading[a:b, :] = batch_res.loading
+            losses[a:b, :] = batch_res.losses
+    else:
+        for k in range(nb):
+            res = multi_island_pf_nc(nc=numerical_circuit,
+                                     options=options,
+                                     Sbus_input=S_block[k, :])
+            V[k, :] = res.voltage
+            Sf[k, :] = res.Sf
+            loading[k, :] = res.loading
+            losses[k, :] = res.losses
+
+    return V, Sf, loading, losses
+
+
+def stochastic_power_flow_block(numerical_circuit: NumericalCircuit,
+                                options: PowerFlowOptions,
+                                monte_carlo_input: StochasticPowerFlowInput,
+                                n_samples: int,
+                                use_lhs: bool,
+                                seed: np.random.SeedSequence,
+                                Sbase: float,
+                                lhs_points: Union[Mat, None] = None):
+    """
+    Sample and solve a block of stochastic power flow points.
+    This is the process pool entry point, the results only depend on the seed of the block.
+    :param numerical_circuit: NumericalCircuit
+    :param options: PowerFlowOptions
+    :param monte_carlo_input: StochasticPowerFlowInput
+    :param n_samples: number of samples of the block
+    :param use_lhs: use Latin Hypercube sampling
+    :param seed: random seed sequence of the block
+    :param Sbase: base power (MVA)
+    :param lhs_points: Latin Hypercube design of the block, if None and use_lhs, one is generated
+    :return: injections, voltages, flows, loading, losses, statistics of the block, logger
+    """
+    logger = Logger()
+    rng = np.random.default_rng(seed)
+
+    # get the power injections in p.u.
+    S = monte_carlo_input.get(n_samples, use_latin_hypercube=use_lhs, rng=rng, lhs_points=lhs_points) / Sbase
+
+    V, Sf, loading, losses = solve_stochastic_block(numerical_circuit=numerical_circuit,
+                                                    options=options,
+                                                    S_block=S,
+                                                    logger=logger)
+
+    # statistics of the voltage modules, flows, loading and losses of the block
+    block_stats = (WeldorfOnlineStdDevVec(numerical_circuit.nbus),
+                   WeldorfOnlineStdDevVec(numerical_circuit.nbr),
+                   WeldorfOnlineStdDevVec(numerical_circuit.nbr),
+                   WeldorfOnlineStdDevVec(numerical_circuit.nbr))
+    for st, values in zip(block_stats, (np.abs(V), Sf.real, loading.real, losses.real)):
+        st.update(values)
+
+    return S, V, Sf, loading, losses, block_stats, logger
+
+
+# arguments of stochastic_power_flow_block shared by all the blocks, set once per worker process
+_WORKER_BASE_CASE: Dict[str, Any] = dict()
+
+
+def stochastic_power_flow_worker_init(base_case: Dict[str, Any]) -> None:
+    """
+    Process pool initializer: keep the numerical circuit and the stochastic input in the worker process,
+    so that only the block size, seed and design are sent with every block
+    :param base_case: arguments of stochastic_power_flow_block shared by all the blocks
+    """
+    _WORKER_BASE_CASE.clear()
+    _WORKER_BASE_CASE.update(base_case)
+
+
+def stochastic_power_flow_block_worker(n_samples: int,
+                                       seed: np.random.SeedSequence,
+                                       lhs_points: Union[Mat, None] = None):
+    """
+    Process pool entry point of stochastic_power_flow_block
+    :param n_samples: number of samples of the block
+    :param seed: random seed sequence of the block
+    :param lhs_points: Latin Hypercube design of the block
+    :return: injections, voltages, flows, loading, losses, statistics of the block, logger
+    """
+    return stochastic_power_flow_block(n_samples=n_samples, seed=seed, lhs_points=lhs_points, **_WORKER_BASE_CASE)
+
+
 class StochasticPowerFlowDriver(DriverTemplate):
     name = 'Stochastic Power Flow'
     tpe = SimulationTypes.StochasticPowerFlow
@@ -46,15 +169,29 @@ class StochasticPowerFlowDriver(DriverTemplate):
     def __init__(self, grid: MultiCircuit, options: PowerFlowOptions, mc_tol=1e-3, batch_size=100,
                  sampling_points=10000,
                  opf_time_series_results=None,
-                 simulation_type: StochasticPowerFlowType = StochasticPowerFlowType.LatinHypercube):
+                 simulation_type: StochasticPowerFlowType = StochasticPowerFlowType.LatinHypercube,
+                 streaming: bool = False,
+                 reservoir_size: int = 1000,
+                 confidence: float = 0.95,
+                 seed: Union[int, None] = None,
+                 early_stop: bool = False):
         """
         Monte Carlo simulation constructor
         :param grid: MultiGrid instance
         :param options: Power flow options
-        :param mc_tol: monte carlo std.dev tolerance
-        :param batch_size: size of the batch
-        :param sampling_points: maximum monte carlo iterations in case of not reach the precission
+        :param mc_tol: monte carlo tolerance: maximum half width of the confidence interval of the mean voltage modules
+        :param batch_size: number of samples generated and evaluated at once (every block is a parallel task),
+                           also the minimum number of samples before checking the convergence
+        :param sampling_points: number of monte carlo samples (maximum number if early_stop is set)
         :param simulation_type: Type of sampling method
+        :param streaming: if true, the statistics are computed online and only a reservoir sample of the points is kept,
+                          so that the memory does not grow with the number of samples
+        :param reservoir_size: number of points kept in streaming mode
+        :param confidence: confidence level of the convergence criterion (i.e. 0.95)
+        :param seed: random seed, the same seed gives the same results with any number of processes
+                     (the blocks are run in parallel when options.multi_core is set)
+        :param early_stop: if true, stop sampling once the confidence interval is below mc_tol,
+                           otherwise all the sampling points are evaluated
         """
         DriverTemplate.__init__(self, grid=grid)
 
@@ -70,6 +207,16 @@ class StochasticPowerFlowDriver(DriverTemplate):
 
         self.simulation_type = simulation_type
 
+        self.streaming = streaming
+
+        self.reservoir_size = reservoir_size
+
+        self.confidence = confidence
+
+        self.seed = seed
+
+        self.early_stop = early_stop
+
         self.results = StochasticPowerFlowResults(n=0,
                                                   m=0,
                                                   p=0,
@@ -99,18 +246,65 @@ class StochasticPowerFlowDriver(DriverTemplate):
         self.report_progress2(t, self.max_sampling_points)
         self.returned_results.append(res)
 
-    def run_single_thread_mc(self, use_lhs=False):
+    @property
+    def z_score(self) -> float:
+        """
+        Two-tailed z-score of the confidence level
+        :return: float
         """
+        return float(stats.norm.ppf((1.0 + self.confidence) / 2.0))
 
-        :param use_lhs:
-        :return:
+    def report_convergence(self, mc_results: StochasticPowerFlowResults, err: float, n_evaluated: int):
         """
-        self.__cancel__ = False
+        Store the convergence error and emmit the progress signal
+        :param mc_results: StochasticPowerFlowResults
+        :param err: half width of the confidence interval of the mean voltage modules
+        :param n_evaluated: number of samples evaluated so far
+        """
+        if err == 0:
+            err = 1e-200  # to avoid division by zeros
+        mc_results.error_series.append(err)
+
+        # emmit the progress signal
+        std_dev_progress = 100 * self.mc_tol / err
+        if std_dev_progress > 100:
+            std_dev_progress = 100
+        self.report_progress(max((std_dev_progress, n_evaluated / self.max_sampling_points * 100)))
+
+    def add_block(self, mc_results: StochasticPowerFlowResults, block_results: Tuple,
+                  reservoir_rng: Union[np.random.Generator, None]) -> bool:
+        """
+        Add the results of a block of samples and check the convergence
+        :param mc_results: StochasticPowerFlowResults
+        :param block_results: results of stochastic_power_flow_block
+        :param reservoir_rng: random generator of the reservoir sampling (streaming mode), None otherwise
+        :return: the simulation has converged and early stopping is enabled
+        """
+        S, V, Sf, loading, losses, block_stats, logger = block_results
+        self.logger += logger
+
+        mc_results.add_samples(S=S, V=V, Sf=Sf, loading=loading, losses=losses, stats=block_stats,
+                               rng=reservoir_rng)
+
+        # determine when to stop
+        if mc_results.samples_number > 1:
+            err = mc_results.v_stats.get_confidence_half_width(self.z_score).max()
+            self.report_convergence(mc_results=mc_results, err=err, n_evaluated=mc_results.samples_number)
+
+            return self.early_stop and mc_results.samples_number >= self.batch_size and err <= self.mc_tol
 
-        # initialize the grid time series results
-        # we will append the island results with another function
+        return False
 
-        # batch_size = self.sampling_points
+    def run_stochastic(self, use_lhs=False) -> StochasticPowerFlowResults:
+        """
+        Run the stochastic power flow.
+        The samples are generated and solved in blocks of batch_size samples, every block with its
+        own random stream spawned from the seed. The blocks are aggregated in order, hence the
+        results only depend on the seed and not on the number of processes.
+        :param use_lhs: use Latin Hypercube sampling
+        :return: StochasticPowerFlowResults
+        """
+        self.__cancel__ = False
 
         self.report_progress(0.0)
         self.report_text('Running Monte Carlo Sampling...')
@@ -122,68 +316,97 @@ class StochasticPowerFlowDriver(DriverTemplate):
                                                          branch_tolerance_mode=BranchImpedanceMode.Specified,
                                                          opf_results=self.opf_time_series_results)
 
+        # in streaming mode only a reservoir of points is kept
+        p = min(self.reservoir_size, self.max_sampling_points) if self.streaming else self.max_sampling_points
+
         mc_results = StochasticPowerFlowResults(n=numerical_circuit.nbus,
                                                 m=numerical_circuit.nbr,
-                                                p=self.max_sampling_points,
+                                                p=p,
                                                 bus_names=numerical_circuit.bus_names,
                                                 branch_names=numerical_circuit.branch_names,
                                                 bus_types=numerical_circuit.bus_types)
 
-        avg_res = PowerFlowResults(n=numerical_circuit.nbus,
-                                   m=numerical_circuit.nbr,
-                                   n_hvdc=numerical_circuit.nhvdc,
-                                   bus_names=numerical_circuit.bus_names,
-                                   branch_names=numerical_circuit.branch_names,
-                                   hvdc_names=numerical_circuit.hvdc_names,
-                                   bus_types=numerical_circuit.bus_types)
-
-        variance_sum = 0.0
-        v_sum = np.zeros(numerical_circuit.nbus, dtype=complex)
-
         # build inputs
         monte_carlo_input = StochasticPowerFlowInput(self.grid)
 
-        # get the power injections in p.u.
-        S_combinations = monte_carlo_input.get(self.max_sampling_points, use_latin_hypercube=use_lhs) / self.grid.Sbase
-
-        # run the time series
-        for i in range(self.max_sampling_points):
-
-            # Run the set monte carlo point at 't'
-            res = multi_island_pf_nc(nc=numerical_circuit,
-                                     options=self.options,
-                                     Sbus_input=S_combinations[i, :])
-
-            # Gather the results
-            mc_results.S_points[i, :] = S_combinations[i, :]
-            mc_results.V_points[i, :] = res.voltage
-            mc_results.Sbr_points[i, :] = res.Sf
-            mc_results.loading_points[i, :] = res.loading
-            mc_results.losses_points[i, :] = res.losses
-
-            # determine when to stop
-            if i > 1:
-                v_sum += mc_results.get_voltage_sum()
-                v_avg = v_sum / i
-                v_variance = np.abs((np.power(mc_results.V_points - v_avg, 2.0) / (i - 1)).min())
-
-                # progress
-                variance_sum += v_variance
-                err = variance_sum / i
-                if err == 0:
-                    err = 1e-200  # to avoid division by zeros
-                mc_results.error_series.append(err)
-
-                # emmit the progress signal
-                std_dev_progress = 100 * self.mc_tol / err
-                if std_dev_progress > 100:
-                    std_dev_progress = 100
-                self.report_progress(max((std_dev_progress, i / self.max_sampling_points * 100)))
-
-            if self.__cancel__:
-                break
-
-        mc_results.compile()
+        block_size = max(self.batch_size, 1)
+        starts = np.arange(0, self.max_sampling_points, block_size)
+        ends = np.minimum(starts + block_size, self.max_sampling_points)
+
+        # independent random streams for every block, plus one for the driver itself
+        seed_sequence = np.random.SeedSequence(self.seed)
+        block_seeds = seed_sequence.spawn(len(starts))
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+
+        if use_lhs and not self.streaming:
+            # a single design for all the samples, that the blocks slice
+            lhs_points = lhs(monte_carlo_input.n, samples=self.max_sampling_points, criterion='center', rng=rng)
+        else:
+            # in streaming mode every block is stratified independently
+            lhs_points = None
+
+        reservoir_rng = rng if self.streaming else None
+
+        # arguments shared by all the blocks
+        base_case = dict(numerical_circuit=numerical_circuit,
+                         options=self.options,
+                         monte_carlo_input=monte_carlo_input,
+                         use_lhs=use_lhs,
+                         Sbase=self.grid.Sbase)
+
+        def get_block_args(k: int):
+            return dict(n_samples=ends[k] - starts[k],
+                        seed=block_seeds[k],
+                        lhs_points=lhs_points[starts[k]:ends[k], :] if lhs_points is not None else None)
+
+        if self.options.multi_thread and len(starts) > 1:
+
+            n_workers = self.options.n_workers if self.options.n_workers > 0 else os.cpu_count()
+            n_workers = max(1, min(n_workers, len(starts)))
+
+            self.report_text('Running Monte Carlo Sampling in {} processes...'.format(n_workers))
+
+            # the base case is sent once to every process, the blocks only carry their own arguments
+            with ProcessPoolExecutor(max_workers=n_workers,
+                                     initializer=stochastic_power_flow_worker_init,
+                                     initargs=(base_case,)) as executor:
+
+                # keep a bounded window of blocks in flight and gather them in order,
+                # so that the aggregation and the stop decision are the same as in the serial run
+                pending = deque()
+                k_next = 0
+                while True:
+                    while k_next < len(starts) and len(pending) < 2 * n_workers:
+                        pending.append(executor.submit(stochastic_power_flow_block_worker,
+                                                       **get_block_args(k_next)))
+                        k_next += 1
+
+                    if len(pending) == 0:
+                        break
+
+                    converged = self.add_block(mc_results=mc_results,
+                                               block_results=pending.popleft().result(),
+                                               reservoir_rng=reservoir_rng)
+
+                    if converged or self.__cancel__:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+        else:
+            for k in range(len(starts)):
+                converged = self.add_block(mc_results=mc_results,
+                                           block_results=stochastic_power_flow_block(**base_case,
+                                                                                     **get_block_args(k)),
+                                           reservoir_rng=reservoir_rng)
+
+                if converged or self.__cancel__:
+                    break
+
+        if self.streaming:
+            mc_results.compile_streaming()
+        else:
+            if mc_results.samples_number < self.max_sampling_points:
+                mc_results.trim(mc_results.samples_number)
+            mc_results.compile()
 
         # send the finnish signal
         self.report_done()
@@ -199,9 +422,9 @@ class StochasticPowerFlowDriver(DriverTemplate):
         self.__cancel__ = False
 
         if self.simulation_type == StochasticPowerFlowType.MonteCarlo:
-            self.results = self.run_single_thread_mc(use_lhs=False)
+            self.results = self.run_stochastic(use_lhs=False)
         elif self.simulation_type == StochasticPowerFlowType.LatinHypercube:
-            self.results = self.run_single_thread_mc(use_lhs=True)
+            self.results = self.run_stochastic(use_lhs=True)
 
         self.toc()
 
@@ -16,10 +16,11 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import numpy as np
+from typing import Union
 from sklearn.neighbors import KNeighborsRegressor
 from GridCalEngine.Simulations.Stochastic.latin_hypercube_sampling import lhs
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
-from GridCalEngine.basic_structures import CDF, CxVec, CxMat
+from GridCalEngine.basic_structures import CDF, CxVec, CxMat, Mat
 
 
 class StochasticPowerFlowInput:
@@ -48,11 +49,15 @@ class StochasticPowerFlowInput:
         self.regression_model = KNeighborsRegressor(n_neighbors=4)
         self.regression_model.fit(Sprof_fixed.real, Sprof_dispatcheable.real)
 
-    def get(self, n_samples=0, use_latin_hypercube=False) -> CxMat:
+    def get(self, n_samples=0, use_latin_hypercube=False,
+            rng: Union[np.random.Generator, None] = None,
+            lhs_points: Union[Mat, None] = None) -> CxMat:
         """
         Call this object
         :param n_samples: number of samples
         :param use_latin_hypercube: use Latin Hypercube to sample
+        :param rng: random generator, if None the numpy global random state is used
+        :param lhs_points: Latin Hypercube design to use instead of generating one (i.e. a slice of a bigger design)
         :return: CxMat (p.u.)
         """
         if n_samples == 0:
@@ -60,7 +65,8 @@ class StochasticPowerFlowInput:
 
         if use_latin_hypercube:
 
-            lhs_points = lhs(self.n, samples=n_samples, criterion='center')
+            if lhs_points is None:
+                lhs_points = lhs(self.n, samples=n_samples, criterion='center', rng=rng)
             S_fixed = np.zeros((n_samples, self.n), dtype=complex)
             for i in range(self.n):
                 if self.Scdf_fixed[i] is not None:
@@ -71,7 +77,7 @@ class StochasticPowerFlowInput:
 
             for i in range(self.n):
                 if self.Scdf_fixed[i] is not None:
-                    S_fixed[:, i] = self.Scdf_fixed[i].get_sample(n_samples)
+                    S_fixed[:, i] = self.Scdf_fixed[i].get_sample(n_samples, rng=rng)
 
         # apply the regression
         S_dispatchable = self.regression_model.predict(S_fixed.real)
@@ -15,8 +15,10 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import numpy as np
+from typing import Union, List, Tuple
 from sklearn.ensemble import RandomForestRegressor
-from GridCalEngine.basic_structures import CDF
+from GridCalEngine.basic_structures import CDF, Mat, CxMat, IntVec
+from GridCalEngine.Utils.NumericalMethods.weldorf_online_stddev import WeldorfOnlineStdDevVec
 from GridCalEngine.Simulations.results_table import ResultsTable
 from GridCalEngine.Simulations.results_template import ResultsTemplate
 from GridCalEngine.enumerations import StudyResultsType, ResultTypes, DeviceType
@@ -66,6 +68,17 @@ class StochasticPowerFlowResults(ResultsTemplate):
 
         self.error_series = list()
 
+        # number of samples evaluated (in streaming mode the points are only a reservoir sample of these)
+        self.samples_number = 0
+
+        # online statistics of the magnitudes, used in streaming mode
+        self.v_stats = WeldorfOnlineStdDevVec(n)
+        self.s_stats = WeldorfOnlineStdDevVec(m)
+        self.l_stats = WeldorfOnlineStdDevVec(m)
+        self.loss_stats = WeldorfOnlineStdDevVec(m)
+        self.conv_samples_list = list()
+        self.conv_lists = [list() for _ in range(8)]
+
         self.voltage = np.zeros(n)
         self.loading = np.zeros(m)
         self.sbranch = np.zeros(m)
@@ -83,6 +96,9 @@ class StochasticPowerFlowResults(ResultsTemplate):
         self.l_avg_conv = None
         self.loss_avg_conv = None
 
+        # number of samples of every convergence row (None means one row per sample)
+        self.conv_samples: Union[IntVec, None] = None
+
         # TODO: Register results
 
     def append_batch(self, mcres):
@@ -97,6 +113,106 @@ class StochasticPowerFlowResults(ResultsTemplate):
         self.loading_points = np.vstack((self.loading_points, mcres.loading_points))
         self.losses_points = np.vstack((self.losses_points, mcres.loading_points))
 
+    def trim(self, p: int):
+        """
+        Keep only the first p points
+        :param p: number of points to keep
+        """
+        self.S_points = self.S_points[:p, :]
+        self.V_points = self.V_points[:p, :]
+        self.Sbr_points = self.Sbr_points[:p, :]
+        self.loading_points = self.loading_points[:p, :]
+        self.losses_points = self.losses_points[:p, :]
+        self.points_number = p
+
+    def add_samples(self, S: CxMat, V: CxMat, Sf: CxMat, loading: CxMat, losses: CxMat,
+                    stats: Tuple[WeldorfOnlineStdDevVec, WeldorfOnlineStdDevVec,
+                                 WeldorfOnlineStdDevVec, WeldorfOnlineStdDevVec],
+                    rng: Union[np.random.Generator, None] = None):
+        """
+        Add a block of samples: the online statistics are merged and the points are stored.
+        If a random generator is given, the points are kept in a uniform reservoir sample
+        of the size of the points matrices (algorithm R), otherwise they are stored in order.
+        :param S: power injections of the samples (p.u.)
+        :param V: voltages of the samples (p.u.)
+        :param Sf: branch flows of the samples
+        :param loading: branch loading of the samples
+        :param losses: branch losses of the samples
+        :param stats: statistics of the block for the voltage modules, flows, loading and losses
+        :param rng: random generator used to pick the reservoir slots
+        """
+        nb = V.shape[0]
+        own_stats = (self.v_stats, self.s_stats, self.l_stats, self.loss_stats)
+        for k, (st, block_st) in enumerate(zip(own_stats, stats)):
+            st.merge(block_st)
+
+            # convergence rows, the "std" series store the variance as in compile()
+            self.conv_lists[k].append(st.mean.copy())
+            self.conv_lists[k + 4].append(st.variance)
+        self.conv_samples_list.append(self.samples_number + nb)
+
+        if rng is None:
+            rows = np.arange(nb)
+            slots = self.samples_number + rows
+        else:
+            # reservoir sampling
+            capacity = self.S_points.shape[0]
+            idx = self.samples_number + np.arange(nb)
+            slots = idx.copy()
+            full = idx >= capacity
+            slots[full] = rng.integers(0, idx[full] + 1)
+            rows = np.where(slots < capacity)[0]
+            slots = slots[rows]
+
+        self.S_points[slots, :] = S[rows, :]
+        self.V_points[slots, :] = V[rows, :]
+        self.Sbr_points[slots, :] = Sf[rows, :]
+        self.loading_points[slots, :] = loading[rows, :]
+        self.losses_points[slots, :] = losses[rows, :]
+
+        self.samples_number += nb
+
+    @staticmethod
+    def stack_convergence(rows: List[Mat], ncol: int) -> Mat:
+        """
+        Stack the convergence rows padded with a zero row at both ends, like compile() does
+        :param rows: list of convergence rows
+        :param ncol: number of columns
+        :return: Mat
+        """
+        zero = np.zeros((1, ncol))
+        return np.vstack([zero] + [r.reshape(1, ncol) for r in rows] + [zero])
+
+    def compile_streaming(self):
+        """
+        Compile the final values out of the online statistics gathered by add_samples
+        """
+        self.trim(min(self.samples_number, self.S_points.shape[0]))
+
+        n = len(self.v_stats.mean)
+        m = len(self.s_stats.mean)
+        (self.v_avg_conv, self.s_avg_conv, self.l_avg_conv, self.loss_avg_conv,
+         self.v_std_conv, self.s_std_conv, self.l_std_conv, self.loss_std_conv) = [
+            self.stack_convergence(rows, ncol) for rows, ncol in zip(self.conv_lists, (n, m, m, m) * 2)
+        ]
+        self.conv_samples = np.array(self.conv_samples_list, dtype=int)
+
+        self.voltage = self.v_stats.mean.copy()
+        self.sbranch = self.s_stats.mean.copy()
+        self.loading = self.l_stats.mean.copy()
+        self.losses = self.loss_stats.mean.copy()
+
+    def get_convergence_index(self, n_rows: int) -> IntVec:
+        """
+        Get the index of the convergence series
+        :param n_rows: number of convergence rows
+        :return: IntVec
+        """
+        if self.conv_samples is not None and len(self.conv_samples) == n_rows:
+            return self.conv_samples
+        else:
+            return np.arange(0, n_rows, 1)
+
     def get_voltage_sum(self):
         """
         Return the voltage summation
@@ -264,7 +380,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             x_label = 'Sampling points'
 
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BusDevice,
@@ -279,7 +395,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(MW)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BranchDevice,
@@ -294,7 +410,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(%)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BranchDevice,
@@ -309,7 +425,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(MVA)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BranchDevice,
@@ -324,7 +440,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(p.u.)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BusDevice,
@@ -339,7 +455,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(MW)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BranchDevice,
@@ -354,7 +470,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(%)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BranchDevice,
@@ -369,7 +485,7 @@ class StochasticPowerFlowResults(ResultsTemplate):
             y_label = '(MVA)'
             x_label = 'Sampling points'
             return ResultsTable(data=y,
-                                index=np.arange(0, y.shape[0], 1),
+                                index=self.get_convergence_index(y.shape[0]),
                                 idx_device_type=DeviceType.NoDevice,
                                 columns=labels,
                                 cols_device_type=DeviceType.BranchDevice,
@@ -17,13 +17,12 @@
 from __future__ import annotations
 import time
 import numpy as np
-from typing import List, Dict, Union, TYPE_CHECKING
+from typing import List, Dict, Tuple, Union, TYPE_CHECKING
 from GridCalEngine.basic_structures import IntVec, Vec
 from GridCalEngine.Simulations.driver_types import SimulationTypes
 from GridCalEngine.basic_structures import Logger, Mat
 from GridCalEngine.enumerations import EngineType
 from GridCalEngine.Devices.multi_circuit import MultiCircuit
-import GridCalEngine.Topology.topology as tp
 
 if TYPE_CHECKING:
     from GridCalEngine.Simulations.Clustering.clustering_results import ClusteringResults
@@ -229,9 +228,21 @@ class TimeSeriesDriverTemplate(DriverTemplate):
                  and that [5, 6, 7, 8] are represented by the topology of 5
         """
 
-        return tp.find_different_states(
-            states_array=self.grid.get_branch_active_time_array()[self.time_indices]
-        )
+        return self.grid.get_topology_states().get_groups(time_indices=self.time_indices)
+
+    def get_topology_execution_plan(self) -> List[Tuple[IntVec, IntVec]]:
+        """
+        Grouped execution plan: the time steps to simulate gathered by topology state,
+        so that the topology dependent structures (islands, admittances, factorizations, PTDF, ...)
+        can be computed once per group and then every time step of the group swept.
+        :return: list of (positions in time_indices, time indices) of every group, in order of first appearance.
+                 The first time step of each group is its representative.
+        """
+        if self.time_indices is None:
+            return list()
+
+        return [(np.array(pos, dtype=int), self.time_indices[pos])
+                for pos in self.get_topologic_groups().values()]
 
     def get_fuel_emissions_energy_calculations(self, gen_p: Mat, gen_cost: Mat):
         """
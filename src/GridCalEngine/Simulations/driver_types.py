@@ -51,6 +51,7 @@ class SimulationTypes(Enum):
     OptimalNetTransferCapacityTimeSeries_run = 'Optimal net transfer capacity time series'
     InvestmestsEvaluation_run = 'Investments evaluation'
     TopologyProcessor_run = 'Topology Processor'
+    Reliability_run = 'Reliability'
 
     def __str__(self):
         return self.value
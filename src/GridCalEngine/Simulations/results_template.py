@@ -357,6 +357,11 @@ class ResultsTemplate:
 
             if df is not None and res_prop is not None:
 
+                # tabular results (i.e. reports) rebuild themselves from their DataFrame
+                if hasattr(res_prop.tpe, "from_df"):
+                    setattr(self, res_prop.name, res_prop.tpe.from_df(df))
+                    continue
+
                 # it may be complex...
                 if is_complex:
                     split_pt = int(df.columns.size / 2)
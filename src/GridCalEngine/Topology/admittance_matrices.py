@@ -16,9 +16,11 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 
+import hashlib
 import numpy as np
 import scipy.sparse as sp
-from typing import Union, Tuple, List
+from collections import OrderedDict
+from typing import Union, Tuple, List, Callable, Any, Hashable
 from GridCalEngine.enumerations import WindingsConnection
 from GridCalEngine.basic_structures import ObjVec, Vec, CxVec, IntVec
 
@@ -665,3 +667,81 @@ def compute_linear_admittances(nbr: int,
     """
 
     return LinearAdmittanceMatrices(Bbus=Bbus, Bf=Bf)
+
+
+def get_arrays_hash(*arrays: np.ndarray) -> bytes:
+    """
+    Get a digest of the contents of a number of arrays
+    :param arrays: numpy arrays
+    :return: digest bytes
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        h.update(str(arr.dtype).encode())
+        h.update(np.array(arr.shape, dtype=np.int64).tobytes())
+        h.update(arr.tobytes())
+    return h.digest()
+
+
+class AdmittanceMatricesCache:
+    """
+    Bounded LRU cache of admittance structures.
+    The keys are the hashes of the arrays that change along the simulations (branch states, taps, etc.)
+    so the cache must only be shared among circuits compiled from the same grid and compilation options,
+    where the rest of the information (impedances, connectivity) is the same.
+    """
+
+    def __init__(self, max_size: int = 32):
+        """
+        Constructor
+        :param max_size: maximum number of entries
+        """
+        self.max_size = max_size
+
+        self.data: OrderedDict[Hashable, Any] = OrderedDict()
+
+        self.hits = 0
+
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Ratio of cache hits
+        :return: float
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def get(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Get the value of a key, computing it with func if it is not stored
+        :param key: hashable key
+        :param func: function without arguments that computes the value
+        :return: stored value
+        """
+        val = self.data.get(key, None)
+
+        if val is None:
+            self.misses += 1
+            val = func()
+            self.data[key] = val
+            if len(self.data) > self.max_size:
+                self.data.popitem(last=False)  # remove the least recently used
+        else:
+            self.hits += 1
+            self.data.move_to_end(key)
+
+        return val
+
+    def clear(self) -> None:
+        """
+        Remove all the entries and reset the counters
+        """
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
@@ -20,7 +20,7 @@ import numpy as np
 import numba as nb
 import scipy.sparse as sp
 from scipy.sparse import csc_matrix, csr_matrix, diags
-from GridCalEngine.basic_structures import IntVec, Vec
+from GridCalEngine.basic_structures import IntVec, IntMat, Vec
 
 
 @nb.njit(cache=True)
@@ -203,7 +203,71 @@ def get_adjacency_matrix(C_branch_bus_f: csc_matrix, C_branch_bus_t: csc_matrix,
     return C_bus_bus
 
 
-def find_different_states(states_array: IntVec, force_all=False) -> Dict[int, List[int]]:
+class TopologyStatesIndex:
+    """
+    Index of the different device status states along time.
+    Every time step row is packed into bits and the distinct rows are found in one pass,
+    the states are numbered in order of first appearance.
+    """
+
+    def __init__(self, states_array: IntMat):
+        """
+        TopologyStatesIndex constructor
+        :param states_array: array indicating the device status at every time step (time, device)
+        """
+        self.ntime = states_array.shape[0]
+
+        if self.ntime > 0:
+            packed = np.packbits(np.asarray(states_array) != 0, axis=1)
+            _, first, inverse = np.unique(packed, axis=0, return_index=True, return_inverse=True)
+
+            # renumber the states by order of first appearance
+            order = np.argsort(first)
+            rank = np.empty(len(order), dtype=int)
+            rank[order] = np.arange(len(order))
+
+            # time index where each state appears first
+            self.first_time: IntVec = first[order]
+
+            # state index of every time step
+            self.state_of_time: IntVec = rank[np.ravel(inverse)]
+        else:
+            self.first_time: IntVec = np.zeros(0, dtype=int)
+            self.state_of_time: IntVec = np.zeros(0, dtype=int)
+
+    @property
+    def n_states(self) -> int:
+        """
+        Number of different states
+        :return: int
+        """
+        return len(self.first_time)
+
+    def get_groups(self, time_indices: Union[IntVec, None] = None) -> Dict[int, List[int]]:
+        """
+        Group the time steps by state
+        :param time_indices: subset of time indices, the groups are given in positions of this subset (optional)
+        :return: Dictionary with the time: [array of times] represented by the index, for instance
+                 {0: [0, 1, 2, 3, 4], 5: [5, 6, 7, 8]}
+                 This means that [0, 1, 2, 3, 4] are represented by the topology of 0
+                 and that [5, 6, 7, 8] are represented by the topology of 5
+        """
+        states = self.state_of_time if time_indices is None else self.state_of_time[time_indices]
+
+        if len(states) == 0:
+            return dict()
+
+        _, first, inverse = np.unique(states, return_index=True, return_inverse=True)
+
+        # sort the positions by state, keeping the time order within each state
+        order = np.argsort(inverse, kind='stable')
+        splits = np.cumsum(np.bincount(inverse))[:-1]
+        groups = np.split(order, splits)
+
+        return {int(first[k]): groups[k].tolist() for k in np.argsort(first)}
+
+
+def find_different_states(states_array: IntMat, force_all=False) -> Dict[int, List[int]]:
     """
     Find the different branch states in time that may lead to different islands
     :param states_array: bool array indicating the different grid states (time, device)
@@ -219,34 +283,7 @@ def find_different_states(states_array: IntVec, force_all=False) -> Dict[int, Li
         return {i: [i] for i in range(ntime)}  # force all states
 
     else:
-
-        # initialize
-        states = dict()  # type: Dict[int, List[int]]
-        k = 1
-        for t in range(ntime):
-
-            # search this state in the already existing states
-            keys = list(states.keys())
-            nn = len(keys)
-            found = False
-            i = 0
-            while i < nn and not found:
-                t2 = keys[i]
-
-                # compare state at t2 with the state at t
-                if np.array_equal(states_array[t, :], states_array[t2, :]):
-                    states[t2].append(t)  # add the state to the existing list of the key
-                    found = True
-
-                i += 1
-
-            if not found:
-                # new state found (append itself)
-                states[t] = [t]
-
-            k += 1
-
-        return states
+        return TopologyStatesIndex(states_array=states_array).get_groups()
 
 
 def get_csr_bus_indices(C: csr_matrix) -> IntVec:
@@ -16,14 +16,15 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import uuid
 import warnings
-from typing import List, Union, Tuple, Iterable
+from typing import List, Union, Tuple, Iterable, Sequence
 import numpy as np
 from uuid import uuid4
 
+import scipy.sparse as sp
 from scipy.sparse import csc_matrix
 from GridCalEngine.Utils.MIP.SimpleMip.lpobjects import LpExp, LpCst, LpVar
 from GridCalEngine.Utils.MIP.SimpleMip.highs import HIGHS_AVAILABLE, solve_with_highs
-from GridCalEngine.basic_structures import Vec, Logger
+from GridCalEngine.basic_structures import Vec, IntVec, ObjVec, Logger
 from GridCalEngine.enumerations import MIPSolvers
 
 
@@ -51,6 +52,88 @@ def set_var_bounds(var: LpVar, lb: float, ub: float):
     var.upper_bound = ub
 
 
+class CoefficientsTriplets:
+    """
+    Growable (row, col, value) storage of the constraints matrix,
+    plus the constraints lower and upper bounds
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        CoefficientsTriplets constructor
+        :param capacity: initial number of non-zeros allocated
+        """
+        self.nnz = 0
+        self.rows: IntVec = np.empty(capacity, dtype=np.int64)
+        self.cols: IntVec = np.empty(capacity, dtype=np.int64)
+        self.data: Vec = np.empty(capacity, dtype=float)
+
+        self.n_rows = 0
+        self.lower: Vec = np.empty(max(capacity // 4, 1), dtype=float)
+        self.upper: Vec = np.empty(max(capacity // 4, 1), dtype=float)
+
+    def copy(self) -> "CoefficientsTriplets":
+        """
+        Deep copy of this
+        :return: CoefficientsTriplets
+        """
+        cpy = CoefficientsTriplets(capacity=1)
+        cpy.nnz = self.nnz
+        cpy.rows = self.rows.copy()
+        cpy.cols = self.cols.copy()
+        cpy.data = self.data.copy()
+        cpy.n_rows = self.n_rows
+        cpy.lower = self.lower.copy()
+        cpy.upper = self.upper.copy()
+        return cpy
+
+    def add_rows(self, lower: Vec, upper: Vec) -> IntVec:
+        """
+        Register new rows
+        :param lower: lower bounds of the rows
+        :param upper: upper bounds of the rows
+        :return: indices of the new rows
+        """
+        n = len(lower)
+        if self.n_rows + n > len(self.lower):
+            capacity = max(2 * len(self.lower), self.n_rows + n)
+            self.lower = np.resize(self.lower, capacity)
+            self.upper = np.resize(self.upper, capacity)
+
+        self.lower[self.n_rows:self.n_rows + n] = lower
+        self.upper[self.n_rows:self.n_rows + n] = upper
+        self.n_rows += n
+        return np.arange(self.n_rows - n, self.n_rows)
+
+    def add_terms(self, rows: IntVec, cols: IntVec, data: Vec):
+        """
+        Append non-zero entries (repeated entries are summed at export)
+        :param rows: row indices
+        :param cols: column indices
+        :param data: values
+        """
+        n = len(data)
+        if self.nnz + n > len(self.data):
+            capacity = max(2 * len(self.data), self.nnz + n)
+            self.rows = np.resize(self.rows, capacity)
+            self.cols = np.resize(self.cols, capacity)
+            self.data = np.resize(self.data, capacity)
+
+        self.rows[self.nnz:self.nnz + n] = rows
+        self.cols[self.nnz:self.nnz + n] = cols
+        self.data[self.nnz:self.nnz + n] = data
+        self.nnz += n
+
+    def get_matrix(self, n_cols: int) -> csc_matrix:
+        """
+        Get the constraints matrix
+        :param n_cols: number of columns (variables)
+        :return: CSC matrix (n_rows, n_cols)
+        """
+        return csc_matrix((self.data[:self.nnz], (self.rows[:self.nnz], self.cols[:self.nnz])),
+                          shape=(self.n_rows, n_cols))
+
+
 class LpModel:
     """
     SimpleMIP
@@ -69,6 +152,7 @@ class LpModel:
         self.objective: Union[LpExp, None] = None
         self.constraints: List[LpCst] = []
         self.variables: List[LpVar] = []
+        self.triplets = CoefficientsTriplets()
         self.relaxed_slacks: List[Tuple[int, LpVar, float]] = []
         self._is_minimize = True
         self._is_mip = False
@@ -108,6 +192,8 @@ class LpModel:
         for cst in self.constraints:
             cpy.constraints.append(cst.copy())
 
+        cpy.triplets = self.triplets.copy()
+
         if copy_results:
             cpy._col_value = self._col_value
             cpy._col_dual = self._col_dual
@@ -133,7 +219,8 @@ class LpModel:
         :param is_int:
         :return: Variable instance
         """
-        var = LpVar(name=name, lower_bound=lb, upper_bound=ub, is_integer=is_int, hash_id=uuid4().int)
+        var = LpVar(name=name, lower_bound=lb, upper_bound=ub, is_integer=is_int,
+                    internal_idx=len(self.variables), hash_id=uuid4().int)
         self.variables.append(var)
         return var
 
@@ -157,17 +244,22 @@ class LpModel:
         """
         return self._add_variable(lb=lb, ub=ub, name=name, is_int=False)
 
-    def add_vars(self, size: int, lb: float = 0.0, ub: float = 1e20, name: str = "", is_int=False) -> List[LpVar]:
+    def add_vars(self, size: int, lb: Union[float, Vec] = 0.0, ub: Union[float, Vec] = 1e20, name: str = "",
+                 is_int=False, labels: Union[Sequence, None] = None) -> List[LpVar]:
         """
         Make array of LP vars
         :param size: number of variables
-        :param lb: lower bound
-        :param ub: upper bound
+        :param lb: lower bound (one for all or one per variable)
+        :param ub: upper bound (one for all or one per variable)
         :param name: name (optional)
         :param is_int: create integer variables
+        :param labels: label of every variable to name them, if None the position is used
         :return: LpVar
         """
-        return [self._add_variable(lb=lb, ub=ub, name=f"{name}_{i}", is_int=is_int)
+        lb = np.broadcast_to(np.asarray(lb, dtype=float), size)
+        ub = np.broadcast_to(np.asarray(ub, dtype=float), size)
+        return [self._add_variable(lb=lb[i], ub=ub[i], name=f"{name}_{labels[i] if labels is not None else i}",
+                                   is_int=is_int)
                 for i in range(size)]
 
     def _set_objective(self, expression: LpExp, is_minimize=True):
@@ -202,11 +294,184 @@ class LpModel:
         """
         if isinstance(cst, LpCst):
             cst.name = name
+            lower, upper = cst.get_bounds()
+            i = self.triplets.add_rows(lower=[lower], upper=[upper])[0]
+            cst.set_index(i)
             self.constraints.append(cst)
+            self._add_expression_terms(i, cst.linear_expression)
             return cst
         else:
             raise ValueError("Only Constraint instances can be added.")
 
+    def _add_expression_terms(self, i: int, expr: LpExp):
+        """
+        Store the variable terms of an expression in the row i of the constraints matrix
+        :param i: constraint index
+        :param expr: LpExp
+        """
+        n = len(expr.terms)
+        cols = np.empty(n, dtype=np.int64)
+        data = np.empty(n, dtype=float)
+        k = 0
+        for var, coeff in expr.terms.items():
+            if var is not None:  # Skip if it's the constant term
+                cols[k] = var.get_index()
+                data[k] = coeff
+                k += 1
+        self.triplets.add_terms(rows=np.full(k, i), cols=cols[:k], data=data[:k])
+
+    def add_cst_term(self, cst: LpCst, var: LpVar, coeff: float = 1.0):
+        """
+        Add a term to a constraint that is already in the model
+        :param cst: LpCst
+        :param var: LpVar
+        :param coeff: coefficient
+        """
+        cst.add_term(var, coeff)
+        self.triplets.add_terms(rows=[cst.get_index()], cols=[var.get_index()], data=[coeff])
+
+    def get_linear_map(self, arr: ObjVec) -> Tuple[csc_matrix, Vec]:
+        """
+        Express an array of LP vars, expressions and numbers as X·v + c,
+        where v is the vector of all the model variables
+        :param arr: object array
+        :return: sparse matrix X (len(arr), n_vars), constant vector c
+        """
+        n = len(arr)
+        is_var = np.fromiter((isinstance(x, LpVar) for x in arr), dtype=bool, count=n)
+        is_expr = np.fromiter((isinstance(x, LpExp) for x in arr), dtype=bool, count=n)
+
+        # the vars are mapped at once, the expressions term by term
+        rows = [np.where(is_var)[0]]
+        cols = [np.fromiter((arr[i].get_index() for i in rows[0]), dtype=np.int64, count=len(rows[0]))]
+        data = [np.ones(len(rows[0]))]
+
+        const = np.zeros(n)
+        is_num = ~(is_var | is_expr)
+        const[is_num] = np.asarray(arr, dtype=object)[is_num].astype(float)
+
+        for i in np.where(is_expr)[0]:
+            x = arr[i]
+            items = [(var.get_index(), coeff) for var, coeff in x.terms.items() if var is not None]
+            rows.append(np.full(len(items), i))
+            cols.append(np.array([j for j, _ in items], dtype=np.int64))
+            data.append(np.array([v for _, v in items], dtype=float))
+            const[i] = x.offset
+
+        X = csc_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                       shape=(n, len(self.variables)))
+
+        return X, const
+
+    def add_matrix_cst(self,
+                       terms: List[Tuple[csc_matrix, ObjVec]],
+                       lb: Vec,
+                       ub: Vec,
+                       name: str = "",
+                       row_labels: Union[Sequence, None] = None) -> ObjVec:
+        """
+        Add a block of constraints lb <= sum(A_k · x_k) <= ub in one go.
+        The x_k arrays may contain LP vars, expressions or numbers; the numeric
+        part of the product is moved to the bounds.
+        Each row must be an equality, a lower or an upper limit.
+        :param terms: list of (sparse matrix A_k, object array x_k)
+        :param lb: array of lower bounds (one per row)
+        :param ub: array of upper bounds (one per row)
+        :param name: name prefix, the row label is appended (optional)
+        :param row_labels: label of every row to name the constraints, if None the row index is used
+        :return: object array of LpCst, 0 where the row has no variables
+        """
+        n_rows = len(lb)
+        A, const = self.get_matrix_map(terms=terms, n_rows=n_rows)
+
+        lb = np.asarray(lb, dtype=float) - const
+        ub = np.asarray(ub, dtype=float) - const
+
+        # only the rows with variables become constraints
+        row_idx = np.where(np.diff(A.indptr) > 0)[0]
+        lb = lb[row_idx]
+        ub = ub[row_idx]
+        eq = lb == ub
+        upper_only = ~eq & (lb <= -self.INFINITY)
+        lower_only = ~eq & (ub >= self.INFINITY)
+        if np.any(~(eq | upper_only | lower_only)):
+            raise ValueError("Ranged rows are not supported, split them into two blocks")
+
+        lb = np.where(upper_only, -self.INFINITY, lb)
+        ub = np.where(lower_only, self.INFINITY, ub)
+        idx = self.triplets.add_rows(lower=lb, upper=ub)
+
+        A = A[row_idx, :]
+        rows = np.repeat(idx, np.diff(A.indptr))
+        self.triplets.add_terms(rows=rows, cols=A.indices, data=A.data)
+
+        res = np.zeros(n_rows, dtype=object)
+        for k, i in enumerate(row_idx):
+            a, b = A.indptr[k], A.indptr[k + 1]
+            expr = LpExp()
+            expr.terms = {self.variables[j]: v for j, v in zip(A.indices[a:b], A.data[a:b])}
+            if eq[k]:
+                cst = LpCst(linear_expression=expr, sense="==", coefficient=lb[k])
+            elif upper_only[k]:
+                cst = LpCst(linear_expression=expr, sense="<=", coefficient=ub[k])
+            else:
+                cst = LpCst(linear_expression=expr, sense=">=", coefficient=lb[k])
+            label = row_labels[i] if row_labels is not None else i
+            cst.name = name + str(label) if name != "" else ""
+            cst.set_index(idx[k])
+            self.constraints.append(cst)
+            res[i] = cst
+
+        return res
+
+    def get_matrix_map(self, terms: List[Tuple[csc_matrix, ObjVec]], n_rows: int) -> Tuple[sp.csr_matrix, Vec]:
+        """
+        Express sum(A_k · x_k) as A·v + c, where v is the vector of all the model variables
+        :param terms: list of (sparse matrix A_k, object array x_k)
+        :param n_rows: number of rows of the matrices
+        :return: sparse matrix A (n_rows, n_vars), constant vector c
+        """
+        A = sp.csr_matrix((n_rows, len(self.variables)))
+        const = np.zeros(n_rows)
+        for mat, arr in terms:
+            X, c = self.get_linear_map(arr)
+            A = A + mat @ X
+            const += mat @ c
+
+        A = A.tocsr()
+        A.sum_duplicates()
+        A.eliminate_zeros()
+
+        return A, const
+
+    def dot(self, mat: csc_matrix, arr: ObjVec) -> ObjVec:
+        """
+        Matrix-vector product (A x) returning one expression per row
+        :param mat: sparse matrix A
+        :param arr: object array of LP vars, expressions or numbers
+        :return: object array of expressions (or numbers where the row has no variables)
+        """
+        return self.matrix_expressions(terms=[(mat, arr)], n_rows=mat.shape[0])
+
+    def matrix_expressions(self, terms: List[Tuple[csc_matrix, ObjVec]], n_rows: int) -> ObjVec:
+        """
+        Compute sum(A_k · x_k) returning one expression per row
+        :param terms: list of (sparse matrix A_k, object array x_k)
+        :param n_rows: number of rows of the matrices
+        :return: object array of expressions (or numbers where the row has no variables)
+        """
+        A, const = self.get_matrix_map(terms=terms, n_rows=n_rows)
+        res = np.zeros(n_rows, dtype=object)
+        for i in range(n_rows):
+            a, b = A.indptr[i], A.indptr[i + 1]
+            if a < b:
+                expr = LpExp(offset=const[i])
+                expr.terms = {self.variables[j]: v for j, v in zip(A.indices[a:b], A.data[a:b])}
+                res[i] = expr
+            else:
+                res[i] = float(const[i])
+        return res
+
     @staticmethod
     def sum(expr: Union[LpExp, Iterable]) -> LpExp:
         """
@@ -291,12 +556,13 @@ class LpModel:
 
             # Write the COLUMNS section
             file.write("COLUMNS\n")
-            for var in self.variables:
+            A = self.triplets.get_matrix(len(self.variables))
+            A.sum_duplicates()
+            for j, var in enumerate(self.variables):
                 file.write(f"    {var.name}    COST    {self.objective.terms.get(var, 0)}\n")
-                for i, constraint in enumerate(self.constraints):
-                    coeff = constraint.linear_expression.terms.get(var, 0)
-                    if coeff != 0:
-                        file.write(f"    {var.name}    C{i}    {coeff}\n")
+                for k in range(A.indptr[j], A.indptr[j + 1]):
+                    if A.data[k] != 0:
+                        file.write(f"    {var.name}    C{A.indices[k]}    {A.data[k]}\n")
 
             # Write the RHS section
             file.write("RHS\n")
@@ -381,40 +647,10 @@ class LpModel:
     def get_coefficients_data(self) -> Tuple[np.ndarray, csc_matrix, np.ndarray]:
         """
         Returns the coefficients matrix
-        :return:
+        :return: lower bounds, CSC matrix, upper bounds
         """
-
-        # Initialize lists to hold the row indices, column indices, and data for the A matrix
-        row_indices = []
-        col_indices = []
-        data = []
-
-        n = len(self.constraints)
-        lower = np.empty(n)
-        upper = np.empty(n)
-
-        # Iterate through each constraint, populating the lists
-        for i, constraint in enumerate(self.constraints):
-
-            lower[i], upper[i] = constraint.get_bounds()
-            constraint.set_index(i)
-
-            for var, coeff in constraint.linear_expression.terms.items():
-                if var is not None:  # Skip if it's the constant term
-                    # Row index is the constraint number
-                    row_indices.append(i)
-
-                    # Column index is the variable's index
-                    col_indices.append(self.variables.index(var))
-
-                    # Coefficient is the data
-                    data.append(coeff)
-
-        # Create the A matrix in CSC format
-        A_csc = csc_matrix((data, (row_indices, col_indices)),
-                           shape=(len(self.constraints), len(self.variables)))
-
-        return lower, A_csc, upper
+        n = self.triplets.n_rows
+        return self.triplets.lower[:n].copy(), self.triplets.get_matrix(len(self.variables)), self.triplets.upper[:n].copy()
 
     def get_var_data(self) -> Tuple[Vec, Vec, Vec, List[int]]:
         """
@@ -431,7 +667,6 @@ class LpModel:
             lower[i] = var.lower_bound
             coeff[i] = self.get_obj_coefficient(var)
             upper[i] = var.upper_bound
-            var.set_index(i)
             if var.is_integer:
                 is_int.append(i)
 
@@ -494,7 +729,7 @@ class LpModel:
                     debugging_f_obj += sl
 
                     # add the variable to the current constraint
-                    cst.add_var(sl)
+                    debug_model.add_cst_term(cst, sl)
 
                     # store for later
                     slacks.append(sl)
@@ -530,7 +765,7 @@ class LpModel:
                             main_f += sl2
 
                             # alter the matching constraint
-                            self.constraints[i].add_var(sl2)
+                            self.add_cst_term(self.constraints[i], sl2)
 
                             # logg this
                             # self.logger.add_warning("Relaxed problem",
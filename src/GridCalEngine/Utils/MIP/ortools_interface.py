@@ -21,7 +21,10 @@ so that in the future it can be exchanged with some
 other solver interface easily
 """
 
-from typing import List, Union, Tuple, Iterable
+from typing import List, Union, Tuple, Iterable, Sequence
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csc_matrix
 import ortools.linear_solver.pywraplp as ort
 from ortools.linear_solver.python import model_builder
 from ortools.linear_solver.python.model_builder import BoundedLinearExpression as LpCstBounded
@@ -31,7 +34,7 @@ from ortools.linear_solver.python.model_builder import Variable as LpVar
 from ortools.linear_solver.python.model_builder import _Sum as LpSum
 from ortools.init.python import init
 from GridCalEngine.enumerations import MIPSolvers
-from GridCalEngine.basic_structures import Logger
+from GridCalEngine.basic_structures import Logger, Vec, IntVec, ObjVec
 
 
 def get_available_mip_solvers() -> List[str]:
@@ -121,6 +124,152 @@ class LpModel:
         """
         return self.model.new_var(lb=lb, ub=ub, is_integer=False, name=name)
 
+    def add_vars(self, size: int, lb: Union[float, Vec] = 0.0, ub: Union[float, Vec] = 1e20, name: str = "",
+                 is_int=False, labels: Union[Sequence, None] = None) -> ObjVec:
+        """
+        Make array of LP vars
+        :param size: number of variables
+        :param lb: lower bound (one for all or one per variable)
+        :param ub: upper bound (one for all or one per variable)
+        :param name: name prefix, "_" and the position are appended (optional)
+        :param is_int: create integer variables
+        :param labels: label of every variable to name them, if None the position is used
+        :return: object array of LpVar
+        """
+        lb = np.broadcast_to(np.asarray(lb, dtype=float), size)
+        ub = np.broadcast_to(np.asarray(ub, dtype=float), size)
+        res = np.empty(size, dtype=object)
+        for i in range(size):
+            res[i] = self.model.new_var(lb=lb[i], ub=ub[i], is_integer=is_int,
+                                        name=f"{name}_{labels[i] if labels is not None else i}" if name != "" else "")
+        return res
+
+    def get_linear_map(self, arr: ObjVec) -> Tuple[csc_matrix, Vec, IntVec]:
+        """
+        Express an object array of LP vars and numbers as X·v + c, where v is the vector of all the model variables.
+        The positions holding expressions are not mapped, they are returned apart
+        :param arr: object array
+        :return: sparse matrix X (len(arr), n_vars), constant vector c, positions of the expressions
+        """
+        n = len(arr)
+        is_var = np.fromiter((isinstance(x, LpVar) for x in arr), dtype=bool, count=n)
+        is_expr = np.fromiter((isinstance(x, LpExp) for x in arr), dtype=bool, count=n) & ~is_var
+
+        var_pos = np.where(is_var)[0]
+        var_idx = np.fromiter((arr[i].index for i in var_pos), dtype=int, count=len(var_pos))
+        X = sp.csc_matrix((np.ones(len(var_pos)), (var_pos, var_idx)), shape=(n, self.model.num_variables))
+
+        const = np.zeros(n)
+        is_num = ~(is_var | is_expr)
+        const[is_num] = np.asarray(arr, dtype=object)[is_num].astype(float)
+
+        return X, const, np.where(is_expr)[0]
+
+    def get_matrix_map(self,
+                       terms: List[Tuple[csc_matrix, ObjVec]],
+                       n_rows: int) -> Tuple[sp.csr_matrix, Vec, ObjVec]:
+        """
+        Express sum(A_k · x_k) as A·v + c + e, where v is the vector of all the model variables
+        :param terms: list of (sparse matrix A_k, object array x_k)
+        :param n_rows: number of rows of the matrices
+        :return: sparse matrix A (n_rows, n_vars), constant vector c,
+                 object array e with the expressions contribution of every row (0 if none)
+        """
+        A = sp.csr_matrix((n_rows, self.model.num_variables))
+        const = np.zeros(n_rows)
+        row_expr = np.zeros(n_rows, dtype=object)
+        for mat, arr in terms:
+            X, c, expr_pos = self.get_linear_map(arr)
+            A = A + mat @ X
+            const += mat @ c
+
+            if len(expr_pos):
+                M = sp.csc_matrix(mat)[:, expr_pos]
+                for k, j in enumerate(expr_pos):
+                    for p in range(M.indptr[k], M.indptr[k + 1]):
+                        row_expr[M.indices[p]] += M.data[p] * arr[j]
+
+        A = A.tocsr()
+        A.eliminate_zeros()
+
+        return A, const, row_expr
+
+    def get_row_expression(self, A: sp.csr_matrix, i: int, row_expr: ObjVec, constant: float = 0.0) -> LpExp:
+        """
+        Build the expression of a row of a matrix map (see get_matrix_map)
+        :param A: sparse matrix (n_rows, n_vars)
+        :param i: row index
+        :param row_expr: expressions contribution of every row
+        :param constant: constant of the expression
+        :return: LpExp
+        """
+        a, b = A.indptr[i], A.indptr[i + 1]
+        expr = LpExp.weighted_sum([self.model.var_from_index(j) for j in A.indices[a:b]],
+                                  A.data[a:b],
+                                  constant=constant)
+        if isinstance(row_expr[i], LpExp):
+            expr = expr + row_expr[i]
+        return expr
+
+    def add_matrix_cst(self,
+                       terms: List[Tuple[csc_matrix, ObjVec]],
+                       lb: Vec,
+                       ub: Vec,
+                       name: str = "",
+                       row_labels: Union[Sequence, None] = None) -> ObjVec:
+        """
+        Add a block of constraints lb <= sum(A_k · x_k) <= ub in one go.
+        The x_k arrays may contain LP vars, expressions or numbers; the numeric
+        part of the product is moved to the bounds.
+        :param terms: list of (sparse matrix A_k, object array x_k)
+        :param lb: array of lower bounds (one per row)
+        :param ub: array of upper bounds (one per row)
+        :param name: name prefix, the row label is appended (optional)
+        :param row_labels: label of every row to name the constraints, if None the row index is used
+        :return: object array of LpCst, 0 where the row has no variables
+        """
+        n_rows = len(lb)
+        A, const, row_expr = self.get_matrix_map(terms=terms, n_rows=n_rows)
+
+        lb = np.asarray(lb, dtype=float) - const
+        ub = np.asarray(ub, dtype=float) - const
+
+        res = np.zeros(n_rows, dtype=object)
+        for i in np.where((np.diff(A.indptr) > 0) | np.fromiter((isinstance(x, LpExp) for x in row_expr),
+                                                                 dtype=bool, count=n_rows))[0]:
+            label = row_labels[i] if row_labels is not None else i
+            res[i] = self.model.add_linear_constraint(linear_expr=self.get_row_expression(A, i, row_expr),
+                                                      lb=lb[i],
+                                                      ub=ub[i],
+                                                      name=name + str(label) if name != "" else None)
+
+        return res
+
+    def dot(self, mat: csc_matrix, arr: ObjVec) -> ObjVec:
+        """
+        Matrix-vector product (A x) returning one flat expression per row
+        :param mat: sparse matrix A
+        :param arr: object array of LP vars, expressions or numbers
+        :return: object array of expressions (or numbers where the row has no variables)
+        """
+        return self.matrix_expressions(terms=[(mat, arr)], n_rows=mat.shape[0])
+
+    def matrix_expressions(self, terms: List[Tuple[csc_matrix, ObjVec]], n_rows: int) -> ObjVec:
+        """
+        Compute sum(A_k · x_k) returning one expression per row
+        :param terms: list of (sparse matrix A_k, object array x_k)
+        :param n_rows: number of rows of the matrices
+        :return: object array of expressions (or numbers where the row has no variables)
+        """
+        A, const, row_expr = self.get_matrix_map(terms=terms, n_rows=n_rows)
+        res = np.zeros(n_rows, dtype=object)
+        for i in range(n_rows):
+            if A.indptr[i] < A.indptr[i + 1] or isinstance(row_expr[i], LpExp):
+                res[i] = self.get_row_expression(A, i, row_expr, constant=const[i])
+            else:
+                res[i] = float(const[i])
+        return res
+
     def add_cst(self, cst: Union[LpCstBounded, LpExp, bool], name: str = "") -> Union[LpCst, int]:
         """
         Add constraint to the model
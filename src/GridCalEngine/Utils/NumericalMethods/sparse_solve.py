@@ -18,6 +18,7 @@
 import numpy as np
 from enum import Enum
 from typing import Union
+from collections import OrderedDict
 from collections.abc import Callable
 from scipy.sparse import csr_matrix, csc_matrix
 from GridCalEngine.basic_structures import Vec, Mat
@@ -132,6 +133,204 @@ def gmres_linsolve(A: csc_matrix, b: Union[Vec, Mat]) -> Union[Vec, Mat]:
     return x
 
 
+class SparsePatternAnalysis:
+    """
+    Symbolic analysis of a sparsity pattern: the pattern itself and the solver information that only depends on it
+    """
+
+    def __init__(self, A: csc_matrix):
+        """
+        Constructor
+        :param A: CSC matrix
+        """
+        self.shape = A.shape
+        self.indptr: np.ndarray = A.indptr.copy()
+        self.indices: np.ndarray = A.indices.copy()
+
+        # KLU: coordinates of A.data and symbolic factorization
+        self.klu_rows = None
+        self.klu_cols = None
+        self.klu_symbolic = None
+
+    def same_pattern(self, A: csc_matrix) -> bool:
+        """
+        Check if a matrix has this sparsity pattern
+        :param A: CSC matrix
+        :return: bool
+        """
+        return (self.shape == A.shape
+                and np.array_equal(self.indptr, A.indptr)
+                and np.array_equal(self.indices, A.indices))
+
+
+class SparseLinearSolver:
+    """
+    Sparse LU factorization handle for A x = b.
+    The symbolic analysis of every sparsity pattern factorized is kept (up to max_patterns, the least recently
+    used is forgotten), so that the factorizations of matrices with an already seen structure
+    (i.e. the Newton Jacobians of the islands of a time series) only perform the numeric step.
+    The analysis only depends on the sparsity pattern and the numeric step pivots on the values of each matrix,
+    so the factorization of a matrix does not depend on the matrices factorized before it.
+    SuperLU does not expose its symbolic analysis, so its matrices are always analyzed and factorized afresh.
+    The factorization can be used to solve several right hand sides.
+    """
+
+    def __init__(self, solver_type: SparseSolver = preferred_type, max_patterns: int = 8):
+        """
+        Constructor
+        :param solver_type: SparseSolver option
+        :param max_patterns: maximum number of sparsity patterns whose analysis is kept
+        """
+        self.solver_type = solver_type if solver_type in available_sparse_solvers else SparseSolver.UMFPACK
+        self.max_patterns = max_patterns
+
+        # analysis of the sparsity patterns seen so far (hash key -> analysis)
+        self._patterns: OrderedDict[int, SparsePatternAnalysis] = OrderedDict()
+
+        # analysis of the last factorized matrix
+        self._analysis: Union[SparsePatternAnalysis, None] = None
+
+        # numeric information
+        self._lu = None
+        self._A: Union[csc_matrix, None] = None
+        self._klu_A = None
+        self._klu_numeric = None
+
+        # statistics
+        self.n_analysis = 0
+        self.n_factorizations = 0
+
+    @staticmethod
+    def pattern_key(A: csc_matrix) -> int:
+        """
+        Hash of the sparsity pattern of a matrix
+        :param A: CSC matrix
+        :return: int
+        """
+        return hash((A.shape, A.indptr.tobytes(), A.indices.tobytes()))
+
+    def same_pattern(self, A: csc_matrix) -> bool:
+        """
+        Check if the matrix has the same sparsity pattern as the last factorized one
+        :param A: CSC matrix
+        :return: bool
+        """
+        return self._analysis is not None and self._analysis.same_pattern(A)
+
+    def find_analysis(self, A: csc_matrix) -> Union[SparsePatternAnalysis, None]:
+        """
+        Find the analysis of the sparsity pattern of a matrix
+        :param A: CSC matrix
+        :return: SparsePatternAnalysis or None if the pattern was not analyzed
+        """
+        if self.same_pattern(A):
+            return self._analysis
+
+        key = self.pattern_key(A)
+        analysis = self._patterns.get(key, None)
+        if analysis is not None and analysis.same_pattern(A):
+            self._patterns.move_to_end(key)
+            return analysis
+
+        return None
+
+    def analyze(self, A: csc_matrix) -> None:
+        """
+        Perform the symbolic analysis of the matrix (this also factorizes it)
+        :param A: CSC matrix
+        """
+        self._analysis = None
+        analysis = SparsePatternAnalysis(A)
+
+        if self.solver_type == SparseSolver.KLU:
+            # the KLU symbolic factorization only depends on the pattern
+            analysis.klu_rows = cvxopt.matrix(A.indices.astype(int))
+            analysis.klu_cols = cvxopt.matrix(np.repeat(np.arange(A.shape[1]), np.diff(A.indptr)))
+            analysis.klu_symbolic = klu.symbolic(cvxopt.spmatrix(A.data, analysis.klu_rows, analysis.klu_cols,
+                                                                 A.shape, 'd'))
+
+        self.factorize_numeric(A, analysis)
+
+        self._patterns[self.pattern_key(A)] = analysis
+        while len(self._patterns) > self.max_patterns:
+            self._patterns.popitem(last=False)
+
+        self._analysis = analysis
+        self.n_analysis += 1
+        self.n_factorizations += 1
+
+    def factorize_numeric(self, A: csc_matrix, analysis: SparsePatternAnalysis) -> None:
+        """
+        Numeric factorization of a matrix whose pattern was analyzed
+        :param A: CSC matrix
+        :param analysis: analysis of the sparsity pattern of A
+        """
+        if self.solver_type == SparseSolver.SuperLU:
+            # COLAMD ordering and partial pivoting of this matrix
+            self._lu = splu(A)
+
+        elif self.solver_type == SparseSolver.KLU:
+            self._klu_A = cvxopt.spmatrix(A.data, analysis.klu_rows, analysis.klu_cols, A.shape, 'd')
+            self._klu_numeric = klu.numeric(self._klu_A, analysis.klu_symbolic)
+
+        elif self.solver_type == SparseSolver.ILU:
+            self._lu = spilu(A)
+
+        else:
+            # these solvers do not expose the factorization, the matrix is stored for the solve step
+            self._A = A
+
+        self._analysis = analysis
+
+    def factorize(self, A: csc_matrix) -> "SparseLinearSolver":
+        """
+        Factorize the matrix, reusing the symbolic analysis if its sparsity pattern was seen before
+        :param A: sparse matrix
+        :return: self
+        """
+        if not isinstance(A, csc_matrix):
+            A = csc_matrix(A)
+
+        analysis = self.find_analysis(A)
+
+        if analysis is None:
+            self.analyze(A)
+        else:
+            self.factorize_numeric(A, analysis)
+            self.n_factorizations += 1
+
+        return self
+
+    def solve(self, b: Union[Vec, Mat]) -> Union[Vec, Mat]:
+        """
+        Solve A x = b with the last factorized matrix
+        :param b: right hand side (vector or matrix of several right hand sides)
+        :return: solution
+        """
+        if self.solver_type == SparseSolver.SuperLU:
+            return self._lu.solve(b)
+
+        elif self.solver_type == SparseSolver.ILU:
+            return self._lu.solve(b)
+
+        elif self.solver_type == SparseSolver.KLU:
+            x = cvxopt.matrix(b)
+            klu.solve(self._klu_A, self._klu_numeric, x)
+            return np.array(x)[:, 0] if b.ndim == 1 else np.array(x)
+
+        else:
+            return get_linear_solver(self.solver_type)(self._A, b)
+
+    def __call__(self, A: csc_matrix, b: Union[Vec, Mat]) -> Union[Vec, Mat]:
+        """
+        Factorize and solve, this has the same signature as the linear solver functions
+        :param A: System matrix
+        :param b: right hand side
+        :return: solution
+        """
+        return self.factorize(A).solve(b)
+
+
 def get_linear_solver(solver_type: SparseSolver = preferred_type) -> Callable[[csc_matrix, Union[Vec, Mat]], Union[Vec, Mat]]:
     """
     Privide the chosen linear solver_type function pointer to
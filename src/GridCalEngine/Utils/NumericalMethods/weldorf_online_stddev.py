@@ -104,6 +104,24 @@ class WeldorfOnlineStdDevMat:
                mean=self.mean,
                M2=self.M2)
 
+    def merge_row(self, t: int, count: Vec, mean: Vec, M2: Vec, steps: int):
+        """
+        Combine the aggregates of a set of values computed elsewhere into a row (Chan's parallel formula)
+        :param t: Row index
+        :param count: number of (positive) values of every column
+        :param mean: mean of the values of every column
+        :param M2: sum of the squared deviations of every column
+        :param steps: number of updates that the aggregates represent
+        """
+        self.steps += steps
+
+        n = self.count[t, :] + count
+        n_safe = np.maximum(n, 1)
+        delta = mean - self.mean[t, :]
+        self.M2[t, :] += M2 + delta * delta * self.count[t, :] * count / n_safe
+        self.mean[t, :] += delta * count / n_safe
+        self.count[t, :] = n
+
     def finalize(self) -> None:
         """
         Finalize: compute the variance and std dev
@@ -117,3 +135,98 @@ class WeldorfOnlineStdDevMat:
                      M2=self.M2,
                      std_dev=self.std_dev,
                      sample_variance=self.sample_variance)
+
+
+class WeldorfOnlineStdDevVec:
+    """
+    Weldorf's algorithm for the online computation of the mean and variance of a vector of magnitudes.
+    Unlike WeldorfOnlineStdDevMat, every value is accounted (signed magnitudes are allowed)
+    and the values may be added in blocks of samples
+    """
+
+    def __init__(self, n: int) -> None:
+        """
+        Constructor
+        :param n: number of magnitudes (columns)
+        """
+        self.count = 0
+        self.mean = np.zeros(n, dtype=float)
+        self.M2 = np.zeros(n, dtype=float)
+
+    def update(self, new_values: Mat):
+        """
+        Add a block of samples, combining its aggregates with the current ones (Chan's parallel formula)
+        :param new_values: matrix of samples (rows) by magnitudes (columns)
+        """
+        nb = new_values.shape[0]
+        if nb == 0:
+            return
+
+        b_mean = new_values.mean(axis=0)
+        b_M2 = np.power(new_values - b_mean, 2.0).sum(axis=0)
+
+        self.combine(count=nb, mean=b_mean, M2=b_M2)
+
+    def combine(self, count: int, mean: Vec, M2: Vec):
+        """
+        Combine the aggregates of a set of samples computed elsewhere (Chan's parallel formula)
+        :param count: number of samples
+        :param mean: mean of the samples
+        :param M2: sum of the squared deviations of the samples
+        """
+        if count == 0:
+            return
+
+        n = self.count + count
+        delta = mean - self.mean
+        self.M2 += M2 + delta * delta * self.count * count / n
+        self.mean += delta * count / n
+        self.count = n
+
+    def merge(self, other: "WeldorfOnlineStdDevVec"):
+        """
+        Merge the aggregates of another accumulator into this one
+        :param other: WeldorfOnlineStdDevVec
+        """
+        self.combine(count=other.count, mean=other.mean, M2=other.M2)
+
+    @property
+    def variance(self) -> Vec:
+        """
+        Population variance of every magnitude
+        :return: Vec
+        """
+        if self.count > 0:
+            return self.M2 / self.count
+        else:
+            return np.zeros_like(self.M2)
+
+    @property
+    def sample_variance(self) -> Vec:
+        """
+        Sample variance of every magnitude
+        :return: Vec
+        """
+        if self.count > 1:
+            return self.M2 / (self.count - 1)
+        else:
+            return np.zeros_like(self.M2)
+
+    @property
+    def std_dev(self) -> Vec:
+        """
+        Sample standard deviation of every magnitude
+        :return: Vec
+        """
+        return np.sqrt(self.sample_variance)
+
+    def get_confidence_half_width(self, z: float) -> Vec:
+        """
+        Half width of the confidence interval of the mean of every magnitude
+        :param z: two-tailed z-score of the confidence level (i.e. 1.96 for 95%)
+        :return: Vec
+        """
+        if self.count > 1:
+            return z * self.std_dev / np.sqrt(self.count)
+        else:
+            return np.full(len(self.M2), np.inf)
@@ -19,6 +19,7 @@ from GridCalEngine.Simulations import *
 from GridCalEngine.IO import *
 from GridCalEngine.Devices import *
 from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
+from GridCalEngine.DataStructures.numerical_circuit_ts import NumericalCircuitTimeSeries
 from GridCalEngine.enumerations import *
 
 
@@ -117,14 +117,15 @@ class CDF:
         """
         return CDF(np.array([a - b for a in self.arr for b in other]))
 
-    def get_sample(self, npoints=1):
+    def get_sample(self, npoints=1, rng: Union[np.random.Generator, None] = None):
         """
         Samples a number of uniform distributed points and
         returns the corresponding probability values given the CDF.
         @param npoints: Number of points to sample, 1 by default
+        @param rng: random generator, if None the numpy global random state is used
         @return: Corresponding probabilities
         """
-        pt = np.random.uniform(0, 1, npoints)
+        pt = (np.random if rng is None else rng).uniform(0, 1, npoints)
         if self.iscomplex:
             a = np.interp(pt, self.prob, self.arr.real)
             b = np.interp(pt, self.prob, self.arr.imag)
@@ -1139,6 +1139,7 @@ class StudyResultsType(Enum):
     NetTransferCapacity = 'NetTransferCapacity'
     NetTransferCapacityTimeSeries = 'NetTransferCapacityTimeSeries'
     StochasticPowerFlow = 'StochasticPowerFlow'
+    Reliability = 'Reliability'
 
     def __str__(self):
         return self.value
@@ -1405,6 +1406,8 @@ class ResultTypes(Enum):
     # Short-circuit
     BusShortCircuitActivePower = 'Short circuit active power'
     BusShortCircuitReactivePower = 'Short circuit reactive power'
+    BusShortCircuitSweepPower = 'Short circuit power sweep'
+    BusShortCircuitSweepCurrent = 'Short circuit current sweep'
 
     # PTDF
     PTDF = 'PTDF'
@@ -1532,6 +1535,12 @@ class ResultTypes(Enum):
     BranchReactiveLosses2 = 'Branch reactive losses (2)'
     BranchMonitoring = 'Branch monitoring logic'
 
+    # ReliabilityStudy
+    ReliabilityIndices = 'Reliability indices'
+    ReliabilityYearlyIndices = 'Reliability yearly indices'
+    BusExpectedEnergyNotServed = 'Bus expected energy not served'
+    BranchExpectedOverloadHours = 'Branch expected overload hours'
+
     ShortCircuitInfo = 'Short-circuit information'
 
     # classifiers
@@ -15,8 +15,13 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import os
+from io import BytesIO
 import numpy as np
+import pandas as pd
+import pytest
 from GridCalEngine.api import *
+from GridCalEngine.Simulations.ContingencyAnalysis.contingency_plan import add_n1_contingencies
+from GridCalEngine.Simulations.ContingencyAnalysis.contingencies_report import ContingencyResultsReport
 
 
 def test_contingency():
@@ -52,6 +57,259 @@ def test_contingency():
         line.active = True
 
 
+def test_contingency_multi_core():
+    """
+    Check that the parallel contingency analysis matches the serial one
+    :return:
+    """
+    fname = os.path.join('data', 'grids', 'IEEE14_contingency.gridcal')
+    main_circuit = FileOpen(fname).open()
+    pf_options = PowerFlowOptions(SolverType.NR,
+                                  verbose=False,
+                                  initialize_with_existing_solution=False,
+                                  dispatch_storage=True,
+                                  control_q=ReactivePowerControlMode.NoControl,
+                                  control_p=False)
+
+    options = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow)
+    serial_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options,
+                                              linear_multiple_contingencies=None)
+    serial_driver.run()
+
+    options_mc = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow,
+                                            multi_core=True, n_workers=2)
+    parallel_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options_mc,
+                                                linear_multiple_contingencies=None)
+    parallel_driver.run()
+
+    assert np.allclose(serial_driver.results.Sf, parallel_driver.results.Sf)
+    assert np.allclose(serial_driver.results.voltage, parallel_driver.results.voltage)
+    assert np.allclose(serial_driver.results.loading, parallel_driver.results.loading)
+    assert serial_driver.results.report.size() == parallel_driver.results.report.size()
+    assert np.all(serial_driver.results.report.get_data() == parallel_driver.results.report.get_data())
+
+
+
+def test_contingency_statistics():
+    """
+    Check that the bounded-memory contingency statistics match the dense results,
+    also when they are merged from parallel processes
+    :return:
+    """
+    fname = os.path.join('data', 'grids', 'IEEE14_contingency.gridcal')
+    main_circuit = FileOpen(fname).open()
+    pf_options = PowerFlowOptions(SolverType.NR,
+                                  verbose=False,
+                                  initialize_with_existing_solution=False,
+                                  dispatch_storage=True,
+                                  control_q=ReactivePowerControlMode.NoControl,
+                                  control_p=False)
+
+    options = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow,
+                                         top_k_contingencies=3, exceedance_threshold=0.5)
+    dense_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options)
+    dense_driver.run()
+    dense = dense_driver.results
+
+    options_st = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow,
+                                            top_k_contingencies=3, exceedance_threshold=0.5,
+                                            dense_results=False, multi_core=True, n_workers=2)
+    stats_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options_st)
+    stats_driver.run()
+    stats = stats_driver.results.statistics
+
+    assert stats_driver.results.Sf.shape[0] == 0
+    assert stats.n_updates == len(main_circuit.contingency_groups)
+
+    loading = np.abs(dense.loading)
+    assert np.allclose(stats.max_flow, np.abs(dense.Sf).max(axis=0))
+    assert np.allclose(stats.max_loading, loading.max(axis=0))
+    assert np.allclose(stats.top_k_loading, -np.sort(-loading, axis=0)[:3, :].T)
+    assert np.all(loading[stats.worst_contingency, np.arange(loading.shape[1])] == loading.max(axis=0))
+    assert np.all(stats.overload_count == np.count_nonzero(loading > 1.0, axis=0))
+    assert np.allclose(stats.overload_count * stats.overload_mean, np.where(loading > 1.0, loading, 0).sum(axis=0))
+
+    con_idx, br_idx, flows, loadings = stats.get_exceedances()
+    assert len(con_idx) == np.count_nonzero(loading > 0.5)
+    assert np.allclose(loadings, loading[con_idx, br_idx])
+
+    # with dense results the statistics are reduced from the stored matrices
+    dense_stats = dense.statistics
+    assert dense_stats.n_updates == stats.n_updates
+    assert np.allclose(dense_stats.top_k_loading, stats.top_k_loading)
+    assert np.all(dense_stats.overload_count == stats.overload_count)
+
+def test_contingency_screening():
+    """
+    Check that the screened contingency analysis solves exactly the critical contingencies
+    :return:
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    contingencies, groups = add_n1_contingencies(branches=main_circuit.get_branches(),
+                                                 vmax=1e20, vmin=0,
+                                                 filter_branches_by_voltage=False,
+                                                 branch_types=[DeviceType.LineDevice, DeviceType.Transformer2WDevice])
+    for group in groups:
+        main_circuit.add_contingency_group(group)
+    for contingency in contingencies:
+        main_circuit.add_contingency(contingency)
+
+    pf_options = PowerFlowOptions(SolverType.NR, verbose=False)
+
+    options = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow)
+    full_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options)
+    full_driver.run()
+
+    options_scr = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow,
+                                             use_screening=True, screening_threshold=0.9)
+    scr_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options_scr)
+    scr_driver.run()
+
+    screened_in = scr_driver.results.screened_in
+
+    # the screening must discard something, and the solved contingencies must match the full run
+    assert 0 < np.sum(screened_in) < len(groups)
+    assert np.allclose(scr_driver.results.Sf[screened_in, :], full_driver.results.Sf[screened_in, :])
+    assert scr_driver.results.get_screening_recall(full_driver.results) == 1.0
+    assert scr_driver.results.report.size() == full_driver.results.report.size()
+
+    # the recall cannot be computed against the streamed (non-dense) results
+    options_stream = ContingencyAnalysisOptions(pf_options=pf_options, engine=ContingencyMethod.PowerFlow,
+                                                dense_results=False)
+    stream_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options_stream)
+    stream_driver.run()
+
+    with pytest.raises(ValueError):
+        scr_driver.results.get_screening_recall(stream_driver.results)
+
+
+def test_linear_contingency_time_series():
+    """
+    Check that the batched PTDF contingency time series matches the contingency analysis of every time step
+    :return:
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    contingencies, groups = add_n1_contingencies(branches=main_circuit.get_branches(),
+                                                 vmax=1e20, vmin=0,
+                                                 filter_branches_by_voltage=False,
+                                                 branch_types=[DeviceType.LineDevice])
+    for group in groups:
+        main_circuit.add_contingency_group(group)
+    for contingency in contingencies:
+        main_circuit.add_contingency(contingency)
+
+    time_indices = np.arange(24)
+    options = ContingencyAnalysisOptions(engine=ContingencyMethod.PTDF)
+
+    ts_driver = ContingencyAnalysisTimeSeriesDriver(grid=main_circuit, options=options, time_indices=time_indices)
+    ts_driver.run()
+
+    snapshot_driver = ContingencyAnalysisDriver(grid=main_circuit, options=options)
+    report_size = 0
+    for it, t in enumerate(time_indices):
+        res_t = snapshot_driver.run_at(t=t, t_prob=1.0 / len(time_indices))
+        assert np.allclose(ts_driver.results.max_flows[it, :], np.abs(res_t.Sf).max(axis=0))
+        assert np.allclose(ts_driver.results.max_loading[it, :], np.abs(res_t.loading).max(axis=0))
+        report_size += res_t.report.size()
+
+    assert ts_driver.results.report.size() == report_size
+
+
+def test_linear_contingency_time_series_sparse_factors(monkeypatch):
+    """
+    Check that the contingency time series with sparse factors never computes the dense PTDF and LODF
+    and that it matches the time series with the dense factors
+    :return:
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    contingencies, groups = add_n1_contingencies(branches=main_circuit.get_branches(),
+                                                 vmax=1e20, vmin=0,
+                                                 filter_branches_by_voltage=False,
+                                                 branch_types=[DeviceType.LineDevice])
+    for group in groups:
+        main_circuit.add_contingency_group(group)
+    for contingency in contingencies:
+        main_circuit.add_contingency(contingency)
+
+    time_indices = np.arange(24)
+    dense_options = ContingencyAnalysisOptions(engine=ContingencyMethod.PTDF)
+    dense_driver = ContingencyAnalysisTimeSeriesDriver(grid=main_circuit,
+                                                       options=dense_options,
+                                                       time_indices=time_indices)
+    dense_driver.run()
+
+    def dense_run(self):
+        raise AssertionError("The dense PTDF and LODF must not be computed with sparse factors")
+
+    # LinearAnalysis.run is the only place where the dense PTDF and LODF are computed
+    monkeypatch.setattr(LinearAnalysis, 'run', dense_run)
+
+    lin_options = LinearAnalysisOptions(ptdf_threshold=0.0, lodf_threshold=0.0, use_sparse_factors=True)
+    sparse_options = ContingencyAnalysisOptions(engine=ContingencyMethod.PTDF, lin_options=lin_options)
+    sparse_driver = ContingencyAnalysisTimeSeriesDriver(grid=main_circuit,
+                                                        options=sparse_options,
+                                                        time_indices=time_indices)
+    sparse_driver.run()
+
+    assert np.allclose(sparse_driver.results.max_flows, dense_driver.results.max_flows)
+    assert np.allclose(sparse_driver.results.max_loading, dense_driver.results.max_loading)
+
+
+
+def test_contingency_report_columns():
+    """
+    Check that the columnar contingency report merges and exports to parquet without losing information
+    :return:
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    contingencies, groups = add_n1_contingencies(branches=main_circuit.get_branches(),
+                                                 vmax=1e20, vmin=0,
+                                                 filter_branches_by_voltage=False,
+                                                 branch_types=[DeviceType.LineDevice])
+    for group in groups:
+        main_circuit.add_contingency_group(group)
+    for contingency in contingencies:
+        main_circuit.add_contingency(contingency)
+
+    options = ContingencyAnalysisOptions(engine=ContingencyMethod.PTDF)
+    ts_driver = ContingencyAnalysisTimeSeriesDriver(grid=main_circuit, options=options, time_indices=np.arange(24))
+    ts_driver.run()
+    report = ts_driver.results.report
+    assert report.size() > 0
+
+    # rebuild the report from its entries in two shards
+    entries = report.entries
+    half = len(entries) // 2
+    shard1 = ContingencyResultsReport()
+    shard2 = ContingencyResultsReport()
+    for entry in entries[:half]:
+        shard1.add_entry(entry)
+    for entry in entries[half:]:
+        shard2.add_entry(entry)
+    shard1 += shard2
+    assert np.all(shard1.get_data() == report.get_data())
+
+    # the exported columns are typed
+    df = report.to_df()
+    assert df["post_contingency_loading"].dtype == float
+    assert df["solved_by_srap"].dtype == bool
+    assert np.all(df["monitored_idx"].values >= 0)
+
+    with BytesIO() as buffer:
+        report.to_parquet(buffer)
+        loaded = ContingencyResultsReport.from_df(pd.read_parquet(buffer))
+
+    assert np.all(loaded.get_data() == report.get_data())
+    assert np.all(loaded.get_column("post_contingency_loading") == report.get_column("post_contingency_loading"))
+
 def test_linear_contingency():
     # fname = os.path.join('data', 'grids', 'IEEE14_contingency.gridcal')
     fname = os.path.join('data', 'grids', 'IEEE14-2_4_1-3_4_1.gridcal')
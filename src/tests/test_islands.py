@@ -23,7 +23,7 @@ from GridCalEngine.Simulations.PowerFlow.power_flow_worker import PowerFlowOptio
 from GridCalEngine.Simulations.PowerFlow.power_flow_options import ReactivePowerControlMode, SolverType
 from GridCalEngine.Simulations.PowerFlow.power_flow_driver import PowerFlowDriver
 from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
-from GridCalEngine.Topology.topology import find_islands
+from GridCalEngine.Topology.topology import find_islands, find_different_states
 from GridCalEngine.api import FileOpen
 
 
@@ -151,5 +151,49 @@ def test_islands():
             assert (computed_indices == expected_indices).all()
 
 
+def test_find_different_states():
+    """
+    The topology states are numbered by order of first appearance
+    and every time step is assigned to the state where it first appeared
+    """
+    states = np.array([[1, 1, 1],
+                       [1, 0, 1],
+                       [1, 1, 1],
+                       [0, 1, 1],
+                       [1, 0, 1]])
+
+    groups = find_different_states(states)
+
+    assert list(groups.items()) == [(0, [0, 2]), (1, [1, 4]), (3, [3])]
+
+
+def test_topology_states_cache():
+    """
+    The topology states index is cached in the grid and rebuilt when a status profile changes
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    grid = FileOpen(fname).open()
+
+    idx = grid.get_topology_states()
+    assert idx.n_states == 1
+    assert grid.get_topology_states() is idx
+
+    # branch outage at t=5
+    grid.lines[3].active_prof[5] = False
+    idx2 = grid.get_topology_states()
+    assert idx2 is not idx
+    assert idx2.n_states == 2
+    assert grid.get_topologic_group_dict()[5] == [5]
+
+    # generator outage at t=9, with the profiles in the columnar store
+    grid.build_profile_store()
+    grid.generators[0].active_prof[9] = False
+    idx3 = grid.get_topology_states()
+    assert idx3.n_states == 3
+
+    # groups of a subset of time steps are given in positions of the subset
+    assert idx3.get_groups(np.array([4, 5, 9, 10])) == {0: [0, 3], 1: [1], 2: [2]}
+
+
 if __name__ == '__main__':
     test_ieee14_islands()
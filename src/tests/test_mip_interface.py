@@ -0,0 +1,76 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import numpy as np
+import scipy.sparse as sp
+from GridCalEngine.enumerations import MIPSolvers
+from GridCalEngine.Utils.MIP.selected_interface import LpModel
+
+
+def test_matrix_constraints():
+    """
+    Build the same LP with scalar constraints and with a matrix block
+    and check that both reach the same solution
+    """
+    A = sp.csc_matrix(np.array([[3.0, 4.0],
+                                [2.0, 3.0]]))
+    ub = np.array([650.0, 500.0])
+
+    # scalar formulation
+    prob1 = LpModel(MIPSolvers.SCIP)
+    x1 = np.array([prob1.add_var(lb=0, ub=1e20, name="XR"), prob1.add_var(lb=0, ub=1e20, name="XE")])
+    prob1.add_cst(3 * x1[0] + 4 * x1[1] <= 650)
+    prob1.add_cst(2 * x1[0] + 3 * x1[1] <= 500)
+    prob1.minimize(-5 * x1[0] - 7 * x1[1])
+    prob1.solve()
+
+    # matrix formulation, with a numeric offset that must be moved to the bounds
+    prob2 = LpModel(MIPSolvers.SCIP)
+    x2 = np.array([prob2.add_var(lb=0, ub=1e20, name="XR"), prob2.add_var(lb=0, ub=1e20, name="XE")])
+    offset = np.array([10.0, 2.0], dtype=object)
+    csts = prob2.add_matrix_cst(terms=[(A, x2), (sp.identity(2, format='csc'), offset)],
+                                lb=np.full(2, -1e20),
+                                ub=ub + np.array([10.0, 2.0]),
+                                name="cst_")
+    prob2.minimize(-5 * x2[0] - 7 * x2[1])
+    prob2.solve()
+
+    assert np.isclose(prob1.fobj_value(), -1137.5)
+    assert np.isclose(prob2.fobj_value(), prob1.fobj_value())
+    assert np.isclose(prob2.get_value(x2[1]), 162.5)
+
+    # the dot product gives one expression per row
+    expr = prob2.dot(A, x2)
+    assert np.allclose([prob2.get_value(e) for e in expr], [650.0, 487.5])
+
+    # the block constraints are regular model constraints
+    assert [c.name for c in csts] == ["cst_0", "cst_1"]
+
+    # the arrays may hold expressions, and the rows are named after their labels
+    prob3 = LpModel(MIPSolvers.SCIP)
+    x3 = prob3.add_vars(size=2, lb=np.zeros(2), ub=np.full(2, 1e20), name="x")
+    y3 = np.array([3 * x3[0] + 4 * x3[1], 2 * x3[0] + 3 * x3[1]], dtype=object)
+    csts = prob3.add_matrix_cst(terms=[(sp.identity(2, format='csc'), y3)],
+                                lb=np.full(2, -1e20),
+                                ub=ub,
+                                name="row_",
+                                row_labels=np.array([7, 9]))
+    prob3.minimize(-5 * x3[0] - 7 * x3[1])
+    prob3.solve()
+
+    assert np.isclose(prob3.fobj_value(), prob1.fobj_value())
+    assert [c.name for c in csts] == ["row_7", "row_9"]
@@ -41,6 +41,80 @@ def test_monte_carlo():
                                        sampling_points=1000)
     mc_sim.run()
 
+    # without early stopping all the samples are evaluated
+    assert mc_sim.results.samples_number == 1000
+
+
+def test_monte_carlo_streaming():
+    """
+    The streaming Monte Carlo keeps a bounded number of points, stops early on the confidence
+    interval criterion and converges to the same mean as the regular Monte Carlo
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+    pf_options = PowerFlowOptions(SolverType.NR, verbose=False,
+                                  initialize_with_existing_solution=False,
+                                  multi_core=False, dispatch_storage=True,
+                                  control_q=ReactivePowerControlMode.NoControl,
+                                  control_p=True)
+
+    mc_tol = 2e-4
+    results = dict()
+    for streaming in [False, True]:
+        mc_sim = StochasticPowerFlowDriver(main_circuit,
+                                           pf_options,
+                                           mc_tol=mc_tol,
+                                           batch_size=50,
+                                           sampling_points=2000,
+                                           simulation_type=StochasticPowerFlowType.MonteCarlo,
+                                           streaming=streaming,
+                                           reservoir_size=100,
+                                           early_stop=True)
+        mc_sim.run()
+        results[streaming] = mc_sim.results
+
+        assert mc_sim.results.samples_number < 2000
+        assert mc_sim.results.error_series[-1] <= mc_tol
+
+    res = results[True]
+    assert res.V_points.shape == (100, main_circuit.get_bus_number())
+    assert res.v_avg_conv.shape[0] - 2 == len(res.conv_samples)
+    assert np.allclose(res.voltage, np.abs(res.V_points).mean(axis=0), atol=1e-2)
+    assert np.allclose(res.voltage, results[False].voltage, atol=2e-3)
+
+
+def test_monte_carlo_seed_reproducibility():
+    """
+    The same seed gives bit-identical results regardless of the number of processes
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    results = list()
+    for multi_core in [False, True]:
+        pf_options = PowerFlowOptions(SolverType.NR, verbose=False,
+                                      initialize_with_existing_solution=False,
+                                      multi_core=multi_core, n_workers=2,
+                                      dispatch_storage=True,
+                                      control_q=ReactivePowerControlMode.NoControl,
+                                      control_p=True)
+
+        mc_sim = StochasticPowerFlowDriver(main_circuit,
+                                           pf_options,
+                                           mc_tol=1e-9,
+                                           batch_size=50,
+                                           sampling_points=150,
+                                           simulation_type=StochasticPowerFlowType.LatinHypercube,
+                                           seed=42)
+        mc_sim.run()
+        results.append(mc_sim.results)
+
+    assert np.array_equal(results[0].S_points, results[1].S_points)
+    assert np.array_equal(results[0].V_points, results[1].V_points)
+    assert np.array_equal(results[0].v_stats.mean, results[1].v_stats.mean)
+    assert np.array_equal(results[0].v_stats.M2, results[1].v_stats.M2)
+    assert np.array_equal(results[0].voltage, results[1].voltage)
+
 
 if __name__ == '__main__':
     test_monte_carlo()
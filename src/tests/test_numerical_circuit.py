@@ -17,6 +17,7 @@
 import os
 import scipy.sparse as sp
 from GridCalEngine.api import *
+from GridCalEngine.Topology.admittance_matrices import AdmittanceMatricesCache
 
 
 def test_numerical_cicuit_generator_contingencies():
@@ -121,3 +122,54 @@ def test_bus_indexing_remap():
 
         assert np.allclose(F, island.branch_data.F)
         assert np.allclose(T, island.branch_data.T)
+
+
+def test_numerical_circuit_time_series_equivalence():
+    """
+    Check that the compile-once time series circuit produces the same
+    NumericalCircuit as the per-step compilation
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    nc_ts = NumericalCircuitTimeSeries(main_circuit)
+
+    for t in [0, 5, 50, 100, 167]:
+        nc_a = nc_ts.get_at(t)
+        nc_b = compile_numerical_circuit_at(main_circuit, t_idx=t)
+
+        assert np.array_equal(nc_a.bus_data.bus_types, nc_b.bus_data.bus_types)
+        assert np.allclose(nc_a.bus_data.Vbus, nc_b.bus_data.Vbus)
+        assert np.allclose(nc_a.Sbus, nc_b.Sbus)
+        assert np.allclose(nc_a.Ybus.toarray(), nc_b.Ybus.toarray())
+        assert np.allclose(nc_a.branch_data.active, nc_b.branch_data.active)
+        assert np.allclose(nc_a.branch_data.rates, nc_b.branch_data.rates)
+        assert np.allclose(nc_a.generator_data.p, nc_b.generator_data.p)
+        assert np.array_equal(nc_a.pq, nc_b.pq)
+        assert np.array_equal(nc_a.pv, nc_b.pv)
+        assert np.array_equal(nc_a.vd, nc_b.vd)
+
+
+def test_admittance_cache():
+    """
+    Check that the admittance cache reuses the matrices of equal topologies
+    and that a change in the branch states produces new matrices
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+
+    nc = compile_numerical_circuit_at(main_circuit, t_idx=None)
+    nc.admittance_cache = AdmittanceMatricesCache(max_size=4)
+
+    Ybus0 = nc.Ybus.copy()
+    nc.reset_calculations()
+    assert np.allclose(nc.Ybus.toarray(), Ybus0.toarray())
+    assert nc.admittance_cache.hits == 1
+
+    # disconnect a branch: the cache must not return the previous matrices
+    nc.branch_data.active[0] = 0
+    nc.reset_calculations()
+    nc_ref = compile_numerical_circuit_at(main_circuit, t_idx=None)
+    nc_ref.branch_data.active[0] = 0
+    assert np.allclose(nc.Ybus.toarray(), nc_ref.Ybus.toarray())
+    assert not np.allclose(nc.Ybus.toarray(), Ybus0.toarray())
@@ -19,6 +19,10 @@ import os
 import numpy as np
 
 from GridCalEngine.api import *
+from GridCalEngine.basic_structures import Logger
+from GridCalEngine.enumerations import MIPSolvers, AvailableTransferMode
+from GridCalEngine.Simulations.OPF.linear_opf_ts import run_linear_opf_ts
+from GridCalEngine.Simulations.NTC.ntc_opf import run_linear_ntc_opf_ts
 
 
 def test_opf():
@@ -32,5 +36,92 @@ def test_opf():
     opf.run()
 
 
+def get_ieee39_reference_grid() -> MultiCircuit:
+    """
+    IEEE39 with a balanced snapshot, different generation costs and some line contingencies
+    :return: MultiCircuit
+    """
+    grid = FileOpen(os.path.join('data', 'grids', 'IEEE39_1W.gridcal')).open()
+
+    load = sum(ld.P for ld in grid.get_loads())
+    gen_p = sum(gen.P for gen in grid.get_generators())
+    for i, gen in enumerate(grid.get_generators()):
+        gen.Cost = 1.0 + 0.5 * i
+        gen.P *= load / gen_p
+
+    for i in range(0, 20, 2):
+        group = ContingencyGroup(name=grid.lines[i].name)
+        grid.add_contingency_group(group)
+        grid.add_contingency(Contingency(device_idtag=grid.lines[i].idtag,
+                                         name=grid.lines[i].name,
+                                         group=group))
+    return grid
+
+
+def test_linear_opf_reference():
+    """
+    Check the linear OPF against the values of the element by element formulation
+    """
+    ref = {
+        False: (125.37155043210159,
+                [900.0, 1809.2, 478.1691, 900.0, 380.0, 764.3751, 0.0, 251.2052, 0.0, 0.0]),
+        True: (149.32610597275237,
+               [900.0, 1516.4495, 0.0, 900.0, 380.0, 825.0201, 0.0, 317.6475, 0.0, 452.4357])
+    }
+
+    # the branch injections hold the complete specified power of the buses
+    ref_p_esp = [-97.6, 0.0, -322.0, -500.0, 0.0, 0.0, -233.8, -522.0, -6.5, 0.0, 0.0, -8.53, 0.0, 771.2806,
+                 -320.0, -329.0, 0.0, -158.0, 0.0, -680.0, -274.0, 0.0, -247.5, -308.6, -224.0, -139.0, -281.0,
+                 -206.0, -283.5, 900.0, 1800.0, 478.1691, 900.0, 380.0, 764.3751, 0.0, 251.2052, 0.0, -1104.0]
+
+    for consider_contingencies, (ref_f_obj, ref_gen_p) in ref.items():
+        logger = Logger()
+        res = run_linear_opf_ts(grid=get_ieee39_reference_grid(),
+                                time_indices=None,
+                                solver_type=MIPSolvers.HIGHS,
+                                consider_contingencies=consider_contingencies,
+                                logger=logger)
+
+        f_obj = float(next(e.value for e in logger.entries if e.msg == "Objective function"))
+        assert res.acceptable_solution
+        assert np.isclose(f_obj, ref_f_obj)
+        assert np.allclose(res.gen_vars.p[0, :], ref_gen_p, atol=1e-3)
+
+        if not consider_contingencies:
+            assert np.allclose(res.bus_vars.branch_injections[0, :], ref_p_esp, atol=1e-3)
+
+
+def test_linear_ntc_reference():
+    """
+    Check the linear NTC against the values of the element by element formulation
+    """
+    ref = {False: 331996.40547170024, True: 337593.56622007955}
+    ref_flows = [3091.1118, -3786.4528, 4972.1634, -1881.0517, 0.0, 3576.5251, -1313.3525, 1072.389, -1180.8279,
+                 1512.4931, -440.104, -65.8195, -1356.9114, 2935.224, -1794.8059, -6126.8434, -6374.3467, 1151.7396,
+                 -1151.7396, 0.0, 205.1718, -22.5284, -1174.268, -2355.0959, -4611.521, -555.8035, -3019.9093,
+                 -1560.2096, -2157.1286, 2559.2238, -3115.0273, -3019.9093, 0.0, 0.0, -466.9361, -466.9361, 0.0,
+                 553.0132, 0.0, -908.5702, 0.0, 1922.4715, -1214.7062, -992.2137, -293.7936, 0.0]
+
+    # half of the non-generation buses and half of the generation buses on each side
+    a1 = np.r_[np.arange(19), np.arange(29, 34)]
+    a2 = np.setdiff1d(np.arange(39), a1)
+
+    for consider_contingencies, ref_f_obj in ref.items():
+        res = run_linear_ntc_opf_ts(grid=get_ieee39_reference_grid(),
+                                    time_indices=None,
+                                    solver_type=MIPSolvers.HIGHS,
+                                    consider_contingencies=consider_contingencies,
+                                    transfer_method=AvailableTransferMode.GenerationAndLoad,
+                                    skip_generation_limits=True,
+                                    buses_areas_1=a1,
+                                    buses_areas_2=a2,
+                                    logger=Logger())
+
+        assert res.acceptable_solution
+        assert np.isclose(res.model.fobj_value(), ref_f_obj)
+        assert np.allclose(res.power_shift, [-305.44966])
+        assert np.allclose(res.branch_vars.flows[0, :], ref_flows, atol=1e-3)
+
+
 if __name__ == '__main__':
     test_opf()
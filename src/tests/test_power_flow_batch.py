@@ -0,0 +1,57 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import numpy as np
+
+from GridCalEngine.api import *
+from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
+from GridCalEngine.Simulations.PowerFlow.NumericalMethods.ac_jacobian import AC_jacobian
+from GridCalEngine.Simulations.PowerFlow.NumericalMethods.newton_raphson import NR_LS
+from GridCalEngine.Simulations.PowerFlow.NumericalMethods.newton_raphson_batch import NR_LS_batch, JacobianPattern
+
+
+def test_batch_newton_raphson():
+    """
+    Check the batched Newton-Raphson against the Newton-Raphson of every scenario
+    """
+    fname = os.path.join('data', 'grids', 'IEEE118-gen120.gridcal')
+    main_circuit = FileOpen(fname).open()
+    nc = compile_numerical_circuit_at(main_circuit)
+    island = nc.split_into_islands()[0]
+    pvpq = np.r_[island.pv, island.pq]
+
+    # the Jacobian values over the shared pattern are the same as the regular ones
+    rng = np.random.default_rng(0)
+    V = island.Vbus * np.exp(0.05j * rng.random(island.nbus))
+    pattern = JacobianPattern(Ybus=island.Ybus, pvpq=pvpq, pq=island.pq)
+    J1 = AC_jacobian(island.Ybus, V, pvpq, island.pq)
+    J2 = pattern.get_matrix(pattern.values(V[np.newaxis, :])[0])
+    assert np.allclose(J1.toarray(), J2.toarray())
+
+    nk = 50
+    S = island.Sbus[np.newaxis, :] * (1.0 + 0.1 * rng.standard_normal((nk, island.nbus)))
+
+    res = NR_LS_batch(Ybus=island.Ybus, S0=S, V0=island.Vbus, I0=island.Ibus, Y0=island.YLoadBus,
+                      pv=island.pv, pq=island.pq, tol=1e-9, max_it=25)
+
+    assert res.converged.all()
+    assert res.n_factorizations < nk
+
+    for k in range(nk):
+        res_k = NR_LS(Ybus=island.Ybus, S0=S[k], V0=island.Vbus.copy(), I0=island.Ibus, Y0=island.YLoadBus,
+                      pv_=island.pv, pq_=island.pq, Qmin=None, Qmax=None, tol=1e-9, max_it=25)
+        assert np.allclose(res_k.V, res.V[k], atol=1e-7)
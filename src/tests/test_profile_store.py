@@ -0,0 +1,122 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import numpy as np
+from GridCalEngine.Devices.profile import Profile
+from GridCalEngine.Devices.profile_store import ColumnarProfile
+from GridCalEngine.IO.file_handler import FileOpen
+from GridCalEngine.DataStructures.numerical_circuit import compile_numerical_circuit_at
+from GridCalEngine.DataStructures.numerical_circuit_ts import NumericalCircuitTimeSeries
+from GridCalEngine.enumerations import DeviceType
+
+
+def test_columnar_profile():
+    """
+    Test the columnar (time x devices) storage against the dense matrix
+    """
+    nt = 50
+    np.random.seed(0)
+    mat = np.full((nt, 4), 1.0)
+    mat[:, 1] = np.random.rand(nt)  # dense column
+    mat[[3, 7], 2] = 5.0  # sparse column
+    mat[:, 3] = 2.0  # constant column
+
+    store = ColumnarProfile.from_matrix(mat)
+    assert list(store.sparse_mask) == [True, False, True, True]
+    assert len(store.data) == 2
+    assert np.array_equal(store.get(), mat)
+
+    t_idx = np.array([7, 3, 3, 0])
+    d_idx = np.array([2, 1])
+    assert np.array_equal(store.get(time_indices=t_idx, device_indices=d_idx), mat[np.ix_(t_idx, d_idx)])
+    assert np.array_equal(store.at(7), mat[7, :])
+
+    # single value edition of sparse and dense columns
+    store.set_value(10, 2, 9.0)
+    store.set_value(3, 2, 1.0)
+    store.set_value(10, 1, 9.0)
+    mat[10, 2] = 9.0
+    mat[3, 2] = 1.0
+    mat[10, 1] = 9.0
+    assert np.array_equal(store.get(), mat)
+    assert store.get_value(10, 2) == 9.0
+
+    # full column edition
+    col = np.zeros(nt)
+    col[5] = 1.0
+    store.set_column(3, col)
+    mat[:, 3] = col
+    assert np.array_equal(store.get(), mat)
+
+    # the profiles keep working as views
+    profile = Profile(default_value=0.0, data_type=float)
+    profile.set_view(store=store, col=2)
+    assert profile.is_view and profile.is_sparse
+    assert np.array_equal(profile.toarray(), mat[:, 2])
+    assert profile.sparse_array.get_map() == {7: 5.0, 10: 9.0}
+    profile[20] = 3.0
+    assert store.get_value(20, 2) == 3.0
+
+    # the sparse array of a view is kept while the store does not change and writes through it
+    sparse_array = profile.sparse_array
+    assert profile.sparse_array is sparse_array
+    sparse_array[30] = 4.0
+    assert store.get_value(30, 2) == 4.0
+    assert profile.sparse_array.get_map() == {7: 5.0, 10: 9.0, 20: 3.0, 30: 4.0}
+
+    profile.detach_view()
+    assert not profile.is_view
+    assert profile[20] == 3.0
+
+
+def test_profile_store():
+    """
+    Test that the grid profiles gathered in the columnar store produce the same values
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    grid = FileOpen(fname).open()
+    nt = grid.get_time_number()
+
+    P = np.array([elm.P_prof.toarray() for elm in grid.loads]).T
+    active = np.array([elm.active_prof.toarray() for elm in grid.lines]).T
+    nc0 = compile_numerical_circuit_at(grid, t_idx=10)
+
+    store = grid.build_profile_store()
+    assert grid.loads[0].P_prof.is_view
+    assert np.array_equal(store.get(DeviceType.LoadDevice, 'P'), P)
+    assert np.array_equal(store.get(DeviceType.LineDevice, 'active'), active)
+
+    nc1 = compile_numerical_circuit_at(grid, t_idx=10)
+    assert np.allclose(nc0.Sbus, nc1.Sbus)
+
+    # bulk assignment from a matrix
+    Q = np.random.rand(nt, len(grid.loads))
+    grid.set_profiles_matrix(DeviceType.LoadDevice, 'Q', Q)
+    assert np.array_equal(grid.loads[3].Q_prof.toarray(), Q[:, 3])
+
+    # the time series compilation fetches the stored profiles in bulk
+    grid.lines[2].active_prof.detach_view()
+    grid.lines[2].active_prof[4] = False
+    active[4, 2] = False
+    nc_ts = NumericalCircuitTimeSeries(circuit=grid)
+    assert np.array_equal(nc_ts.stacks['br_active'].rows(np.arange(nt))[:, :len(grid.lines)], active)
+    assert np.allclose(nc_ts.stacks['load_S'].rows(np.arange(nt))[:, :len(grid.loads)], P + 1j * Q)
+
+    grid.release_profile_store()
+    assert not grid.loads[3].Q_prof.is_view
+    assert np.array_equal(grid.loads[3].Q_prof.toarray(), Q[:, 3])
+    assert np.array_equal(grid.loads[3].P_prof.toarray(), P[:, 3])
@@ -1,9 +1,13 @@
 import os
 import numpy as np
+import scipy.sparse as sp
 import pandas as pd
 import GridCalEngine.api as gce
 from GridCalEngine.Simulations.ContingencyAnalysis.contingency_plan import add_n1_contingencies
 from GridCalEngine.Simulations.PowerFlow.power_flow_worker import multi_island_pf_nc
+from GridCalEngine.Simulations.LinearFactors.linear_analysis import (make_ptdf, make_lodf, make_ptdf_blocked,
+                                                                   make_lodf_blocked, make_otdf, make_transfer_limits)
+from GridCalEngine.Simulations.ATC.available_transfer_capacity_driver import get_atc_list
 
 
 def test_ptdf():
@@ -792,3 +796,192 @@ def test_ptdf_contingencies_powerflow():
 
             ok = np.allclose(cont_analysis_driver1.results.Sf, power_flow.results.Sf)
             assert ok
+
+
+def test_blocked_ptdf_lodf(tmp_path) -> None:
+    """
+    Check that the blocked PTDF and LODF match the dense computation,
+    also when computing subsets and writing into memory-mapped files
+    """
+    fname = os.path.join('data', 'grids', 'RAW', 'IEEE 118 Bus v2.raw')
+    main_circuit = gce.FileOpen(fname).open()
+    nc = gce.compile_numerical_circuit_at(main_circuit, t_idx=None)
+
+    for distribute_slack in [True, False]:
+        ptdf = make_ptdf(Bpqpv=nc.Bpqpv, Bf=nc.Bf, pqpv=nc.pqpv, distribute_slack=distribute_slack)
+        lodf = make_lodf(Cf=nc.Cf, Ct=nc.Ct, PTDF=ptdf)
+
+        ptdf2 = make_ptdf_blocked(Bpqpv=nc.Bpqpv, Bf=nc.Bf, pqpv=nc.pqpv,
+                                  distribute_slack=distribute_slack, block_size=17)
+        assert np.allclose(ptdf, ptdf2)
+
+        lodf2 = make_lodf_blocked(Bpqpv=nc.Bpqpv, Bf=nc.Bf, Cf=nc.Cf, Ct=nc.Ct, pqpv=nc.pqpv,
+                                  distribute_slack=distribute_slack, block_size=17)
+        assert np.allclose(lodf, lodf2)
+
+        # monitored and contingency subsets into a memory-mapped file
+        mon = np.arange(0, nc.nbr, 3)
+        cnt = np.arange(0, nc.nbr, 5)
+        lodf3 = make_lodf_blocked(Bpqpv=nc.Bpqpv, Bf=nc.Bf, Cf=nc.Cf, Ct=nc.Ct, pqpv=nc.pqpv,
+                                  distribute_slack=distribute_slack, block_size=10,
+                                  monitored_idx=mon, contingency_idx=cnt,
+                                  out=str(tmp_path / 'lodf.npy'))
+        lodf3.flush()
+        assert np.allclose(lodf[np.ix_(mon, cnt)], np.load(str(tmp_path / 'lodf.npy')))
+
+
+def test_sparse_linear_factors():
+    """
+    Check that the thresholded sparse PTDF and LODF stay within their error bound
+    and that the contingency analysis and the ATC produce the same results as with the dense factors
+    """
+    fname = os.path.join('data', 'grids', 'IEEE118-gen80.gridcal')
+    main_circuit = gce.FileOpen(fname).open()
+    nc = gce.compile_numerical_circuit_at(main_circuit, t_idx=None)
+
+    linear = gce.LinearAnalysis(numerical_circuit=nc, distributed_slack=False, correct_values=False)
+    linear.run()
+    factors = linear.get_sparse_factors(ptdf_threshold=1e-3, lodf_threshold=1e-3)
+
+    assert factors.PTDF.nnz < linear.PTDF.size
+    assert np.abs(factors.PTDF.toarray() - linear.PTDF).max() <= 1e-3
+    assert np.all(np.abs(factors.get_flows(nc.Sbus) - linear.get_flows(nc.Sbus))
+                  <= factors.get_flows_error_bound(nc.Sbus) + 1e-10)
+
+    # built per island by blocks of columns, without allocating the dense matrices
+    linear2 = gce.LinearAnalysis(numerical_circuit=nc, distributed_slack=False, correct_values=False, block_size=25)
+    factors2 = linear2.get_sparse_factors(ptdf_threshold=1e-3, lodf_threshold=1e-3)
+    assert linear2.PTDF is None and linear2.LODF is None
+    assert np.allclose(factors2.PTDF.toarray(), factors.PTDF.toarray())
+    assert np.allclose(factors2.LODF.toarray(), factors.LODF.toarray())
+    assert np.allclose(factors2.ptdf_error, factors.ptdf_error)
+    assert np.allclose(factors2.lodf_error, factors.lodf_error)
+
+    # run by blocks: the factors are stored as sparse matrices (threshold 0: no values discarded)
+    linear3 = gce.LinearAnalysis(numerical_circuit=nc, distributed_slack=False, correct_values=False, block_size=25)
+    linear3.run()
+    assert sp.issparse(linear3.PTDF) and sp.issparse(linear3.LODF)
+    assert np.allclose(linear3.PTDF.toarray(), linear.PTDF)
+    assert np.allclose(linear3.LODF.toarray(), linear.LODF)
+    assert np.allclose(linear3.get_flows(nc.Sbus), linear.get_flows(nc.Sbus))
+
+    # OTDF and transfer limits with the sparse factors
+    j = 10
+    factors0 = linear.get_sparse_factors(ptdf_threshold=0.0, lodf_threshold=0.0)
+    assert np.allclose(factors0.get_otdf(j=j, block_size=50).toarray(), make_otdf(linear.PTDF, linear.LODF, j))
+    flows = linear.get_flows(nc.Sbus)
+    assert np.allclose(factors0.get_transfer_limits(flows=flows, rates=nc.Rates),
+                       make_transfer_limits(ptdf=linear.PTDF, flows=flows, rates=nc.Rates))
+
+    # ATC: the LODF values below the threshold are never used, so the report is the same
+    alpha = linear.PTDF @ np.r_[1.0, np.zeros(nc.nbus - 2), -1.0]
+    br_idx = nc.branch_data.get_monitor_enabled_indices()
+    con_br_idx = nc.branch_data.get_contingency_enabled_indices()
+    reports = list()
+    for lodf in [linear.LODF, linear.get_sparse_factors(lodf_threshold=0.02).LODF]:
+        reports.append(np.array(get_atc_list(br_idx=br_idx,
+                                             contingency_br_idx=con_br_idx,
+                                             lodf=lodf,
+                                             alpha=alpha,
+                                             flows=flows * nc.Sbase,
+                                             rates=nc.Rates,
+                                             contingency_rates=nc.ContingencyRates,
+                                             base_exchange=0.0,
+                                             threshold=0.02,
+                                             time_idx=0)))
+    assert reports[0].shape == reports[1].shape
+    assert np.allclose(reports[0], reports[1])
+
+    # linear contingency analysis with the sparse factors
+    results = list()
+    for use_sparse_factors in [False, True]:
+        lin_options = gce.LinearAnalysisOptions(distribute_slack=False, correct_values=False,
+                                                ptdf_threshold=1e-5, lodf_threshold=1e-5,
+                                                use_sparse_factors=use_sparse_factors)
+        options = gce.ContingencyAnalysisOptions(lin_options=lin_options, engine=gce.ContingencyMethod.PTDF)
+        driver = gce.ContingencyAnalysisDriver(grid=main_circuit, options=options,
+                                               linear_multiple_contingencies=None)
+        driver.run()
+        results.append(driver.results.Sf.real)
+
+    assert np.allclose(results[0], results[1], atol=1e-2)
+
+
+def test_mlodf_batch():
+    """
+    Check that the contingency flows computed in batch (grouped by the number of failed branches)
+    match the flows computed one contingency at a time
+    """
+    fname = os.path.join('data', 'grids', 'RAW', 'IEEE 118 Bus v2.raw')
+    main_circuit = gce.FileOpen(fname).open()
+
+    # N-1 of all the branches
+    contingencies, groups = add_n1_contingencies(branches=main_circuit.get_branches(),
+                                                 vmax=1e20, vmin=0,
+                                                 filter_branches_by_voltage=False,
+                                                 branch_types=[gce.DeviceType.LineDevice,
+                                                               gce.DeviceType.Transformer2WDevice])
+    for group in groups:
+        main_circuit.add_contingency_group(group)
+    for contingency in contingencies:
+        main_circuit.add_contingency(contingency)
+
+    # some N-2 of lines
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        group = gce.ContingencyGroup(name='N-2')
+        main_circuit.add_contingency_group(group)
+        for i in rng.choice(len(main_circuit.lines), 2, replace=False):
+            main_circuit.add_contingency(gce.Contingency(device_idtag=main_circuit.lines[i].idtag,
+                                                         name=main_circuit.lines[i].name,
+                                                         prop='active',
+                                                         value=0,
+                                                         group=group))
+
+    nc = gce.compile_numerical_circuit_at(main_circuit, t_idx=None)
+    linear = gce.LinearAnalysis(numerical_circuit=nc, distributed_slack=False, correct_values=False)
+    linear.run()
+
+    linear_multi_contingency = gce.LinearMultiContingencies(grid=main_circuit)
+    linear_multi_contingency.compute(ptdf=linear.PTDF, lodf=linear.LODF)
+
+    cardinalities = [g.cardinality for g in linear_multi_contingency.contingency_groups_by_cardinality]
+    assert cardinalities == [1, 2]
+
+    base_flows = rng.random((5, nc.nbr)) * 100.0
+    flows = linear_multi_contingency.get_contingency_flows_batch(base_flows=base_flows)
+
+    for t in range(base_flows.shape[0]):
+        for ic, multi_contingency in enumerate(linear_multi_contingency.multi_contingencies):
+            expected = multi_contingency.get_contingency_flows(base_flow=base_flows[t, :], injections=None)
+            assert np.allclose(flows[t, ic, :], expected)
+
+
+def test_linear_analysis_ts_topology_groups():
+    """
+    The linear analysis time series computes the factors once per topology group,
+    the flows must match the ones of the factors computed at every time step
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = gce.open_file(fname)
+
+    # outages of some lines at different moments
+    for k, br in enumerate(main_circuit.lines[:3]):
+        arr = br.active_prof.toarray().copy()
+        arr[(np.arange(len(arr)) // 24) % 4 == k] = False
+        br.active_prof = arr
+
+    time_indices = np.arange(0, 200, 3)
+    driver = gce.LinearAnalysisTimeSeriesDriver(grid=main_circuit, time_indices=time_indices)
+
+    plan = driver.get_topology_execution_plan()
+    assert len(plan) == 4
+    assert np.array_equal(np.sort(np.concatenate([pos for pos, _ in plan])), np.arange(len(time_indices)))
+
+    driver.run()
+
+    for it, t in enumerate(time_indices):
+        nc = gce.compile_numerical_circuit_at(main_circuit, t_idx=t)
+        linear = gce.LinearAnalysis(numerical_circuit=nc, distributed_slack=True, correct_values=False)
+        linear.run()
+        assert np.allclose(driver.results.Sf[it, :], linear.get_flows(nc.Sbus))
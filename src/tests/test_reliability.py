@@ -0,0 +1,113 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import numpy as np
+from GridCalEngine.api import *
+from GridCalEngine.Simulations.Stochastic.reliability_driver import sample_availability
+
+
+def test_sample_availability():
+    """
+    The sampled availability matches the stationary availability of the devices
+    """
+    rng = np.random.default_rng(0)
+    mttf = np.array([500.0, 0.0, 2000.0])
+    mttr = np.array([50.0, 10.0, 10.0])
+    states = sample_availability(n_years=100, n_hours=8760, mttf=mttf, mttr=mttr, rng=rng)
+
+    assert states.shape == (100, 8760, 3)
+    assert np.all(states[:, :, 1])  # no MTTF, never fails
+    assert np.allclose(states[:, :, [0, 2]].mean(axis=(0, 1)), mttf[[0, 2]] / (mttf[[0, 2]] + mttr[[0, 2]]), atol=5e-3)
+
+
+def test_reliability_single_bus():
+    """
+    Single bus with two generators that are both needed to supply the load:
+    the indices are compared with their analytic values
+    """
+    grid = MultiCircuit()
+    bus = Bus('B1')
+    grid.add_bus(bus)
+    grid.add_load(bus, Load(P=100))
+    for i in range(2):
+        grid.add_generator(bus, Generator(P=50, Pmax=60, mttf=500, mttr=50))
+
+    drv = ReliabilityStudy(grid, PowerFlowOptions(), n_years=300, seed=3)
+    drv.run()
+    res = drv.results
+
+    a = 500.0 / 550.0  # availability of a generator
+    lole = 8760 * (1 - a * a)
+    eens = 8760 * (2 * a * (1 - a) * 40 + (1 - a) ** 2 * 100)
+
+    assert res.n_years == 300
+    assert res.n_unique_states == 4
+    assert np.isclose(res.lole, lole, rtol=0.03)
+    assert np.isclose(res.eens, eens, rtol=0.03)
+    assert np.isclose(res.bus_eens.sum(), res.eens)
+
+
+def test_reliability_line_rating():
+    """
+    The load behind a line can only be supplied up to the line rating:
+    the curtailment is that of the DC model and not just the capacity balance
+    """
+    grid = MultiCircuit()
+    b1 = Bus('B1', is_slack=True)
+    b2 = Bus('B2')
+    grid.add_bus(b1)
+    grid.add_bus(b2)
+    grid.add_line(Line(bus_from=b1, bus_to=b2, r=0.01, x=0.1, rate=30.0))
+    grid.add_generator(b1, Generator(P=50, Pmax=100))
+    grid.add_load(b2, Load(P=50))
+
+    drv = ReliabilityStudy(grid, PowerFlowOptions(SolverType.DC), n_years=2, seed=1)
+    drv.run()
+    res = drv.results
+
+    assert np.isclose(res.lole, 8760)
+    assert np.isclose(res.eens, 20.0 * 8760)
+    assert np.allclose(res.bus_eens, [0.0, 20.0 * 8760])
+
+
+def test_reliability_flows():
+    """
+    The reliability study with flows is reproducible with a seed and solves only the distinct states
+    """
+    fname = os.path.join('data', 'grids', 'IEEE14_contingency.gridcal')
+    grid = FileOpen(fname).open()
+
+    for br in grid.get_branches_wo_hvdc():
+        br.mttf = 4000.0
+        br.mttr = 20.0
+
+    for gen in grid.get_generators():
+        gen.mttf = 1500.0
+        gen.mttr = 60.0
+        gen.Pmax = 80.0
+
+    results = list()
+    for i in range(2):
+        drv = ReliabilityStudy(grid, PowerFlowOptions(SolverType.DC), n_years=10, seed=7, compute_flows=True)
+        drv.run()
+        results.append(drv.results)
+
+    res = results[0]
+    assert 0 < res.n_unique_states < 10 * 8760
+    assert res.lole > 0
+    assert np.array_equal(res.ens, results[1].ens)
+    assert np.array_equal(res.branch_overload_hours, results[1].branch_overload_hours)
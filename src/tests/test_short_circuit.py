@@ -58,5 +58,58 @@ def test_short_circuit():
     print('\t|loading|:', abs(main_circuit.short_circuit_results.loading1) * 100)
 
 
+def test_short_circuit_sweep():
+    """
+    Check that the all-bus fault sweep matches the individual short circuits
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    grid = FileOpen(fname).open()
+
+    # give the generators some impedance so that the sequence networks are well conditioned
+    for gen in grid.get_generators():
+        gen.R1, gen.X1 = 0.0, 0.2
+        gen.R2, gen.X2 = 0.0, 0.2
+        gen.R0, gen.X0 = 0.0, 0.1
+
+    # give the branches negative and zero sequence data
+    for br in grid.get_lines() + grid.get_transformers2w():
+        br.R2, br.X2, br.B2 = br.R, br.X, br.B
+        br.R0, br.X0, br.B0 = 3 * br.R, 3 * br.X, br.B
+
+    pf_options = PowerFlowOptions(SolverType.NR)
+    power_flow = PowerFlowDriver(grid, pf_options)
+    power_flow.run()
+
+    fault_types = [FaultType.ph3, FaultType.LG, FaultType.LL, FaultType.LLG]
+
+    for multi_core in [False, True]:
+        sc_options = ShortCircuitOptions(sweep=True,
+                                         sweep_fault_types=fault_types,
+                                         sweep_block_size=8,
+                                         multi_core=multi_core,
+                                         n_workers=2)
+        sc = ShortCircuitDriver(grid=grid, options=sc_options, pf_options=pf_options,
+                                pf_results=power_flow.results)
+        sc.run()
+        sweep = sc.results
+
+        assert sweep.sweep_SCpower.shape == (len(grid.buses), len(fault_types))
+
+        for k, fault_type in enumerate(fault_types):
+            for bus_idx in range(0, len(grid.buses), 6):
+                sc_options = ShortCircuitOptions(bus_index=bus_idx, fault_type=fault_type)
+                sc = ShortCircuitDriver(grid=grid, options=sc_options, pf_options=pf_options,
+                                        pf_results=power_flow.results)
+                sc.run()
+
+                assert np.isclose(sweep.sweep_SCpower[bus_idx, k], sc.results.SCpower[bus_idx], rtol=1e-8)
+
+        # for a bolted 3-phase fault |I| = |V| / |Zth| and |SCC| = Sbase |V|^2 / |Zth|
+        Vnom = np.array([bus.Vnom for bus in grid.buses])
+        Ik = np.abs(sweep.sweep_SCpower[:, 0]) / (np.abs(power_flow.results.voltage) * np.sqrt(3) * Vnom)
+        assert np.allclose(sweep.sweep_Ik[:, 0], Ik)
+
+
 if __name__ == '__main__':
     test_short_circuit()
+    test_short_circuit_sweep()
@@ -16,6 +16,7 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import numpy as np
+import scipy.sparse as sp
 from GridCalEngine.Utils.MIP.SimpleMip import LpModel, LpExp, LpCst, LpVar
 
 
@@ -160,3 +161,36 @@ def test_lp_simple4():
     assert np.isclose(prob.get_objective_value(), 208.13008130081298)
     assert np.allclose(prob.get_array_value(X), np.array([27.642277, 58.536587, 26.016260, 104.065041]))
     assert np.allclose(prob.get_array_value(S), np.array([72.357727, 0.0, 0.0, 0.0, 0.0]))
+
+
+def test_lp_matrix_constraints():
+    """
+    Same problem as test_lp_simple3, with the constraints inserted as a matrix block
+    """
+    prob = LpModel()
+
+    X = np.array(prob.add_vars(name="X", size=2), dtype=object)
+    assert [x.get_index() for x in X] == [0, 1]
+
+    prob.maximize(5 * X[0] + 7 * X[1])
+
+    A = sp.csc_matrix(np.array([[3.0, 4.0],
+                                [2.0, 3.0]]))
+    csts = prob.add_matrix_cst(terms=[(A, X)],
+                               lb=np.full(2, -prob.INFINITY),
+                               ub=np.array([650.0, 500.0]),
+                               name="cst_")
+
+    assert [c.sense for c in csts] == ["<=", "<="]
+    assert [c.name for c in csts] == ["cst_0", "cst_1"]
+
+    lower, A2, upper = prob.get_coefficients_data()
+    assert np.allclose(A2.toarray(), A.toarray())
+    assert np.allclose(upper, [650.0, 500.0])
+
+    prob.solve()
+
+    assert prob.is_optimal()
+    assert np.isclose(prob.get_objective_value(), 1137.5)
+    assert np.allclose(prob.get_array_value(X), [0.0, 162.5])
+    assert np.isclose(prob.get_value(prob.dot(A, X)[0]), 650.0)
@@ -21,6 +21,7 @@ from scipy.sparse import csc_matrix, random, hstack, vstack
 import GridCalEngine.api as gce
 from GridCalEngine.Utils.Sparse import csc_stack_2d_ff
 from GridCalEngine.Utils.Sparse.csc import sp_slice, sp_slice_rows, dense_to_csc
+from GridCalEngine.Utils.NumericalMethods.sparse_solve import SparseLinearSolver
 
 
 def test_sp_slice():
@@ -109,5 +110,41 @@ def test_dense_to_sparse() -> None:
         assert np.allclose(expected_ptdf, sparse_ptdf.toarray())
 
 
+def test_sparse_linear_solver_refactorization():
+    """
+    Check that the factorization handle reuses the symbolic analysis
+    and solves several right hand sides
+    """
+    n = 200
+    np.random.seed(0)
+    A = csc_matrix(random(n, n, density=0.05, random_state=0) + csc_matrix(np.eye(n) * 10.0))
+    b = np.random.rand(n)
+    B = np.random.rand(n, 3)
+
+    solver = SparseLinearSolver()
+    x = solver(A, b)
+    assert np.allclose(A @ x, b)
+
+    # same pattern, different values: only the numeric factorization is done
+    A2 = A.copy()
+    A2.data *= 2.0
+    X = solver.factorize(A2).solve(B)
+    assert np.allclose(A2 @ X, B)
+    assert solver.n_analysis == 1
+    assert solver.n_factorizations == 2
+
+    # different pattern: the analysis is repeated
+    A3 = csc_matrix(A + csc_matrix(random(n, n, density=0.01, random_state=1)))
+    x3 = solver(A3, b)
+    assert np.allclose(A3 @ x3, b)
+    assert solver.n_analysis == 2
+
+    # back to the first pattern (i.e. another island): its analysis is reused
+    x = solver(A, b)
+    assert np.allclose(A @ x, b)
+    assert solver.n_analysis == 2
+    assert solver.n_factorizations == 4
+
+
 if __name__ == '__main__':
     test_dense_to_sparse()
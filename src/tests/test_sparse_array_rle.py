@@ -0,0 +1,118 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import numpy as np
+from GridCalEngine.Devices.sparse_array import RleArray
+from GridCalEngine.Devices.profile import Profile
+
+
+def test_rle_array():
+    """
+    Check the run-length encoded array against its dense equivalent
+    """
+    arr = np.r_[np.full(100, 3.0), np.full(50, 5.0), np.full(200, 3.0)]
+
+    rle = RleArray(data_type=float)
+    rle.create_from_array(arr)
+
+    assert rle.n_runs == 3
+    assert rle.default_value == 3.0
+    assert np.array_equal(rle.toarray(), arr)
+    assert rle.get_map() == {i: 5.0 for i in range(100, 150)}
+
+    idx = np.array([0, 99, 100, 149, 150, 349])
+    assert np.array_equal(rle.at_batch(idx), arr[idx])
+
+    rle2 = RleArray(data_type=float)
+    rle2.create_from_dict(default_value=3.0, size=350, map_data={i: 5.0 for i in range(100, 150)})
+    assert rle == rle2
+
+    # arithmetic
+    assert np.array_equal((rle + rle2).toarray(), arr + arr)
+    assert np.array_equal((rle * 2.0).toarray(), arr * 2.0)
+    assert np.array_equal((rle - rle2).toarray(), np.zeros(350))
+    assert (rle - rle2).n_runs == 1
+
+    # resampling
+    idx = np.arange(0, 350, 7)
+    rle.resample(idx)
+    assert np.array_equal(rle.toarray(), arr[idx])
+
+    # resizing
+    rle2.resize(400)
+    assert np.array_equal(rle2.toarray(), np.r_[arr, np.full(50, 3.0)])
+    rle2.resize(120)
+    assert np.array_equal(rle2.toarray(), arr[:120])
+
+
+def test_rle_array_set_values():
+    """
+    Check that writing positions splices the runs like the dense equivalent
+    """
+    arr = np.r_[np.full(100, 3.0), np.full(50, 5.0), np.full(200, 3.0)]
+    rle = RleArray(data_type=float)
+    rle.create_from_array(arr)
+
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        i = int(rng.integers(-350, 350))
+        x = float(rng.choice([3.0, 5.0, 7.0]))
+        rle[i] = x
+        arr[i] = x
+        assert np.array_equal(rle.toarray(), arr)
+        assert rle.n_runs == len(np.where(np.diff(arr) != 0)[0]) + 1
+
+    idx = rng.integers(0, 350, 80)
+    data = rng.choice([3.0, 5.0, 7.0], 80)
+    rle.set_sparse_data_from_data(idx, data)
+    arr[idx] = data
+    assert np.array_equal(rle.toarray(), arr)
+    assert rle.default_value == 3.0
+
+    # negative positions count from the end
+    idx = np.array([-1, -350, 10, -20])
+    assert np.array_equal(rle.at_batch(idx), arr[idx])
+    assert rle[-2] == arr[-2]
+
+
+def test_profile_rle():
+    """
+    Check that the step-like profiles are run-length encoded and the rest are not
+    """
+    arr = np.repeat(np.arange(10.0), 100)
+    profile = Profile(default_value=0.0, data_type=float)
+    profile.set(arr)
+    assert isinstance(profile.sparse_array, RleArray)
+    assert np.array_equal(profile.toarray(), arr)
+
+    idx = np.array([0, 150, 999])
+    assert np.array_equal(profile.get_values(idx), arr[idx])
+
+    profile.scale(2.0)
+    assert np.array_equal(profile.toarray(), 2.0 * arr)
+
+    # non step-like data stays dense
+    arr = np.sin(np.arange(100))
+    profile = Profile(default_value=0.0, data_type=float)
+    profile.set(arr)
+    assert not profile.is_sparse
+    assert np.array_equal(profile.get_values(np.array([3, 7])), arr[[3, 7]])
+
+    # maintenance-like outage
+    profile = Profile(default_value=True, data_type=bool)
+    profile.create_sparse(size=8760, default_value=True, map_data={i: False for i in range(1000, 1500)})
+    assert isinstance(profile.sparse_array, RleArray)
+    assert profile.sparse_array.get_map() == {i: False for i in range(1000, 1500)}
@@ -18,6 +18,8 @@ import os
 import numpy as np
 
 from GridCalEngine.api import *
+from GridCalEngine.Simulations.PowerFlow.power_flow_ts_driver import PowerFlowWarmStart
+from GridCalEngine.Simulations.PowerFlow.power_flow_worker import multi_island_pf_nc
 from tests.zip_file_mgmt import open_data_frame_from_zip
 
 
@@ -49,5 +51,140 @@ def test_time_series():
     assert np.allclose(np.real(ts.results.Sf), data.values[:96])
 
 
+def test_time_series_parallel():
+    """
+    Check that the parallel time series gives exactly the same results as the serial one
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+    time_indices = np.arange(0, 24)
+
+    pf_options = PowerFlowOptions(SolverType.NR, multi_core=False)
+    ts_serial = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+    ts_serial.run()
+
+    pf_options = PowerFlowOptions(SolverType.NR, multi_core=True, n_workers=2)
+    ts_parallel = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+    ts_parallel.run()
+
+    assert np.array_equal(ts_serial.results.voltage, ts_parallel.results.voltage)
+    assert np.array_equal(ts_serial.results.Sf, ts_parallel.results.Sf)
+    assert np.array_equal(ts_serial.results.loading, ts_parallel.results.loading)
+    assert np.array_equal(ts_serial.results.converged_values, ts_parallel.results.converged_values)
+
+
+def test_time_series_warm_start():
+    """
+    Check that starting every step from the previous solution gives the same
+    results as starting from the stored guess, with less iterations
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+    time_indices = np.arange(0, 48)
+
+    for control_q in [ReactivePowerControlMode.NoControl, ReactivePowerControlMode.Direct]:
+        pf_options = PowerFlowOptions(SolverType.NR, control_q=control_q, warm_start=False)
+        ts_cold = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+        ts_cold.run()
+
+        pf_options = PowerFlowOptions(SolverType.NR, control_q=control_q, warm_start=True)
+        ts_warm = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+        ts_warm.run()
+
+        assert ts_warm.results.converged_values.all()
+        assert np.allclose(ts_cold.results.voltage, ts_warm.results.voltage, atol=1e-6)
+        assert ts_warm.results.warm_started_values.sum() == len(time_indices) - 1
+        assert ts_warm.results.iteration_values.sum() < ts_cold.results.iteration_values.sum()
+
+
+def test_time_series_warm_start_generator_off():
+    """
+    Check that a bus kept at its reactive power limit by the warm start is released
+    when its generator is switched off in the next time step
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+    time_indices = np.arange(0, 12)
+
+    # the generator of the bus 29 is at its reactive power limit, switch it off from the time step 5
+    gen = main_circuit.generators[0]
+    bus_idx = main_circuit.buses.index(gen.bus)
+    active = np.ones(main_circuit.get_time_number(), dtype=bool)
+    active[5:] = False
+    gen.active_prof = active
+    main_circuit.add_load(gen.bus, Load(name='load at the generator bus', P=1.0, Q=5.0))
+
+    pf_options = PowerFlowOptions(SolverType.NR, control_q=ReactivePowerControlMode.Direct, warm_start=True)
+
+    warm_start = PowerFlowWarmStart(options=pf_options)
+    nc = compile_numerical_circuit_at(main_circuit, t_idx=4)
+    warm_start.update(nc=nc, pf_res=multi_island_pf_nc(nc=nc, options=pf_options))
+    assert bus_idx in np.r_[warm_start.at_qmax, warm_start.at_qmin]
+
+    nc = compile_numerical_circuit_at(main_circuit, t_idx=5)
+    V_guess, Sbus_input = warm_start.prepare(nc=nc)
+    assert bus_idx not in np.r_[warm_start.at_qmax, warm_start.at_qmin]
+    assert nc.bus_data.bus_types[bus_idx] != BusMode.PV.value
+    assert Sbus_input is None or Sbus_input[bus_idx] == nc.Sbus[bus_idx]
+
+    results = list()
+    for warm in [False, True]:
+        pf_options = PowerFlowOptions(SolverType.NR, control_q=ReactivePowerControlMode.Direct, warm_start=warm)
+        ts = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+        ts.run()
+        results.append(ts.results)
+
+    assert results[1].converged_values.all()
+    assert np.allclose(results[0].voltage, results[1].voltage, atol=1e-6)
+
+
+def test_time_series_batch():
+    """
+    Check that the time series solved with the batched Newton-Raphson
+    gives the same results as the step by step solution
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+    time_indices = np.arange(0, 48)
+
+    pf_options = PowerFlowOptions(SolverType.NR, tolerance=1e-8)
+    ts_serial = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+    ts_serial.run()
+
+    pf_options = PowerFlowOptions(SolverType.NR, tolerance=1e-8, batch_size=16)
+    ts_batch = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+    ts_batch.run()
+
+    assert ts_batch.results.converged_values.all()
+    assert np.allclose(ts_serial.results.voltage, ts_batch.results.voltage, atol=1e-7)
+    assert np.allclose(ts_serial.results.Sf, ts_batch.results.Sf, atol=1e-4)
+    assert np.allclose(ts_serial.results.loading, ts_batch.results.loading, atol=1e-6)
+
+
+def test_time_series_batch_warm_start():
+    """
+    Check that the batches started from the last solution of the previous batch
+    give the same results as the cold batches, with less iterations
+    """
+    fname = os.path.join('data', 'grids', 'IEEE39_1W.gridcal')
+    main_circuit = FileOpen(fname).open()
+    time_indices = np.arange(0, 48)
+
+    pf_options = PowerFlowOptions(SolverType.NR, tolerance=1e-8, batch_size=16)
+    ts_cold = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+    ts_cold.run()
+
+    pf_options = PowerFlowOptions(SolverType.NR, tolerance=1e-8, batch_size=16, warm_start=True)
+    ts_warm = PowerFlowTimeSeriesDriver(grid=main_circuit, options=pf_options, time_indices=time_indices)
+    ts_warm.run()
+
+    # the first batch has no previous solution to start from
+    assert ts_warm.results.converged_values.all()
+    assert np.allclose(ts_cold.results.voltage, ts_warm.results.voltage, atol=1e-7)
+    assert not ts_warm.results.warm_started_values[:16].any()
+    assert ts_warm.results.warm_started_values[16:].all()
+    assert ts_warm.results.iteration_values.sum() < ts_cold.results.iteration_values.sum()
+
+
 if __name__ == '__main__':
     test_time_series()
@@ -0,0 +1,197 @@
+# GridCal
+# Copyright (C) 2015 - 2024 Santiago Peñate Vera
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+from types import SimpleNamespace
+import numpy as np
+import scipy.sparse as sp
+from GridCalEngine.api import FileOpen, PowerFlowDriver, PowerFlowOptions
+from GridCalEngine.Simulations.Dynamics.dynamic_modules import (dynamic_simulation, DynamicModels,
+                                                                 TransientStabilityEvents)
+from GridCalEngine.Simulations.Dynamics.transient_stability_driver import (TransientStability,
+                                                                            TransientStabilityOptions)
+
+
+def get_test_system():
+    """
+    4-bus system: external grid at bus 0, 4th order machines at buses 1 and 2 and a load at bus 3
+    :return: Ybus, V, S, dynamic devices, bus indices, branch matrices (Cf, Ct, Yf, Yt)
+    """
+    F = np.array([0, 0, 1, 2, 1])
+    T = np.array([1, 3, 3, 3, 2])
+    ys = 1.0 / (0.01 + 0.1j)
+    n = 4
+    Cf = sp.csc_matrix((np.ones(len(F)), (np.arange(len(F)), F)), shape=(len(F), n))
+    Ct = sp.csc_matrix((np.ones(len(T)), (np.arange(len(T)), T)), shape=(len(T), n))
+    Cft = Cf - Ct
+    Yf = (sp.diags(np.full(len(F), ys)) @ Cft).tocsc()
+    Yt = -Yf
+    Ybus = (Cf.T @ Yf + Ct.T @ Yt).tocsc()
+
+    V = np.array([1.0, 1.02 * np.exp(0.05j), 1.01 * np.exp(0.03j), 0.97 * np.exp(-0.04j)])
+    S = V * np.conj(Ybus @ V)
+
+    def sm4(**kwargs):
+        params = dict(machine_model=DynamicModels.SynchronousGeneratorOrder4,
+                      H=4.0, Ra=0.0, Xd=1.6, Xdp=0.3, Xdpp=0.2, Xq=1.5, Xqp=0.3, Xqpp=0.2,
+                      Td0p=6.0, Tq0p=0.8, Snom=100.0, speed_volt=False)
+        params.update(kwargs)
+        return SimpleNamespace(**params)
+
+    devices = [SimpleNamespace(machine_model=DynamicModels.ExternalGrid, Xdp=0.05, H=50.0),
+               sm4(),
+               sm4(H=3.0, Xd=1.8, Td0p=5.0)]
+
+    return Ybus, V, S, devices, [0, 1, 2], (Cf, Ct, Yf, Yt)
+
+
+def test_transient_stability_steady_state():
+    """
+    Starting from a power flow solution, all the machines must stay in equilibrium
+    """
+    Ybus, V, S, devices, bus_indices, branches = get_test_system()
+
+    res = dynamic_simulation(n=4, Vbus=V, Sbus=S, Ybus=Ybus, Sbase=100.0, fBase=50.0, t_sim=1.0, h=0.01,
+                             dynamic_devices=devices, bus_indices=bus_indices)
+
+    assert res.voltage.shape == (100, 4)
+    assert res.omega.shape == (100, 3)
+    assert np.allclose(res.voltage, V[np.newaxis, :], atol=1e-6)
+    assert np.allclose(res.omega, 1.0, atol=1e-8)
+
+
+def test_transient_stability_disturbance():
+    """
+    A machine initialised with less power than the network draws from it must decelerate
+    """
+    Ybus, V, S, devices, bus_indices, branches = get_test_system()
+
+    # a smaller injection at the machine bus makes the mechanical power lower than the electrical one
+    S2 = S.copy()
+    S2[1] *= 0.9
+
+    res = dynamic_simulation(n=4, Vbus=V, Sbus=S2, Ybus=Ybus, Sbase=100.0, fBase=50.0, t_sim=1.0, h=0.01,
+                             dynamic_devices=devices, bus_indices=bus_indices)
+
+    assert np.all(np.isfinite(res.voltage))
+    assert res.omega[-1, 1] < 1.0
+    assert not np.allclose(res.voltage[-1, :], V)
+
+
+def get_test_events() -> TransientStabilityEvents:
+    """
+    Fault at the load bus cleared by tripping the line 1-2
+    :return: TransientStabilityEvents
+    """
+    events = TransientStabilityEvents()
+    events.add(t=0.2, evt_type='Bus short circuit', obj=3, param=0.01j)
+    events.add(t=0.3, evt_type='Bus recovery', obj=3, param=None)
+    events.add(t=0.3, evt_type='Line failure', obj=4, param=None)
+    return events
+
+
+def test_transient_stability_events():
+    """
+    The network is refactorized only at the event instants, which are hit exactly
+    """
+    Ybus, V, S, devices, bus_indices, (Cf, Ct, Yf, Yt) = get_test_system()
+
+    res = dynamic_simulation(n=4, Vbus=V, Sbus=S, Ybus=Ybus, Sbase=100.0, fBase=50.0, t_sim=1.0, h=0.003,
+                             dynamic_devices=devices, bus_indices=bus_indices,
+                             events=get_test_events(), Cf=Cf, Ct=Ct, Yf=Yf, Yt=Yt)
+
+    # initial factorization + one per event instant
+    assert res.n_factorizations == 3
+    assert np.any(np.isclose(res.time, 0.2))
+    assert np.any(np.isclose(res.time, 0.3))
+
+    before = res.time <= 0.2 + 1e-9
+    during = (res.time > 0.2 + 1e-9) & (res.time <= 0.3 + 1e-9)
+    assert np.allclose(res.omega[before], 1.0, atol=1e-8)
+    assert np.all(np.abs(res.voltage[during, 3]) < 0.2)
+    assert np.all(res.omega[during, 1:] > 1.0)
+
+
+def test_transient_stability_adaptive():
+    """
+    The adaptive step follows the fixed small step solution with far fewer steps
+    """
+    Ybus, V, S, devices, bus_indices, (Cf, Ct, Yf, Yt) = get_test_system()
+
+    fixed = dynamic_simulation(n=4, Vbus=V, Sbus=S, Ybus=Ybus, Sbase=100.0, fBase=50.0, t_sim=5.0, h=0.001,
+                               dynamic_devices=devices, bus_indices=bus_indices,
+                               events=get_test_events(), Cf=Cf, Ct=Ct, Yf=Yf, Yt=Yt, max_err=1e-8)
+
+    adaptive = dynamic_simulation(n=4, Vbus=V, Sbus=S, Ybus=Ybus, Sbase=100.0, fBase=50.0, t_sim=5.0, h=0.001,
+                                  dynamic_devices=devices, bus_indices=bus_indices,
+                                  events=get_test_events(), Cf=Cf, Ct=Ct, Yf=Yf, Yt=Yt, max_err=1e-8,
+                                  adaptive=True, h_max=0.2, integration_tol=1e-6)
+
+    assert np.isclose(adaptive.time[-1], 5.0)
+    assert len(adaptive.time) * 5 < len(fixed.time)
+    assert adaptive.n_factorizations == 3
+
+    # the steps grow far beyond the initial one away from the disturbances
+    steps = np.diff(np.r_[0.0, adaptive.time])
+    assert np.isclose(steps[0], 0.001)
+    assert np.max(steps) > 0.05
+
+    for k in range(len(devices)):
+        omega_fixed = np.interp(adaptive.time, fixed.time, fixed.omega[:, k])
+        assert np.allclose(adaptive.omega[:, k], omega_fixed, atol=5e-4)
+
+
+def test_transient_stability_driver():
+    """
+    The driver runs from a grid whose events are bus and branch devices
+    """
+    grid = FileOpen(os.path.join('data', 'grids', 'case14.m')).open()
+    pf_driver = PowerFlowDriver(grid=grid, options=PowerFlowOptions())
+    pf_driver.run()
+
+    # dynamic parameters of the generators
+    for gen in grid.get_generators():
+        if gen.bus.is_slack:
+            params = dict(machine_model=DynamicModels.ExternalGrid, Xdp=0.05, H=50.0)
+        else:
+            params = dict(machine_model=DynamicModels.SynchronousGeneratorOrder4,
+                          H=4.0, Ra=0.0, Xd=1.6, Xdp=0.3, Xdpp=0.2, Xq=1.5, Xqp=0.3, Xqpp=0.2,
+                          Td0p=6.0, Tq0p=0.8, Snom=100.0, speed_volt=False)
+        for key, value in params.items():
+            setattr(gen, key, value)
+
+    bus = grid.get_buses()[13]
+    line = [br for br in grid.get_branches_wo_hvdc() if br.bus_from.name == 'bus 13' and br.bus_to.name == 'bus 14'][0]
+
+    events = TransientStabilityEvents()
+    events.add(t=0.2, evt_type='Bus short circuit', obj=bus, param=0.05j)
+    events.add(t=0.3, evt_type='Bus recovery', obj=bus, param=None)
+    events.add(t=0.3, evt_type='Line failure', obj=line, param=None)
+
+    driver = TransientStability(grid=grid,
+                                options=TransientStabilityOptions(h=0.005, t_sim=1.0),
+                                pf_res=pf_driver.results,
+                                events=events)
+    driver.run()
+    res = driver.results
+
+    before = res.time <= 0.2 + 1e-9
+    during = (res.time > 0.2 + 1e-9) & (res.time <= 0.3 + 1e-9)
+    assert res.n_factorizations == 3
+    assert np.allclose(res.omega[before], 1.0, atol=1e-6)
+    assert np.allclose(res.voltage[before], pf_driver.results.voltage[np.newaxis, :], atol=1e-6)
+    assert np.all(np.abs(res.voltage[during, 13]) < 0.2)
+    assert np.all(np.abs(res.omega[-1] - 1.0) < 0.01)